@@ -0,0 +1,129 @@
+"""
+アバターごとのプロファイル
+
+アバターを切り替えると PhysBone 名や好みの強度カーブが変わることが多いので、
+VRChat が送る /avatar/change（引数はアバター ID）を見て、アバター ID ごとの設定に切り替える。
+
+プロファイルは起動時に [avatars."<アバター ID>"] の表から一度だけ組み立ててメモリに置き、
+切り替え時には設定ファイルを読まない（属性の差し替えと状態のリセットだけ）：
+
+    [avatars."avtr_xxxxxxxx"]
+    stretch_param = "/avatar/parameters/Collar_Stretch"  # [osc] の *_param を上書き（省略したものは名前を揃えて [osc] から作る）
+    max_stimulus_value = 50                              # 強度カーブの上書き（全 PhysBone 共通）
+    [avatars."avtr_xxxxxxxx".physbones.Leash]            # 追加 PhysBone（省略時は [physbones]）
+    max_stretch_for_calc = 0.6
+    [avatars."avtr_xxxxxxxx".speed_mode]                 # 速度モード設定の上書き
+    speed_zap_threshold = 2.0
+
+どのプロファイルにも一致しないアバターでは既定のプロファイル（[osc] と [physbones]）を使う。
+"""
+
+import logging
+from dataclasses import dataclass, fields, replace
+
+from physbones import PhysBone, build_physbones, configured_physbones, physbone_name, rename_param
+
+logger = logging.getLogger(__name__)
+
+# 既定のプロファイルのキー（OSCReceiver の avatar_profiles でも同じく "" 以外のキーがアバター ID）
+DEFAULT_PROFILE = ""
+
+_PARAM_KEYS = ("stretch_param", "is_grabbed_param", "angle_param", "is_posed_param")
+
+
+@dataclass(frozen=True)
+class AvatarProfile:
+    """1 アバター分の受信アドレス・強度カーブ・速度モード設定。"""
+    avatar_id: str
+    physbones: tuple[PhysBone, ...]
+    speed_mode: object | None = None  # SpeedModeSettings。None なら [speed_mode] を実行時に読む
+
+
+def compile_profiles(s=None) -> dict[str, AvatarProfile]:
+    """設定からアバター ID → AvatarProfile を作る（DEFAULT_PROFILE が既定のプロファイル）。"""
+    from intensity import IntensityConfig
+    if s is None:
+        import settings as s_mod
+        s = s_mod.settings
+    osc = s.osc
+    profiles = {DEFAULT_PROFILE: AvatarProfile(DEFAULT_PROFILE, tuple(configured_physbones(s)))}
+
+    allowed = IntensityConfig.field_names() | set(_PARAM_KEYS) | {"physbones", "speed_mode"}
+    speed_fields = {f.name for f in fields(s.speed_mode)}
+    for avatar_id, table in s.avatars.items():
+        table = table or {}
+        label = f'avatars."{avatar_id}"'
+        unknown = sorted(set(table) - allowed)
+        if unknown:
+            logger.warning(f"[{label}] unknown keys ignored: {', '.join(unknown)}")
+
+        # 省略したアドレスは stretch_param の PhysBone 名に揃える（アドレス → PhysBone 名を一意に保つ）
+        name = physbone_name(table.get("stretch_param", osc.stretch_param))
+        params = [table.get(key) or rename_param(getattr(osc, key), name) for key in _PARAM_KEYS]
+        base = {k: v for k, v in table.items() if k in IntensityConfig.field_names()}
+        physbones = build_physbones(
+            *params, table.get("physbones", s.physbones), base, label=f"{label}.physbones")
+
+        speed_mode = None
+        if table.get("speed_mode"):
+            speed = table["speed_mode"]
+            bad = sorted(set(speed) - speed_fields)
+            if bad:
+                logger.warning(f"[{label}.speed_mode] unknown keys ignored: {', '.join(bad)}")
+            speed_mode = replace(s.speed_mode, **{k: v for k, v in speed.items() if k in speed_fields})
+
+        profiles[avatar_id] = AvatarProfile(avatar_id, tuple(physbones), speed_mode)
+    return profiles
+
+
+def physbone_union(profiles: dict[str, AvatarProfile]) -> list[PhysBone]:
+    """全プロファイルの PhysBone を名前で重複を除いて並べる（既定のプロファイルが先）。
+
+    アドレスの末尾が PhysBone 名なので、同じ名前なら受信アドレスのルートも同じになる。
+    """
+    seen: dict[str, PhysBone] = {}
+    for profile in profiles.values():
+        for pb in profile.physbones:
+            seen.setdefault(pb.name, pb)
+    return list(seen.values())
+
+
+class AvatarSwitcher:
+    """アバター切り替えを PhysBone ごとの状態機械に適用する。
+
+    OSCEventQueue のコンシューマスレッドから（受信順に）呼ぶ。切り替えのたびに
+    進行中の Grab は刺激なしでリセットし、強度カーブと速度モード設定を差し替える。
+    差し替える値はプロファイルごとに起動時に計算しておく。
+    """
+
+    def __init__(self, profiles: dict[str, AvatarProfile], machines: dict):
+        """
+        Args:
+            profiles: compile_profiles() の結果
+            machines: PhysBone 名 → GrabStateMachine（physbone_union() の全 PhysBone 分）
+        """
+        self._machines = machines
+        # プロファイル → [(状態機械, 強度カーブの上書き, 速度モード設定)]（プロファイルにない PhysBone は空の上書き）
+        self._plans: dict[str, list[tuple]] = {}
+        for key, profile in profiles.items():
+            by_name = {pb.name: pb for pb in profile.physbones}
+            self._plans[key] = [
+                (m, by_name[name].intensity_overrides if name in by_name else {}, profile.speed_mode)
+                for name, m in machines.items()
+            ]
+        self.avatar_id: str | None = None
+        self.profile: str = DEFAULT_PROFILE
+        self.switches: int = 0
+
+    def apply(self, avatar_id: str) -> None:
+        """avatar_id のプロファイル（なければ既定）に切り替える。"""
+        key = avatar_id if avatar_id in self._plans else DEFAULT_PROFILE
+        for machine, overrides, speed_mode in self._plans[key]:
+            machine.reset()
+            machine.intensity_overrides = overrides
+            machine.speed_mode = speed_mode
+        self.avatar_id = avatar_id
+        self.switches += 1
+        if key != self.profile:
+            logger.info(f"[Avatar] Switched to {'profile ' + key if key else 'default profile'} ({avatar_id})")
+        self.profile = key
@@ -0,0 +1,227 @@
+"""時計（現在時刻・遅延実行・取り消し）
+
+GrabStateMachine と速度モードは時刻の取得とタイマーをここに頼る。
+本番は SystemClock（time.perf_counter() と TimerScheduler のスレッド 1 本）、テストやシミュレーションは
+VirtualClock を渡すと、スレッドも実時間の待ちもなしに決定的に動く：
+
+    clock = VirtualClock()
+    machine = GrabStateMachine("ShockPB", clock=clock)
+    SpeedModeHandler(machine)               # machine.clock を使う
+    clock.advance_to(t)                     # t までに期限の来たタイマーを順に実行してから
+    machine.on_stretch_change(value, t)     # イベントを渡す
+
+時刻はすべて time.perf_counter() と同じ基準（秒、単調）で、イベント時刻と比べられる。
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, Protocol
+
+logger = logging.getLogger(__name__)
+
+
+class Clock(Protocol):
+    """時計のインターフェース。"""
+
+    def now(self) -> float:
+        """現在時刻（秒）。"""
+        ...
+
+    def call_later(self, delay: float, fn: Callable, *args):
+        """delay 秒後に fn(*args) を呼ぶ。cancel() に渡すハンドルを返す。"""
+        ...
+
+    def cancel(self, handle) -> None:
+        """call_later() で積んだ呼び出しを取り消す（実行済み・取り消し済みなら何もしない）。"""
+        ...
+
+
+class TimerScheduler:
+    """全タイマーを 1 本のスレッドで待つスケジューラ（期限順のヒープ）。
+
+    threading.Timer はタイマーごとに OS スレッドを 1 本作るので、停止タイマーを頻繁に張り直すと
+    短命なスレッドが 1 秒に何十本もできる。こちらは何個積んでもスレッドは 1 本（最初の call_at() で起動）。
+
+    executor を設定すると、期限の来た処理をそこへ渡して実行させる（main.py は OSCEventQueue.post を渡し、
+    Stretch の処理と同じスレッドで直列に実行する）。None ならスケジューラのスレッドで実行する。
+    取り消しは実行直前にも確かめるので、executor に渡した後で cancel() された処理は実行しない。
+    """
+
+    def __init__(self, executor: Callable | None = None):
+        """
+        Args:
+            executor: executor(fn, *args) で処理を実行させる先（省略時はスケジューラのスレッド）
+        """
+        self.executor = executor
+        # [期限, 積んだ順, 処理, 引数]。取り消す・実行すると処理を None にする
+        self._heap: list[list] = []
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._running = True
+
+        # --- カウンタ ---
+        self.scheduled: int = 0   # 積んだタイマーの数
+        self.fired: int = 0       # 実行したタイマーの数
+        self.cancelled: int = 0   # 取り消したタイマーの数
+        self.late_max: float = 0.0  # 期限から実行開始までの最大の遅れ（秒）
+        self._late_sum: float = 0.0
+
+    def call_at(self, deadline: float, fn: Callable, *args) -> list:
+        """時刻 deadline（perf_counter 基準）に fn(*args) を呼ぶ。cancel() に渡すハンドルを返す。"""
+        entry = [deadline, next(self._order), fn, args]
+        with self._cond:
+            heap = self._heap
+            if len(heap) > 4096:
+                # 取り消し済みは期限まで残るので、張り直しが続いたら掃除する
+                heap[:] = [e for e in heap if e[2] is not None]
+                heapq.heapify(heap)
+            heapq.heappush(heap, entry)
+            self.scheduled += 1
+            if self._thread is None and self._running:
+                self._thread = threading.Thread(target=self._run, name="TimerScheduler", daemon=True)
+                self._thread.start()
+            elif heap[0] is entry:
+                self._cond.notify()
+        return entry
+
+    def cancel(self, handle: list) -> None:
+        if handle[2] is not None:
+            handle[2] = None
+            self.cancelled += 1
+
+    def stop(self) -> None:
+        """スレッドを止める（未実行のタイマーは捨てる）。"""
+        with self._cond:
+            self._running = False
+            self._heap.clear()
+            self._cond.notify()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+
+    def stats(self) -> dict:
+        """カウンタのスナップショットを返す。"""
+        return {
+            "scheduled": self.scheduled,
+            "fired":     self.fired,
+            "cancelled": self.cancelled,
+            "pending":   sum(1 for e in self._heap if e[2] is not None),
+            "late_max":  self.late_max,
+            "late_avg":  self._late_sum / self.fired if self.fired else 0.0,
+        }
+
+    def _run(self) -> None:
+        cond = self._cond
+        heap = self._heap
+        while True:
+            with cond:
+                while True:
+                    if not self._running:
+                        return
+                    if not heap:
+                        cond.wait()
+                        continue
+                    head = heap[0]
+                    if head[2] is None:
+                        heapq.heappop(heap)
+                        continue
+                    delay = head[0] - time.perf_counter()
+                    if delay <= 0:
+                        heapq.heappop(heap)
+                        break
+                    cond.wait(delay)
+            executor = self.executor
+            if executor is None:
+                self._fire(head)
+            else:
+                executor(self._fire, head)
+
+    def _fire(self, entry: list) -> None:
+        fn = entry[2]
+        if fn is None:
+            return  # executor に渡した後で取り消された
+        entry[2] = None
+        late = time.perf_counter() - entry[0]
+        self.fired += 1
+        self._late_sum += late
+        if late > self.late_max:
+            self.late_max = late
+        try:
+            fn(*entry[3])
+        except Exception as e:
+            logger.error(f"[TimerScheduler] Timer error: {e}", exc_info=True)
+
+
+# scheduler を指定しない SystemClock が共有するスケジューラ（スレッドは最初のタイマーで起動する）
+_SHARED_SCHEDULER = TimerScheduler()
+
+
+class SystemClock:
+    """実時間の時計。call_later() は TimerScheduler（省略時はプロセスで共有する 1 本）で待つ。"""
+
+    def __init__(self, scheduler: TimerScheduler | None = None):
+        self.scheduler = scheduler or _SHARED_SCHEDULER
+
+    @staticmethod
+    def now() -> float:
+        return time.perf_counter()
+
+    def call_later(self, delay: float, fn: Callable, *args) -> list:
+        return self.scheduler.call_at(time.perf_counter() + max(0.0, delay), fn, *args)
+
+    def cancel(self, handle: list) -> None:
+        self.scheduler.cancel(handle)
+
+
+# 既定の時計
+SYSTEM_CLOCK = SystemClock()
+
+
+class VirtualClock:
+    """仮想時刻の時計。advance() / advance_to() を呼んだときだけ時刻が進み、呼び出したスレッドでタイマーを実行する。"""
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+        # [期限, 積んだ順, 処理, 引数]。取り消すと処理を None にする
+        self._heap: list[list] = []
+        self._order = itertools.count()
+
+    def now(self) -> float:
+        return self._now
+
+    def call_later(self, delay: float, fn: Callable, *args) -> list:
+        entry = [self._now + max(0.0, delay), next(self._order), fn, args]
+        heapq.heappush(self._heap, entry)
+        return entry
+
+    def cancel(self, handle: list) -> None:
+        handle[2] = None
+
+    def advance(self, dt: float) -> int:
+        """dt 秒進める。実行したタイマーの数を返す。"""
+        return self.advance_to(self._now + dt)
+
+    def advance_to(self, t: float) -> int:
+        """時刻 t まで進め、その間に期限の来たタイマーを期限順（同じ期限なら積んだ順）に実行する。
+
+        タイマーの実行中は now() がそのタイマーの期限を返す。実行中に積まれたタイマーも
+        t までに期限が来れば同じ呼び出しで実行する。t が現在時刻より前なら時刻は戻さない。
+        """
+        heap = self._heap
+        fired = 0
+        while heap and heap[0][0] <= t:
+            when, _, fn, args = heapq.heappop(heap)
+            if fn is None:
+                continue
+            self._now = max(self._now, when)
+            fn(*args)
+            fired += 1
+        self._now = max(self._now, t)
+        return fired
+
+    def pending(self) -> int:
+        """取り消されていない未実行のタイマーの数。"""
+        return sum(1 for e in self._heap if e[2] is not None)
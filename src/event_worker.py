@@ -0,0 +1,150 @@
+"""イベントワーカー（購読者ごとの有界キュー + 専用スレッド）
+
+GrabStateMachine の購読コールバックは状態機械のスレッド（OSCEventQueue のコンシューマ）で
+同期的に呼ばれる。BLE の再接続中に send_zap が最大 connect_timeout*2+15 秒ブロックすると、
+その間 Stretch / IsGrabbed が処理されず、GUI も止まる。
+
+デバイス送信やファイル書き込みのように遅くなりうる処理は EventWorker に積み、
+状態機械のスレッドはすぐに戻る。メモリ上だけで完結する処理（状態の更新・閾値判定・GUI キュー）は
+従来どおりインラインで呼ぶ：
+
+    device_worker = EventWorker("device", maxsize=8, overflow="drop_oldest", max_delay=2.0)
+    device_worker.submit(ctrl.send_zap, intensity)                        # 処理だけ積む
+    machine.subscribe_grab_end(self._on_grab_end, worker=recorder_worker)  # コールバックごと積む
+
+キューが一杯のときの扱い（overflow）：
+  - "drop_oldest" : 最も古い処理を捨てて積む（最新の刺激を優先する）
+  - "drop_newest" : 積もうとした処理を捨てる（先に積んだ記録を優先する）
+max_delay を超えて待たされた処理は実行せずに捨てる（切断中に溜まった刺激を再接続後にまとめて送らない）。
+同じワーカーに積んだ処理は積んだ順に 1 つずつ実行する。
+"""
+
+import threading
+import time
+import logging
+from collections import deque
+from functools import partial
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest")
+
+
+def call_now(fn: Callable, *args) -> bool:
+    """ワーカーを使わないときの submit の代わり：fn(*args) をその場で実行する。"""
+    fn(*args)
+    return True
+
+
+class EventWorker:
+    """有界キューに積んだ処理を専用スレッドで順に実行する。"""
+
+    def __init__(self, name: str, maxsize: int = 16, overflow: str = "drop_oldest", max_delay: float = 0.0):
+        """
+        Args:
+            name: スレッド名・ログ用の名前
+            maxsize: キューに溜められる処理の数（1 以上）
+            overflow: キューが一杯のときの扱い（OVERFLOW_POLICIES）
+            max_delay: 積んでからこの秒数を過ぎた処理は実行しない、0 で無制限
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            logger.warning(f"[EventWorker:{name}] Unknown overflow policy {overflow!r}, using 'drop_oldest'")
+            overflow = "drop_oldest"
+        self.name = name
+        self._maxsize = max(1, maxsize)
+        self._drop_oldest = overflow == "drop_oldest"
+        self._max_delay = max_delay
+
+        # (積んだ時刻, 処理, 引数)
+        self._items: deque[tuple[float, Callable, tuple]] = deque()
+        self._cond = threading.Condition()
+        self._running = True
+
+        # --- カウンタ ---
+        self.submitted: int = 0  # 積んだ処理の数
+        self.executed: int = 0   # 実行した処理の数
+        self.dropped: int = 0    # キューが一杯で捨てた処理の数
+        self.expired: int = 0    # max_delay を過ぎて捨てた処理の数
+        self.errors: int = 0     # 例外で終わった処理の数
+        self.max_wait: float = 0.0  # 積んでから実行を始めるまでの最大待ち時間（秒）
+
+        self._thread = threading.Thread(target=self._run, name=f"EventWorker-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable, *args) -> bool:
+        """fn(*args) をワーカースレッドで実行するよう積む（すぐ戻る）。捨てたら False。"""
+        with self._cond:
+            if not self._running:
+                return False
+            self.submitted += 1
+            items = self._items
+            if len(items) >= self._maxsize:
+                self.dropped += 1
+                if not self._drop_oldest:
+                    self._log_drop()
+                    return False
+                items.popleft()
+                self._log_drop()
+            items.append((time.perf_counter(), fn, args))
+            self._cond.notify()
+            return True
+
+    def wrap(self, fn: Callable) -> Callable[..., None]:
+        """呼ばれたら fn をこのワーカーに積むコールバックを返す（subscribe_*(worker=...) が使う）。"""
+        return partial(self.submit, fn)
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """未実行の処理を捨ててスレッドを止める（実行中の処理は timeout まで待つ）。"""
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._items.clear()
+            self._cond.notify()
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        logger.info(f"[EventWorker:{self.name}] stopped: {self.stats()}")
+
+    def stats(self) -> dict:
+        """カウンタのスナップショットを返す。"""
+        return {
+            "submitted": self.submitted,
+            "executed":  self.executed,
+            "dropped":   self.dropped,
+            "expired":   self.expired,
+            "errors":    self.errors,
+            "max_wait":  self.max_wait,
+            "pending":   len(self._items),
+        }
+
+    # ------------------------------------------------------------------ #
+    # 内部                                                                 #
+    # ------------------------------------------------------------------ #
+
+    def _log_drop(self) -> None:
+        if self.dropped == 1 or self.dropped % 100 == 0:
+            logger.warning(f"[EventWorker:{self.name}] Queue full, dropped {self.dropped} event(s)")
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while self._running and not self._items:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                queued_at, fn, args = self._items.popleft()
+
+            wait = time.perf_counter() - queued_at
+            if self._max_delay and wait > self._max_delay:
+                self.expired += 1
+                logger.warning(f"[EventWorker:{self.name}] Skipped stale event ({wait:.1f}s old)")
+                continue
+            if wait > self.max_wait:
+                self.max_wait = wait
+            try:
+                fn(*args)
+                self.executed += 1
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"[EventWorker:{self.name}] Event error: {e}", exc_info=True)
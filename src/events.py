@@ -0,0 +1,51 @@
+"""
+GrabStateMachine が購読者に渡すイベント
+
+強度（内部値・表示用 %）は状態機械がイベントごとに 1 回だけ計算して載せる。
+ハンドラは calculate_zap_intensity / IntensityConfig.from_settings を呼び直さずにこれを読む。
+
+イベントは NamedTuple（__slots__ = () のタプル）なので不変で、属性を持つ dict を作らない。
+ワーカースレッドに渡しても（event_worker.EventWorker）値が変わらない。
+
+seq は状態機械ごとのイベント番号（GrabStart / StretchUpdate / GrabEnd で共通、1 から）。
+ZapFired はデバイス送信のスレッド（device_worker）から届くので番号を持たない。
+"""
+
+from typing import NamedTuple
+
+from intensity import IntensityConfig
+
+
+class GrabStart(NamedTuple):
+    """Grab 開始（IsGrabbed が false → true）。"""
+    seq: int
+    event_time: float  # 受信時刻（time.perf_counter() 基準）
+    stretch: float     # 開始時点の Stretch
+
+
+class StretchUpdate(NamedTuple):
+    """Grab 中に Stretch 値が変わった。"""
+    seq: int
+    event_time: float
+    stretch: float
+    intensity: int           # calculate_intensity(stretch)（0 なら刺激なし）
+    intensity_display: int   # 表示用 %（intensity が 0 なら 0）
+
+
+class GrabEnd(NamedTuple):
+    """Grab 終了（IsGrabbed が true → false）。"""
+    seq: int
+    event_time: float
+    stretch: float           # 終了直前の Stretch
+    duration: float          # Grab していた時間（秒）
+    intensity: int
+    intensity_display: int
+    config: IntensityConfig  # 強度の計算に使った設定（記録用）
+
+
+class ZapFired(NamedTuple):
+    """ハンドラが Zap を送った（StimulusHandler / SpeedModeHandler が notify_zap() で通知する）。"""
+    event_time: float        # 送信した時刻（machine.clock.now()）
+    intensity: int
+    intensity_display: int
+    sent: bool               # デバイスが送信を受け付けたか（send_zap の戻り値）
@@ -0,0 +1,150 @@
+"""Grab 1 回分の Stretch サンプル列（[(Grab 開始からの経過秒, Stretch), ...] と離す経過秒）
+
+速度モードのテスト・ベンチマーク・負荷ジェネレータ（tools/）が同じ入力を使うための生成と読み込み：
+
+  - profile_samples() : 引っ張り方（PROFILES）ごとの決まった形（tools/osc_load_generator.py が送る形）
+  - synthetic_grabs() : ピーク・引く時間・形をばらつかせ、送信間隔の揺れとノイズを入れた Grab の列
+  - journal_grabs()   : 記録したジャーナルの Grab（grab_start〜grab_end のサンプル）
+"""
+
+import random
+
+PROFILES = ("slow", "yank", "jitter", "hold", "tugs")
+
+# synthetic_grabs() の形（slow は速度モードの合格ラインに届かないゆっくりした引っ張り）
+SYNTHETIC_KINDS = ("decel", "smooth", "hesitate", "slow")
+
+
+# ---------------------------------------------------------------------- #
+# 引っ張り方（Grab 開始からの経過秒 → Stretch 値）                         #
+# ---------------------------------------------------------------------- #
+
+def _ramp(t0: float, t1: float, v0: float, v1: float, rate: float) -> list[tuple[float, float]]:
+    """t0〜t1 の間を rate Hz で v0 → v1 に直線補間したサンプル（t1 は含まない）。"""
+    n = max(1, int((t1 - t0) * rate))
+    return [(t0 + (t1 - t0) * i / n, v0 + (v1 - v0) * i / n) for i in range(n)]
+
+
+def profile_samples(
+    profile: str,
+    rate: float,
+    peak: float = 0.6,
+    duration: float = 1.0,
+    tugs: int = 3,
+    jitter: float = 0.05,
+    settle: float = 0.15,
+    rng: random.Random | None = None,
+) -> tuple[list[tuple[float, float]], float]:
+    """1 回の Grab 分の Stretch サンプルを作る。
+
+    Args:
+        profile: PROFILES のいずれか
+        rate: Stretch の送信レート（Hz）
+        peak: 最大 Stretch
+        duration: 主動作の長さ（秒。yank / tugs では引く・戻す 1 回の速さに使わない）
+        tugs: tugs の回数
+        jitter: jitter の振れ幅
+        settle: yank / tugs で引き始めるまでの静止時間（速度モードの grab_settle_time より長く）
+        rng: jitter 用の乱数
+
+    Returns:
+        ([(経過秒, Stretch), ...], Grab を離す経過秒)
+    """
+    rng = rng or random.Random(0)
+    if profile == "slow":
+        samples = _ramp(0.0, duration, 0.0, peak, rate) + _ramp(duration, duration + 0.3, peak, peak, rate)
+        return samples, duration + 0.3
+    if profile == "yank":
+        pull = 0.08
+        samples = (_ramp(0.0, settle, 0.0, 0.0, rate)
+                   + _ramp(settle, settle + pull, 0.0, peak, rate)
+                   + _ramp(settle + pull, settle + pull + 0.5, peak, peak, rate))
+        return samples, settle + pull + 0.5
+    if profile == "jitter":
+        center = peak / 2
+        samples = [(t, min(1.0, max(0.0, center + rng.uniform(-jitter, jitter))))
+                   for t, _ in _ramp(0.0, duration, 0.0, 0.0, rate)]
+        return samples, duration
+    if profile == "hold":
+        return _ramp(0.0, duration, peak, peak, rate), duration
+    if profile == "tugs":
+        samples = _ramp(0.0, settle, 0.0, 0.0, rate)
+        t = settle
+        for _ in range(tugs):
+            samples += _ramp(t, t + 0.1, 0.1, peak, rate) + _ramp(t + 0.1, t + 0.2, peak, 0.1, rate)
+            samples += _ramp(t + 0.2, t + 0.4, 0.1, 0.1, rate)
+            t += 0.4
+        return samples, t
+    raise ValueError(f"unknown profile: {profile!r}")
+
+
+# ---------------------------------------------------------------------- #
+# ばらつかせた Grab                                                        #
+# ---------------------------------------------------------------------- #
+
+def _shape(kind: str, x: float) -> float:
+    """引っ張りの進み具合 x（0〜1）→ 伸びの割合（0〜1）"""
+    if kind == "decel":
+        return 1.0 - (1.0 - x) ** 2
+    if kind == "hesitate":
+        # 前半 60% まで伸ばして止まり（0.1 秒分は synthetic_grabs で足す）、残りを伸ばす
+        return 0.6 * _shape("smooth", min(1.0, x * 2)) + 0.4 * _shape("smooth", max(0.0, x * 2 - 1))
+    return x * x * (3 - 2 * x)
+
+
+def synthetic_grabs(count: int, rate: float, noise: float, seed: int) -> list[tuple[str, list[tuple[float, float]], float]]:
+    """[(種類, [(経過秒, Stretch), ...], 離す経過秒), ...]
+
+    種類（SYNTHETIC_KINDS を順に）:
+      decel    : 等減速で止まる（速度が直線的に 0 へ）
+      smooth   : 加速して減速（smoothstep）
+      hesitate : 途中で 0.1 秒止まってから続きを引く
+      slow     : 合格ラインに届かないゆっくりした引っ張り
+    送信間隔は rate Hz を中心に揺らし、ときどき 2 パケットが詰まって届く。値には ±noise のノイズを乗せる。
+    """
+    rng = random.Random(seed)
+    grabs = []
+    for i in range(count):
+        kind = SYNTHETIC_KINDS[i % len(SYNTHETIC_KINDS)]
+        peak = rng.uniform(0.3, 0.9)
+        pull = rng.uniform(0.8, 1.6) if kind == "slow" else rng.uniform(0.08, 0.35)
+        pause = 0.1 if kind == "hesitate" else 0.0
+        settle, hold = 0.15, 0.6
+        samples, t = [], 0.0
+        while t < settle + pull + pause + hold:
+            t += 0.0005 if rng.random() < 0.1 else rng.uniform(0.6, 1.4) / rate
+            x = t - settle
+            if kind == "hesitate" and x > pull / 2:
+                x = max(pull / 2, x - pause)  # 半分まで引いたところで pause 秒止まる
+            base = peak * _shape(kind, min(1.0, max(0.0, x / pull)))
+            samples.append((t, min(1.0, max(0.0, base + rng.uniform(-noise, noise)))))
+        grabs.append((kind, samples, t + 0.01))
+    return grabs
+
+
+# ---------------------------------------------------------------------- #
+# ジャーナル                                                               #
+# ---------------------------------------------------------------------- #
+
+def journal_grabs(path: str) -> list[tuple[str, list[tuple[float, float]], float]]:
+    """ジャーナルの Grab を synthetic_grabs() と同じ形で返す（種類の代わりに PhysBone 名）。"""
+    from journal import JournalReader
+
+    grabs, open_grabs = [], {}
+    with JournalReader(path) as reader:
+        for r in reader:
+            if r.kind == "grab_start":
+                open_grabs[r.physbone] = (r.t, [])
+            elif r.kind == "sample" and r.physbone in open_grabs:
+                start, samples = open_grabs[r.physbone]
+                samples.append((r.t - start, r.stretch))
+            elif r.kind == "grab_end" and r.physbone in open_grabs:
+                start, samples = open_grabs.pop(r.physbone)
+                grabs.append((r.physbone, samples, r.t - start))
+    return grabs
+
+
+def peak_time(samples: list[tuple[float, float]]) -> float:
+    """Stretch が最大値の 99% に最初に届いた経過秒（遅れの起点）。"""
+    top = max((s for _, s in samples), default=0.0)
+    return next((t for t, s in samples if s >= top * 0.99), 0.0)
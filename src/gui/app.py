@@ -87,6 +87,11 @@ class PavlokGUI(tk.Tk):
         if hasattr(self, 'tab_dashboard'):
             self.tab_dashboard.set_device(device)
 
+    def set_executor(self, executor):
+        """テストタブの入力を状態機械のスレッドで実行させる関数（OSCEventQueue.post）"""
+        if hasattr(self, 'tab_test'):
+            self.tab_test.set_executor(executor)
+
     def poll_data(self):
         try:
             while True:
@@ -19,6 +19,7 @@ class DashboardTab(ttk.Frame):
         super().__init__(parent)
         self.grab_state = None
         self._device = None
+        self._bone_rows: dict[str, tuple] = {}  # PhysBone 名 → (掴み状態, 引っ張り度, 計算強度) のラベル
         self._create_widgets()
 
     def set_grab_state(self, grab_state):
@@ -95,11 +96,17 @@ class DashboardTab(ttk.Frame):
         self.osc_status_label = ttk.Label(osc_frame, text="接続中", foreground="green")
         self.osc_status_label.pack(side="left")
 
+        # PhysBone ごとの状態（2 個目の PhysBone から状態が届いたら表示する）
+        self._bones_frame = ttk.LabelFrame(frame, text="PhysBone 別", padding=10)
+        for col, text in enumerate(("PhysBone", "掴み状態", "引っ張り度", "計算強度")):
+            ttk.Label(self._bones_frame, text=text, width=15).grid(row=0, column=col, sticky="w")
+
         # 詳細情報
         detail_frame = ttk.LabelFrame(frame, text="詳細情報", padding=10)
         detail_frame.pack(fill="x", pady=10)
         self.detail_text = tk.Text(detail_frame, height=5, width=60, state="disabled")
         self.detail_text.pack(fill="both", expand=True)
+        self._detail_frame = detail_frame
 
 
     # ------------------------------------------------------------------ #
@@ -198,6 +205,11 @@ class DashboardTab(ttk.Frame):
             self._schedule_battery_refresh(failed=False)
 
     def update(self, data: dict):
+        """状態のスナップショットを表示する。
+
+        PhysBone が複数あると status_queue には全部の状態機械のスナップショットが混ざって届くので、
+        上の表示は主 PhysBone（grab_state）のものだけで更新し、各 PhysBone は「PhysBone 別」の行に出す。
+        """
         from datetime import datetime
         from pavlok_controller import normalize_intensity_for_display
         try:
@@ -206,6 +218,16 @@ class DashboardTab(ttk.Frame):
             intensity = data.get('intensity', 0)
             last_zap_display = data.get('last_zap_display_intensity', 0)
             last_zap_actual = data.get('last_zap_actual_intensity', 0)
+            physbone = data.get('physbone', '')
+
+            if intensity == 0:
+                intensity_percent = 0
+            else:
+                intensity_percent = data.get('intensity_display') or normalize_intensity_for_display(intensity)
+
+            self._update_bone_row(physbone, is_grabbed, stretch, intensity_percent)
+            if self.grab_state is not None and physbone and physbone != self.grab_state.name:
+                return
 
             if is_grabbed:
                 self.grab_status_label.config(text="True", foreground="red")
@@ -215,16 +237,14 @@ class DashboardTab(ttk.Frame):
             self.stretch_slider.set(stretch)
             self.stretch_label.config(text=f"{stretch:.3f}")
 
-            if intensity == 0:
-                intensity_percent = 0
-            else:
-                intensity_percent = normalize_intensity_for_display(intensity)
             self.intensity_progressbar['value'] = intensity_percent
             self.intensity_label.config(text=f"{intensity_percent}%")
 
             self.detail_text.config(state="normal")
             self.detail_text.delete("1.0", "end")
             detail_info = f"時刻: {datetime.now().strftime('%H:%M:%S')}\n"
+            if physbone:
+                detail_info += f"PhysBone: {physbone}\n"
             detail_info += f"計算強度: {intensity_percent}% (表示値) / {intensity} (内部値)\n"
             if last_zap_display > 0:
                 detail_info += f"最終Zap: {last_zap_display}% (内部値: {last_zap_actual})\n"
@@ -235,6 +255,24 @@ class DashboardTab(ttk.Frame):
         except Exception as e:
             print(f"Error updating dashboard: {e}")
 
+    def _update_bone_row(self, physbone: str, is_grabbed: bool, stretch: float, intensity_percent: int):
+        if not physbone:
+            return
+        row = self._bone_rows.get(physbone)
+        if row is None:
+            r = len(self._bone_rows) + 1
+            ttk.Label(self._bones_frame, text=physbone, width=15).grid(row=r, column=0, sticky="w")
+            row = tuple(ttk.Label(self._bones_frame, width=15) for _ in range(3))
+            for col, label in enumerate(row, start=1):
+                label.grid(row=r, column=col, sticky="w")
+            self._bone_rows[physbone] = row
+            if len(self._bone_rows) == 2:
+                self._bones_frame.pack(fill="x", pady=10, before=self._detail_frame)
+        grab_label, stretch_label, intensity_label = row
+        grab_label.config(text=str(is_grabbed), foreground="red" if is_grabbed else "blue")
+        stretch_label.config(text=f"{stretch:.3f}")
+        intensity_label.config(text=f"{intensity_percent}%")
+
     def _on_scan_devices(self):
         """BLE デバイスをスキャンして見つかったデバイスを選択"""
         import asyncio
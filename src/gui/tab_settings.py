@@ -157,6 +157,10 @@ class SettingsTab(ttk.Frame):
             ("OSC_SEND_PORT",   "送信ポート", "int", 9000, 1024, 65535, 1, "VRChat への OSC 送信ポート"),
         ])
         row = 2
+        self._add_combo_item(osc_frame, "OSC_RECEIVER_BACKEND", "受信方式",
+                             ["selector", "threading"], "selector", row=row,
+                             desc="selector=単一スレッド / threading=旧方式（再起動で反映）")
+        row += 1
         self._add_entry_item(osc_frame, "OSC_SEND_IP", "送信先 IP", "127.0.0.1", row=row, desc="通常は 127.0.0.1")
         row += 1
         self._add_entry_item(osc_frame, "OSC_PB_PREFIX", "PhysBone のパラメータ名", "ShockPB", row=row,
@@ -405,6 +409,7 @@ class SettingsTab(ttk.Frame):
             "BLE_KEEPALIVE_INTERVAL":         s.ble.keepalive_interval,
             "BLE_BATTERY_REFRESH_INTERVAL":   s.ble.battery_refresh_interval,
             "OSC_LISTEN_PORT":                    s.osc.listen_port,
+            "OSC_RECEIVER_BACKEND":               s.osc.backend,
             "OSC_SEND_PORT":                      s.osc.send.port,
             "OSC_SEND_IP":                        s.osc.send.ip,
             "OSC_PB_PREFIX":                      self._extract_pb_prefix(s.osc.stretch_param),
@@ -525,6 +530,7 @@ class SettingsTab(ttk.Frame):
             "BLE_KEEPALIVE_INTERVAL":         default_settings.ble.keepalive_interval,
             "BLE_BATTERY_REFRESH_INTERVAL":   default_settings.ble.battery_refresh_interval,
             "OSC_LISTEN_PORT":                    default_settings.osc.listen_port,
+            "OSC_RECEIVER_BACKEND":               default_settings.osc.backend,
             "OSC_SEND_PORT":                      default_settings.osc.send.port,
             "OSC_SEND_IP":                        default_settings.osc.send.ip,
             "OSC_PB_PREFIX":                      self._extract_pb_prefix(default_settings.osc.stretch_param),
@@ -11,6 +11,7 @@ class TestTab(ttk.Frame):
     def __init__(self, parent):
         super().__init__(parent)
         self.grab_state = None
+        self._executor = None  # 状態機械のスレッドで実行する関数（OSCEventQueue.post）
         self.test_stretch_var = tk.DoubleVar(value=0.0)
         self._ble_counter = 0
         self._polling = False
@@ -43,6 +44,36 @@ class TestTab(ttk.Frame):
     def set_grab_state(self, grab_state):
         self.grab_state = grab_state
 
+    def set_executor(self, executor):
+        """テスト入力を状態機械のスレッド（OSC のイベントキューのコンシューマ）で実行させる。
+
+        停止タイマーや OSC の入力と同じスレッドで状態機械を更新するため、GUI のスレッドからは直接呼ばない。
+        """
+        self._executor = executor
+
+    def _post(self, fn, *args):
+        if self._executor:
+            self._executor(fn, *args)
+        else:
+            fn(*args)
+
+    # 以下の 2 つは状態機械のスレッドで実行される
+
+    @staticmethod
+    def _apply_test_grab(gs, grabbed: bool, event_time: float):
+        # is_test_mode は Grab と同じスレッドで切り替える（RecorderHandler が Grab 終了時に参照する）
+        if grabbed:
+            gs.is_test_mode = True
+            gs.on_grabbed_change(True, event_time)
+        else:
+            gs.on_grabbed_change(False, event_time)
+            gs.is_test_mode = False
+
+    @staticmethod
+    def _apply_test_stretch(gs, stretch: float, event_time: float):
+        if gs.is_grabbed:
+            gs.on_stretch_change(stretch, event_time)
+
     # ------------------------------------------------------------------ #
     # リアルタイム状態パネル                                               #
     # ------------------------------------------------------------------ #
@@ -156,10 +187,10 @@ class TestTab(ttk.Frame):
             return
 
         import settings as s_mod
-        from intensity import IntensityConfig, calculate_intensity, normalize_for_display
+        from intensity import calculate_intensity, normalize_for_display
 
         mode = s_mod.settings.device.zap_mode
-        cfg = IntensityConfig.from_settings()
+        cfg = gs.intensity_config()
 
         # Grab 状態
         if gs.is_grabbed:
@@ -420,16 +451,16 @@ class TestTab(ttk.Frame):
     def test_grab_start(self):
         self.test_stretch_var.set(0.0)
         self.test_stretch_label.config(text="0.000")
-        if self.grab_state:
-            self.grab_state.is_test_mode = True
-            self.grab_state.on_grabbed_change(True)
+        gs = self.grab_state
+        if gs:
+            self._post(self._apply_test_grab, gs, True, gs.clock.now())
         print("[Test Send] Grab Start")
 
     def test_grab_end(self):
         stretch = self.test_stretch_var.get()
-        if self.grab_state:
-            self.grab_state.on_grabbed_change(False)
-            self.grab_state.is_test_mode = False
+        gs = self.grab_state
+        if gs:
+            self._post(self._apply_test_grab, gs, False, gs.clock.now())
         self.test_stretch_var.set(0.0)
         self.test_stretch_label.config(text="0.000")
         print(f"[Test Send] Grab End (Final Stretch: {stretch:.3f})")
@@ -437,13 +468,12 @@ class TestTab(ttk.Frame):
     def on_test_stretch_change(self, value):
         stretch = float(value)
         self.test_stretch_label.config(text=f"{stretch:.3f}")
-        if self.grab_state and self.grab_state.is_grabbed:
-            self.grab_state.on_stretch_change(stretch)
+        gs = self.grab_state
+        if gs:
+            self._post(self._apply_test_stretch, gs, stretch, gs.clock.now())
 
     def test_grab_sequence(self, max_stretch: float, duration: float):
         def sequence():
-            if self.grab_state:
-                self.grab_state.is_test_mode = True
             self.test_grab_start()
             time_module.sleep(0.1)
             steps = 20
@@ -453,8 +483,6 @@ class TestTab(ttk.Frame):
                 self.on_test_stretch_change(stretch)
                 time_module.sleep(duration / steps)
             self.test_grab_end()
-            if self.grab_state:
-                self.grab_state.is_test_mode = False
             print(f"[Test Complete] max_stretch={max_stretch:.1f}, duration={duration:.1f}s")
 
         threading.Thread(target=sequence, daemon=True).start()
@@ -3,3 +3,4 @@ from .chatbox import ChatboxHandler
 from .recorder import RecorderHandler
 from .gui_updater import GUIUpdater
 from .speed_mode import SpeedModeHandler
+from .journal import JournalHandler
@@ -3,7 +3,6 @@
 Stretch 変化（スロットル付き）と Grab 終了時に VRChat Chatbox へメッセージを送る。
 """
 
-import time
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,17 +11,19 @@ logger = logging.getLogger(__name__)
 class ChatboxHandler:
     """VRChat Chatbox へのメッセージ送信を担う。"""
 
-    def __init__(self, machine, osc_sender, device=None):
+    def __init__(self, machine, osc_sender, device=None, show_name: bool = False):
         """
         Args:
             machine: GrabStateMachine（stretch_update / grab_end を購読）
             osc_sender: OSCSender インスタンス
             device: デバイスインスタンス（接続状態チェック用、省略可）
+            show_name: メッセージに PhysBone 名を付ける（複数の PhysBone を受信するとき）
         """
         self._machine = machine
         self._sender = osc_sender
         self._device = device
-        self._last_send_time: float = 0.0
+        self._name = f"{machine.name} " if show_name and machine.name else ""
+        self._last_send_time: float = float("-inf")
 
         machine.subscribe_stretch_update(self._on_stretch_update)
         machine.subscribe_grab_end(self._on_grab_end)
@@ -37,39 +38,35 @@ class ChatboxHandler:
     # イベントハンドラ                                                     #
     # ------------------------------------------------------------------ #
 
-    def _on_stretch_update(self, stretch: float) -> None:
+    def _on_stretch_update(self, event) -> None:
         """Grab 中の Stretch 変化：スロットル付きで Chatbox を更新する。"""
         from config import SEND_REALTIME_CHATBOX, OSC_SEND_INTERVAL
         if not SEND_REALTIME_CHATBOX:
             return
 
-        now = time.time()
+        now = event.event_time
         if now - self._last_send_time < OSC_SEND_INTERVAL:
             return
 
-        from pavlok_controller import calculate_zap_intensity, normalize_intensity_for_display
-        intensity = calculate_zap_intensity(stretch)
-        if intensity <= 0:
+        if event.intensity <= 0:
             return
 
-        display = normalize_intensity_for_display(intensity)
+        display = event.intensity_display
         prefix = "[切断中] " if self._is_disconnected() else ""
-        self._sender.send_chatbox_message(f"{prefix}Zap: {display}%", send_immediately=True)
+        self._sender.send_chatbox_message(f"{prefix}{self._name}Zap: {display}%", send_immediately=True)
         self._last_send_time = now
 
-    def _on_grab_end(self, stretch: float, duration: float) -> None:
+    def _on_grab_end(self, event) -> None:
         """Grab 終了時：最終刺激強度を Chatbox に表示する。"""
         from config import MIN_GRAB_DURATION, SEND_FINAL_CHATBOX
         if not SEND_FINAL_CHATBOX:
             return
-        if duration < MIN_GRAB_DURATION:
+        if event.duration < MIN_GRAB_DURATION:
             return
 
-        from pavlok_controller import calculate_zap_intensity, normalize_intensity_for_display
-        intensity = calculate_zap_intensity(stretch)
-        if intensity <= 0:
+        if event.intensity <= 0:
             return
 
-        display = normalize_intensity_for_display(intensity)
+        display = event.intensity_display
         prefix = "[切断中] " if self._is_disconnected() else ""
-        self._sender.send_chatbox_message(f"{prefix}Zap: {display}% [Final]", send_immediately=True)
+        self._sender.send_chatbox_message(f"{prefix}{self._name}Zap: {display}% [Final]", send_immediately=True)
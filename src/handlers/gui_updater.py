@@ -31,13 +31,14 @@ class GUIUpdater:
     def _on_state_change(self) -> None:
         """任意の状態変化時に現在のスナップショットをキューに積む。"""
         try:
-            from pavlok_controller import calculate_zap_intensity
+            # 強度は状態機械が計算済み（Grab していなければ 0）
             m = self._machine
-            intensity = calculate_zap_intensity(m.current_stretch) if m.is_grabbed else 0
             self._queue.put({
+                "physbone": m.name,
                 "is_grabbed": m.is_grabbed,
                 "stretch": m.current_stretch,
-                "intensity": intensity,
+                "intensity": m.intensity,
+                "intensity_display": m.intensity_display,
                 "last_zap_display_intensity": m.last_zap_display_intensity,
                 "last_zap_actual_intensity": m.last_zap_actual_intensity,
             })
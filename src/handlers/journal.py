@@ -0,0 +1,47 @@
+"""イベントジャーナルハンドラ
+
+GrabStateMachine のイベントを journal.EventJournal に追記する。
+追記はレコードを詰めて積むだけなので、状態機械のスレッドでそのまま呼ぶ（書き込みはジャーナルのスレッド）。
+"""
+
+import logging
+from functools import partial
+
+logger = logging.getLogger(__name__)
+
+
+class JournalHandler:
+    """状態機械のイベントをジャーナルに記録するハンドラ。"""
+
+    def __init__(self, machine, journal):
+        """
+        Args:
+            machine: GrabStateMachine（grab_start / stretch_sample / grab_end / zap / reset を購読）
+            journal: EventJournal インスタンス（複数の状態機械で共有する）
+        """
+        self._machine = machine
+        self._journal = journal
+        self._channel = journal.channel(machine.name)
+
+        machine.subscribe_grab_start(self._on_grab_start)
+        # サンプルは Grab 中ずっと届くので、メソッドを挟まずにジャーナルへ直接渡す
+        machine.subscribe_stretch_sample(partial(journal.sample, self._channel))
+        machine.subscribe_grab_end(self._on_grab_end)
+        machine.subscribe_zap(self._on_zap)
+        machine.subscribe_reset(self._on_reset)
+
+    # ------------------------------------------------------------------ #
+    # イベントハンドラ                                                     #
+    # ------------------------------------------------------------------ #
+
+    def _on_grab_start(self, event) -> None:
+        self._journal.grab_start(self._channel, event)
+
+    def _on_grab_end(self, event) -> None:
+        self._journal.grab_end(self._channel, event)
+
+    def _on_zap(self, event) -> None:
+        self._journal.zap(self._channel, event)
+
+    def _on_reset(self) -> None:
+        self._journal.reset(self._channel, self._machine.clock.now())
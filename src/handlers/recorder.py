@@ -2,9 +2,15 @@
 
 Grab 終了時に Zap 実行を JSON ファイルに記録する。
 テストモード（is_test_mode=True）の場合は記録しない。
+記録するかどうか（テストモード・Vibe モード・Grab 時間・強度）は Grab 終了のその場で状態機械のスレッドで決め、
+ファイル書き込みだけを worker（event_worker.EventWorker）に積む。ワーカーが動く頃には GUI のテスト Grab が
+is_test_mode を戻しているので、判定までワーカーに回すとテストの Grab を記録してしまう。
 """
 
 import logging
+from functools import partial
+
+from event_worker import call_now
 
 logger = logging.getLogger(__name__)
 
@@ -12,14 +18,16 @@ logger = logging.getLogger(__name__)
 class RecorderHandler:
     """Zap 実行記録を ZapRecorder に委譲するハンドラ。"""
 
-    def __init__(self, machine, zap_recorder):
+    def __init__(self, machine, zap_recorder, worker=None):
         """
         Args:
             machine: GrabStateMachine（grab_end を購読、is_test_mode を参照）
             zap_recorder: ZapRecorder インスタンス
+            worker: 記録（ファイル書き込み）を積む EventWorker（省略時は状態機械のスレッドで記録する）
         """
         self._machine = machine
         self._recorder = zap_recorder
+        self._submit = worker.submit if worker else call_now
 
         machine.subscribe_grab_end(self._on_grab_end)
 
@@ -27,27 +35,29 @@ class RecorderHandler:
     # イベントハンドラ                                                     #
     # ------------------------------------------------------------------ #
 
-    def _on_grab_end(self, stretch: float, duration: float) -> None:
+    def _on_grab_end(self, event) -> None:
         """Grab 終了時：Zap を記録する（テストモード・Vibe モードは除外）。"""
-        from config import MIN_GRAB_DURATION, USE_VIBRATION, MIN_STIMULUS_VALUE, MAX_STIMULUS_VALUE
+        from config import MIN_GRAB_DURATION, USE_VIBRATION
 
         # テストモードまたは Vibration モードは記録しない
         if self._machine.is_test_mode or USE_VIBRATION:
             return
 
-        if duration < MIN_GRAB_DURATION:
+        if event.duration < MIN_GRAB_DURATION:
             return
 
-        from pavlok_controller import calculate_zap_intensity, normalize_intensity_for_display
-        intensity = calculate_zap_intensity(stretch)
+        intensity = event.intensity
         if intensity <= 0:
             return
 
-        display = normalize_intensity_for_display(intensity)
-        self._recorder.record_zap(
+        display = event.intensity_display
+        cfg = event.config
+        record = partial(
+            self._recorder.record_zap,
             display_intensity=display,
             actual_intensity=intensity,
-            min_stimulus_value=MIN_STIMULUS_VALUE,
-            max_stimulus_value=MAX_STIMULUS_VALUE,
+            min_stimulus_value=cfg.min_stimulus_value,
+            max_stimulus_value=cfg.max_stimulus_value,
         )
-        logger.info(f"[Recorder] Zap recorded: display={display}%, actual={intensity}")
+        if self._submit(record):
+            logger.info(f"[Recorder] Zap recorded: display={display}%, actual={intensity}")
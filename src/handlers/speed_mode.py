@@ -1,12 +1,30 @@
 """速度モード Zap ハンドラ
 
 Grab 中の Stretch 変化速度を監視し、素早い引っ張りを検出したら Zap を発火する。
+履歴の時刻は状態機械から渡されるイベント時刻（受信時刻、time.perf_counter() 基準）を使うので、
+速度はスレッドのスケジューリングではなくパケットの到着間隔で決まる。
+
+判定（onset・ピーク・停止・初期速度・総合速度・戻し・予測発火）は speed_kernel.SpeedKernel に任せ、
+このハンドラはライブ用の薄いアダプタとして次だけを受け持つ：
+
+  - 状態機械のイベント（Grab 開始・終了・Stretch サンプル・リセット）をカーネルに渡す
+  - カーネルの停止タイマーの期限を clock.call_later() に張り、期限が来たら expire() を呼ぶ
+  - カーネルの Decision を見て Zap を device_worker（event_worker.EventWorker）に積み、ログを出す
+  - machine.speed_mode_state（tab_test が参照）を書く
+
+記録した Grab を配列でまとめて判定する speed_kernel.run_grab() も同じカーネルを使うので、
+ライブとオフライン（スイープ・ベンチマーク）で判定がずれない。
+
+停止タイマーと現在時刻は状態機械の clock（clock.py）を使う。本番（main.py）では停止タイマーは
+TimerScheduler のスレッド 1 本で待ち、期限が来たら OSCEventQueue のコンシューマで実行されるので、
+カーネルの状態を Stretch の処理と取り合わない。VirtualClock なら停止タイマーも
+clock.advance_to() を呼んだスレッドで仮想時刻どおりに発火し、実時間を待たない。
 """
 
-import time
-import threading
 import logging
-from collections import deque
+
+from event_worker import call_now
+from speed_kernel import SpeedKernel
 
 logger = logging.getLogger(__name__)
 
@@ -14,27 +32,29 @@ logger = logging.getLogger(__name__)
 class SpeedModeHandler:
     """速度ベースの Zap 発火ハンドラ。"""
 
-    def __init__(self, machine):
+    def __init__(self, machine, device_worker=None, clock=None):
+        """
+        Args:
+            machine: GrabStateMachine インスタンス
+            device_worker: デバイス送信を積む EventWorker（省略時はその場で送る）
+            clock: 時計（clock.Clock）。省略時は machine.clock
+        """
+        from intensity import calculate_intensity
+
         self._machine = machine
+        self._clock = clock or machine.clock
+        self._submit = device_worker.submit if device_worker else call_now
 
-        # 状態変数
-        self._grab_start_time: float = 0.0
-        self._is_settled: bool = False
-        self._history: deque[tuple[float, float]] = deque(maxlen=300)
-        self._origin_stretch: float = 0.0
-        self._origin_time: float = 0.0
-        self._measuring: bool = False
-        self._peak_stretch: float = 0.0
-        self._peak_time: float = 0.0
-        self._last_movement_time: float = 0.0
-        self._stop_start_time: float | None = None
-        self._stop_timer: threading.Timer | None = None
-        self._zap_fired: bool = False
-        self._zap_fire_stretch: float = 0.0
+        self._kernel = SpeedKernel(self._get_settings(),
+                                   intensity=lambda delta: calculate_intensity(delta, machine.intensity_config()))
+        self._stop_timer = None  # clock.call_later() のハンドル
+        self._timer_gen = self._kernel.timer_gen  # _stop_timer を張ったときのカーネルの timer_gen
 
         machine.subscribe_grab_start(self._on_grab_start)
         machine.subscribe_grab_end(self._on_grab_end)
-        machine.subscribe_stretch_update(self._on_stretch_update)
+        # 値が変わらないサンプルも停止検知・速度計算の時間軸に必要なので stretch_sample で受ける
+        machine.subscribe_stretch_sample(self._on_stretch_update)
+        machine.subscribe_reset(self._on_reset)
 
     # ------------------------------------------------------------------ #
     # イベントハンドラ                                                     #
@@ -45,293 +65,131 @@ class SpeedModeHandler:
         import settings as s_mod
         return s_mod.settings.device.zap_mode == "speed"
 
-    def _on_grab_start(self) -> None:
+    def _on_grab_start(self, event) -> None:
         if not self._is_active():
             return
-        self._cancel_stop_timer()
-        self._grab_start_time = time.time()
-        self._is_settled = False
-        self._history.clear()
-        self._measuring = False
-        self._peak_stretch = 0.0
-        self._peak_time = 0.0
-        self._last_movement_time = 0.0
-        self._stop_start_time = None
-        self._zap_fired = False
-        self._zap_fire_stretch = 0.0
+        self._kernel.settings = self._get_settings()
+        self._kernel.grab_start(event.event_time)
+        self._sync_timer()
         logger.debug("[SpeedMode] Grab started, settling...")
 
-    def _on_grab_end(self, stretch: float, duration: float) -> None:
+    def _on_grab_end(self, event) -> None:
         if not self._is_active():
             return
-        self._cancel_stop_timer()
-        self._is_settled = False
-        self._measuring = False
-        self._zap_fired = False
-        self._peak_stretch = 0.0
+        self._kernel.grab_end()
+        self._sync_timer()
         self._update_machine_state(0.0)
         logger.debug("[SpeedMode] Grab ended, state reset")
 
-    def _on_stretch_update(self, stretch: float) -> None:
-        if not self._is_active():
-            return
-        now = time.time()
-        sm = self._get_settings()
+    def _on_reset(self) -> None:
+        """アバター切り替え：発火せずに計測を打ち切る（zap_mode に関係なく戻す）。"""
+        self._kernel.reset()
+        self._sync_timer()
+        self._update_machine_state(0.0)
 
-        # A. settle チェック
-        elapsed = now - self._grab_start_time
-        if elapsed < sm.grab_settle_time:
+    def _on_stretch_update(self, stretch: float, event_time: float) -> None:
+        if not self._is_active():
             return
-        if not self._is_settled:
-            self._is_settled = True
-            logger.debug(f"[SpeedMode] Settled after {elapsed:.3f}s")
-
-        # 履歴に追記
-        self._history.append((now, stretch))
-
-        # B. ZAP_RESET_PULLBACK 監視（_zap_fired=True のとき）
-        if self._zap_fired:
-            delta = self._zap_fire_stretch - self._origin_stretch
-            if delta > 0:
-                pullback_ratio = (self._zap_fire_stretch - stretch) / delta
-                threshold = sm.zap_reset_pullback / 100.0
-                if pullback_ratio >= threshold:
-                    logger.info(f"[SpeedMode] Pullback detected ({pullback_ratio:.2%}), resetting origin")
-                    self._zap_fired = False
-                    self._reset_origin(stretch, now)
-            self._update_machine_state(stretch)
-            return  # Zap 済みは pullback 解除待ち
-
-        # C. Onset 判定（_measuring=False のとき）
-        if not self._measuring:
-            avg_speed = self._calc_avg_speed_recent(sm.speed_onset_ticks)
-            if avg_speed > sm.speed_onset_threshold:
-                logger.info(f"[SpeedMode] Onset detected (avg_speed={avg_speed:.3f}), starting measurement")
-                self._reset_origin(stretch, now)
+        kernel = self._kernel
+        kernel.settings = self._get_settings()
+        settled = kernel.settled
+        decisions = kernel.sample(event_time, stretch)
+        if kernel.settled and not settled:
+            logger.debug(f"[SpeedMode] Settled after {event_time - kernel.grab_start_time:.3f}s")
+        self._apply(decisions)
+        self._sync_timer()
+        if kernel.settled:
             self._update_machine_state(stretch)
-            return
-
-        # D. _measuring=True のとき
-        if stretch > self._peak_stretch:
-            self._peak_stretch = stretch
-            self._peak_time = now
-
-        # 停止検知（stretch 方向のみ）
-        recent_speed = self._calc_recent_speed()
-        if recent_speed > sm.speed_stop_threshold:
-            # まだ動いている → 最終動き時刻を更新（タイマーは再生成しない）
-            self._last_movement_time = now
-            self._stop_start_time = now
-            if self._stop_timer is None:
-                self._start_stop_timer(sm.speed_zap_hold_time)
-        else:
-            # 停止とみなす → タイマーが切れていれば起動
-            if self._stop_timer is None:
-                if self._stop_start_time is None:
-                    self._stop_start_time = now
-                self._start_stop_timer(sm.speed_zap_hold_time)
-
-        self._update_machine_state(stretch)
-
-    # ------------------------------------------------------------------ #
-    # 内部ロジック                                                         #
-    # ------------------------------------------------------------------ #
-
-    def _start_stop_timer(self, hold_time: float) -> None:
-        """停止タイマーを開始する。OSC 更新がなくても hold_time 後に発火チェックする。"""
-        self._cancel_stop_timer()
-        self._stop_timer = threading.Timer(hold_time, self._on_stop_timer_fired)
-        self._stop_timer.daemon = True
-        self._stop_timer.start()
-        logger.debug(f"[SpeedMode] Stop timer started ({hold_time:.2f}s)")
-
-    def _cancel_stop_timer(self) -> None:
-        if self._stop_timer is not None:
-            self._stop_timer.cancel()
-            self._stop_timer = None
 
     def _on_stop_timer_fired(self) -> None:
-        """タイマー満了：発火チェックを実行する。"""
+        """タイマー満了：カーネルの発火チェックを実行する。"""
         self._stop_timer = None
-        if not self._measuring or self._zap_fired:
-            return
-        sm = self._get_settings()
-        # 最後の動き検知からまだ hold_time 経過していない場合は残り時間で再スタート
-        elapsed = time.time() - self._last_movement_time
-        if elapsed < sm.speed_zap_hold_time:
-            self._start_stop_timer(sm.speed_zap_hold_time - elapsed)
-            return
-        self._stop_start_time = None
+        kernel = self._kernel
         try:
-            self._check_zap_fire(time.time(), sm)
+            self._apply(kernel.expire(self._clock.now()))
         except Exception as e:
             logger.error(f"[SpeedMode] Error in stop timer: {e}", exc_info=True)
-            self._measuring = False
-            self._update_machine_state(self._peak_stretch)
+            kernel.measuring = False
+        self._sync_timer()
+        self._update_machine_state(kernel.peak)
 
-    def _reset_origin(self, stretch: float, now: float) -> None:
-        """原点をリセットして計測開始"""
-        self._cancel_stop_timer()
-        self._origin_stretch = stretch
-        self._origin_time = now
-        self._measuring = True
-        self._peak_stretch = stretch
-        self._peak_time = now
-        self._last_movement_time = now
-        self._stop_start_time = now
-        self._history.clear()
-        self._history.append((now, stretch))
-        self._update_machine_state(stretch)
-        # onset 直後からタイマーをスタート。
-        # 次の更新で速度が高ければキャンセルされ、更新が来なければそのまま発火チェック。
-        self._start_stop_timer(self._get_settings().speed_zap_hold_time)
-
-    def _check_zap_fire(self, now: float, sm) -> None:
-        """発火条件チェック。全通過で Zap 発火。"""
-        stretch_range = self._peak_stretch - self._origin_stretch
-        if stretch_range <= 0:
-            logger.info("[SpeedMode] Cancel: no stretch movement")
-            self._measuring = False
-            self._update_machine_state(self._peak_stretch)
-            return
-
-        # ② INITIAL_SPEED_STRETCH_WINDOW 区間の速度チェック
-        window_end = self._origin_stretch + stretch_range * (sm.initial_speed_stretch_window / 100.0)
-        initial_avg = self._calc_avg_speed_in_range(self._origin_stretch, window_end, self._peak_time)
-        if initial_avg < sm.speed_zap_threshold:
-            logger.info(f"[SpeedMode] Cancel: initial speed too low ({initial_avg:.3f} < {sm.speed_zap_threshold})")
-            self._measuring = False
-            self._update_machine_state(self._peak_stretch)
-            return
+    # ------------------------------------------------------------------ #
+    # 内部ロジック                                                         #
+    # ------------------------------------------------------------------ #
 
-        # ③ MIN_SPEED_EVAL_WINDOW 区間の速度チェック
-        eval_end = self._origin_stretch + stretch_range * (sm.min_speed_eval_window / 100.0)
-        eval_avg = self._calc_avg_speed_in_range(self._origin_stretch, eval_end, self._peak_time)
-        if eval_avg < sm.min_speed_threshold:
-            logger.info(f"[SpeedMode] Cancel: eval speed too low ({eval_avg:.3f} < {sm.min_speed_threshold})")
-            self._measuring = False
-            self._update_machine_state(self._peak_stretch)
+    def _sync_timer(self) -> None:
+        """カーネルが停止タイマーを張り直した・取り消したら clock のタイマーを合わせる。"""
+        kernel = self._kernel
+        if kernel.timer_gen == self._timer_gen:
             return
-
-        # 全チェック通過 → Zap 発火
-        delta = self._peak_stretch - self._origin_stretch
-        logger.info(
-            f"[SpeedMode] ZAP FIRE! origin={self._origin_stretch:.3f}, "
-            f"peak={self._peak_stretch:.3f}, delta={delta:.3f}, "
-            f"initial_avg={initial_avg:.3f}, eval_avg={eval_avg:.3f}"
-        )
-        self._fire_zap()
-
-    def _fire_zap(self) -> None:
-        from intensity import calculate_intensity, IntensityConfig
+        self._timer_gen = kernel.timer_gen
+        if self._stop_timer is not None:
+            self._clock.cancel(self._stop_timer)
+            self._stop_timer = None
+        if kernel.deadline is not None:
+            self._stop_timer = self._clock.call_later(kernel.timer_delay, self._on_stop_timer_fired)
+            logger.debug(f"[SpeedMode] Stop timer started ({kernel.timer_delay:.2f}s)")
+
+    def _apply(self, decisions) -> None:
+        """カーネルの判定を Zap の送信とログにする。"""
+        for d in decisions:
+            if d.kind == "fire":
+                label = "ZAP FIRE (predicted)!" if d.reason == "predicted" else "ZAP FIRE!"
+                logger.info(
+                    f"[SpeedMode] {label} origin={d.origin:.3f}, peak={d.peak:.3f}, "
+                    f"delta={d.peak - d.origin:.3f}, initial_avg={d.initial_avg:.3f}, eval_avg={d.eval_avg:.3f}"
+                )
+                self._submit(self._send_zap, d.intensity, self._machine.intensity_config())
+            elif d.kind == "onset":
+                logger.info(f"[SpeedMode] Onset detected (avg_speed={d.value:.3f}), starting measurement")
+            elif d.kind == "pullback":
+                label = "Immediate pullback" if d.reason == "immediate" else "Pullback"
+                logger.info(f"[SpeedMode] {label} detected ({d.value:.2%}), resetting origin")
+            elif d.kind == "skip":
+                logger.info("[SpeedMode] Zap skipped: intensity=0")
+            elif d.reason == "no_movement":
+                logger.info("[SpeedMode] Cancel: no stretch movement")
+            elif d.reason == "initial_speed":
+                sm = self._kernel.settings
+                logger.info(f"[SpeedMode] Cancel: initial speed too low "
+                            f"({d.initial_avg:.3f} < {sm.speed_zap_threshold})")
+            else:
+                sm = self._kernel.settings
+                logger.info(f"[SpeedMode] Cancel: eval speed too low ({d.eval_avg:.3f} < {sm.min_speed_threshold})")
+
+    def _send_zap(self, intensity: int, cfg) -> None:
+        """Zap を送信する（device_worker のスレッドで呼ばれる）。"""
         from pavlok_controller import normalize_intensity_for_display
         import pavlok_controller as ctrl
         from config import USE_VIBRATION
-
-        cfg = IntensityConfig.from_settings()
-        delta = self._peak_stretch - self._origin_stretch
-        intensity = calculate_intensity(delta, cfg)
-        if intensity <= 0:
-            logger.info("[SpeedMode] Zap skipped: intensity=0")
-            self._measuring = False
-            return
-
-        ctrl.send_zap(intensity)
+        sent = ctrl.send_zap(intensity)
+        display = normalize_intensity_for_display(intensity, cfg)
+        self._machine.notify_zap(intensity, display, sent)
 
         if not USE_VIBRATION:
-            display = normalize_intensity_for_display(intensity)
             self._machine.last_zap_display_intensity = display
             self._machine.last_zap_actual_intensity = intensity
             self._machine.notify_state_change()
 
-        self._zap_fired = True
-        self._zap_fire_stretch = self._peak_stretch
-        self._measuring = False
-        self._update_machine_state(self._peak_stretch)
-
-        # ZAP発火時点で既にプルバック条件を満たしている場合は即座にリセット
-        # （素早く引いて即戻した場合、次のOSC更新を待たずに再計測を開始する）
-        self._check_immediate_pullback(time.time())
-
-    def _check_immediate_pullback(self, now: float) -> None:
-        """ZAP直後に現在のstretchでプルバック条件を確認し、満たしていれば即座にリセット。"""
-        current = self._machine.current_stretch
-        delta = self._zap_fire_stretch - self._origin_stretch
-        if delta <= 0:
-            return
-        pullback_ratio = (self._zap_fire_stretch - current) / delta
-        threshold = self._get_settings().zap_reset_pullback / 100.0
-        if pullback_ratio >= threshold:
-            logger.info(f"[SpeedMode] Immediate pullback detected ({pullback_ratio:.2%}), resetting origin")
-            self._zap_fired = False
-            self._reset_origin(current, now)
-
-    # ------------------------------------------------------------------ #
-    # 速度計算ヘルパー                                                     #
-    # ------------------------------------------------------------------ #
-
-    def _calc_avg_speed_recent(self, ticks: int) -> float:
-        """直近 ticks 個のエントリから平均速度を計算"""
-        history = list(self._history)
-        if len(history) < 2:
-            return 0.0
-        recent = history[-min(ticks + 1, len(history)):]
-        return self._avg_speed_of(recent)
-
-    def _calc_recent_speed(self) -> float:
-        """直近 2 エントリの速度（stretch 方向のみ、戻しは 0）"""
-        history = list(self._history)
-        if len(history) < 2:
-            return 0.0
-        t_prev, s_prev = history[-2]
-        t_curr, s_curr = history[-1]
-        if s_curr <= s_prev:
-            return 0.0
-        dt = t_curr - t_prev
-        if dt <= 0:
-            return 0.0
-        return (s_curr - s_prev) / dt
-
-    def _calc_avg_speed_in_range(self, stretch_from: float, stretch_to: float, time_limit: float | None = None) -> float:
-        """stretch_from ~ stretch_to の範囲にある履歴エントリから平均速度を計算。
-        time_limit を指定するとその時刻以前のエントリのみ使用（戻り動作の混入を防ぐ）。"""
-        history = list(self._history)
-        filtered = [
-            (t, s) for t, s in history
-            if stretch_from <= s <= stretch_to
-            and (time_limit is None or t <= time_limit)
-        ]
-        if len(filtered) < 2:
-            return 0.0
-        return self._avg_speed_of(filtered)
-
-    @staticmethod
-    def _avg_speed_of(entries: list[tuple[float, float]]) -> float:
-        """エントリリスト（時刻, stretch）から平均速度（total stretch / total time）を返す"""
-        if len(entries) < 2:
-            return 0.0
-        total_stretch = entries[-1][1] - entries[0][1]
-        total_time = entries[-1][0] - entries[0][0]
-        if total_time <= 0 or total_stretch <= 0:
-            return 0.0
-        return total_stretch / total_time
-
     def _update_machine_state(self, current_stretch: float) -> None:
         """machine.speed_mode_state に現在の内部状態を書き込む（tab_test が参照）"""
+        kernel = self._kernel
         self._machine.speed_mode_state = {
-            "settled":        self._is_settled,
-            "measuring":      self._measuring,
-            "zap_fired":      self._zap_fired,
-            "origin_stretch": self._origin_stretch,
-            "peak_stretch":   self._peak_stretch,
-            "delta":          self._peak_stretch - self._origin_stretch,
+            "settled":        kernel.settled,
+            "measuring":      kernel.measuring,
+            "zap_fired":      kernel.zap_fired,
+            "origin_stretch": kernel.origin,
+            "peak_stretch":   kernel.peak,
+            "delta":          kernel.peak - kernel.origin,
             "current_stretch": current_stretch,
-            "recent_speed":   self._calc_recent_speed(),
-            "stop_detecting": self._stop_start_time is not None,
-            "history_len":    len(self._history),
+            "recent_speed":   max(0.0, kernel.velocity),
+            "stop_detecting": kernel.stop_start_time is not None,
+            "history_len":    len(kernel.history),
         }
 
     def _get_settings(self):
+        # アバターのプロファイルで上書きされていればそちら（起動時に組み立て済み）
+        if self._machine.speed_mode is not None:
+            return self._machine.speed_mode
         import settings as s_mod
         return s_mod.settings.speed_mode
-
@@ -5,7 +5,7 @@
 設定値は IntensityConfig にまとめて渡すので、pytest から任意の値でテスト可能。
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, fields, replace
 
 
 @dataclass(frozen=True)
@@ -21,11 +21,15 @@ class IntensityConfig:
     intensity_at_switch_percent: int
 
     @staticmethod
-    def from_settings() -> "IntensityConfig":
-        """現在の settings から IntensityConfig を生成する。"""
+    def from_settings(overrides: dict | None = None) -> "IntensityConfig":
+        """現在の settings から IntensityConfig を生成する。
+
+        Args:
+            overrides: 一部のフィールドだけ差し替える値（PhysBone ごとの強度カーブ）
+        """
         import settings as s_mod
         s = s_mod.settings
-        return IntensityConfig(
+        cfg = IntensityConfig(
             min_stimulus_value=s.device.min_stimulus_value,
             max_stimulus_value=s.device.max_stimulus_value,
             min_stretch_threshold=s.logic.min_stretch_threshold,
@@ -35,6 +39,12 @@ class IntensityConfig:
             nonlinear_switch_position_percent=s.logic.nonlinear_switch_position_percent,
             intensity_at_switch_percent=s.logic.intensity_at_switch_percent,
         )
+        return replace(cfg, **overrides) if overrides else cfg
+
+    @staticmethod
+    def field_names() -> frozenset[str]:
+        """上書きに使えるフィールド名。"""
+        return frozenset(f.name for f in fields(IntensityConfig))
 
 
 def calculate_intensity(stretch: float, cfg: IntensityConfig) -> int:
@@ -0,0 +1,410 @@
+"""状態機械イベントのバイナリジャーナル（追記専用）
+
+GrabStateMachine のイベント（Grab 開始・Stretch サンプル・Grab 終了・Zap・リセット）を
+受信時刻付きで追記し、後から統計を作り直したり、状態機械に流し直してセッションを再生したりする。
+zap_recorder.py は最終的な強度だけ、ログは自由形式なので、何が起きたかを再構成できない。
+
+書き込みは 2 段：
+  - 状態機械のスレッド（と Zap を送るワーカー）はレコードを struct で詰めて deque に積むだけ
+    （ロックもシステムコールもなし）。
+  - 専用スレッドが flush_interval ごと（または max_batch 個溜まったら）まとめて書き込む。
+書き込みが追いつかず max_pending 個溜まったら、新しいレコードを捨てて dropped に数える。
+
+ファイルが max_bytes を超えたら <path>.1 へ回し（既存の .1 は .2 へ、backups 個まで残す）、
+新しいファイルを作り直す。各ファイルの先頭には PhysBone 名の対応（channel レコード）を書き直すので、
+どのファイルも単独で読める。合計サイズはおよそ max_bytes × (backups + 1) に収まる。
+
+ファイル形式（リトルエンディアン）:
+
+    ヘッダ   : magic "PVJRNL01"(8) | 開始時の壁時計 time.time_ns()(u64)
+    レコード : 種別(u8) | チャネル(u8) | 開始からの経過 ns(u64) | 種別ごとの本体
+
+    種別         本体
+    channel      名前の長さ(u8) | PhysBone 名（UTF-8）
+    grab_start   seq(u32) | stretch(f32)
+    sample       stretch(f32)                 ← stretch_sample（値が変わらないサンプルも含む）
+    grab_end     seq(u32) | stretch(f32) | duration(f32) | intensity(u16) | 表示 %(u8)
+    zap          intensity(u16) | 表示 %(u8) | sent(u8)
+    reset        なし
+
+経過時間は capture.py と同じく perf_counter 基準のイベント時刻から求める。
+読み出し（JournalReader）は mmap で行い、末尾の書きかけのレコードは読み飛ばす。
+"""
+
+import mmap
+import struct
+import threading
+import time
+import logging
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PVJRNL01"
+_HEADER = struct.Struct("<8sQ")
+
+CHANNEL, GRAB_START, SAMPLE, GRAB_END, ZAP, RESET = range(6)
+KINDS = ("channel", "grab_start", "sample", "grab_end", "zap", "reset")
+
+_HEAD = struct.Struct("<BBQ")
+_CHANNEL = struct.Struct("<BBQB")
+_GRAB_START = struct.Struct("<BBQIf")
+_SAMPLE = struct.Struct("<BBQf")
+_GRAB_END = struct.Struct("<BBQIffHB")
+_ZAP = struct.Struct("<BBQHBB")
+_RESET = _HEAD
+
+# 種別 → 固定長部分（channel は後ろに名前が続く）
+_RECORDS = (_CHANNEL, _GRAB_START, _SAMPLE, _GRAB_END, _ZAP, _RESET)
+
+MAX_CHANNELS = 256
+
+_DEFAULT_DIR = Path(__file__).parent.parent / "journals"
+
+
+def default_journal_path() -> Path:
+    """journals/events_<日時>.pvjrnl を返す（ディレクトリは作成する）。"""
+    _DEFAULT_DIR.mkdir(exist_ok=True)
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    return _DEFAULT_DIR / f"events_{timestamp}.pvjrnl"
+
+
+class EventJournal:
+    """状態機械のイベントをバックグラウンドでファイルに追記する。"""
+
+    def __init__(
+        self,
+        path: str | Path,
+        start_time: float | None = None,
+        max_bytes: int = 16 << 20,
+        backups: int = 1,
+        flush_interval: float = 0.5,
+        max_batch: int = 4096,
+        max_pending: int = 1 << 16,
+    ):
+        """
+        Args:
+            path: 出力ファイル
+            start_time: 経過時間の基準（perf_counter 基準）。省略時は現在時刻
+            max_bytes: 1 ファイルの上限（超えたら回す）、0 で無制限
+            backups: 回したファイルを何個残すか（0 なら回さずに作り直す）
+            flush_interval: まとめて書き込む間隔（秒）
+            max_batch: これだけ溜まったら間隔を待たずに書き込む
+            max_pending: 書き込み待ちの上限（超えた分は捨てる）
+        """
+        self.path = Path(path)
+        self._start = time.perf_counter() if start_time is None else start_time
+        self._max_bytes = max_bytes
+        self._backups = max(0, backups)
+        self._flush_interval = flush_interval
+        self._max_batch = max(1, max_batch)
+        self._max_pending = max(1, max_pending)
+
+        self._pending: deque[bytes] = deque()
+        self._channels: list[str] = []
+        self._wake = threading.Event()
+        self._running = True
+
+        # --- カウンタ ---
+        self.records: int = 0    # 書き込んだレコード数
+        self.dropped: int = 0    # 書き込み待ちが一杯で捨てたレコード数
+        self.flushes: int = 0    # まとめて書き込んだ回数
+        self.rotations: int = 0  # ファイルを回した回数
+        self.errors: int = 0     # 書き込みに失敗した回数
+
+        self._file = self._open()
+        self._thread = threading.Thread(target=self._run, name="EventJournal", daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------ #
+    # 追記（状態機械のスレッド・ワーカーから呼ばれる）                        #
+    # ------------------------------------------------------------------ #
+
+    def channel(self, name: str) -> int:
+        """PhysBone 名を登録してチャネル番号を返す（同じ名前なら同じ番号）。"""
+        if name in self._channels:
+            return self._channels.index(name)
+        if len(self._channels) >= MAX_CHANNELS:
+            raise ValueError(f"too many journal channels (max {MAX_CHANNELS})")
+        self._channels.append(name)
+        channel = len(self._channels) - 1
+        self._put(self._channel_record(channel, self._offset(time.perf_counter())))
+        return channel
+
+    def grab_start(self, channel: int, event) -> None:
+        self._put(_GRAB_START.pack(GRAB_START, channel, self._offset(event.event_time), event.seq, event.stretch))
+
+    def sample(self, channel: int, stretch: float, event_time: float) -> None:
+        self._put(_SAMPLE.pack(SAMPLE, channel, self._offset(event_time), stretch))
+
+    def grab_end(self, channel: int, event) -> None:
+        self._put(_GRAB_END.pack(
+            GRAB_END, channel, self._offset(event.event_time), event.seq, event.stretch, event.duration,
+            _u16(event.intensity), _u8(event.intensity_display)))
+
+    def zap(self, channel: int, event) -> None:
+        self._put(_ZAP.pack(
+            ZAP, channel, self._offset(event.event_time),
+            _u16(event.intensity), _u8(event.intensity_display), bool(event.sent)))
+
+    def reset(self, channel: int, event_time: float) -> None:
+        self._put(_RESET.pack(RESET, channel, self._offset(event_time)))
+
+    # ------------------------------------------------------------------ #
+    # 停止・統計                                                           #
+    # ------------------------------------------------------------------ #
+
+    def close(self, timeout: float = 2.0) -> None:
+        """残りを書き込んでファイルを閉じる。"""
+        if not self._running:
+            return
+        self._running = False
+        self._wake.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        logger.info(f"Event journal saved: {self.path} ({self.stats()})")
+
+    def stats(self) -> dict:
+        """カウンタのスナップショットを返す。"""
+        return {
+            "records":   self.records,
+            "dropped":   self.dropped,
+            "flushes":   self.flushes,
+            "rotations": self.rotations,
+            "errors":    self.errors,
+            "pending":   len(self._pending),
+        }
+
+    # ------------------------------------------------------------------ #
+    # 内部                                                                 #
+    # ------------------------------------------------------------------ #
+
+    def _offset(self, event_time: float) -> int:
+        return max(0, int((event_time - self._start) * 1e9))
+
+    def _put(self, record: bytes) -> None:
+        pending = self._pending
+        if len(pending) >= self._max_pending:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"[EventJournal] Writer behind, dropped {self.dropped} record(s)")
+            return
+        pending.append(record)
+        if len(pending) == self._max_batch:
+            self._wake.set()
+
+    def _channel_record(self, channel: int, offset_ns: int) -> bytes:
+        name = self._channels[channel].encode("utf-8")[:255]
+        return _CHANNEL.pack(CHANNEL, channel, offset_ns, len(name)) + name
+
+    def _open(self):
+        f = open(self.path, "wb")
+        f.write(_HEADER.pack(MAGIC, time.time_ns()))
+        return f
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self._flush_interval)
+            self._wake.clear()
+            running = self._running
+            self._flush()
+            if not running:
+                self._file.close()
+                return
+
+    def _flush(self) -> None:
+        """溜まったレコードを max_batch 個ずつまとめて書き込む（書き込みスレッドだけが呼ぶ）。
+
+        1 回に書くのは max_batch 個までなので、ファイルは max_bytes を最大 1 バッチ分しか超えない。
+        """
+        pending = self._pending
+        while pending:
+            n = min(len(pending), self._max_batch)
+            batch = [pending.popleft() for _ in range(n)]
+            try:
+                self._file.write(b"".join(batch))
+                self._file.flush()
+            except OSError as e:
+                self.errors += 1
+                logger.error(f"[EventJournal] Write failed: {e}")
+                return
+            self.records += n
+            self.flushes += 1
+            if self._max_bytes and self._file.tell() >= self._max_bytes:
+                self._rotate()
+
+    def _rotate(self) -> None:
+        """<path> → <path>.1 → … → <path>.<backups> と回して新しいファイルを開く。
+
+        名前を変えられなかったとき（Windows で別プロセスが開いている等）は今のファイルを
+        追記で開き直して書き続ける（"wb" で開くと回していない記録を消してしまう）。次の書き込みでまた回す。
+        """
+        self._file.close()
+        try:
+            if self._backups:
+                for i in range(self._backups - 1, 0, -1):
+                    src = self.path.with_name(f"{self.path.name}.{i}")
+                    if src.exists():
+                        src.replace(self.path.with_name(f"{self.path.name}.{i + 1}"))
+                self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        except OSError as e:
+            self.errors += 1
+            logger.error(f"[EventJournal] Rotation failed, appending to {self.path.name}: {e}")
+            self._file = open(self.path, "ab")
+            return
+        self._file = self._open()
+        offset = self._offset(time.perf_counter())
+        for channel in range(len(self._channels)):
+            self._file.write(self._channel_record(channel, offset))
+        self.rotations += 1
+
+
+def _u16(value: int) -> int:
+    return min(max(0, int(value)), 0xFFFF)
+
+
+def _u8(value: int) -> int:
+    return min(max(0, int(value)), 0xFF)
+
+
+# ---------------------------------------------------------------------- #
+# 読み出し                                                                #
+# ---------------------------------------------------------------------- #
+
+class JournalRecord(NamedTuple):
+    """ジャーナルの 1 レコード（使わないフィールドは 0）。"""
+    kind: str                # KINDS のいずれか
+    physbone: str
+    t: float                 # 開始からの経過秒
+    seq: int = 0
+    stretch: float = 0.0
+    duration: float = 0.0
+    intensity: int = 0
+    intensity_display: int = 0
+    sent: bool = False
+
+
+class JournalReader:
+    """ジャーナルファイルを mmap で読み、JournalRecord を順に返す。"""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.started_at_ns = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"not an event journal: {self.path}")
+
+    def __iter__(self) -> Iterator[JournalRecord]:
+        mm = self._mmap
+        size = len(mm)
+        pos = _HEADER.size
+        names: dict[int, str] = {}
+        while pos + _HEAD.size <= size:
+            kind = mm[pos]
+            if kind >= len(_RECORDS):
+                logger.warning(f"[JournalReader] Unknown record kind {kind} at {pos}, stopping")
+                return
+            rec = _RECORDS[kind]
+            if pos + rec.size > size:
+                return  # 書き込み途中のレコード
+            fields = rec.unpack_from(mm, pos)
+            pos += rec.size
+            channel, t = fields[1], fields[2] * 1e-9
+            if kind == CHANNEL:
+                length = fields[3]
+                if pos + length > size:
+                    return
+                names[channel] = mm[pos:pos + length].decode("utf-8", "replace")
+                pos += length
+                yield JournalRecord("channel", names[channel], t)
+                continue
+            name = names.get(channel, str(channel))
+            if kind == SAMPLE:
+                yield JournalRecord("sample", name, t, stretch=fields[3])
+            elif kind == GRAB_START:
+                yield JournalRecord("grab_start", name, t, seq=fields[3], stretch=fields[4])
+            elif kind == GRAB_END:
+                yield JournalRecord("grab_end", name, t, *fields[3:])
+            elif kind == ZAP:
+                yield JournalRecord("zap", name, t, intensity=fields[3], intensity_display=fields[4],
+                                    sent=bool(fields[5]))
+            else:
+                yield JournalRecord("reset", name, t)
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def __enter__(self) -> "JournalReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def summarize(records) -> dict[str, dict]:
+    """レコード列から PhysBone ごとの統計を作る。
+
+    Returns:
+        {PhysBone 名: {"grabs", "grab_time", "max_stretch", "samples", "zaps", "zaps_sent",
+                       "max_intensity", "avg_display"}}
+    """
+    stats: dict[str, dict] = {}
+    display_sum: dict[str, int] = {}
+    for r in records:
+        if r.kind == "channel":
+            continue
+        s = stats.get(r.physbone)
+        if s is None:
+            s = stats[r.physbone] = {"grabs": 0, "grab_time": 0.0, "max_stretch": 0.0, "samples": 0,
+                                     "zaps": 0, "zaps_sent": 0, "max_intensity": 0, "avg_display": 0.0}
+            display_sum[r.physbone] = 0
+        if r.kind == "sample":
+            s["samples"] += 1
+            if r.stretch > s["max_stretch"]:
+                s["max_stretch"] = r.stretch
+        elif r.kind == "grab_end":
+            s["grabs"] += 1
+            s["grab_time"] += r.duration
+        elif r.kind == "zap":
+            s["zaps"] += 1
+            s["zaps_sent"] += r.sent
+            s["max_intensity"] = max(s["max_intensity"], r.intensity)
+            display_sum[r.physbone] += r.intensity_display
+            s["avg_display"] = display_sum[r.physbone] / s["zaps"]
+    return stats
+
+
+def replay(records, machines: dict, clock=None) -> int:
+    """レコード列を状態機械に流し直す（zap は結果なので流さない）。
+
+    Args:
+        records: JournalRecord の列
+        machines: PhysBone 名 → GrabStateMachine
+        clock: clock.VirtualClock を渡すと、各レコードの前にその時刻まで進める（停止タイマーを仮想時刻で発火させる）
+
+    Returns:
+        流したレコード数
+    """
+    fed = 0
+    for r in records:
+        machine = machines.get(r.physbone)
+        if machine is None or r.kind in ("channel", "zap"):
+            continue
+        if clock is not None:
+            clock.advance_to(r.t)
+        if r.kind == "sample":
+            machine.on_stretch_change(r.stretch, r.t)
+        elif r.kind == "grab_start":
+            machine.on_stretch_change(r.stretch, r.t)
+            machine.on_grabbed_change(True, r.t)
+        elif r.kind == "grab_end":
+            machine.on_grabbed_change(False, r.t)
+        else:
+            machine.reset()
+        fed += 1
+    return fed
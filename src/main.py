@@ -2,13 +2,20 @@ import logging
 import time
 import threading
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 from queue import Queue
 
 from osc.receiver import OSCReceiver
+from osc.event_queue import OSCEventQueue
+from osc.dedupe import OSCDedupe
 from osc.sender import OSCSender
+from avatar_profiles import AvatarSwitcher, DEFAULT_PROFILE, compile_profiles, physbone_union
 from state_machine import GrabStateMachine
-from handlers import StimulusHandler, ChatboxHandler, RecorderHandler, GUIUpdater, SpeedModeHandler
+from clock import SystemClock, TimerScheduler
+from event_worker import EventWorker
+from handlers import StimulusHandler, ChatboxHandler, RecorderHandler, GUIUpdater, SpeedModeHandler, JournalHandler
+from journal import EventJournal, default_journal_path
 from zap_recorder import ZapRecorder
 from gui import QueueHandler
 
@@ -36,6 +43,24 @@ def _setup_file_logging() -> logging.FileHandler | None:
     return handler
 
 
+def _build_machine(physbone, zap_recorder, osc_sender, device, status_queue, show_name: bool,
+                   device_worker=None, recorder_worker=None, journal=None, clock=None) -> GrabStateMachine:
+    """PhysBone 1 個分の状態機械とハンドラを組み立てる（デバイス・送信・記録・GUI キュー・ワーカー・ジャーナルは共有）。"""
+    machine = GrabStateMachine(physbone.name, physbone.intensity_overrides, clock=clock)
+    machine.zap_recorder = zap_recorder  # tab_stats.py からのアクセス用
+
+    # ハンドラを生成してイベントを購読（両方登録し、実行時に zap_mode で分岐）
+    # デバイス送信と記録はワーカーに積み、判定・Chatbox・GUI 更新は状態機械のスレッドで行う
+    SpeedModeHandler(machine, device_worker)
+    StimulusHandler(machine, device_worker)
+    ChatboxHandler(machine, osc_sender, device=device, show_name=show_name)
+    RecorderHandler(machine, zap_recorder, worker=recorder_worker)
+    GUIUpdater(machine, status_queue)
+    if journal:
+        JournalHandler(machine, journal)
+    return machine
+
+
 def main():
     """メインプログラム"""
     status_queue: Queue = Queue()
@@ -60,18 +85,40 @@ def main():
     # ------------------------------------------------------------------ #
     # 状態機械とハンドラの組み立て                                         #
     # ------------------------------------------------------------------ #
-    machine = GrabStateMachine()
+    # PhysBone ごとに状態機械・強度カーブ・ハンドラを持ち、デバイス・送信・GUI は共有する。
+    # アバターごとのプロファイルは起動時に組み立て、どれかのプロファイルにある PhysBone は全部作っておく
+    profiles = compile_profiles()
+    physbones = physbone_union(profiles)
     zap_recorder = ZapRecorder()
-    machine.zap_recorder = zap_recorder  # tab_stats.py からのアクセス用
-
-    # ハンドラを生成してイベントを購読（両方登録し、実行時に zap_mode で分岐）
-    SpeedModeHandler(machine)
-    StimulusHandler(machine)
-    logger.info("Both zap handlers registered (mode switching at runtime)")
     osc_sender = OSCSender()
-    ChatboxHandler(machine, osc_sender, device=device)
-    RecorderHandler(machine, zap_recorder)
-    GUIUpdater(machine, status_queue)
+    from settings import settings as _s
+    workers = _s.event_workers
+    device_worker = recorder_worker = None
+    if workers.enabled:
+        # デバイスは 1 台なので、全 PhysBone で 1 本のワーカーを共有して送信を直列化する
+        device_worker = EventWorker(
+            "device", workers.device_queue_size, workers.device_overflow, workers.device_max_delay)
+        recorder_worker = EventWorker("recorder", workers.recorder_queue_size, workers.recorder_overflow)
+    # 速度モードの停止タイマーは全 PhysBone で 1 本のスケジューラスレッドが待ち、
+    # 期限が来たらイベントキューのコンシューマ（Stretch と同じスレッド）で実行する（executor は下で設定）
+    timers = TimerScheduler()
+    clock = SystemClock(timers)
+    journal = None
+    if _s.journal.enabled:
+        journal = EventJournal(
+            _s.journal.path or default_journal_path(), max_bytes=_s.journal.max_bytes,
+            backups=_s.journal.backups, flush_interval=_s.journal.flush_interval)
+        logger.info(f"Event journal: {journal.path}")
+    machines = [
+        _build_machine(pb, zap_recorder, osc_sender, device, status_queue, show_name=len(physbones) > 1,
+                       device_worker=device_worker, recorder_worker=recorder_worker, journal=journal,
+                       clock=clock)
+        for pb in physbones
+    ]
+    machine = machines[0]  # 既定のプロファイルの主 PhysBone（tab_test.py / tab_stats.py が参照）
+    logger.info(
+        f"Both zap handlers registered for {len(machines)} PhysBone(s): "
+        f"{', '.join(pb.name for pb in physbones)} (mode switching at runtime)")
 
     # BLE 接続状態変化を Chatbox に通知
     def _on_ble_connection_changed(connected: bool) -> None:
@@ -87,9 +134,45 @@ def main():
     # ------------------------------------------------------------------ #
     # OSC 受信                                                             #
     # ------------------------------------------------------------------ #
-    osc_receiver = OSCReceiver()
-    osc_receiver.on_stretch_change = machine.on_stretch_change
-    osc_receiver.on_grabbed_change = machine.on_grabbed_change
+    osc_receiver = OSCReceiver(
+        physbones=list(profiles[DEFAULT_PROFILE].physbones),
+        avatar_profiles={k: list(p.physbones) for k, p in profiles.items() if k != DEFAULT_PROFILE},
+    )
+    # 受信スレッドは積むだけ。状態機械へは単一のコンシューマが受信順（seq 順）に渡す。
+    # PhysBone ごとにキューのチャネルを分け、受信側のルートから O(1) で振り分ける。
+    # conflate_stretch が有効なら、処理の合間に溜まった Stretch は最新値へまとめる。
+    # dedupe が有効なら、値の変わらない入力はコンシューマ側で状態機械の手前で止める
+    event_queue = None
+    for pb, m in zip(physbones, machines):
+        dedupe = OSCDedupe(m, _s.osc.dedupe_epsilon) if _s.osc.dedupe else None
+        sink = dedupe or m
+        if event_queue is None:
+            event_queue = OSCEventQueue(
+                sink.on_stretch_change, sink.on_grabbed_change, conflate=_s.osc.conflate_stretch)
+            channel = 0
+        else:
+            channel = event_queue.add_channel(sink.on_stretch_change, sink.on_grabbed_change)
+        route = osc_receiver.routes[pb.name]
+        route.on_stretch_change = partial(event_queue.push_stretch, channel=channel)
+        route.on_grabbed_change = partial(event_queue.push_grabbed, channel=channel)
+        # 受信メトリクスに下流で抑制した数も載せる
+        if dedupe:
+            osc_receiver.metrics.add_source("dedupe" if channel == 0 else f"dedupe.{pb.name}", dedupe.stats)
+    # /avatar/change は同じキューに受信順で積み、コンシューマ上で状態機械を切り替える
+    if len(profiles) > 1:
+        switcher = AvatarSwitcher(profiles, dict(zip((pb.name for pb in physbones), machines)))
+        osc_receiver.on_avatar_change = (
+            lambda avatar_id, t, seq: event_queue.push_call(partial(switcher.apply, avatar_id), t, seq))
+        logger.info(f"Avatar profiles: {', '.join(k for k in profiles if k != DEFAULT_PROFILE)}")
+    timers.executor = event_queue.post
+    event_queue.start()
+    osc_receiver.metrics.add_source("queue", event_queue.stats)
+    osc_receiver.metrics.add_source("timers", timers.stats)
+    for worker in (device_worker, recorder_worker):
+        if worker:
+            osc_receiver.metrics.add_source(f"worker.{worker.name}", worker.stats)
+    if journal:
+        osc_receiver.metrics.add_source("journal", journal.stats)
 
     listener_thread = threading.Thread(target=osc_receiver.start, daemon=True)
     listener_thread.start()
@@ -104,6 +187,8 @@ def main():
         gui.status_queue = status_queue
         gui.log_queue = log_queue
         gui.grab_state = machine  # tab_test.py / tab_stats.py が参照
+        # テストタブの Grab・Stretch も OSC と同じコンシューマスレッドで状態機械に渡す
+        gui.set_executor(event_queue.post)
         gui.set_device(device)
 
         original_on_close = gui.on_close
@@ -134,6 +219,13 @@ def main():
 
     finally:
         osc_receiver.stop()
+        timers.stop()
+        event_queue.stop()
+        for worker in (device_worker, recorder_worker):
+            if worker:
+                worker.stop()
+        if journal:
+            journal.close()
         device.disconnect()
         logger.info("===== VRChat Pavlok Connector Stopped =====")
         if file_handler:
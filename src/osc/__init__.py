@@ -1,2 +1,6 @@
 from .receiver import OSCReceiver
 from .sender import OSCSender
+from .event_queue import OSCEventQueue
+from .oscquery import OSCQueryService
+from .relay import OSCRelay
+from .dedupe import OSCDedupe
@@ -0,0 +1,143 @@
+"""OSC 受信データグラムのバイナリキャプチャと再生
+
+不具合の出た Zap を VRChat で同じ操作をせずに再現するため、OSCReceiver が受け付けた
+データグラムを受信時刻付きでファイルに追記し、後から同じ間隔で送り直す。
+
+ファイル形式（リトルエンディアン）:
+
+    ヘッダ   : magic "PVOSCAP1"(8) | 開始時の壁時計 time.time_ns()(u64)
+    レコード : 開始からの経過 ns(u64) | 長さ(u16) | データグラム本体
+
+経過時間は受信時刻（perf_counter 基準の単調時計）から求めるので、壁時計の補正の影響を受けない。
+読み出しは mmap で行い、数時間分のキャプチャでもメモリに全部は読み込まない。
+書き込み途中で終了した末尾の不完全なレコードは読み飛ばす。
+"""
+
+import mmap
+import socket
+import struct
+import time
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PVOSCAP1"
+_HEADER = struct.Struct("<8sQ")
+_RECORD = struct.Struct("<QH")
+
+_DEFAULT_DIR = Path(__file__).parent.parent.parent / "captures"
+
+
+def default_capture_path() -> Path:
+    """captures/osc_<日時>.pvcap を返す（ディレクトリは作成する）。"""
+    _DEFAULT_DIR.mkdir(exist_ok=True)
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    return _DEFAULT_DIR / f"osc_{timestamp}.pvcap"
+
+
+class CaptureWriter:
+    """受信スレッドからデータグラムを追記する（単一スレッド専用）。"""
+
+    def __init__(self, path: str | Path, start_time: float | None = None):
+        """
+        Args:
+            path: 出力ファイル
+            start_time: 経過時間の基準（perf_counter 基準）。省略時は現在時刻
+        """
+        self.path = Path(path)
+        self._start = time.perf_counter() if start_time is None else start_time
+        self._file = open(self.path, "wb", buffering=1 << 16)
+        self._file.write(_HEADER.pack(MAGIC, time.time_ns()))
+        self.records = 0
+
+    def write(self, event_time: float, data: bytes) -> None:
+        """受信時刻（perf_counter 基準）とデータグラムを 1 レコード追記する。"""
+        offset_ns = max(0, int((event_time - self._start) * 1e9))
+        self._file.write(_RECORD.pack(offset_ns, len(data)))
+        self._file.write(data)
+        self.records += 1
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+            logger.info(f"OSC capture saved: {self.path} ({self.records} records)")
+
+
+class CaptureReader:
+    """キャプチャファイルを mmap で読み、(経過秒, データグラム) を順に返す。"""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.started_at_ns = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"not an OSC capture file: {self.path}")
+
+    def __iter__(self) -> Iterator[tuple[float, bytes]]:
+        # レコード単位で mmap から切り出すので、ファイル全体はメモリに載らない
+        mm = self._mmap
+        size = len(mm)
+        pos = _HEADER.size
+        record_size = _RECORD.size
+        unpack = _RECORD.unpack_from
+        while pos + record_size <= size:
+            offset_ns, length = unpack(mm, pos)
+            pos += record_size
+            if pos + length > size:
+                break  # 書き込み途中のレコード
+            yield offset_ns * 1e-9, mm[pos:pos + length]
+            pos += length
+
+    def summary(self) -> dict:
+        """レコード数と収録時間を返す。"""
+        count = 0
+        last = 0.0
+        for t, _data in self:
+            count += 1
+            last = t
+        return {"records": count, "duration": last, "started_at_ns": self.started_at_ns}
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def __enter__(self) -> "CaptureReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def replay(path: str | Path, address: tuple[str, int], speed: float = 1.0) -> int:
+    """キャプチャを address に送り直す。
+
+    Args:
+        path: キャプチャファイル
+        address: 送信先 (host, port)
+        speed: 再生速度の倍率（1.0 = 収録時と同じ間隔、0 以下 = 待たずに全速）
+
+    Returns:
+        送信したデータグラム数
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sent = 0
+    try:
+        with CaptureReader(path) as reader:
+            start = time.perf_counter()
+            first = None
+            for t, data in reader:
+                if first is None:
+                    first = t  # 収録開始から最初の受信までの空白は待たない
+                if speed > 0:
+                    delay = start + (t - first) / speed - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                sock.sendto(data, address)
+                sent += 1
+    finally:
+        sock.close()
+    return sent
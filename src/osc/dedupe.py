@@ -0,0 +1,91 @@
+"""値の変わらない OSC 入力の抑制（GrabStateMachine の手前に挟む）
+
+VRChat は同じパラメータ値を何度も送ってくる。重複でも GrabStateMachine に渡すと
+state_change（GUIUpdater のキュー積み）や Grab 中の stretch_update が毎回発火するので、
+前回値との差が epsilon 以下の Stretch、状態と同じ IsGrabbed をここで止める。
+
+ただし、
+  - IsGrabbed は状態機械の現在値と比べるので、実際の Grab 開始・終了（エッジ）は決して止めない
+  - Grab 中の重複 Stretch は on_stretch_repeat() に回し、速度モードの時間軸（履歴）には記録する
+    （停止検知は「値が変わらないまま時間が過ぎた」ことを見ているため）
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class OSCDedupe:
+    """値が変わらない Stretch / IsGrabbed を状態機械の手前で間引く。
+
+    OSCEventQueue の配送先として使う（単一コンシューマスレッドからだけ呼ばれる）。
+    """
+
+    def __init__(self, machine, epsilon: float = 0.0):
+        """
+        Args:
+            machine: GrabStateMachine
+            epsilon: 前回渡した Stretch との差がこれ以下なら重複とみなす（0 なら完全一致のみ）
+        """
+        self._machine = machine
+        self._epsilon = epsilon
+        self._last_stretch: float | None = None
+        machine.subscribe_reset(self._on_reset)
+
+        # --- カウンタ ---
+        self.stretch_forwarded: int = 0
+        self.stretch_suppressed: int = 0          # 状態機械に渡さなかった Stretch
+        self.stretch_suppressed_grabbed: int = 0  # そのうち Grab 中（stretch_sample のみ発火）のもの
+        self.grabbed_forwarded: int = 0
+        self.grabbed_suppressed: int = 0
+
+    # ------------------------------------------------------------------ #
+    # 入力（OSCEventQueue から呼ばれる）                                    #
+    # ------------------------------------------------------------------ #
+
+    def on_stretch_change(self, value: float, event_time: float) -> None:
+        last = self._last_stretch
+        if last is not None and abs(value - last) <= self._epsilon:
+            self.stretch_suppressed += 1
+            if self._machine.is_grabbed:
+                self.stretch_suppressed_grabbed += 1
+            self._machine.on_stretch_repeat(value, event_time)
+            return
+        self._last_stretch = value
+        self.stretch_forwarded += 1
+        self._machine.on_stretch_change(value, event_time)
+
+    def on_grabbed_change(self, value: bool, event_time: float) -> None:
+        # tab_test.py などが状態機械を直接操作することもあるので、比較相手は状態機械の現在値
+        if value == self._machine.is_grabbed:
+            self.grabbed_suppressed += 1
+            return
+        self.grabbed_forwarded += 1
+        self._machine.on_grabbed_change(value, event_time)
+        # Grab 終了で状態機械は current_stretch を 0 に戻すので、次の Stretch は必ず渡す
+        self._last_stretch = None
+
+    def _on_reset(self) -> None:
+        # 状態機械がリセットされたら（アバター切り替え）次の Stretch は必ず渡す
+        self._last_stretch = None
+
+    # ------------------------------------------------------------------ #
+    # 統計                                                                 #
+    # ------------------------------------------------------------------ #
+
+    def stats(self) -> dict:
+        """カウンタと、抑制によって呼ばずに済んだコールバック数の見積もりを返す。"""
+        subs = self._machine.subscriber_counts()
+        callbacks_saved = (
+            self.stretch_suppressed * subs["state_change"]
+            + self.stretch_suppressed_grabbed * subs["stretch_update"]
+            + self.grabbed_suppressed * subs["state_change"]
+        )
+        return {
+            "stretch_forwarded":          self.stretch_forwarded,
+            "stretch_suppressed":         self.stretch_suppressed,
+            "stretch_suppressed_grabbed": self.stretch_suppressed_grabbed,
+            "grabbed_forwarded":          self.grabbed_forwarded,
+            "grabbed_suppressed":         self.grabbed_suppressed,
+            "callbacks_saved":            callbacks_saved,
+        }
@@ -0,0 +1,230 @@
+"""OSC イベントキュー（受信順の直列化・Stretch の最新値コンフレーション）
+
+OSCReceiver と GrabStateMachine の間に挟む単一コンシューマのキュー。
+受信スレッドは push_* で積むだけですぐ戻り、専用スレッドが受信順に状態機械へ渡す。
+
+受信順は OSCReceiver が振る通し番号（seq）で決める。threading バックエンドでは
+パケット毎のスレッドが前後して push してくるので、キューは seq 順に挿入して並べ直す。
+それでも間に合わなかった（より新しい seq を状態機械に渡した後に届いた）イベントは古いとみなす：
+  - Stretch  : 捨てて stretch_stale に数える（古い値で履歴や現在値を巻き戻さない）
+  - IsGrabbed: 状態遷移は失えないので適用し、grabbed_stale に数える
+
+conflate=True のとき、ハンドラチェーンの処理中に溜まった Stretch は
+「キュー末尾が Stretch なら上書き」で最新値 1 個にまとめる（1 tick = コンシューマの 1 周）。
+IsGrabbed は決してまとめず、前後の Stretch との順序も入れ替えない。
+まとめた Stretch は最新サンプルの受信時刻（イベント時刻）をそのまま引き継ぐ：
+
+    S1 S2 G(true) S3 S4 S5 G(false)  →  S2 G(true) S5 G(false)
+
+複数の PhysBone を受信するときは、PhysBone ごとの配送先をチャネルとして登録する（add_channel()）。
+受信順（seq）はチャネルをまたいで 1 本のキューで保ち、コンフレーションは同じチャネルの
+Stretch 同士だけで行う。
+
+アバター切り替えのように「それまでに届いたイベントの後、次のイベントの前」に
+コンシューマスレッドで実行したい処理は push_call() で受信順に積む（まとめない・捨てない）。
+受信順と関係のない処理（速度モードの停止タイマーなど）は post() で末尾に積み、
+Stretch の処理と同じスレッドで直列に実行する。
+"""
+
+import threading
+import logging
+from collections import deque
+from functools import partial
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+_STRETCH = 0
+_GRABBED = 1
+_CALL = 2
+
+
+class OSCEventQueue:
+    """受信スレッドから状態機械へイベントを受け渡す単一コンシューマキュー。"""
+
+    def __init__(
+        self,
+        on_stretch_change: Callable[[float, float], None],
+        on_grabbed_change: Callable[[bool, float], None],
+        conflate: bool = True,
+    ):
+        """
+        Args:
+            on_stretch_change: Stretch の配送先（通常は GrabStateMachine.on_stretch_change）
+            on_grabbed_change: IsGrabbed の配送先（通常は GrabStateMachine.on_grabbed_change）
+            conflate: True なら未処理の Stretch を最新値 1 個にまとめる
+        """
+        # チャネル番号 → (Stretch の配送先, IsGrabbed の配送先)。0 は主 PhysBone
+        self._sinks: list[tuple[Callable[[float, float], None], Callable[[bool, float], None]]] = [
+            (on_stretch_change, on_grabbed_change)]
+        self._conflate = conflate
+
+        # (種別, 値, イベント時刻, seq, チャネル) を seq 昇順に保つ
+        self._items: deque[tuple[int, float | bool, float, int, int]] = deque()
+        # 状態機械に渡した最大の seq（コンシューマスレッドだけが更新する）
+        self._last_seq: int = 0
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._running = False
+
+        # --- カウンタ ---
+        self.stretch_received: int = 0   # push された Stretch の数
+        self.stretch_conflated: int = 0  # 新しい値に上書きされて捨てた Stretch の数
+        self.stretch_delivered: int = 0  # 状態機械に渡した Stretch の数
+        self.grabbed_delivered: int = 0  # 状態機械に渡した IsGrabbed の数
+        self.reordered: int = 0          # seq 順に並べ直して挿入したイベントの数
+        self.stretch_stale: int = 0      # 追い越されて届いたため捨てた Stretch の数
+        self.grabbed_stale: int = 0      # 追い越されて届いたが適用した IsGrabbed の数
+        self.calls: int = 0              # push_call() / post() で実行した処理の数
+        self.ticks: int = 0              # コンシューマの処理周回数
+
+    # ------------------------------------------------------------------ #
+    # 起動・停止                                                           #
+    # ------------------------------------------------------------------ #
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="OSCEventQueue", daemon=True)
+        self._thread.start()
+        logger.info(f"OSCEventQueue started (conflate={self._conflate})")
+
+    def stop(self) -> None:
+        if not self._running:
+            return
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        logger.info(f"OSCEventQueue stopped: {self.stats()}")
+
+    def add_channel(
+        self,
+        on_stretch_change: Callable[[float, float], None],
+        on_grabbed_change: Callable[[bool, float], None],
+    ) -> int:
+        """別の PhysBone の配送先を登録し、push_* に渡すチャネル番号を返す（start() 前に呼ぶ）。"""
+        self._sinks.append((on_stretch_change, on_grabbed_change))
+        return len(self._sinks) - 1
+
+    # ------------------------------------------------------------------ #
+    # 受信側（OSCReceiver のコールバックに設定する）                        #
+    # ------------------------------------------------------------------ #
+
+    def push_stretch(self, value: float, event_time: float, seq: int, channel: int = 0) -> None:
+        with self._cond:
+            self.stretch_received += 1
+            items = self._items
+            if items and items[-1][3] > seq:
+                self._insert_out_of_order((_STRETCH, value, event_time, seq, channel))
+            elif self._conflate and items and items[-1][0] == _STRETCH and items[-1][4] == channel:
+                items[-1] = (_STRETCH, value, event_time, seq, channel)
+                self.stretch_conflated += 1
+                return
+            else:
+                items.append((_STRETCH, value, event_time, seq, channel))
+            self._cond.notify()
+
+    def push_grabbed(self, value: bool, event_time: float, seq: int, channel: int = 0) -> None:
+        with self._cond:
+            items = self._items
+            if items and items[-1][3] > seq:
+                self._insert_out_of_order((_GRABBED, value, event_time, seq, channel))
+            else:
+                items.append((_GRABBED, value, event_time, seq, channel))
+            self._cond.notify()
+
+    def push_call(self, fn: Callable[[], None], event_time: float, seq: int) -> None:
+        """fn をコンシューマスレッドで受信順（seq 順）に実行する。"""
+        with self._cond:
+            items = self._items
+            if items and items[-1][3] > seq:
+                self._insert_out_of_order((_CALL, fn, event_time, seq, -1))
+            else:
+                items.append((_CALL, fn, event_time, seq, -1))
+            self._cond.notify()
+
+    def post(self, fn: Callable, *args) -> None:
+        """fn(*args) をコンシューマスレッドで実行する（今積まれているイベントの後。clock.TimerScheduler の executor）。"""
+        call = partial(fn, *args) if args else fn
+        with self._cond:
+            items = self._items
+            # 末尾と同じ seq にすれば並べ直しの対象にならない
+            seq = items[-1][3] if items else self._last_seq
+            items.append((_CALL, call, 0.0, seq, -1))
+            self._cond.notify()
+
+    def _insert_out_of_order(self, item: tuple) -> None:
+        """後から届いた若い seq のイベントを seq 順の位置に挿入する（_cond 保持中に呼ぶ）。
+
+        追い越しは通常 1〜2 個なので末尾から線形に探す。
+        コンフレーション中の Stretch は、直後に同じチャネルの新しい Stretch があれば上書き済みとして捨てる。
+        """
+        items = self._items
+        i = len(items)
+        while i > 0 and items[i - 1][3] > item[3]:
+            i -= 1
+        if self._conflate and item[0] == _STRETCH and items[i][0] == _STRETCH and items[i][4] == item[4]:
+            self.stretch_conflated += 1
+            return
+        items.insert(i, item)
+        self.reordered += 1
+
+    # ------------------------------------------------------------------ #
+    # 統計                                                                 #
+    # ------------------------------------------------------------------ #
+
+    def stats(self) -> dict:
+        """カウンタのスナップショットを返す。"""
+        return {
+            "stretch_received":  self.stretch_received,
+            "stretch_conflated": self.stretch_conflated,
+            "stretch_delivered": self.stretch_delivered,
+            "grabbed_delivered": self.grabbed_delivered,
+            "reordered":         self.reordered,
+            "stretch_stale":     self.stretch_stale,
+            "grabbed_stale":     self.grabbed_stale,
+            "calls":             self.calls,
+            "ticks":             self.ticks,
+            "pending":           len(self._items),
+        }
+
+    # ------------------------------------------------------------------ #
+    # コンシューマ                                                         #
+    # ------------------------------------------------------------------ #
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while self._running and not self._items:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                batch = self._items
+                self._items = deque()
+            self.ticks += 1
+
+            sinks = self._sinks
+            for kind, value, event_time, seq, channel in batch:
+                stale = seq < self._last_seq
+                if not stale:
+                    self._last_seq = seq
+                try:
+                    if kind == _CALL:
+                        self.calls += 1
+                        value()
+                    elif kind == _STRETCH:
+                        if stale:
+                            self.stretch_stale += 1
+                            continue
+                        self.stretch_delivered += 1
+                        sinks[channel][0](value, event_time)
+                    else:
+                        if stale:
+                            self.grabbed_stale += 1
+                        self.grabbed_delivered += 1
+                        sinks[channel][1](value, event_time)
+                except Exception as e:
+                    logger.error(f"[OSCEventQueue] Delivery error: {e}", exc_info=True)
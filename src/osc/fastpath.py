@@ -0,0 +1,113 @@
+"""OSC 受信の高速デコーダ
+
+VRChat は 1 パケットにつき「アドレス + 引数 1 個」の単純な OSC メッセージを送ってくる。
+受け取りたいアドレスは数個しかないので、pythonosc の Dispatcher（パターンマッチ +
+メッセージ全体のデコード）を通さず、生バイト列のまま次の手順で処理する：
+
+  1. 先頭のヌル終端を探してパディング込みのアドレス長を求める
+  2. memoryview のスライスで事前計算済みテーブル（パディング済みアドレス → ルート）を引く
+  3. 未知のアドレスはここで捨てる（文字列化・オブジェクト生成なし）
+  4. 型タグを見て struct.unpack_from で引数 1 個だけを取り出す
+     （文字列は /avatar/change のアバター ID のように既知アドレスのものだけ str にする）
+
+バンドルや複数引数など想定外の形は FALLBACK を返すので、呼び出し側で
+pythonosc による通常デコードに回すこと。壊れたパケット（空・ヌル終端なし・引数の途切れ）は
+INVALID を返す（受信メトリクスのデコード失敗として数える）。
+"""
+
+import struct
+from typing import Any
+
+# decode() が「高速パスでは扱えない（通常デコードに回す）」ときに返す値
+FALLBACK = object()
+# decode() が「OSC として壊れている（破棄する）」ときに返す値
+INVALID = object()
+
+_FLOAT = struct.Struct(">f")
+_INT = struct.Struct(">i")
+_DOUBLE = struct.Struct(">d")
+
+# 型タグ文字（",X" の X）の ASCII コード
+_TAG_FLOAT = ord("f")
+_TAG_INT = ord("i")
+_TAG_DOUBLE = ord("d")
+_TAG_TRUE = ord("T")
+_TAG_FALSE = ord("F")
+_TAG_STRING = ord("s")
+_COMMA = ord(",")
+_BUNDLE_MARK = ord("#")
+
+
+def pad_address(address: str) -> bytes:
+    """OSC アドレスをヌル終端 + 4 バイト境界パディングしたバイト列にする。"""
+    raw = address.encode("utf-8") + b"\x00"
+    return raw + b"\x00" * (-len(raw) % 4)
+
+
+class AddressTable:
+    """パディング済みアドレスのバイト列からルートを O(1) で引くテーブル。
+
+    ルートは呼び出し側が自由に決めてよい（ハンドラ、(アドレス, ハンドラ) のタプルなど）。
+    """
+
+    def __init__(self, routes: dict[str, Any] | None = None):
+        self._table: dict[bytes, Any] = {}
+        for address, route in (routes or {}).items():
+            self.add(address, route)
+
+    def add(self, address: str, route: Any) -> None:
+        self._table[pad_address(address)] = route
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def __contains__(self, address: str) -> bool:
+        return pad_address(address) in self._table
+
+    def decode(self, data: bytes) -> tuple[Any, Any] | None:
+        """データグラムをデコードする。
+
+        Returns:
+            (route, value)  : 既知アドレスの単一引数メッセージ
+            None            : 未知のアドレス（破棄してよい）
+            FALLBACK        : バンドル・複数引数・未対応型（通常デコードに回す）
+            INVALID         : 壊れたパケット（破棄してよい）
+        """
+        if not data:
+            return INVALID
+        if data[0] == _BUNDLE_MARK:
+            return FALLBACK
+
+        end = data.find(0)
+        if end < 0:
+            return INVALID
+        # ヌル終端を含めて 4 バイト境界に切り上げ
+        tag_pos = (end & ~3) + 4
+        route = self._table.get(memoryview(data)[:tag_pos])
+        if route is None:
+            return None
+
+        # 型タグ ",X\0\0" を確認（引数 1 個のみ高速パス）
+        if len(data) < tag_pos + 4 or data[tag_pos] != _COMMA or data[tag_pos + 2] != 0:
+            return FALLBACK
+        tag = data[tag_pos + 1]
+        arg_pos = tag_pos + 4
+        try:
+            if tag == _TAG_FLOAT:
+                return route, _FLOAT.unpack_from(data, arg_pos)[0]
+            if tag == _TAG_TRUE:
+                return route, True
+            if tag == _TAG_FALSE:
+                return route, False
+            if tag == _TAG_INT:
+                return route, _INT.unpack_from(data, arg_pos)[0]
+            if tag == _TAG_DOUBLE:
+                return route, _DOUBLE.unpack_from(data, arg_pos)[0]
+            if tag == _TAG_STRING:
+                end = data.find(0, arg_pos)
+                if end < 0:
+                    return INVALID
+                return route, data[arg_pos:end].decode("utf-8", "replace")
+        except struct.error:
+            return INVALID  # 引数部分が途切れている
+        return FALLBACK
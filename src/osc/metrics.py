@@ -0,0 +1,175 @@
+"""OSC 受信メトリクス
+
+OSCReceiver の受信スレッドだけが書き込み、GUI やログなど任意のスレッドからロックなしで読む。
+書き込みは int の加算と固定長リストの要素更新だけで、読み取り側は GIL のもとで
+個々の値をそのまま読む（スナップショット全体の一貫性は保証しないが、監視用途には十分）。
+アドレスごとのカウンタは start() 時に既知アドレス分だけ作り、以後 dict のサイズは変えない。
+
+集計する値：
+  - データグラム数・バイト数、未知アドレス数、高速パス外（Dispatcher 回し）の数、デコード失敗数
+  - 過負荷時に間引いた（shed）サンプル数
+  - アドレスごとの受信数と packets/s（直近の 1 秒区切りで数えた値）
+  - Stretch の到着間隔ヒストグラム（固定バケット、ミリ秒）
+  - 待ち受けソケット（エンドポイント）ごとのデータグラム数・バイト数と packets/s
+
+VRChat の送信レートが低い（到着間隔が長い）のか、こちらの処理が追いついていない
+（shed / キューのコンフレーション・stale が増える）のかを切り分けるために使う。
+"""
+
+import time
+from bisect import bisect_left
+from typing import Callable
+
+# Stretch 到着間隔ヒストグラムのバケット上限（ミリ秒）。最後のバケットはそれ以上すべて
+INTERARRIVAL_BUCKETS_MS: tuple[float, ...] = (1, 2, 5, 10, 20, 33, 50, 100, 200, 500, 1000)
+
+
+class AddressCounter:
+    """1 アドレス分の受信数と packets/s。
+
+    packets/s は perf_counter の整数秒で区切った「直前の 1 秒間」の受信数。
+    """
+
+    __slots__ = ("address", "count", "_second", "_window", "_last_pps")
+
+    def __init__(self, address: str):
+        self.address = address
+        self.count = 0
+        self._second = -1
+        self._window = 0
+        self._last_pps = 0
+
+    def hit(self, t: float) -> None:
+        self.count += 1
+        sec = int(t)
+        if sec != self._second:
+            self._last_pps = self._window if sec == self._second + 1 else 0
+            self._second = sec
+            self._window = 0
+        self._window += 1
+
+    def pps(self, now: float) -> int:
+        """直前の 1 秒間の受信数を返す（受信が途絶えていれば 0）。"""
+        sec = int(now)
+        second = self._second
+        if sec == second:
+            return self._last_pps
+        if sec == second + 1:
+            return self._window
+        return 0
+
+
+class StretchCounter(AddressCounter):
+    """AddressCounter に到着間隔ヒストグラムを加えたもの（Stretch 用）。"""
+
+    __slots__ = ("histogram", "_last_time")
+
+    def __init__(self, address: str):
+        super().__init__(address)
+        # histogram[i] = 到着間隔が INTERARRIVAL_BUCKETS_MS[i] 以下（最後は超過）だった回数
+        self.histogram = [0] * (len(INTERARRIVAL_BUCKETS_MS) + 1)
+        self._last_time: float | None = None
+
+    def hit(self, t: float) -> None:
+        AddressCounter.hit(self, t)
+        last = self._last_time
+        self._last_time = t
+        if last is not None:
+            self.histogram[bisect_left(INTERARRIVAL_BUCKETS_MS, (t - last) * 1000.0)] += 1
+
+    def histogram_snapshot(self) -> dict[str, int]:
+        labels = [f"<={b}ms" for b in INTERARRIVAL_BUCKETS_MS] + [f">{INTERARRIVAL_BUCKETS_MS[-1]}ms"]
+        return dict(zip(labels, list(self.histogram)))
+
+
+class EndpointCounter(AddressCounter):
+    """1 待ち受けソケット分の受信数・バイト数と packets/s（address は "host:port" のタグ）。
+
+    受信ループは起床ごとにソケット単位でまとめて数える（hit_many）。
+    """
+
+    __slots__ = ("bytes",)
+
+    def __init__(self, tag: str):
+        super().__init__(tag)
+        self.bytes = 0
+
+    def hit_many(self, count: int, nbytes: int, t: float) -> None:
+        self.count += count
+        self.bytes += nbytes
+        sec = int(t)
+        if sec != self._second:
+            self._last_pps = self._window if sec == self._second + 1 else 0
+            self._second = sec
+            self._window = 0
+        self._window += count
+
+
+class ReceiverMetrics:
+    """OSCReceiver の受信メトリクス。"""
+
+    def __init__(
+        self,
+        addresses: list[str] = (),
+        stretch_address: str | None = None,
+        sources: dict[str, Callable[[], dict]] | None = None,
+        endpoints: list[str] = (),
+    ):
+        """
+        Args:
+            addresses: カウンタを用意する既知アドレス
+            stretch_address: 到着間隔ヒストグラムを取るアドレス
+            sources: スナップショットに含める下流の統計（add_source() と同じ）
+            endpoints: カウンタを用意する待ち受けソケットのタグ
+        """
+        self.started_at = time.perf_counter()
+        self.datagrams = 0
+        self.bytes = 0
+        self.unknown = 0          # 未知アドレス（高速パスで破棄）
+        self.fallback = 0         # 高速パス外（バンドル等、Dispatcher に回した）
+        self.decode_failures = 0  # 壊れたパケット
+        self.shed = 0             # 過負荷時に間引いたサンプル
+
+        self.counters: dict[str, AddressCounter] = {
+            addr: StretchCounter(addr) if addr == stretch_address else AddressCounter(addr)
+            for addr in addresses
+        }
+        self.stretch: StretchCounter | None = self.counters.get(stretch_address)
+        self.endpoints: dict[str, EndpointCounter] = {tag: EndpointCounter(tag) for tag in endpoints}
+        # 下流（OSCEventQueue / OSCDedupe など）の stats() をスナップショットに含める
+        self.sources: dict[str, Callable[[], dict]] = dict(sources or {})
+
+    def counter(self, address: str) -> AddressCounter:
+        return self.counters[address]
+
+    def add_source(self, name: str, stats: Callable[[], dict]) -> None:
+        """スナップショットに含める下流の統計（ロックなしで読めるもの）を登録する。"""
+        self.sources = {**self.sources, name: stats}
+
+    def snapshot(self) -> dict:
+        """現在の値を dict で返す（任意のスレッドから呼んでよい）。"""
+        now = time.perf_counter()
+        result = {
+            "uptime":          now - self.started_at,
+            "datagrams":       self.datagrams,
+            "bytes":           self.bytes,
+            "unknown":         self.unknown,
+            "fallback":        self.fallback,
+            "decode_failures": self.decode_failures,
+            "shed":            self.shed,
+            "addresses": {
+                addr: {"count": c.count, "pps": c.pps(now)} for addr, c in self.counters.items()
+            },
+        }
+        if self.endpoints:
+            result["endpoints"] = {
+                tag: {"count": c.count, "bytes": c.bytes, "pps": c.pps(now)} for tag, c in self.endpoints.items()
+            }
+        if self.stretch is not None:
+            result["stretch_interarrival"] = self.stretch.histogram_snapshot()
+        for name, stats in self.sources.items():
+            try:
+                result[name] = stats()
+            except Exception as e:
+                result[name] = {"error": str(e)}
+        return result
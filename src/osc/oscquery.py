@@ -0,0 +1,217 @@
+"""OSCQuery 広告モジュール
+
+受信するパラメータだけを OSCQuery で広告し、VRChat から送られてくる OSC を絞り込む。
+
+  - HTTP : GET /?HOST_INFO でホスト情報、GET /<パス> でパラメータツリー（JSON）を返す
+  - mDNS : _oscjson._tcp（HTTP）と _osc._udp（OSC 受信ポート）をアナウンスする
+
+mDNS には zeroconf パッケージを使う。入っていない場合は警告を出して HTTP だけを提供する
+（VRChat には見つけてもらえないが、HTTP エンドポイントの確認やテストはできる）。
+
+パラメータツリーの例（ACCESS: 0=値なし / 2=書き込みのみ＝こちらが受信する）:
+
+    {"FULL_PATH": "/", "ACCESS": 0, "CONTENTS": {
+        "avatar": {"FULL_PATH": "/avatar", "ACCESS": 0, "CONTENTS": {
+            "parameters": {"FULL_PATH": "/avatar/parameters", "ACCESS": 0, "CONTENTS": {
+                "ShockPB_Stretch": {"FULL_PATH": "/avatar/parameters/ShockPB_Stretch",
+                                    "ACCESS": 2, "TYPE": "f"}, ...}}}}}}
+"""
+
+import json
+import socket
+import threading
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, unquote
+
+logger = logging.getLogger(__name__)
+
+# OSCQuery の ACCESS 値
+ACCESS_NONE = 0
+ACCESS_WRITE_ONLY = 2
+
+_HTTP_SERVICE_TYPE = "_oscjson._tcp.local."
+_OSC_SERVICE_TYPE = "_osc._udp.local."
+
+
+def build_tree(parameters: dict[str, str], descriptions: dict[str, str] | None = None) -> dict:
+    """OSC アドレス → 型タグ の辞書から OSCQuery のノードツリーを組み立てる。
+
+    Args:
+        parameters: {"/avatar/parameters/ShockPB_Stretch": "f", ...}（bool は "T"）
+        descriptions: アドレス → 説明文（任意）
+    """
+    descriptions = descriptions or {}
+    root = {"DESCRIPTION": "root node", "FULL_PATH": "/", "ACCESS": ACCESS_NONE, "CONTENTS": {}}
+    for address, type_tag in parameters.items():
+        parts = [p for p in address.split("/") if p]
+        node = root
+        for depth, part in enumerate(parts[:-1], start=1):
+            node = node["CONTENTS"].setdefault(part, {
+                "FULL_PATH": "/" + "/".join(parts[:depth]),
+                "ACCESS": ACCESS_NONE,
+                "CONTENTS": {},
+            })
+        leaf = {"FULL_PATH": address, "ACCESS": ACCESS_WRITE_ONLY, "TYPE": type_tag}
+        if address in descriptions:
+            leaf["DESCRIPTION"] = descriptions[address]
+        node["CONTENTS"][parts[-1]] = leaf
+    return root
+
+
+def find_node(tree: dict, path: str) -> dict | None:
+    """ツリーからパス（"/avatar/parameters" など）のノードを探す。"""
+    node = tree
+    for part in (p for p in path.split("/") if p):
+        node = node.get("CONTENTS", {}).get(part)
+        if node is None:
+            return None
+    return node
+
+
+class OSCQueryService:
+    """OSCQuery の HTTP サーバーと mDNS アナウンスを管理する。"""
+
+    def __init__(
+        self,
+        name: str,
+        osc_port: int,
+        parameters: dict[str, str],
+        host: str = "127.0.0.1",
+        http_port: int = 0,
+        mdns: bool = True,
+    ):
+        """
+        Args:
+            name: サービス名（mDNS のインスタンス名・HOST_INFO の NAME）
+            osc_port: 広告する OSC（UDP）受信ポート
+            parameters: 広告する OSC アドレス → 型タグ
+            host: HTTP の待ち受けアドレス兼 OSC_IP
+            http_port: HTTP の待ち受けポート（0 なら空きポート）
+            mdns: True なら zeroconf で mDNS アナウンスする
+        """
+        self._name = name
+        self._osc_port = osc_port
+        self._host = host
+        self._http_port = http_port
+        self._mdns = mdns
+        self.tree = build_tree(parameters)
+
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+        self._zeroconf = None
+        self._service_infos: list = []
+
+        # 実際に bind した HTTP アドレス
+        self.http_address: tuple[str, int] | None = None
+
+    def host_info(self) -> dict:
+        return {
+            "NAME": self._name,
+            "OSC_IP": self._host,
+            "OSC_PORT": self._osc_port,
+            "OSC_TRANSPORT": "UDP",
+            "EXTENSIONS": {"ACCESS": True, "VALUE": False, "DESCRIPTION": True},
+        }
+
+    # ------------------------------------------------------------------ #
+    # 起動・停止                                                           #
+    # ------------------------------------------------------------------ #
+
+    def start(self) -> None:
+        handler = type("_Handler", (_OSCQueryRequestHandler,), {"service": self})
+        self._server = ThreadingHTTPServer((self._host, self._http_port), handler)
+        self._server.daemon_threads = True
+        self.http_address = self._server.server_address[:2]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="OSCQuery", daemon=True)
+        self._thread.start()
+        logger.info(f"OSCQuery HTTP started on {self.http_address[0]}:{self.http_address[1]}")
+
+        if self._mdns:
+            self._register_mdns()
+
+    def stop(self) -> None:
+        self._unregister_mdns()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        logger.info("OSCQuery stopped")
+
+    # ------------------------------------------------------------------ #
+    # mDNS                                                                 #
+    # ------------------------------------------------------------------ #
+
+    def _register_mdns(self) -> None:
+        try:
+            from zeroconf import ServiceInfo, Zeroconf
+        except ImportError:
+            logger.warning("zeroconf がインストールされていないため OSCQuery の mDNS アナウンスを行いません")
+            return
+        try:
+            address = socket.inet_aton(self._host)
+            server = f"{self._name}.local."
+            self._service_infos = [
+                ServiceInfo(_HTTP_SERVICE_TYPE, f"{self._name}.{_HTTP_SERVICE_TYPE}",
+                            addresses=[address], port=self.http_address[1], server=server),
+                ServiceInfo(_OSC_SERVICE_TYPE, f"{self._name}.{_OSC_SERVICE_TYPE}",
+                            addresses=[address], port=self._osc_port, server=server),
+            ]
+            self._zeroconf = Zeroconf()
+            for info in self._service_infos:
+                self._zeroconf.register_service(info)
+            logger.info(f"OSCQuery mDNS registered: {self._name}")
+        except Exception as e:
+            logger.warning(f"OSCQuery mDNS registration failed: {e}")
+            self._unregister_mdns()
+
+    def _unregister_mdns(self) -> None:
+        if self._zeroconf is None:
+            return
+        try:
+            self._zeroconf.unregister_all_services()
+            self._zeroconf.close()
+        except Exception as e:
+            logger.warning(f"OSCQuery mDNS unregister failed: {e}")
+        self._zeroconf = None
+        self._service_infos = []
+
+
+class _OSCQueryRequestHandler(BaseHTTPRequestHandler):
+    """GET /?HOST_INFO・GET /<パス>・GET /<パス>?<属性> に応答する。"""
+
+    service: OSCQueryService
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        query = url.query
+        if query == "HOST_INFO":
+            self._send_json(self.service.host_info())
+            return
+
+        node = find_node(self.service.tree, unquote(url.path))
+        if node is None:
+            self.send_error(404, "No such OSC method")
+            return
+        if not query:
+            self._send_json(node)
+        elif query in node:
+            self._send_json({query: node[query]})
+        else:
+            # 値を持たない属性（VALUE など）は内容なし
+            self.send_response(204)
+            self.end_headers()
+
+    def _send_json(self, body: dict) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(f"[OSCQuery] {self.address_string()} {format % args}")
@@ -2,109 +2,814 @@
 
 VRChat から送られる PhysBone パラメータ（Stretch / IsGrabbed など）を
 UDP で受信し、コールバックに渡す。送信機能は持たない。
+
+受信バックエンドは [osc] backend で選択する：
+  - "selector"  : 1 本の常駐スレッドが selectors でソケットを待ち、デコード・ディスパッチまで行う。
+                  既知のアドレス（PhysBone ごとに 4 つ）は fastpath.AddressTable で生バイト列のまま判定し、
+                  それ以外（バンドル等）だけ pythonosc の Dispatcher に回す。
+                  起床ごとにソケットを空になるまで読み切り、バッチが shed_batch_size 以上
+                  （過負荷）のときは古い Stretch を間引いてから受信順に処理する
+  - "threading" : pythonosc の ThreadingOSCUDPServer（パケット毎にスレッドを生成する旧方式）
+
+コールバックには値と一緒に受信時刻（イベント時刻）を渡す。時刻は time.perf_counter()
+基準の単調時計で、selector バックエンドではデータグラムを読んだ直後に打刻する。
+[osc] kernel_timestamps が有効で OS が SO_TIMESTAMPNS に対応していれば（Linux）、
+カーネルがパケットを受け取った時刻を perf_counter 基準に換算して使う。
+threading バックエンドではハンドラスレッドを生成する直前（serve_forever のスレッド）に打刻する。
+
+あわせて、デコードしたメッセージには受信順の通し番号（seq）を振ってコールバックに渡す。
+threading バックエンドはパケット毎のスレッドが前後して状態機械に届きうるので、
+下流の OSCEventQueue（単一コンシューマ）が seq で並べ直し、追い越された古いサンプルを検出する。
+
+[osc] relay_targets を設定すると、受信したデータグラムを再エンコードせずに他の OSC アプリへ
+転送する（relay.OSCRelay）。転送は自分のディスパッチの後に、ノンブロッキングで行う。
+
+[osc] capture を有効にすると、受け付けたデータグラム（未知アドレス・壊れたパケット以外）を
+受信時刻付きでバイナリファイルに追記する（capture.CaptureWriter、再生は tools/osc_replay.py）。
+
+複数の PhysBone（physbones.PhysBone）を 1 つのソケットで受信できる。PhysBone ごとに
+PhysBoneRoute（コールバックの組）を持ち、アドレス → (アドレス, ハンドラ, ...) のテーブルの
+ハンドラにルートを束縛しておくので、PhysBone が何個あってもパケットごとの振り分けは dict 1 回で済む。
+
+アバターごとに受信する PhysBone を変えるときは、アバター ID → PhysBone のプロファイルを渡す。
+テーブル（と Dispatcher）はプロファイルごとに start() 時に作っておき、/avatar/change を
+デコードした時点で差し替える。同じバッチ内でも、それ以降のデータグラムは新しいテーブルで判定する。
+
+selector バックエンドは [osc] listen_addresses で 127.0.0.1:listen_port 以外のソケット
+（LAN の Quest からの送信、IPv6 など）も同じ受信スレッド・同じ selector で待ち受ける。
+ソケットを増やしてもスレッドは増えず、seq・テーブル・間引きは全ソケットで共通。
+ソケットごとのタグ（"quest=0.0.0.0:9001" の "quest"）で受信数・バイト数を数える。
+同じ起床で複数のソケットが読めるときは、ソケット単位でまとめて読む。
 """
 
+import itertools
+from functools import partial
+
+import selectors
+import socket
+import struct
+import sys
 import threading
+import time
 import logging
 from typing import Callable
 
 from pythonosc import osc_server, dispatcher
 
+from .fastpath import AddressTable, FALLBACK, INVALID
+from .metrics import ReceiverMetrics
+from .capture import CaptureWriter, default_capture_path
+from .oscquery import OSCQueryService
+from .relay import OSCRelay, format_target, parse_target
+
 logger = logging.getLogger(__name__)
 
+BACKENDS = ("selector", "threading")
+
+# アバター切り替え（引数はアバター ID の文字列）
+AVATAR_CHANGE = "/avatar/change"
+# 既定のプロファイル（どのアバター ID にも一致しないとき）のキー
+_DEFAULT_PROFILE = ""
+
+# コンストラクタの host / port で待ち受けるソケットのタグ
+LOCAL_ENDPOINT = "local"
+
+# UDP データグラムの最大長
+_MAX_DATAGRAM = 65535
+# selector の待機タイムアウト（秒）。stop() 後にループを抜けるまでの最大遅延になる
+_SELECT_TIMEOUT = 0.5
+
+# SO_TIMESTAMPNS の補助データ（struct timespec）。
+# Python の socket モジュールは定数を公開していないので、Linux では汎用 ABI の値（35）を使う
+_SO_TIMESTAMPNS = getattr(socket, "SO_TIMESTAMPNS", 35 if sys.platform.startswith("linux") else None)
+_TIMESPEC = struct.Struct("@ll")
+
+
+class BatchStats:
+    """起床 1 回あたりに読み切ったデータグラム数（バッチサイズ）の統計。
+
+    受信スレッドだけが更新する。ヒストグラムは 2 のべき乗刻み：
+    histogram[k] = バッチサイズが [2^(k-1), 2^k) だった回数（k=1 は 1 個）。
+    full_batches が増えている／near_full が増えているときはカーネルの受信バッファが
+    溢れかけている（＝取りこぼしている可能性がある）。
+    """
+
+    _BUCKETS = 17
+
+    def __init__(self, rcvbuf: int = 0):
+        self.rcvbuf = rcvbuf            # 実効 SO_RCVBUF（バイト）
+        self.batches = 0
+        self.datagrams = 0
+        self.max_batch = 0
+        self.shed = 0                   # 過負荷で間引いたサンプル数
+        self.full_batches = 0           # max_batch で打ち切った（まだ残っていた）回数
+        self.near_full = 0              # 1 回で rcvbuf の 3/4 以上を読んだ回数
+        self.histogram = [0] * self._BUCKETS
+
+    def record(self, count: int, nbytes: int, shed: int, full: bool) -> None:
+        self.batches += 1
+        self.datagrams += count
+        self.shed += shed
+        if count > self.max_batch:
+            self.max_batch = count
+        self.histogram[min(count.bit_length(), self._BUCKETS - 1)] += 1
+        if full:
+            self.full_batches += 1
+        if self.rcvbuf and nbytes * 4 >= self.rcvbuf * 3:
+            self.near_full += 1
+            if self.near_full == 1 or self.near_full % 100 == 0:
+                logger.warning(
+                    f"OSC receive buffer nearly full ({nbytes} of {self.rcvbuf} bytes in one batch, "
+                    f"{self.near_full} times). Consider raising [osc] recv_buffer_size")
+
+    def snapshot(self) -> dict:
+        return {
+            "rcvbuf":       self.rcvbuf,
+            "batches":      self.batches,
+            "datagrams":    self.datagrams,
+            "avg_batch":    self.datagrams / self.batches if self.batches else 0.0,
+            "max_batch":    self.max_batch,
+            "shed":         self.shed,
+            "full_batches": self.full_batches,
+            "near_full":    self.near_full,
+            "histogram":    {f"<{1 << k}": n for k, n in enumerate(self.histogram) if n},
+        }
+
+
+def parse_listen_address(spec: str) -> tuple[str, str, int]:
+    """"[タグ=]host:port" を (タグ, host, port) に変換する（タグ省略時は spec そのもの、IPv6 は "[::]:9001"）。"""
+    tag, sep, target = spec.partition("=")
+    if not sep:
+        tag, target = spec, spec
+    host, port = parse_target(target)
+    return tag, host, port
+
+
+class _Endpoint:
+    """selector バックエンドの待ち受けソケット 1 つ分（selector の登録データ）。"""
+
+    __slots__ = ("tag", "sock", "kernel_ts", "counter")
+
+    def __init__(self, tag: str, sock: socket.socket, kernel_ts: bool, counter):
+        self.tag = tag
+        self.sock = sock
+        self.kernel_ts = kernel_ts
+        self.counter = counter
+
+
+class _SequencedThreadingOSCUDPServer(osc_server.ThreadingOSCUDPServer):
+    """パケットを読んだスレッド（＝到着順）で (受信時刻, seq) を打刻してからハンドラスレッドを生成する。
+
+    ハンドラスレッド側では打刻をスレッドローカルに置いてから Dispatcher を呼ぶ。
+    受信メトリクスも selector バックエンドと揃えるため、ここで高速パスのテーブルで分類して数える。
+    /avatar/change もここ（到着順）で判定してテーブルを差し替え、ハンドラスレッドには
+    そのパケットを受信した時点の Dispatcher を渡す。
+    """
+
+    def __init__(self, server_address, disp: dispatcher.Dispatcher, receiver: "OSCReceiver"):
+        super().__init__(server_address, disp)
+        self._receiver = receiver
+
+    def process_request(self, request, client_address):
+        receiver = self._receiver
+        t = time.perf_counter()
+        seq = receiver._next_seq()
+        result = receiver._table.decode(request[0])
+        receiver._observe(result, len(request[0]), t)
+        if isinstance(result, tuple) and result[0] is receiver._avatar_route:
+            receiver._switch_avatar(result[1], seq)
+        capture = receiver.capture
+        if capture and result is not None and result is not INVALID:
+            capture.write(t, request[0])
+        super().process_request((request, (t, seq, receiver._disp)), client_address)
+        # ハンドラスレッドを起こした後に転送する（送れない分は次のパケットのときに送る）
+        relay = self._receiver.relay
+        if relay:
+            relay.forward([request[0]])
+
+    def finish_request(self, request, client_address):
+        # _UDPHandler と同じく Dispatcher を呼ぶ（こちらのハンドラは応答を返さない）
+        request, (t, seq, disp) = request
+        self._receiver._local.stamp = (t, seq)
+        disp.call_handlers_for_packet(request[0], client_address)
+
+
+class PhysBoneRoute:
+    """1 PhysBone 分の受信コールバック（OSCReceiver.routes の値）。"""
+
+    __slots__ = ("physbone", "on_stretch_change", "on_grabbed_change")
+
+    def __init__(self, physbone):
+        self.physbone = physbone
+        self.on_stretch_change: Callable[[float, float, int], None] | None = None
+        self.on_grabbed_change: Callable[[bool, float, int], None] | None = None
+
 
 class OSCReceiver:
     """VRChat からの OSC メッセージを受信する（受信のみ）。
 
-    コールバックは属性として後から設定できる：
-        receiver.on_stretch_change = my_func
-        receiver.on_grabbed_change = my_func
+    コールバックは PhysBone ごとに属性として後から設定できる：
+        receiver.routes["Collar"].on_stretch_change = my_func  # (value: float, event_time: float, seq: int)
+        receiver.routes["Collar"].on_grabbed_change = my_func  # (value: bool, event_time: float, seq: int)
+
+    receiver.on_stretch_change / on_grabbed_change は主 PhysBone（physbones[0]）のルートを指す。
+    seq は受信順に 1 から振る通し番号（全 PhysBone で共通、start() ごとにリセット）。
+
+        receiver.on_avatar_change = my_func    # (avatar_id: str, event_time: float, seq: int)
+
+    はテーブルを差し替えた後に、他のコールバックと同じ受信順で呼ばれる。
     """
 
-    def __init__(self):
-        self.on_stretch_change: Callable[[float], None] | None = None
-        self.on_grabbed_change: Callable[[bool], None] | None = None
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int | None = None,
+        backend: str | None = None,
+        physbones: list | None = None,
+        avatar_profiles: dict[str, list] | None = None,
+    ):
+        """
+        Args:
+            host: 待ち受けアドレス
+            port: 待ち受けポート（None なら settings の listen_port、0 なら空きポート）
+            backend: "selector" / "threading"（None なら settings の backend）
+            physbones: 受信する PhysBone（None なら settings の [osc] と [physbones]）
+            avatar_profiles: アバター ID → そのアバターで受信する PhysBone（一致しなければ physbones）
+        """
+        if physbones is None:
+            from physbones import configured_physbones
+            physbones = configured_physbones()
+        self.physbones = list(physbones)
+        self.avatar_profiles: dict[str, list] = {k: list(v) for k, v in (avatar_profiles or {}).items()}
+        # PhysBone 名 → コールバック（全プロファイル分。名前が同じならアドレスも同じ）
+        self.routes: dict[str, PhysBoneRoute] = {}
+        for pb in self.physbones + [pb for pbs in self.avatar_profiles.values() for pb in pbs]:
+            self.routes.setdefault(pb.name, PhysBoneRoute(pb))
+        self._primary = self.routes[self.physbones[0].name]
+        self.on_avatar_change: Callable[[str, float, int], None] | None = None
+
+        # 現在のアバター ID と、使っているプロファイル（start() をまたいで保持する）
+        self.avatar_id: str | None = None
+        self._profile = _DEFAULT_PROFILE
+        self._avatar_seq = 0
+        # プロファイル → (高速パスのテーブル, Dispatcher)。start() で作る
+        self._tables: dict[str, tuple[AddressTable, dispatcher.Dispatcher]] = {}
+        self._table: AddressTable | None = None
+        self._disp: dispatcher.Dispatcher | None = None
+        self._avatar_route: tuple | None = None
+
+        self._host = host
+        self._port = port
+        self._backend = backend
 
         self._server = None
+        # selector バックエンドの待ち受けソケット（先頭が host:port）
+        self._endpoints: list[_Endpoint] = []
         self._server_thread: threading.Thread | None = None
         self._running = False
 
+        # 実際に bind したアドレス（port=0 のとき空きポートが入る）
+        self.address: tuple[str, int] | None = None
+        # タグ → bind したアドレス（listen_addresses の分も含む）
+        self.addresses: dict[str, tuple] = {}
+        # selector バックエンドの起床ごとの読み取り数の統計
+        self.batch_stats = BatchStats()
+        # SO_TIMESTAMPNS による受信時刻を使っているか
+        self._kernel_timestamps = False
+
+        # 受信順の通し番号。itertools.count の __next__ は GIL 下でアトミック
+        self._next_seq = itertools.count(1).__next__
+        # Dispatcher 経由のハンドラに受信時の (時刻, seq) を渡すためのスレッドローカル
+        self._local = threading.local()
+        # [osc] oscquery が有効なときの広告サービス
+        self.oscquery: OSCQueryService | None = None
+        # [osc] relay_targets が設定されているときの転送
+        self.relay: OSCRelay | None = None
+        # 受信メトリクス（受信スレッドだけが書き、任意のスレッドからロックなしで読める）
+        self.metrics = ReceiverMetrics()
+        # [osc] capture が有効なときのキャプチャ出力
+        self.capture: CaptureWriter | None = None
+        # [debug] の受信ログの有無。パケットごとに settings を引かないよう start() で読む
+        self._log_stretch = self._log_is_grabbed = self._log_angle = self._log_is_posed = False
+
+    @property
+    def on_stretch_change(self) -> Callable[[float, float, int], None] | None:
+        return self._primary.on_stretch_change
+
+    @on_stretch_change.setter
+    def on_stretch_change(self, cb: Callable[[float, float, int], None] | None) -> None:
+        self._primary.on_stretch_change = cb
+
+    @property
+    def on_grabbed_change(self) -> Callable[[bool, float, int], None] | None:
+        return self._primary.on_grabbed_change
+
+    @on_grabbed_change.setter
+    def on_grabbed_change(self, cb: Callable[[bool, float, int], None] | None) -> None:
+        self._primary.on_grabbed_change = cb
+
     # ------------------------------------------------------------------ #
     # サーバー起動・停止                                                   #
     # ------------------------------------------------------------------ #
 
     def start(self) -> None:
-        """OSC サーバーを起動する（ブロッキング呼び出し）。"""
+        """OSC サーバーを起動する（受信スレッドを立ててすぐに戻る）。"""
         if self._running:
             logger.warning("OSCReceiver is already running")
             return
 
-        from config import (
-            LISTEN_PORT,
-            OSC_STRETCH_PARAM, OSC_IS_GRABBED_PARAM,
-            OSC_ANGLE_PARAM, OSC_IS_POSED_PARAM,
-            DEBUG_LOG_ALL_OSC,
-        )
+        import settings as s_mod
+        osc = s_mod.settings.osc
+        debug = s_mod.settings.debug
+        self._log_stretch = debug.log_stretch
+        self._log_is_grabbed = debug.log_is_grabbed
+        self._log_angle = debug.log_angle
+        self._log_is_posed = debug.log_is_posed
+        port = osc.listen_port if self._port is None else self._port
+        backend = self._backend or osc.backend
+        if backend not in BACKENDS:
+            logger.warning(f"Unknown OSC backend {backend!r}, falling back to 'selector'")
+            backend = "selector"
+
+        listeners = [(LOCAL_ENDPOINT, self._host, port)]
+        if osc.listen_addresses:
+            if backend == "selector":
+                listeners += self._parse_listen_addresses(osc.listen_addresses)
+            else:
+                logger.warning("[osc] listen_addresses is only supported by the selector backend; ignored")
 
         try:
-            disp = dispatcher.Dispatcher()
-            disp.map(OSC_STRETCH_PARAM,    self._handle_stretch)
-            disp.map(OSC_IS_GRABBED_PARAM, self._handle_grabbed)
-            disp.map(OSC_ANGLE_PARAM,      self._handle_angle)
-            disp.map(OSC_IS_POSED_PARAM,   self._handle_is_posed)
-            if DEBUG_LOG_ALL_OSC:
-                disp.set_default_handler(self._handle_debug_all)
-
-            self._server = osc_server.ThreadingOSCUDPServer(("127.0.0.1", LISTEN_PORT), disp)
-            self._server_thread = threading.Thread(target=self._server.serve_forever, daemon=True)
-            self._server_thread.start()
+            self._next_seq = itertools.count(1).__next__
+            self._avatar_seq = 0
+            self.relay = self._build_relay(osc, port)
+            self.metrics = ReceiverMetrics(
+                list(self._all_parameters()) + [AVATAR_CHANGE],
+                stretch_address=self._primary.physbone.stretch_param, sources=self.metrics.sources,
+                endpoints=[tag for tag, _host, _port in listeners])
+            self._avatar_route = (
+                AVATAR_CHANGE, self._handle_avatar_change, False, self.metrics.counter(AVATAR_CHANGE))
+            profiles = {_DEFAULT_PROFILE: self.physbones, **self.avatar_profiles}
+            self._tables = {
+                key: (self._build_address_table(pbs), self._build_dispatcher(pbs))
+                for key, pbs in profiles.items()
+            }
+            if self._profile not in self._tables:
+                self._profile = _DEFAULT_PROFILE
+            self._table, self._disp = self._tables[self._profile]
+            if osc.capture:
+                self.capture = CaptureWriter(osc.capture_path or default_capture_path())
+                logger.info(f"OSC capture: {self.capture.path}")
+
+            if backend == "threading":
+                self._server = _SequencedThreadingOSCUDPServer((self._host, port), self._disp, self)
+                self.address = self._server.server_address
+                self.addresses = {LOCAL_ENDPOINT: self.address}
+                target, args = self._server.serve_forever, ()
+            else:
+                # host:port が bind できなければ起動失敗、追加分は警告して飛ばす
+                self._endpoints = [self._bind_endpoint(*listeners[0], osc)]
+                for listener in listeners[1:]:
+                    try:
+                        self._endpoints.append(self._bind_endpoint(*listener, osc))
+                    except OSError as e:
+                        logger.warning(f"OSCReceiver: cannot listen on {listener[0]}: {e}")
+                self.addresses = {ep.tag: ep.sock.getsockname() for ep in self._endpoints}
+                self.address = self.addresses[LOCAL_ENDPOINT]
+                primary_sock = self._endpoints[0].sock
+                self.batch_stats = BatchStats(primary_sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF))
+                self._kernel_timestamps = self._endpoints[0].kernel_ts
+                target, args = self._serve_selector, (osc,)
 
             self._running = True
-            logger.info(f"OSCReceiver started on port {LISTEN_PORT}")
+            self._server_thread = threading.Thread(target=target, args=args, name="OSCReceiver", daemon=True)
+            self._server_thread.start()
+            if len(self.addresses) > 1:
+                logger.info("OSCReceiver listening on " + ", ".join(
+                    f"{tag}={addr[0]}:{addr[1]}" for tag, addr in self.addresses.items()))
+            logger.info(
+                f"OSCReceiver started on port {self.address[1]} (backend={backend}, "
+                f"kernel_timestamps={self._kernel_timestamps}, "
+                f"physbones={', '.join(self.routes)})")
+
+            if osc.oscquery:
+                self._start_oscquery(osc)
 
         except Exception as e:
             logger.error(f"OSCReceiver failed to start: {e}")
             self._running = False
+            self._close_socket()
+            if self.relay:
+                self.relay.close()
+                self.relay = None
+            if self.capture:
+                self.capture.close()
+                self.capture = None
 
     def stop(self) -> None:
         """OSC サーバーを停止する。"""
         if not self._running:
             return
         try:
+            self._running = False
             if self._server:
                 self._server.shutdown()
-            self._running = False
+                self._server.server_close()
+                self._server = None
+            if self._server_thread and self._server_thread is not threading.current_thread():
+                self._server_thread.join(timeout=_SELECT_TIMEOUT * 2)
+            self._close_socket()
+            if self.capture:
+                self.capture.close()
+                self.capture = None
+            if self.relay:
+                logger.info(f"OSCRelay stats: {self.relay.stats()}")
+                self.relay.close()
+                self.relay = None
+            if self.oscquery:
+                self.oscquery.stop()
+                self.oscquery = None
+            if self.batch_stats.batches:
+                logger.info(f"OSCReceiver batch stats: {self.batch_stats.snapshot()}")
+            if self.metrics.datagrams:
+                logger.info(f"OSCReceiver metrics: {self.metrics.snapshot()}")
             logger.info("OSCReceiver stopped")
         except Exception as e:
             logger.error(f"OSCReceiver stop error: {e}")
 
+    def _all_parameters(self) -> dict[str, str]:
+        """全プロファイルの PhysBone のアドレス → OSC 型タグ。"""
+        parameters = {}
+        for pbs in [self.physbones, *self.avatar_profiles.values()]:
+            for pb in pbs:
+                parameters.update(pb.parameters)
+        return parameters
+
+    def _build_dispatcher(self, physbones: list) -> dispatcher.Dispatcher:
+        import settings as s_mod
+        disp = dispatcher.Dispatcher()
+        for addr, (handler, _sheddable) in self._routes_by_address(physbones).items():
+            disp.map(addr, handler)
+        disp.map(AVATAR_CHANGE, self._handle_avatar_change)
+        if s_mod.settings.debug.log_all_osc:
+            disp.set_default_handler(self._handle_debug_all)
+        return disp
+
+    def _routes_by_address(self, physbones: list) -> dict:
+        """アドレス → (PhysBoneRoute を束縛したハンドラ, 間引き可否) を physbones の分だけ作る。"""
+        routes = {}
+        for pb in physbones:
+            route = self.routes[pb.name]
+            routes[pb.stretch_param]    = (partial(self._handle_stretch,   route), True)
+            routes[pb.is_grabbed_param] = (partial(self._handle_grabbed,   route), False)
+            routes[pb.angle_param]      = (partial(self._handle_angle,     route), True)
+            routes[pb.is_posed_param]   = (partial(self._handle_is_posed,  route), False)
+        return routes
+
+    def _build_address_table(self, physbones: list) -> AddressTable:
+        """高速パス用のテーブル（パディング済みアドレス → (アドレス, ハンドラ, 間引き可否, カウンタ)）を作る。
+
+        間引き可（連続値）のアドレスは過負荷時に同一バッチ内の古いサンプルを捨ててよい。
+        IsGrabbed / IsPosed のような状態遷移は決して捨てない。
+        カウンタは self.metrics のアドレスごとの受信カウンタ。
+        /avatar/change はどのテーブルにも同じルート（self._avatar_route）で入れる。
+        """
+        table = AddressTable({
+            addr: (addr, handler, sheddable, self.metrics.counter(addr))
+            for addr, (handler, sheddable) in self._routes_by_address(physbones).items()
+        })
+        table.add(AVATAR_CHANGE, self._avatar_route)
+        return table
+
+    def _switch_avatar(self, avatar_id: str, seq: int) -> None:
+        """avatar_id のプロファイルのテーブルに差し替える（受信順で新しいものだけ反映する）。"""
+        if seq <= self._avatar_seq:
+            return
+        self._avatar_seq = seq
+        self.avatar_id = avatar_id
+        profile = avatar_id if avatar_id in self._tables else _DEFAULT_PROFILE
+        if profile != self._profile:
+            self._profile = profile
+            self._table, self._disp = self._tables[profile]
+            logger.info(f"OSCReceiver switched to {'profile ' + profile if profile else 'default profile'}")
+
+    def _build_relay(self, osc, port: int) -> OSCRelay | None:
+        """[osc] relay_targets（"host:port" のリスト）から転送を組み立てる。自分自身への転送は除く。"""
+        targets = []
+        for target in osc.relay_targets:
+            try:
+                address = parse_target(target)
+            except ValueError as e:
+                logger.warning(f"OSCRelay: {e}")
+                continue
+            if address[1] == port and address[0] in (self._host, "127.0.0.1", "localhost", "::1"):
+                logger.warning(f"OSCRelay: skipping {target} (own listen port)")
+                continue
+            targets.append(address)
+        relay = OSCRelay(targets, osc.relay_queue_size) if targets else None
+        if not relay or not relay.targets:
+            return None
+        logger.info(f"OSCRelay forwarding to {', '.join(format_target(t) for t in relay.targets)}")
+        return relay
+
+    def _start_oscquery(self, osc) -> None:
+        """受信する PhysBone のパラメータだけを OSCQuery で広告する（失敗しても受信は続ける）。"""
+        parameters = {**self._all_parameters(), AVATAR_CHANGE: "s"}
+        try:
+            self.oscquery = OSCQueryService(
+                osc.oscquery_name, self.address[1], parameters,
+                host=self._host, http_port=osc.oscquery_http_port)
+            self.oscquery.start()
+        except Exception as e:
+            logger.error(f"OSCQuery failed to start: {e}")
+            self.oscquery = None
+
+    @staticmethod
+    def _parse_listen_addresses(specs: list[str]) -> list[tuple[str, str, int]]:
+        """[osc] listen_addresses を (タグ, host, port) のリストにする（不正・重複したタグは警告して除く）。"""
+        listeners = []
+        tags = {LOCAL_ENDPOINT}
+        for spec in specs:
+            try:
+                tag, host, port = parse_listen_address(spec)
+            except ValueError as e:
+                logger.warning(f"OSCReceiver: invalid listen address {spec!r}: {e}")
+                continue
+            if tag in tags:
+                logger.warning(f"OSCReceiver: duplicate listen address tag {tag!r}; ignored")
+                continue
+            tags.add(tag)
+            listeners.append((tag, host, port))
+        return listeners
+
+    def _bind_endpoint(self, tag: str, host: str, port: int, osc) -> _Endpoint:
+        """ノンブロッキングの UDP ソケットを作って bind する（IPv6 は IPv6 専用にして IPv4 と同じポートを使えるようにする）。"""
+        family, _type, _proto, _name, sockaddr = socket.getaddrinfo(
+            host, port, type=socket.SOCK_DGRAM, flags=socket.AI_PASSIVE)[0]
+        sock = socket.socket(family, socket.SOCK_DGRAM)
+        try:
+            if family == socket.AF_INET6 and hasattr(socket, "IPV6_V6ONLY"):
+                sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 1)
+            if osc.recv_buffer_size > 0:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, osc.recv_buffer_size)
+            sock.bind(sockaddr)
+            sock.setblocking(False)
+        except OSError:
+            sock.close()
+            raise
+        kernel_ts = osc.kernel_timestamps and self._enable_kernel_timestamps(sock)
+        return _Endpoint(tag, sock, kernel_ts, self.metrics.endpoints[tag])
+
+    @staticmethod
+    def _enable_kernel_timestamps(sock: socket.socket) -> bool:
+        """SO_TIMESTAMPNS を有効化する。未対応の OS では False を返す。"""
+        if _SO_TIMESTAMPNS is None or not hasattr(sock, "recvmsg"):
+            return False
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, _SO_TIMESTAMPNS, 1)
+            return True
+        except OSError:
+            return False
+
+    def _close_socket(self) -> None:
+        for ep in self._endpoints:
+            try:
+                ep.sock.close()
+            except OSError:
+                pass
+        self._endpoints = []
+
+    # ------------------------------------------------------------------ #
+    # selector バックエンド                                                #
+    # ------------------------------------------------------------------ #
+
+    def _serve_selector(self, osc) -> None:
+        """単一スレッドでソケットを待ち、起床ごとにソケットを空になるまで読み切ってディスパッチする。"""
+        import settings as s_mod
+        decode = self._table.decode
+        disp = self._disp
+        avatar_route = self._avatar_route
+        stats = self.batch_stats
+        max_batch = max(1, osc.max_batch)
+        shed_batch_size = osc.shed_batch_size
+        # 未知アドレスは全 OSC ログが有効なときだけ Dispatcher（default handler）に回す
+        log_all = s_mod.settings.debug.log_all_osc
+        kernel_ts = any(ep.kernel_ts for ep in self._endpoints)
+        cmsg_size = socket.CMSG_SPACE(_TIMESPEC.size) if kernel_ts else 0
+        perf_counter = time.perf_counter
+        next_seq = self._next_seq
+        local = self._local
+        metrics = self.metrics
+        capture = self.capture
+        relay = self.relay
+        relay_waiting: list = []  # 送り残しがあり、書き込み可能を待っている relay.sockets
+
+        sel = selectors.DefaultSelector()
+        for ep in self._endpoints:
+            sel.register(ep.sock, selectors.EVENT_READ, ep)
+        try:
+            while self._running:
+                events = sel.select(timeout=_SELECT_TIMEOUT)
+                if not events:
+                    continue
+                if relay_waiting and any(key.fileobj in relay_waiting for key, _ in events):
+                    if relay.flush():
+                        for sock in relay_waiting:
+                            sel.unregister(sock)
+                        relay_waiting = []
+                    if not any(key.data is not None for key, _ in events):
+                        continue
+
+                # --- 読めるソケットごとにノンブロッキングで読み切る（合計で最大 max_batch 個） ---
+                raw = [] if relay else None
+                batch = []
+                nbytes = 0
+                count = 0
+                if kernel_ts:
+                    # カーネル時刻（CLOCK_REALTIME）→ perf_counter 基準への換算オフセット
+                    offset = time.time() - perf_counter()
+                for key, _mask in events:
+                    ep = key.data
+                    if ep is None:
+                        continue
+                    sock = ep.sock
+                    ep_kernel_ts = ep.kernel_ts
+                    ep_count = count
+                    ep_bytes = nbytes
+                    while count < max_batch:
+                        try:
+                            if ep_kernel_ts:
+                                data, ancdata, _flags, client = sock.recvmsg(_MAX_DATAGRAM, cmsg_size)
+                                t = self._kernel_time(ancdata, offset)
+                                if t is None:
+                                    t = perf_counter()
+                            else:
+                                data, client = sock.recvfrom(_MAX_DATAGRAM)
+                                t = perf_counter()
+                        except (BlockingIOError, InterruptedError):
+                            break
+                        except ConnectionResetError:
+                            # Windows: 直前の送信先ポートが閉じていると ICMP で recvfrom が失敗する
+                            continue
+                        except OSError:
+                            if self._running:
+                                logger.error("OSCReceiver socket error", exc_info=True)
+                            return
+                        count += 1
+                        nbytes += len(data)
+                        if raw is not None:
+                            raw.append(data)
+                        result = decode(data)
+                        if result is None:
+                            metrics.unknown += 1
+                            if log_all:
+                                batch.append((None, (data, client, disp), t, next_seq()))
+                        elif result is FALLBACK:
+                            metrics.fallback += 1
+                            batch.append((None, (data, client, disp), t, next_seq()))
+                            if capture:
+                                capture.write(t, data)
+                        elif result is INVALID:
+                            metrics.decode_failures += 1
+                        else:
+                            route = result[0]
+                            route[3].hit(t)
+                            seq = next_seq()
+                            batch.append((route, result[1], t, seq))
+                            if capture:
+                                capture.write(t, data)
+                            if route is avatar_route:
+                                # 以降のデータグラムは新しいアバターのテーブルで判定する
+                                self._switch_avatar(result[1], seq)
+                                decode = self._table.decode
+                                disp = self._disp
+                    if count > ep_count:
+                        ep.counter.hit_many(count - ep_count, nbytes - ep_bytes, t)
+
+                if count == 0:
+                    continue
+                shed = 0
+                if 0 < shed_batch_size <= count:
+                    batch, shed = self._shed_stale(batch)
+                stats.record(count, nbytes, shed, full=count >= max_batch)
+                metrics.datagrams += count
+                metrics.bytes += nbytes
+                metrics.shed += shed
+
+                # --- 受信順にディスパッチ ---
+                for route, value, t, seq in batch:
+                    try:
+                        if route is None:
+                            local.stamp = (t, seq)
+                            value[2].call_handlers_for_packet(value[0], value[1])
+                        else:
+                            route[1](route[0], value, t, seq)
+                    except Exception as e:
+                        logger.error(f"OSCReceiver dispatch error: {e}", exc_info=True)
+
+                # --- 自分の処理を終えてから転送（送れない分はキューに残して次の起床で送る） ---
+                if raw and not relay.forward(raw) and not relay_waiting:
+                    relay_waiting = list(relay.sockets.values())
+                    for sock in relay_waiting:
+                        sel.register(sock, selectors.EVENT_WRITE)
+        finally:
+            sel.close()
+
+    def _observe(self, result, nbytes: int, t: float) -> None:
+        """threading バックエンド用：decode() の結果を受信メトリクスに数える。"""
+        metrics = self.metrics
+        metrics.datagrams += 1
+        metrics.bytes += nbytes
+        metrics.endpoints[LOCAL_ENDPOINT].hit_many(1, nbytes, t)
+        if result is None:
+            metrics.unknown += 1
+        elif result is FALLBACK:
+            metrics.fallback += 1
+        elif result is INVALID:
+            metrics.decode_failures += 1
+        else:
+            result[0][3].hit(t)
+
+    @staticmethod
+    def _kernel_time(ancdata: list, offset: float) -> float | None:
+        """recvmsg の補助データから SO_TIMESTAMPNS を取り出し、perf_counter 基準に換算する。"""
+        for level, kind, cdata in ancdata:
+            if level == socket.SOL_SOCKET and kind == _SO_TIMESTAMPNS and len(cdata) >= _TIMESPEC.size:
+                sec, nsec = _TIMESPEC.unpack_from(cdata)
+                return sec + nsec * 1e-9 - offset
+        return None
+
+    @staticmethod
+    def _shed_stale(batch: list) -> tuple[list, int]:
+        """過負荷時の間引き：状態遷移の間にある連続値は、アドレスごとに最新の 1 個だけ残す。
+
+        後ろから走査し、間引き不可のイベント（IsGrabbed 等）を越えたら「既出」集合をリセットする。
+        これで IsGrabbed の直前の Stretch（Grab 終了時の値）は必ず残り、順序も変わらない。
+        """
+        kept = []
+        seen = set()
+        shed = 0
+        for item in reversed(batch):
+            route = item[0]
+            if route is not None and route[2]:
+                if route[0] in seen:
+                    shed += 1
+                    continue
+                seen.add(route[0])
+            else:
+                seen.clear()
+            kept.append(item)
+        kept.reverse()
+        return kept, shed
+
     # ------------------------------------------------------------------ #
     # ハンドラ                                                             #
     # ------------------------------------------------------------------ #
 
-    def _handle_stretch(self, addr: str, value: float) -> None:
-        from config import DEBUG_LOG_STRETCH
-        if DEBUG_LOG_STRETCH:
-            logger.info(f"[STRETCH] {value}")
-        if self.on_stretch_change:
-            self.on_stretch_change(value)
-
-    def _handle_grabbed(self, addr: str, value: bool) -> None:
-        from config import DEBUG_LOG_IS_GRABBED
-        if DEBUG_LOG_IS_GRABBED:
-            logger.info(f"[IS_GRABBED] {value}")
-        if self.on_grabbed_change:
-            self.on_grabbed_change(value)
-
-    def _handle_angle(self, addr: str, value: float) -> None:
-        from config import DEBUG_LOG_ANGLE
-        if DEBUG_LOG_ANGLE:
-            logger.info(f"[ANGLE] {value}")
-
-    def _handle_is_posed(self, addr: str, value: bool) -> None:
-        from config import DEBUG_LOG_IS_POSED
-        if DEBUG_LOG_IS_POSED:
-            logger.info(f"[IS_POSED] {value}")
+    # event_time / seq は selector バックエンドの高速パスから直接渡される。Dispatcher 経由
+    # （threading バックエンド・高速パス外のパケット）では受信時にスレッドローカルへ置いた値を使う。
+
+    def _stamp(self, event_time: float | None, seq: int | None) -> tuple[float, int]:
+        if seq is not None:
+            return event_time, seq
+        stamp = getattr(self._local, "stamp", None)
+        if stamp is None:
+            return time.perf_counter(), self._next_seq()
+        return stamp
+
+    # route はハンドラ登録時に partial で束縛した PhysBoneRoute。
+
+    def _handle_stretch(self, route: PhysBoneRoute, addr: str, value: float,
+                        event_time: float | None = None, seq: int | None = None) -> None:
+        if self._log_stretch:
+            logger.info(f"[STRETCH] {route.physbone.name}: {value}")
+        if route.on_stretch_change:
+            route.on_stretch_change(value, *self._stamp(event_time, seq))
+
+    def _handle_grabbed(self, route: PhysBoneRoute, addr: str, value: bool,
+                        event_time: float | None = None, seq: int | None = None) -> None:
+        if self._log_is_grabbed:
+            logger.info(f"[IS_GRABBED] {route.physbone.name}: {value}")
+        if route.on_grabbed_change:
+            route.on_grabbed_change(value, *self._stamp(event_time, seq))
+
+    def _handle_angle(self, route: PhysBoneRoute, addr: str, value: float,
+                      event_time: float | None = None, seq: int | None = None) -> None:
+        if self._log_angle:
+            logger.info(f"[ANGLE] {route.physbone.name}: {value}")
+
+    def _handle_is_posed(self, route: PhysBoneRoute, addr: str, value: bool,
+                         event_time: float | None = None, seq: int | None = None) -> None:
+        if self._log_is_posed:
+            logger.info(f"[IS_POSED] {route.physbone.name}: {value}")
+
+    def _handle_avatar_change(self, addr: str, avatar_id: str,
+                              event_time: float | None = None, seq: int | None = None) -> None:
+        event_time, seq = self._stamp(event_time, seq)
+        # 高速パスでデコードしたものは切り替え済み。Dispatcher 経由（バンドル内など）はここで切り替える
+        self._switch_avatar(avatar_id, seq)
+        logger.info(f"[AVATAR] {avatar_id}")
+        if self.on_avatar_change:
+            self.on_avatar_change(avatar_id, event_time, seq)
 
     def _handle_debug_all(self, addr: str, *args) -> None:
         logger.info(f"[OSC] Address: {addr}, Values: {args}")
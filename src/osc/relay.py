@@ -0,0 +1,143 @@
+"""OSC リレー（受信データグラムを他の OSC アプリへ転送する）
+
+VRChat の送信先ポートは 1 プロセスしか bind できないので、受信したデータグラムを
+そのまま（再エンコードせずに）設定した host:port へ転送する。
+
+転送は OSCReceiver の受信ループから行う。自分の Stretch / IsGrabbed のディスパッチを
+終えてから積み、ノンブロッキングの送信ソケットで送れるだけ送る。
+送れなかった分は転送先ごとのキューに残り、ソケットが書き込み可能になってから再送する。
+キューが上限に達したら古いデータグラムから捨てる（受信処理は決して待たせない）。
+
+転送先は起動時に getaddrinfo() で解決し、アドレスファミリ（IPv4 / IPv6）ごとに送信ソケットを 1 つ開く。
+"""
+
+import socket
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+def format_target(address: tuple[str, int]) -> str:
+    """(host, port) を "host:port" にする（IPv6 は "[::1]:9002"）。"""
+    host, port = address[0], address[1]
+    return f"[{host}]:{port}" if ":" in host else f"{host}:{port}"
+
+
+def parse_target(target: str) -> tuple[str, int]:
+    """"host:port" 形式の文字列を (host, port) に変換する（IPv6 は "[::1]:9002"）。"""
+    host, sep, port = target.rpartition(":")
+    if not sep or not host:
+        raise ValueError(f"relay target must be 'host:port': {target!r}")
+    return host.removeprefix("[").removesuffix("]"), int(port)
+
+
+class _Target:
+    """転送先 1 つ分の送信キューとカウンタ。"""
+
+    __slots__ = ("address", "family", "sockaddr", "queue", "sent", "dropped", "errors")
+
+    def __init__(self, address: tuple[str, int], family: int, sockaddr: tuple):
+        self.address = address
+        self.family = family
+        self.sockaddr = sockaddr
+        self.queue: deque[bytes] = deque()
+        self.sent = 0
+        self.dropped = 0
+        self.errors = 0
+
+
+class OSCRelay:
+    """受信したデータグラムを複数の転送先へノンブロッキングで送る。
+
+    受信スレッド（単一）からだけ呼ばれる前提で、ロックは持たない。
+    """
+
+    def __init__(self, targets: list[tuple[str, int]], queue_size: int = 1024):
+        """
+        Args:
+            targets: 転送先の (host, port) のリスト。名前解決できないものは警告を出して除く
+            queue_size: 転送先ごとの送信キューの上限（データグラム数）
+        """
+        self._targets: list[_Target] = []
+        # アドレスファミリ → 送信ソケット（転送先のあるファミリだけ開く）
+        self.sockets: dict[int, socket.socket] = {}
+        for address in targets:
+            try:
+                family, _type, _proto, _name, sockaddr = socket.getaddrinfo(
+                    address[0], address[1], type=socket.SOCK_DGRAM)[0]
+            except (socket.gaierror, UnicodeError) as e:
+                logger.warning(f"OSCRelay: cannot resolve {format_target(address)}: {e}")
+                continue
+            if family not in self.sockets:
+                sock = socket.socket(family, socket.SOCK_DGRAM)
+                sock.setblocking(False)
+                self.sockets[family] = sock
+            self._targets.append(_Target(address, family, sockaddr))
+        self._queue_size = max(1, queue_size)
+
+    @property
+    def targets(self) -> list[tuple[str, int]]:
+        return [t.address for t in self._targets]
+
+    @property
+    def pending(self) -> int:
+        """送信待ちのデータグラム数（全転送先の合計）。"""
+        return sum(len(t.queue) for t in self._targets)
+
+    def forward(self, datagrams: list[bytes]) -> bool:
+        """データグラムを全転送先のキューに積んで送れるだけ送る。
+
+        Returns:
+            True なら全部送れた。False なら残りがあるので、書き込み可能になってから flush() する。
+        """
+        limit = self._queue_size
+        for target in self._targets:
+            queue = target.queue
+            queue.extend(datagrams)
+            overflow = len(queue) - limit
+            if overflow > 0:
+                for _ in range(overflow):
+                    queue.popleft()
+                target.dropped += overflow
+        return self.flush()
+
+    def flush(self) -> bool:
+        """キューに残っているデータグラムを送れるだけ送る。全部送れたら True。"""
+        sockets = self.sockets
+        done = True
+        for target in self._targets:
+            queue = target.queue
+            if not queue:
+                continue
+            sendto = sockets[target.family].sendto
+            address = target.sockaddr
+            while queue:
+                try:
+                    sendto(queue[0], address)
+                except (BlockingIOError, InterruptedError):
+                    done = False
+                    break
+                except OSError:
+                    # 転送先が閉じている（Windows の ICMP 等）・経路がない等。捨てて次へ
+                    target.errors += 1
+                else:
+                    target.sent += 1
+                queue.popleft()
+        return done
+
+    def stats(self) -> dict:
+        """転送先ごとのカウンタを返す。"""
+        return {
+            format_target(t.address): {
+                "sent": t.sent, "dropped": t.dropped, "errors": t.errors, "pending": len(t.queue),
+            }
+            for t in self._targets
+        }
+
+    def close(self) -> None:
+        for sock in self.sockets.values():
+            try:
+                sock.close()
+            except OSError:
+                pass
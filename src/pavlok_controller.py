@@ -30,14 +30,14 @@ def _get_device() -> PavlokDevice:
 # ===== 強度計算（intensity.py への薄いラッパー）=====
 # 既存コードが `from pavlok_controller import calculate_zap_intensity` で呼べるよう維持する。
 
-def calculate_zap_intensity(stretch_value: float) -> int:
-    """Stretch 値を刺激強度に変換する。設定は実行時に読み込む。"""
-    return calculate_intensity(stretch_value, IntensityConfig.from_settings())
+def calculate_zap_intensity(stretch_value: float, cfg: IntensityConfig | None = None) -> int:
+    """Stretch 値を刺激強度に変換する。cfg 省略時は設定を実行時に読み込む。"""
+    return calculate_intensity(stretch_value, cfg or IntensityConfig.from_settings())
 
 
-def normalize_intensity_for_display(stimulus_value: int) -> int:
-    """内部強度値を表示用パーセントに変換する。設定は実行時に読み込む。"""
-    return normalize_for_display(stimulus_value, IntensityConfig.from_settings())
+def normalize_intensity_for_display(stimulus_value: int, cfg: IntensityConfig | None = None) -> int:
+    """内部強度値を表示用パーセントに変換する。cfg 省略時は設定を実行時に読み込む。"""
+    return normalize_for_display(stimulus_value, cfg or IntensityConfig.from_settings())
 
 
 # ===== デバイスへのディスパッチ =====
@@ -0,0 +1,104 @@
+"""
+PhysBone 定義モジュール
+
+1 つのアバターに複数の Shock PhysBone（首輪・リード・しっぽなど）があるとき、
+PhysBone ごとに受信アドレスと強度カーブの上書きをまとめる。
+
+主 PhysBone は [osc] stretch_param などから作り、[physbones.<名前>] の表で追加する。
+追加分のアドレスは主 PhysBone のアドレスの PhysBone 名の部分を差し替えたもの：
+
+    /avatar/parameters/ShockPB_Stretch  →  /avatar/parameters/Collar_Stretch
+"""
+
+import logging
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PhysBone:
+    """1 PhysBone 分の受信アドレスと強度カーブの上書き。"""
+    name: str
+    stretch_param: str
+    is_grabbed_param: str
+    angle_param: str
+    is_posed_param: str
+    intensity_overrides: dict = field(default_factory=dict)
+
+    @property
+    def parameters(self) -> dict[str, str]:
+        """アドレス → OSC 型タグ（OSCQuery の広告用）。"""
+        return {
+            self.stretch_param:    "f",
+            self.is_grabbed_param: "T",
+            self.angle_param:      "f",
+            self.is_posed_param:   "T",
+        }
+
+
+def physbone_name(param: str) -> str:
+    """アドレスの末尾から PhysBone 名を取り出す（".../ShockPB_Stretch" → "ShockPB"）。"""
+    return param.rpartition("/")[2].rpartition("_")[0]
+
+
+def rename_param(param: str, name: str) -> str:
+    """アドレスの PhysBone 名の部分を差し替える（".../ShockPB_Stretch", "Collar" → ".../Collar_Stretch"）。"""
+    head, _, tail = param.rpartition("/")
+    return f"{head}/{name}_{tail.rpartition('_')[2]}"
+
+
+def configured_physbones(s=None) -> list[PhysBone]:
+    """設定（[osc] と [physbones]）から PhysBone の一覧を作る（先頭が主 PhysBone）。"""
+    if s is None:
+        import settings as s_mod
+        s = s_mod.settings
+    osc = s.osc
+    return build_physbones(
+        osc.stretch_param, osc.is_grabbed_param, osc.angle_param, osc.is_posed_param, s.physbones)
+
+
+def build_physbones(
+    stretch_param: str,
+    is_grabbed_param: str,
+    angle_param: str,
+    is_posed_param: str,
+    tables: dict[str, dict],
+    base_overrides: dict | None = None,
+    label: str = "physbones",
+) -> list[PhysBone]:
+    """主 PhysBone のアドレスと追加 PhysBone の表から PhysBone の一覧を作る（先頭が主 PhysBone）。
+
+    tables に主 PhysBone と同じ名前の表があれば、主 PhysBone の強度カーブの上書きとして使う。
+    base_overrides は全 PhysBone に共通の上書きで、表ごとの値がさらに優先される。
+    IntensityConfig にないキーは警告して無視する。
+
+    Args:
+        label: 警告メッセージに出す設定の場所（"physbones" なら [physbones.<名前>]）
+    """
+    from intensity import IntensityConfig
+    allowed = IntensityConfig.field_names()
+
+    def overrides_for(name: str, table: dict) -> dict:
+        unknown = sorted(set(table) - allowed)
+        if unknown:
+            logger.warning(f"[{label}.{name}] unknown keys ignored: {', '.join(unknown)}")
+        return {**(base_overrides or {}), **{k: v for k, v in table.items() if k in allowed}}
+
+    primary_name = physbone_name(stretch_param)
+    result = [PhysBone(
+        primary_name, stretch_param, is_grabbed_param, angle_param, is_posed_param,
+        overrides_for(primary_name, tables.get(primary_name) or {}),
+    )]
+    for name, table in tables.items():
+        if name == primary_name:
+            continue
+        result.append(PhysBone(
+            name,
+            rename_param(stretch_param, name),
+            rename_param(is_grabbed_param, name),
+            rename_param(angle_param, name),
+            rename_param(is_posed_param, name),
+            overrides_for(name, table or {}),
+        ))
+    return result
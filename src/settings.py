@@ -56,6 +56,22 @@ class OscSendSettings:
 @dataclass
 class OscSettings:
     listen_port: int = 9001
+    backend: str = "selector"  # "selector" または "threading"
+    conflate_stretch: bool = False  # 処理が追いつかないとき Stretch を最新値にまとめる
+    recv_buffer_size: int = 0       # SO_RCVBUF（バイト）、0 で OS 既定値
+    max_batch: int = 256            # 1 回の起床で読み切るデータグラムの上限
+    shed_batch_size: int = 64       # この数以上まとめて届いたら古い Stretch を間引く、0 で無効
+    kernel_timestamps: bool = True  # 対応 OS ではカーネルの受信時刻（SO_TIMESTAMPNS）を使う
+    oscquery: bool = False          # 受信するパラメータだけを OSCQuery（HTTP + mDNS）で広告する
+    oscquery_http_port: int = 0     # OSCQuery の HTTP ポート、0 で空きポート
+    oscquery_name: str = "PavlokVRC"  # OSCQuery のサービス名
+    listen_addresses: list[str] = field(default_factory=list)  # 追加の待ち受け（"host:port" / "[::]:9001" / "quest=0.0.0.0:9001"）
+    relay_targets: list[str] = field(default_factory=list)  # 受信データグラムの転送先（"host:port"）
+    relay_queue_size: int = 1024    # 転送先ごとの送信キューの上限（データグラム数）
+    dedupe: bool = True             # 値の変わらない Stretch / IsGrabbed を状態機械の手前で止める
+    dedupe_epsilon: float = 0.0     # 前回値との差がこれ以下の Stretch を重複とみなす
+    capture: bool = False           # 受け付けたデータグラムを受信時刻付きでファイルに記録する
+    capture_path: str = ""          # キャプチャの出力先、空なら captures/osc_<日時>.pvcap
     stretch_param: str = "/avatar/parameters/ShockPB_Stretch"
     is_grabbed_param: str = "/avatar/parameters/ShockPB_IsGrabbed"
     angle_param: str = "/avatar/parameters/ShockPB_Angle"
@@ -97,6 +113,14 @@ class SpeedModeSettings:
     speed_stop_threshold: float = 0.1
     speed_zap_hold_time: float = 0.3
     zap_reset_pullback: int = 30
+    velocity_estimator: str = "two_point"  # "two_point" / "alpha_beta" / "savgol"
+    velocity_alpha: float = 0.6
+    velocity_beta: float = 0.25
+    velocity_window: int = 5
+    predictive_fire: bool = False
+    predictive_margin: float = 0.2
+    predictive_min_samples: int = 3
+    predictive_max_remaining: float = 0.1
 
 
 @dataclass
@@ -145,6 +169,25 @@ class ApiSettings:
     url: str = "https://api.pavlok.com/api/v5/stimulus/send"
 
 
+@dataclass
+class EventWorkerSettings:
+    enabled: bool = True               # false=刺激送信・記録も状態機械のスレッドで行う（旧動作）
+    device_queue_size: int = 8         # デバイス送信の待ち行列の上限
+    device_overflow: str = "drop_oldest"  # 溢れたとき "drop_oldest"=古い刺激を捨てる / "drop_newest"=新しい刺激を捨てる
+    device_max_delay: float = 2.0      # これより長く待たされた刺激は送らない（秒）、0 で無制限
+    recorder_queue_size: int = 64      # Zap 記録の待ち行列の上限
+    recorder_overflow: str = "drop_newest"
+
+
+@dataclass
+class JournalSettings:
+    enabled: bool = False              # true=状態機械のイベントをバイナリジャーナルに追記する
+    path: str = ""                     # 出力先、空なら journals/events_<日時>.pvjrnl
+    max_bytes: int = 16777216          # 1 ファイルの上限（超えたら <path>.1 へ回す）、0 で無制限
+    backups: int = 1                   # 回したファイルを何個残すか
+    flush_interval: float = 0.5        # まとめて書き込む間隔（秒）
+
+
 @dataclass
 class Settings:
     osc: OscSettings = field(default_factory=OscSettings)
@@ -156,6 +199,12 @@ class Settings:
     ble: BleSettings = field(default_factory=BleSettings)
     api: ApiSettings = field(default_factory=ApiSettings)
     speed_mode: SpeedModeSettings = field(default_factory=SpeedModeSettings)
+    event_workers: EventWorkerSettings = field(default_factory=EventWorkerSettings)
+    journal: JournalSettings = field(default_factory=JournalSettings)
+    # 追加で受信する PhysBone 名 → 強度カーブの上書き（IntensityConfig のフィールド）
+    physbones: dict[str, dict] = field(default_factory=dict)
+    # アバター ID → プロファイル（avatar_profiles.compile_profiles() が起動時に組み立てる）
+    avatars: dict[str, dict] = field(default_factory=dict)
 
 
 def _apply_toml(settings: Settings, data: dict) -> None:
@@ -169,7 +218,10 @@ def _apply_toml(settings: Settings, data: dict) -> None:
         for k, v in d.items():
             if isinstance(v, dict):
                 sub = getattr(obj, k, None)
-                if sub is not None:
+                if isinstance(sub, dict):
+                    # キーが自由な表（[physbones.*] など）はそのままマージする
+                    setattr(obj, k, _deep_merge(sub, v))
+                elif sub is not None:
                     _walk(sub, v, path + [k])
             else:
                 if hasattr(obj, k):
@@ -270,6 +322,7 @@ _SAVEABLE_KEYS: dict[str, tuple[str, str]] = {
     "BLE_KEEPALIVE_INTERVAL":            ("ble", "keepalive_interval"),
     "BLE_BATTERY_REFRESH_INTERVAL":      ("ble", "battery_refresh_interval"),
     "OSC_LISTEN_PORT":                   ("osc", "listen_port"),
+    "OSC_RECEIVER_BACKEND":              ("osc", "backend"),
     "OSC_SEND_PORT":                     ("osc.send", "port"),
     "LOG_STRETCH":                       ("debug", "log_stretch"),
     "LOG_IS_GRABBED":                    ("debug", "log_is_grabbed"),
@@ -0,0 +1,618 @@
+"""速度モードの判定カーネル（onset・ピーク・停止・初期速度・総合速度・戻し・予測発火）
+
+時刻・タイマー・スレッド・デバイスを持たない純粋な状態機械で、判定を Decision として返す。
+停止タイマーは「期限（deadline）」として持つだけで、期限が来たら呼び出し側が expire() を呼ぶ：
+
+  - handlers/speed_mode.py : ライブ用の薄いアダプタ。deadline を clock.call_later() に張り、
+                             Decision を見て Zap を送る・ログを出す
+  - run_grab()             : 記録した 1 回の Grab の配列 (時刻, Stretch) をまとめて判定する。速度推定は
+                             サンプルごとの状態に依らないので先に配列で計算し、計測していない区間
+                             （onset 待ち・Zap 後の戻し待ち）は numpy で次の onset / 戻しまで飛ばす。
+                             停止タイマーは VirtualClock と同じく、期限がサンプル時刻以前ならそのサンプルの前に
+                             期限の時刻で実行する
+
+どちらも同じ SpeedKernel のメソッドで判定するので、同じ入力なら同じ Decision の列になる
+（tests/test_speed_kernel.py で確かめている）。
+
+速度の計算は _SpeedHistory（固定長のリングバッファ）に任せる。onset 判定は両端の 2 点だけを見るので
+履歴の長さによらず O(1)。発火判定の区間平均は単調に増える「立ち上がり索引」（それまでの最大値を
+更新したサンプル）を二分探索する。停止検知の速度と戻し検知の位置は velocity.py の推定器から取る。
+"""
+
+import math
+from bisect import bisect_left, bisect_right
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+from velocity import TwoPointEstimator, create_estimator
+
+# 停止タイマーの残り時間をこれ以下なら 0 とみなす（秒）
+_TIMER_EPSILON = 1e-6
+
+# 速度履歴の長さ（エントリ数）
+HISTORY_LEN = 300
+
+_NONE: tuple = ()
+
+
+class Decision(NamedTuple):
+    """判定の結果。
+
+    kind / reason:
+      onset    / speed                                   : 計測開始（value は onset 判定の速度）
+      fire     / stop, predicted                         : Zap（停止タイマー満了 / 予測発火）
+      cancel   / no_movement, initial_speed, eval_speed  : 発火条件を満たさず計測終了
+      skip     / intensity                               : 発火条件は満たしたが強度が 0
+      pullback / sample, immediate                       : Zap 後に戻したので原点を取り直して再計測（value は戻し率）
+    """
+    kind: str
+    t: float
+    reason: str
+    origin: float
+    peak: float
+    value: float = 0.0
+    intensity: int = 0
+    initial_avg: float = 0.0
+    eval_avg: float = 0.0
+
+
+def _default_intensity() -> Callable[[float], int]:
+    from intensity import IntensityConfig, calculate_intensity
+
+    cfg = IntensityConfig.from_settings()
+    return lambda delta: calculate_intensity(delta, cfg)
+
+
+class SpeedKernel:
+    """1 つの PhysBone の速度モード判定。
+
+    呼び出し側は grab_start() → sample() … → grab_end() の順に渡し、deadline（停止タイマーの期限）が
+    None でなくなったらその時刻に expire() を呼ぶ。timer_delay は張ったときの待ち時間、timer_gen は
+    タイマーを張る・取り消すたびに増える（ライブのアダプタが張り直しを知るのに使う）。
+    各メソッドは Decision のタプルを返す（何も起きなければ空）。
+    """
+
+    def __init__(self, settings=None, intensity: Callable[[float], int] | None = None):
+        """
+        Args:
+            settings: SpeedModeSettings（省略時は [speed_mode]）。呼び出し側が差し替えてよい
+            intensity: 伸び（peak - origin）→ 強度（省略時は [logic] の強度カーブ）
+        """
+        if settings is None:
+            import settings as s_mod
+            settings = s_mod.settings.speed_mode
+        self.settings = settings
+        self.intensity = intensity or _default_intensity()
+
+        self.history = _SpeedHistory(HISTORY_LEN)
+        self.estimator = TwoPointEstimator()
+        self.decel = _DecelFit()
+        self.deadline: float | None = None
+        self.timer_delay: float = 0.0
+        self.timer_gen: int = 0
+        self._clear_state()
+
+    def _clear_state(self) -> None:
+        self.grab_start_time: float = 0.0
+        self.settled: bool = False
+        self.velocity: float = 0.0  # 直近の推定速度（stretch/秒、符号付き）
+        self.position: float = 0.0  # 直近の推定位置
+        self.origin: float = 0.0
+        self.origin_time: float = 0.0
+        self.measuring: bool = False
+        self.peak: float = 0.0
+        self.peak_time: float = 0.0
+        self.last_movement_time: float = 0.0
+        self.stop_start_time: float | None = None
+        self.zap_fired: bool = False
+        self.zap_fire_stretch: float = 0.0
+
+    # ------------------------------------------------------------------ #
+    # 入力                                                                 #
+    # ------------------------------------------------------------------ #
+
+    def grab_start(self, t: float) -> None:
+        sm = self.settings
+        self._cancel_timer()
+        self._clear_state()
+        self.grab_start_time = t
+        self.history.clear()
+        self.decel.clear()
+        self.estimator = create_estimator(sm.velocity_estimator, sm.velocity_alpha, sm.velocity_beta,
+                                          sm.velocity_window)
+
+    def grab_end(self) -> None:
+        self._cancel_timer()
+        self.settled = False
+        self.measuring = False
+        self.zap_fired = False
+        self.peak = 0.0
+        self.estimator.reset()
+        self.velocity = self.position = 0.0
+
+    def reset(self) -> None:
+        """アバター切り替え：発火せずに計測を打ち切る。"""
+        self._cancel_timer()
+        self.settled = False
+        self.history.clear()
+        self.estimator.reset()
+        self.decel.clear()
+        self.velocity = self.position = 0.0
+        self.measuring = False
+        self.stop_start_time = None
+        self.zap_fired = False
+        self.peak = 0.0
+
+    def sample(self, t: float, stretch: float) -> tuple:
+        """Stretch のサンプル（値が変わらないものも含む）。"""
+        if t - self.grab_start_time < self.settings.grab_settle_time:
+            return _NONE
+        est = self.estimator
+        est.update(t, stretch)
+        return self.advance(t, stretch, est.velocity, est.position)
+
+    def advance(self, t: float, stretch: float, velocity: float, position: float) -> tuple:
+        """settle 後のサンプルを、推定済みの速度・位置とともに渡す（sample() と run_grab() から呼ばれる）。"""
+        sm = self.settings
+        self.settled = True
+        self.velocity = velocity
+        self.position = position
+        self.history.append(t, stretch)
+
+        # B. 戻し監視（Zap 済みは戻すまで待つ）
+        if self.zap_fired:
+            delta = self.zap_fire_stretch - self.origin
+            if delta > 0:
+                ratio = (self.zap_fire_stretch - position) / delta
+                if ratio >= sm.zap_reset_pullback / 100.0:
+                    self.zap_fired = False
+                    self._reset_origin(stretch, t)
+                    return (Decision("pullback", t, "sample", stretch, stretch, ratio),)
+            return _NONE
+
+        # C. onset 判定
+        if not self.measuring:
+            if self.estimator.filtered:
+                speed = max(0.0, velocity)
+            else:
+                speed = self.history.avg_speed_recent(sm.speed_onset_ticks)
+            if speed > sm.speed_onset_threshold:
+                self._reset_origin(stretch, t)
+                return (Decision("onset", t, "speed", stretch, stretch, speed),)
+            return _NONE
+
+        # D. 計測中：ピークと停止検知（stretch 方向のみ）
+        if stretch > self.peak:
+            self.peak = stretch
+            self.peak_time = t
+        if max(0.0, velocity) > sm.speed_stop_threshold:
+            # まだ動いている → 最終動き時刻を更新（タイマーは張り直さない）
+            self.last_movement_time = t
+            self.stop_start_time = t
+            if self.deadline is None:
+                self._start_timer(t, sm.speed_zap_hold_time)
+        elif self.deadline is None:
+            # 停止とみなす → タイマーが切れていれば起動
+            if self.stop_start_time is None:
+                self.stop_start_time = t
+            self._start_timer(t, sm.speed_zap_hold_time)
+
+        if sm.predictive_fire:
+            self.decel.add(t, velocity)
+            return self._check_predictive_fire(t, sm)
+        return _NONE
+
+    def expire(self, now: float) -> tuple:
+        """停止タイマーの期限が来た（now は実際に起きた時刻）。"""
+        self.deadline = None
+        if not self.measuring or self.zap_fired:
+            return _NONE
+        sm = self.settings
+        # 最後の動き検知からまだ hold_time 経過していない場合は残り時間で再スタート。
+        # 丸め誤差ほどの残り（期限ちょうどに起きた）では再スタートしない。仮想時刻では now が進まず無限に再発火する
+        remaining = sm.speed_zap_hold_time - (now - self.last_movement_time)
+        if remaining > _TIMER_EPSILON:
+            self._start_timer(now, remaining)
+            return _NONE
+        self.stop_start_time = None
+        return self._check_zap_fire(now, sm)
+
+    # ------------------------------------------------------------------ #
+    # 判定                                                                 #
+    # ------------------------------------------------------------------ #
+
+    def _start_timer(self, now: float, delay: float) -> None:
+        self.deadline = now + delay
+        self.timer_delay = delay
+        self.timer_gen += 1
+
+    def _cancel_timer(self) -> None:
+        if self.deadline is not None:
+            self.deadline = None
+            self.timer_gen += 1
+
+    def _reset_origin(self, stretch: float, now: float) -> None:
+        """原点をリセットして計測開始。onset 直後からタイマーを張り、更新が来なければそのまま発火チェック。"""
+        self._cancel_timer()
+        self.origin = stretch
+        self.origin_time = now
+        self.measuring = True
+        self.peak = stretch
+        self.peak_time = now
+        self.last_movement_time = now
+        self.stop_start_time = now
+        self.history.clear()
+        self.history.append(now, stretch)
+        self.decel.clear()
+        self._start_timer(now, self.settings.speed_zap_hold_time)
+
+    def _check_zap_fire(self, now: float, sm) -> tuple:
+        """発火条件チェック。全通過で Zap。"""
+        stretch_range = self.peak - self.origin
+        if stretch_range <= 0:
+            self.measuring = False
+            return (Decision("cancel", now, "no_movement", self.origin, self.peak),)
+
+        # ② INITIAL_SPEED_STRETCH_WINDOW 区間の速度チェック
+        window_end = self.origin + stretch_range * (sm.initial_speed_stretch_window / 100.0)
+        initial_avg = self.history.avg_speed_in_range(self.origin, window_end, self.peak_time)
+        if initial_avg < sm.speed_zap_threshold:
+            self.measuring = False
+            return (Decision("cancel", now, "initial_speed", self.origin, self.peak, initial_avg=initial_avg),)
+
+        # ③ MIN_SPEED_EVAL_WINDOW 区間の速度チェック
+        eval_end = self.origin + stretch_range * (sm.min_speed_eval_window / 100.0)
+        eval_avg = self.history.avg_speed_in_range(self.origin, eval_end, self.peak_time)
+        if eval_avg < sm.min_speed_threshold:
+            self.measuring = False
+            return (Decision("cancel", now, "eval_speed", self.origin, self.peak,
+                             initial_avg=initial_avg, eval_avg=eval_avg),)
+
+        return self._fire(now, "stop", initial_avg, eval_avg, sm)
+
+    def _fire(self, now: float, reason: str, initial_avg: float, eval_avg: float, sm) -> tuple:
+        intensity = self.intensity(self.peak - self.origin)
+        self.measuring = False
+        if intensity <= 0:
+            return (Decision("skip", now, "intensity", self.origin, self.peak, 0.0, 0, initial_avg, eval_avg),)
+        fire = Decision("fire", now, reason, self.origin, self.peak, 0.0, intensity, initial_avg, eval_avg)
+        self.zap_fired = True
+        self.zap_fire_stretch = self.peak
+
+        # 発火時点で既に戻していれば（素早く引いて即戻した）次の更新を待たずに再計測を始める
+        delta = self.zap_fire_stretch - self.origin
+        if delta > 0:
+            ratio = (self.zap_fire_stretch - self.position) / delta
+            if ratio >= sm.zap_reset_pullback / 100.0:
+                self.zap_fired = False
+                current = self.position
+                self._reset_origin(current, now)
+                return fire, Decision("pullback", now, "immediate", current, current, ratio)
+        return (fire,)
+
+    def _check_predictive_fire(self, now: float, sm) -> tuple:
+        """減速から止まる位置を外挿し、外挿した軌跡で発火条件を余裕を持って満たせば発火する。"""
+        fit = self.decel.fit(sm.predictive_min_samples)
+        if fit is None:
+            return _NONE
+        velocity, accel = fit
+        if velocity <= 0 or accel >= 0:
+            return _NONE
+        position = self.position
+        remaining = velocity * velocity / (-2.0 * accel)
+        peak = min(1.0, max(self.peak, position + remaining))
+        stretch_range = peak - self.origin
+        if stretch_range <= 0 or peak - self.peak > stretch_range * sm.predictive_max_remaining:
+            return _NONE  # 止まる位置がまだ遠い（外挿に頼る分が大きい）
+
+        margin = 1.0 + sm.predictive_margin
+        window_end = self.origin + stretch_range * (sm.initial_speed_stretch_window / 100.0)
+        initial_avg = self._projected_avg_speed(window_end, now, position, velocity, accel)
+        if initial_avg < sm.speed_zap_threshold * margin:
+            return _NONE
+        eval_end = self.origin + stretch_range * (sm.min_speed_eval_window / 100.0)
+        eval_avg = self._projected_avg_speed(eval_end, now, position, velocity, accel)
+        if eval_avg < sm.min_speed_threshold * margin:
+            return _NONE
+
+        self._cancel_timer()
+        self.stop_start_time = None
+        self.peak = peak
+        self.peak_time = now
+        return self._fire(now, "predicted", initial_avg, eval_avg, sm)
+
+    def _projected_avg_speed(self, stretch_to: float, now: float, position: float, velocity: float,
+                             accel: float) -> float:
+        """原点から stretch_to までの平均速度。実測で届いていなければ、等減速で届く時刻を外挿して使う。"""
+        if stretch_to <= self.peak:
+            return self.history.avg_speed_in_range(self.origin, stretch_to, now)
+        start = self.history.rise_start(self.origin)
+        if start is None:
+            return 0.0
+        # position + v·τ + a·τ²/2 = stretch_to の小さい方の根（届かない分は止まる時刻で打ち切る）
+        ahead = max(0.0, stretch_to - position)
+        tau = (velocity - math.sqrt(max(0.0, velocity * velocity + 2.0 * accel * ahead))) / -accel
+        return _avg_speed(start[0], start[1], now + tau, stretch_to)
+
+
+# ---------------------------------------------------------------------- #
+# 配列での判定                                                             #
+# ---------------------------------------------------------------------- #
+
+def run_grab(start: float, times, values, end: float | None = None, settings=None,
+             intensity: Callable[[float], int] | None = None) -> list[Decision]:
+    """1 回の Grab（start に掴み、end に離す）の Stretch サンプル列を判定し、Decision の列を返す。
+
+    SpeedKernel に grab_start(start) → sample() … を渡し、停止タイマーを期限の時刻で expire() し、
+    end までに期限の来たタイマーを実行してから grab_end() したのと同じ結果になる。
+    end を省略すると、最後のサンプルの後はタイマーが尽きるまで実行する。
+
+    Args:
+        start: Grab 開始時刻
+        times: サンプル時刻（昇順）
+        values: Stretch
+        end: Grab 終了時刻
+        settings: SpeedModeSettings（省略時は [speed_mode]）
+        intensity: 伸び → 強度（省略時は [logic] の強度カーブ）
+    """
+    kernel = SpeedKernel(settings, intensity)
+    sm = kernel.settings
+    kernel.grab_start(start)
+    out: list[Decision] = []
+
+    t_all = np.asarray(times, dtype=float)
+    s_all = np.asarray(values, dtype=float)
+    settled = np.flatnonzero(~(t_all - start < sm.grab_settle_time))
+    if settled.size:
+        k = int(settled[0])
+        T, S = t_all[k:], s_all[k:]
+        V, P = _estimate(kernel.estimator, T, S)
+        _run_settled(kernel, sm, T, S, V, P, out)
+
+    while kernel.deadline is not None and (end is None or kernel.deadline <= end):
+        out.extend(kernel.expire(kernel.deadline))
+    kernel.grab_end()
+    return out
+
+
+def _estimate(estimator, T, S):
+    """settle 後のサンプルに対する推定器の (速度, 位置) の配列。推定器への入力は判定に依らない。"""
+    n = len(T)
+    if not estimator.filtered:
+        # TwoPointEstimator と同じ演算（差分 / 時間差、時間差が 0 以下なら 0）
+        v = np.zeros(n)
+        if n > 1:
+            dt = T[1:] - T[:-1]
+            np.divide(S[1:] - S[:-1], dt, out=v[1:], where=dt > 0)
+        return v, S
+    v = np.empty(n)
+    p = np.empty(n)
+    update = estimator.update
+    for i, (t, s) in enumerate(zip(T.tolist(), S.tolist())):
+        v[i] = update(t, s)
+        p[i] = estimator.position
+    return v, p
+
+
+def _run_settled(kernel: SpeedKernel, sm, T, S, V, P, out: list) -> None:
+    """settle 後のサンプルを流す。計測中はサンプルごと、それ以外は次の onset / 戻しまで numpy で飛ばす。"""
+    tl, sl, vl, pl = T.tolist(), S.tolist(), V.tolist(), P.tolist()
+    m = len(tl)
+    filtered = kernel.estimator.filtered
+    ticks = sm.speed_onset_ticks
+    onset_threshold = sm.speed_onset_threshold
+    pullback_threshold = sm.zap_reset_pullback / 100.0
+    # 履歴（最後にクリアした後）= [head] + サンプル[h_start:]。head は原点を取り直したエントリ
+    head: tuple[float, float] | None = None
+    h_start = 0
+
+    def onset_hits(lo: int, hi: int):
+        if filtered:
+            return np.maximum(V[lo:hi], 0.0) > onset_threshold
+        # _SpeedHistory.avg_speed_recent() と同じ区間（直近 ticks 個、リングの長さまで）
+        idx = np.arange(lo, hi)
+        count = idx - h_start + 1 + (head is not None)
+        first = idx - np.minimum(ticks, np.minimum(count, HISTORY_LEN) - 1)
+        use_head = first < h_start
+        fi = np.maximum(first, 0)
+        t0 = np.where(use_head, head[0] if head else 0.0, T[fi])
+        s0 = np.where(use_head, head[1] if head else 0.0, S[fi])
+        ds = S[lo:hi] - s0
+        dt = T[lo:hi] - t0
+        speed = np.zeros(hi - lo)
+        np.divide(ds, dt, out=speed, where=(dt > 0) & (ds > 0))
+        return speed > onset_threshold
+
+    def pullback_hits(lo: int, hi: int):
+        delta = kernel.zap_fire_stretch - kernel.origin
+        if delta <= 0:
+            return np.zeros(hi - lo, dtype=bool)
+        return (kernel.zap_fire_stretch - P[lo:hi]) / delta >= pullback_threshold
+
+    j = 0
+    while j < m:
+        if kernel.measuring:
+            t = tl[j]
+            while kernel.deadline is not None and kernel.deadline <= t:
+                for d in kernel.expire(kernel.deadline):
+                    out.append(d)
+                    if d.kind == "pullback":
+                        head, h_start = (d.t, d.origin), j
+            if kernel.measuring:
+                for d in kernel.advance(t, sl[j], vl[j], pl[j]):
+                    out.append(d)
+                    if d.kind == "pullback":
+                        head, h_start = (d.t, d.origin), j + 1
+                j += 1
+                continue
+
+        # 計測していない（停止タイマーもない）：次に onset / 戻しが起きるサンプルまで飛ばす
+        hit = _first_hit(pullback_hits if kernel.zap_fired else onset_hits, j, m)
+        if hit < 0:
+            return
+        # 判定はカーネルに任せる：onset 判定に要る直近の履歴だけ入れ直してからサンプル hit を渡す
+        history = kernel.history
+        history.clear()
+        k = min(ticks, HISTORY_LEN - 1)  # onset 判定が見る、サンプル hit より前のエントリ数
+        if k > 0:
+            if head is not None and hit - h_start < k:
+                history.append(*head)
+            for i in range(max(h_start, hit - k), hit):
+                history.append(tl[i], sl[i])
+        for d in kernel.advance(tl[hit], sl[hit], vl[hit], pl[hit]):
+            out.append(d)
+            head, h_start = (d.t, d.origin), hit + 1
+        j = hit + 1
+
+
+def _first_hit(hits, lo: int, m: int) -> int:
+    """hits(lo, hi) が True になる最初の位置（なければ -1）。区間を広げながら調べる。"""
+    size = 64
+    while lo < m:
+        hi = min(m, lo + size)
+        found = np.flatnonzero(hits(lo, hi))
+        if found.size:
+            return lo + int(found[0])
+        lo = hi
+        size *= 4
+    return -1
+
+
+# ---------------------------------------------------------------------- #
+# 速度履歴・減速フィット                                                   #
+# ---------------------------------------------------------------------- #
+
+class _SpeedHistory:
+    """(時刻, Stretch) の固定長リングバッファと、速度計算用の索引。
+
+    立ち上がり索引 : clear() 以降の最大値を更新したエントリだけを並べた列。Stretch・時刻とも
+    狭義単調増加なので、区間の両端を二分探索で引ける。リングから押し出された分は読むときに飛ばし、
+    溜まりすぎたら捨てる（長さはリングの 2 倍まで）。
+    """
+
+    def __init__(self, maxlen: int):
+        self._maxlen = maxlen
+        self._t = [0.0] * maxlen
+        self._s = [0.0] * maxlen
+        self._next = 0  # 次に書く位置
+        self._len = 0
+        self._rise_t: list[float] = []
+        self._rise_s: list[float] = []
+
+    def clear(self) -> None:
+        self._next = self._len = 0
+        self._rise_t.clear()
+        self._rise_s.clear()
+
+    def append(self, t: float, stretch: float) -> None:
+        i = self._next
+        self._t[i] = t
+        self._s[i] = stretch
+        self._next = i + 1 if i + 1 < self._maxlen else 0
+        if self._len < self._maxlen:
+            self._len += 1
+
+        rise_s = self._rise_s
+        if not rise_s or stretch > rise_s[-1]:
+            rise_t = self._rise_t
+            rise_t.append(t)
+            rise_s.append(stretch)
+            if len(rise_t) > 2 * self._maxlen:
+                drop = bisect_left(rise_t, self._oldest_time())
+                del rise_t[:drop]
+                del rise_s[:drop]
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self):
+        """古い順に (時刻, Stretch) を返す。"""
+        start = (self._next - self._len) % self._maxlen
+        for k in range(self._len):
+            i = (start + k) % self._maxlen
+            yield self._t[i], self._s[i]
+
+    def _oldest_time(self) -> float:
+        return self._t[(self._next - self._len) % self._maxlen]
+
+    def avg_speed_recent(self, ticks: int) -> float:
+        """直近 ticks 個の区間（ticks + 1 エントリ）の平均速度（両端の差 / 時間、負なら 0）。"""
+        n = self._len
+        if n < 2:
+            return 0.0
+        last = self._next - 1
+        first = last - min(ticks, n - 1)
+        return _avg_speed(self._t[first], self._s[first], self._t[last], self._s[last])
+
+    def rise_start(self, stretch_from: float) -> tuple[float, float] | None:
+        """立ち上がり索引のうち Stretch が stretch_from 以上の最初のエントリ（なければ None）。"""
+        rise_t, rise_s = self._rise_t, self._rise_s
+        if not self._len:
+            return None
+        lo = max(bisect_left(rise_t, self._oldest_time()), bisect_left(rise_s, stretch_from))
+        return (rise_t[lo], rise_s[lo]) if lo < len(rise_t) else None
+
+    def avg_speed_in_range(self, stretch_from: float, stretch_to: float, time_limit: float | None) -> float:
+        """立ち上がり索引のうち Stretch が stretch_from〜stretch_to、時刻が time_limit 以前の両端から平均速度を求める。"""
+        rise_t, rise_s = self._rise_t, self._rise_s
+        if not self._len or not rise_t:
+            return 0.0
+        lo = max(bisect_left(rise_t, self._oldest_time()), bisect_left(rise_s, stretch_from))
+        hi = bisect_right(rise_s, stretch_to)
+        if time_limit is not None:
+            hi = min(hi, bisect_right(rise_t, time_limit))
+        if hi - lo < 2:
+            return 0.0
+        return _avg_speed(rise_t[lo], rise_s[lo], rise_t[hi - 1], rise_s[hi - 1])
+
+
+class _DecelFit:
+    """速度のピーク以降の (時刻, 速度) に当てはめた直線（減速度の推定）。
+
+    速度がそれまでのピークを超えたら（まだ加速中）数え直す。和を足していくので O(1)。
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self) -> None:
+        self.peak_velocity: float = 0.0
+        self._t0: float = 0.0
+        self._last_u: float = 0.0
+        self._n = 0
+        self._su = self._sv = self._suu = self._suv = 0.0
+
+    def add(self, t: float, velocity: float) -> None:
+        if velocity > self.peak_velocity:
+            self.clear()
+            self.peak_velocity = velocity
+            self._t0 = t
+        u = t - self._t0
+        self._last_u = u
+        self._n += 1
+        self._su += u
+        self._sv += velocity
+        self._suu += u * u
+        self._suv += u * velocity
+
+    def fit(self, min_samples: int) -> tuple[float, float] | None:
+        """(直近の時刻での速度, 加速度)。ピーク以降のサンプルが min_samples 個に満たなければ None。"""
+        n = self._n
+        if n < max(2, min_samples):
+            return None
+        denom = n * self._suu - self._su * self._su
+        if denom <= 1e-12:
+            return None
+        accel = (n * self._suv - self._su * self._sv) / denom
+        velocity = self._sv / n + accel * (self._last_u - self._su / n)
+        return velocity, accel
+
+
+def _avg_speed(t0: float, s0: float, t1: float, s1: float) -> float:
+    """2 点間の平均速度（total stretch / total time、どちらかが 0 以下なら 0）。"""
+    total_stretch = s1 - s0
+    total_time = t1 - t0
+    if total_time <= 0 or total_stretch <= 0:
+        return 0.0
+    return total_stretch / total_time
@@ -5,17 +5,43 @@ GrabState 状態機械
 副作用（刺激送信・Chatbox・記録・GUI更新）は一切持たず、
 イベントコールバックを通じてハンドラに通知する。
 
+grab_start / stretch_update / grab_end には events.py の不変イベント（GrabStart / StretchUpdate / GrabEnd）を
+渡す。強度（内部値・表示用 %）はここでイベントごとに 1 回だけ計算して載せ、Grab 中の現在値は
+intensity / intensity_display 属性にも置く（GUIUpdater が読む）。ハンドラは強度を計算し直さない。
+
 GUI 互換のため以下の公開属性を持つ（state machine が内部で使うわけではない）：
   - zap_recorder : tab_stats.py からアクセス
   - last_zap_display_intensity : StimulusHandler が設定し、GUIUpdater が読む
   - last_zap_actual_intensity  : 同上
+
+時刻はすべて time.perf_counter() 基準（単調・高分解能）のイベント時刻で扱う。
+OSCReceiver が打刻した受信時刻を on_* に渡せば、ハンドラの実行タイミングではなく
+パケットの到着タイミングで Grab 時間や速度が計算される。省略時は clock.now() を使う。
+clock（clock.py）はハンドラも共有する（速度モードの停止タイマーなど）。VirtualClock を渡せば
+実時間を待たずにスレッドなしで Grab を再生できる。
+
+Stretch の購読には 2 種類ある：
+  - stretch_update : 値が変わったときの処理（閾値判定・Chatbox など）
+  - stretch_sample : 時間軸が意味を持つ処理（速度モード）。値が変わらないサンプルも届く
+OSCDedupe が値の変わらない Stretch を on_stretch_repeat() に回すと、
+stretch_sample だけが発火し、state_change と stretch_update は発火しない。
+
+複数の PhysBone を受信するときは PhysBone ごとに 1 つ作る。name・intensity_overrides・speed_mode は
+ハンドラが参照する（状態遷移には使わない）。アバター切り替え時は AvatarSwitcher が差し替え、
+reset() で進行中の Grab を刺激なしで打ち切る（ハンドラは reset を購読して内部状態を戻す）。
+
+購読コールバックは状態機械のスレッドで同期的に呼ぶ。遅くなりうる購読者は
+subscribe_*(cb, worker=EventWorker) で自分のワーカーに積ませ、状態の追跡を止めないようにする。
 """
 
-import time
 import logging
 from collections import deque
 from typing import Callable
 
+from clock import SYSTEM_CLOCK
+from events import GrabEnd, GrabStart, StretchUpdate, ZapFired
+from intensity import calculate_intensity, normalize_for_display
+
 logger = logging.getLogger(__name__)
 
 Event = Callable[..., None]
@@ -24,11 +50,30 @@ Event = Callable[..., None]
 class GrabStateMachine:
     """PhysBone の Grab / Stretch 状態を管理する状態機械。"""
 
-    def __init__(self):
+    def __init__(self, name: str = "", intensity_overrides: dict | None = None, clock=None):
+        """
+        Args:
+            name: PhysBone 名（ログ・GUI・Chatbox の表示用）
+            intensity_overrides: この PhysBone の強度カーブの上書き（IntensityConfig のフィールド）
+            clock: 時計（clock.Clock）。省略時は実時間の SYSTEM_CLOCK
+        """
+        self.name = name
+        self.clock = clock or SYSTEM_CLOCK
+        self.intensity_overrides: dict = dict(intensity_overrides or {})
+        # 速度モード設定の上書き（SpeedModeSettings）。None なら [speed_mode] を実行時に読む
+        self.speed_mode = None
+
         # --- 純粋な状態 ---
         self.is_grabbed: bool = False
         self.current_stretch: float = 0.0
         self.grab_start_time: float | None = None
+        # Grab 中の current_stretch に対する強度（Grab していなければ 0）
+        self.intensity: int = 0
+        self.intensity_display: int = 0
+        # grab_start / stretch_update / grab_end のイベント番号
+        self._seq: int = 0
+        # ((settings, intensity_overrides), IntensityConfig)。intensity_config() のキャッシュ
+        self._intensity_cfg: tuple | None = None
 
         # --- Stretch 履歴（速度計算用） ---
         self._stretch_history: deque[tuple[float, float]] = deque(maxlen=300)
@@ -47,74 +92,186 @@ class GrabStateMachine:
         self.speed_mode_state: dict = {}
 
         # --- イベントコールバックリスト ---
-        self._on_grab_start: list[Event] = []
-        self._on_grab_end: list[Event] = []        # (stretch: float, duration: float)
-        self._on_stretch_update: list[Event] = []  # (stretch: float)  ← grabbed 中のみ
+        self._on_grab_start: list[Event] = []      # (event: GrabStart)
+        self._on_grab_end: list[Event] = []        # (event: GrabEnd)
+        self._on_stretch_update: list[Event] = []  # (event: StretchUpdate)  ← grabbed 中のみ
+        self._on_stretch_sample: list[Event] = []  # (stretch: float, event_time: float)  ← grabbed 中、値が同じサンプルも含む
         self._on_state_change: list[Event] = []    # ()  どんな状態変化でも発火
+        self._on_reset: list[Event] = []           # ()  reset() で発火（Grab 終了は発火しない）
+        self._on_zap: list[Event] = []             # (event: ZapFired)  ハンドラが Zap を送った（送信スレッドから）
 
     # ------------------------------------------------------------------ #
     # Subscribe メソッド                                                   #
     # ------------------------------------------------------------------ #
 
-    def subscribe_grab_start(self, cb: Event) -> None:
-        self._on_grab_start.append(cb)
+    # worker（event_worker.EventWorker）を渡すと、cb はそのワーカーのスレッドで積んだ順に呼ばれる
+
+    def subscribe_grab_start(self, cb: Event, worker=None) -> None:
+        self._on_grab_start.append(self._queued(cb, worker))
 
-    def subscribe_grab_end(self, cb: Event) -> None:
-        self._on_grab_end.append(cb)
+    def subscribe_grab_end(self, cb: Event, worker=None) -> None:
+        self._on_grab_end.append(self._queued(cb, worker))
+
+    def subscribe_stretch_update(self, cb: Event, worker=None) -> None:
+        self._on_stretch_update.append(self._queued(cb, worker))
+
+    def subscribe_stretch_sample(self, cb: Event, worker=None) -> None:
+        self._on_stretch_sample.append(self._queued(cb, worker))
+
+    def subscribe_state_change(self, cb: Event, worker=None) -> None:
+        self._on_state_change.append(self._queued(cb, worker))
+
+    def subscribe_reset(self, cb: Event, worker=None) -> None:
+        self._on_reset.append(self._queued(cb, worker))
+
+    def subscribe_zap(self, cb: Event, worker=None) -> None:
+        self._on_zap.append(self._queued(cb, worker))
+
+    @staticmethod
+    def _queued(cb: Event, worker) -> Event:
+        return cb if worker is None else worker.wrap(cb)
 
-    def subscribe_stretch_update(self, cb: Event) -> None:
-        self._on_stretch_update.append(cb)
+    def subscriber_counts(self) -> dict[str, int]:
+        """イベント種別ごとの購読数（OSCDedupe が省いたコールバック数の見積もりに使う）。"""
+        return {
+            "grab_start":     len(self._on_grab_start),
+            "grab_end":       len(self._on_grab_end),
+            "stretch_update": len(self._on_stretch_update),
+            "stretch_sample": len(self._on_stretch_sample),
+            "state_change":   len(self._on_state_change),
+        }
 
-    def subscribe_state_change(self, cb: Event) -> None:
-        self._on_state_change.append(cb)
+    def intensity_config(self):
+        """この PhysBone の強度計算設定（設定は実行時に読み込む）。
+
+        settings.reload() で settings が差し替わるか、intensity_overrides が代入し直されるまでは
+        前回作ったものを返す（イベントごとに作り直さない）。
+        """
+        import settings as s_mod
+        key = (s_mod.settings, self.intensity_overrides)
+        cached = self._intensity_cfg
+        if cached is None or cached[0][0] is not key[0] or cached[0][1] is not key[1]:
+            from intensity import IntensityConfig
+            cached = self._intensity_cfg = (key, IntensityConfig.from_settings(self.intensity_overrides))
+        return cached[1]
 
     def notify_state_change(self) -> None:
         """外部から状態変化を通知する（ハンドラが last_zap_* を更新した後に呼ぶ）。"""
         self._fire(self._on_state_change)
 
+    def notify_zap(self, intensity: int, display: int, sent: bool) -> None:
+        """ハンドラが Zap を送ったことを通知する（device_worker のスレッドから呼ばれうる）。"""
+        if self._on_zap:
+            self._fire(self._on_zap, ZapFired(self.clock.now(), intensity, display, sent))
+
     # ------------------------------------------------------------------ #
     # OSC コールバック（OSCReceiver から呼ばれる / tab_test.py が直接呼ぶ） #
     # ------------------------------------------------------------------ #
 
-    def on_stretch_change(self, value: float) -> None:
-        """Stretch 値が更新された。"""
+    def on_stretch_change(self, value: float, event_time: float | None = None) -> None:
+        """Stretch 値が更新された。
+
+        Args:
+            value: Stretch 値
+            event_time: 受信時刻（time.perf_counter() 基準）。省略時は clock.now()
+        """
+        t = self.clock.now() if event_time is None else event_time
         self.current_stretch = value
+        if not self.is_grabbed:
+            self._fire(self._on_state_change)
+            return
+
+        intensity, display = self._update_intensity(value)
         self._fire(self._on_state_change)
+        self._stretch_history.append((t, value))
+        logger.debug(f"Stretch updated: {value:.3f}")
+        self._fire(self._on_stretch_sample, value, t)
+        if self._on_stretch_update:
+            self._seq += 1
+            self._fire(self._on_stretch_update, StretchUpdate(self._seq, t, value, intensity, display))
 
+    def on_stretch_repeat(self, value: float, event_time: float | None = None) -> None:
+        """前回とほぼ同じ Stretch 値を受信した（OSCDedupe から呼ばれる）。
+
+        現在値・GUI は更新せず、Grab 中なら時間軸（履歴・stretch_sample）にだけ記録する。
+
+        Args:
+            value: Stretch 値
+            event_time: 受信時刻（time.perf_counter() 基準）。省略時は clock.now()
+        """
         if not self.is_grabbed:
             return
+        t = self.clock.now() if event_time is None else event_time
+        self._stretch_history.append((t, value))
+        self._fire(self._on_stretch_sample, value, t)
 
-        self._stretch_history.append((time.time(), value))
-        logger.debug(f"Stretch updated: {value:.3f}")
-        self._fire(self._on_stretch_update, value)
+    def on_grabbed_change(self, value: bool, event_time: float | None = None) -> None:
+        """IsGrabbed 状態が変化した。
 
-    def on_grabbed_change(self, value: bool) -> None:
-        """IsGrabbed 状態が変化した。"""
+        Args:
+            value: IsGrabbed 値
+            event_time: 受信時刻（time.perf_counter() 基準）。省略時は clock.now()
+        """
+        t = self.clock.now() if event_time is None else event_time
         old_state = self.is_grabbed
         self.is_grabbed = value
+        if value:
+            if not old_state:
+                self._update_intensity(self.current_stretch)
+        else:
+            self.intensity = self.intensity_display = 0
         self._fire(self._on_state_change)
 
         if not old_state and value:
             # false → true: Grab 開始
-            self.grab_start_time = time.time()
+            self.grab_start_time = t
             self._stretch_history.clear()
             logger.info("[SM] Grab started")
-            self._fire(self._on_grab_start)
+            self._seq += 1
+            self._fire(self._on_grab_start, GrabStart(self._seq, t, self.current_stretch))
 
         elif old_state and not value:
             # true → false: Grab 終了
             if self.grab_start_time is not None:
-                duration = time.time() - self.grab_start_time
+                duration = t - self.grab_start_time
                 stretch = self.current_stretch
                 logger.info(f"[SM] Grab ended: duration={duration:.1f}s, stretch={stretch:.3f}")
-                self._fire(self._on_grab_end, stretch, duration)
+                cfg = self.intensity_config()
+                intensity = calculate_intensity(stretch, cfg)
+                display = normalize_for_display(intensity, cfg) if intensity else 0
+                self._seq += 1
+                self._fire(self._on_grab_end, GrabEnd(self._seq, t, stretch, duration, intensity, display, cfg))
                 self.grab_start_time = None
                 self.current_stretch = 0.0
 
+    def reset(self) -> None:
+        """進行中の Grab を刺激なしで打ち切り、状態を初期化する（アバター切り替え時）。
+
+        grab_end は発火しないので、Zap・Chatbox・記録は行われない。
+        """
+        if self.is_grabbed:
+            logger.info("[SM] Grab reset (avatar changed)")
+        self.is_grabbed = False
+        self.current_stretch = 0.0
+        self.grab_start_time = None
+        self.intensity = self.intensity_display = 0
+        self._stretch_history.clear()
+        self._fire(self._on_reset)
+        self._fire(self._on_state_change)
+
     # ------------------------------------------------------------------ #
     # 内部                                                                 #
     # ------------------------------------------------------------------ #
 
+    def _update_intensity(self, stretch: float) -> tuple[int, int]:
+        """stretch の強度を計算して intensity / intensity_display に置く（Grab 中のみ呼ぶ）。"""
+        cfg = self.intensity_config()
+        intensity = calculate_intensity(stretch, cfg)
+        display = normalize_for_display(intensity, cfg) if intensity else 0
+        self.intensity = intensity
+        self.intensity_display = display
+        return intensity, display
+
     @staticmethod
     def _fire(callbacks: list[Event], *args) -> None:
         for cb in callbacks:
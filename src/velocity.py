@@ -0,0 +1,206 @@
+"""Stretch の速度推定（速度モード用）
+
+VRChat の Stretch は送信間隔が揺れ、値にも細かいノイズが乗る。直近 2 点の差分で速度を取ると
+0 とスパイクを行き来し、停止タイマーの張り直しや誤った onset の原因になる。
+ここの推定器はサンプルごとに O(1) で更新し、速度（velocity、stretch/秒、符号付き）と
+位置（position、平滑化した Stretch）を持つ：
+
+  - TwoPointEstimator      : 直近 2 サンプルの差分（フィルタなし。従来の速度モードと同じ）
+  - AlphaBetaEstimator     : α-β フィルタ（位置と速度の 2 状態）。送信間隔の揺れは dt でそのまま扱う
+  - SavitzkyGolayEstimator : 直近 window 個への 1 次の最小二乗フィットの傾き。等間隔なら Savitzky-Golay の
+                             1 階微分フィルタと同じで、不等間隔でも受信時刻で回帰する。累積和で O(1)
+
+estimate_offline() は同じ推定を numpy でトレース全体にまとめて計算する（記録したトレースでの検証用）。
+"""
+
+from collections import deque
+
+ESTIMATORS = ("two_point", "alpha_beta", "savgol")
+
+
+class TwoPointEstimator:
+    """直近 2 サンプルの差分（フィルタなし）。"""
+
+    filtered = False
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.velocity: float = 0.0
+        self.position: float = 0.0
+        self._t: float | None = None
+
+    def update(self, t: float, stretch: float) -> float:
+        if self._t is not None:
+            dt = t - self._t
+            self.velocity = (stretch - self.position) / dt if dt > 0 else 0.0
+        self._t = t
+        self.position = stretch
+        return self.velocity
+
+
+class AlphaBetaEstimator:
+    """α-β フィルタ。
+
+    予測 x' = x + v·dt との残差 r で x = x' + α·r、v = v + β·r/dt と更新する。
+    パケットが詰まって届いたとき（dt がごく小さい）に速度が跳ねないよう、速度の補正には min_dt 以上の dt を使う。
+    """
+
+    filtered = True
+
+    def __init__(self, alpha: float = 0.6, beta: float = 0.25, min_dt: float = 0.004):
+        """
+        Args:
+            alpha: 位置の補正ゲイン（0〜1、大きいほど生の値に追従）
+            beta: 速度の補正ゲイン（0〜α 程度、大きいほど速度の反応が速くノイズも乗る）
+            min_dt: 速度の補正に使う dt の下限（秒）
+        """
+        self.alpha = alpha
+        self.beta = beta
+        self.min_dt = min_dt
+        self.reset()
+
+    def reset(self) -> None:
+        self.velocity: float = 0.0
+        self.position: float = 0.0
+        self._t: float | None = None
+
+    def update(self, t: float, stretch: float) -> float:
+        if self._t is None:
+            self._t = t
+            self.position = stretch
+            return self.velocity
+        dt = t - self._t
+        if dt < 0:
+            dt = 0.0
+        predicted = self.position + self.velocity * dt
+        r = stretch - predicted
+        self.position = predicted + self.alpha * r
+        self.velocity += self.beta * r / max(dt, self.min_dt)
+        self._t = t
+        return self.velocity
+
+
+class SavitzkyGolayEstimator:
+    """直近 window 個のサンプルに直線をあてはめた傾き（1 次の Savitzky-Golay 微分）。
+
+    時刻は基準時刻からの差で持ち、和（n, Σu, Σs, Σu², Σus）を足し引きして O(1) で更新する。
+    基準から rebase_after 秒離れたら窓の中身から和を作り直し、桁落ちと誤差の蓄積を抑える。
+    """
+
+    filtered = True
+
+    def __init__(self, window: int = 5, rebase_after: float = 30.0):
+        """
+        Args:
+            window: フィットに使うサンプル数（2 以上）
+            rebase_after: 和を作り直すまでの時間（秒）
+        """
+        self.window = max(2, window)
+        self.rebase_after = rebase_after
+        self.reset()
+
+    def reset(self) -> None:
+        self.velocity: float = 0.0
+        self.position: float = 0.0
+        self._ref: float | None = None
+        self._samples: deque[tuple[float, float]] = deque()
+        self._su = self._ss = self._suu = self._sus = 0.0
+
+    def update(self, t: float, stretch: float) -> float:
+        if self._ref is None:
+            self._ref = t
+        elif t - self._ref > self.rebase_after:
+            self._rebase(t)
+        u = t - self._ref
+        samples = self._samples
+        samples.append((u, stretch))
+        self._su += u
+        self._ss += stretch
+        self._suu += u * u
+        self._sus += u * stretch
+        if len(samples) > self.window:
+            ou, os_ = samples.popleft()
+            self._su -= ou
+            self._ss -= os_
+            self._suu -= ou * ou
+            self._sus -= ou * os_
+
+        n = len(samples)
+        denom = n * self._suu - self._su * self._su
+        if n >= 2 and denom > 1e-12:
+            self.velocity = (n * self._sus - self._su * self._ss) / denom
+        # 時刻がほぼ同じサンプルしかなければ傾きは前回のまま
+        self.position = (self._ss + self.velocity * (n * u - self._su)) / n
+        return self.velocity
+
+    def _rebase(self, t: float) -> None:
+        shift = t - self._ref
+        self._ref = t
+        self._samples = deque((u - shift, s) for u, s in self._samples)
+        self._su = sum(u for u, _ in self._samples)
+        self._ss = sum(s for _, s in self._samples)
+        self._suu = sum(u * u for u, _ in self._samples)
+        self._sus = sum(u * s for u, s in self._samples)
+
+
+def create_estimator(name: str, alpha: float = 0.6, beta: float = 0.25, window: int = 5):
+    """ESTIMATORS の名前から推定器を作る（不明な名前は two_point）。"""
+    if name == "alpha_beta":
+        return AlphaBetaEstimator(alpha, beta)
+    if name == "savgol":
+        return SavitzkyGolayEstimator(window)
+    return TwoPointEstimator()
+
+
+def estimate_offline(times, values, name: str, alpha: float = 0.6, beta: float = 0.25, window: int = 5,
+                     min_dt: float = 0.004):
+    """トレース全体の速度を numpy でまとめて計算する（各サンプル時点での推定値の配列）。
+
+    two_point と savgol は配列演算（savgol は窓ごとの回帰をまとめて解く）で、
+    オンラインの推定器とは独立に計算するので検証に使える。alpha_beta は再帰フィルタなので
+    同じ式を配列の上で順に回す。
+    """
+    import numpy as np
+
+    t = np.asarray(times, dtype=float)
+    s = np.asarray(values, dtype=float)
+    n = len(t)
+    v = np.zeros(n)
+    if n < 2:
+        return v
+    if name == "two_point":
+        dt = np.diff(t)
+        ds = np.diff(s)
+        v[1:] = np.divide(ds, dt, out=np.zeros(n - 1), where=dt > 0)
+        return v
+    if name == "savgol":
+        # 各サンプルで終わる長さ window の窓（先頭は短い窓）を並べ、窓ごとに最後の時刻を基準にして回帰する
+        w = max(2, window)
+        pad = np.full(w - 1, np.nan)
+        tw = np.lib.stride_tricks.sliding_window_view(np.concatenate((pad, t)), w)
+        sw = np.lib.stride_tricks.sliding_window_view(np.concatenate((pad, s)), w)
+        mask = ~np.isnan(tw)
+        u = np.where(mask, tw - t[:, None], 0.0)
+        y = np.where(mask, sw, 0.0)
+        cnt = mask.sum(axis=1)
+        su, sy = u.sum(axis=1), y.sum(axis=1)
+        denom = cnt * (u * u).sum(axis=1) - su * su
+        valid = (cnt >= 2) & (denom > 1e-12)
+        slope = np.divide(cnt * (u * y).sum(axis=1) - su * sy, denom, out=np.zeros(n), where=valid)
+        # 傾きが決まらないサンプルは直前の値を引き継ぐ（オンライン版と同じ）
+        last = np.maximum.accumulate(np.where(valid, np.arange(n), 0))
+        return np.where(valid[last], slope[last], 0.0)
+    if name == "alpha_beta":
+        dt = np.maximum(np.diff(t), 0.0)
+        gain = beta / np.maximum(dt, min_dt)
+        x, vel = s[0], 0.0
+        for i in range(1, n):
+            predicted = x + vel * dt[i - 1]
+            r = s[i] - predicted
+            x = predicted + alpha * r
+            vel += gain[i - 1] * r
+            v[i] = vel
+        return v
+    raise ValueError(f"unknown estimator: {name!r}")
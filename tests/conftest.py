@@ -0,0 +1,56 @@
+"""
+テスト共通のヘルパー
+"""
+
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+
+import settings as s_mod
+
+
+def wait_until(predicate, timeout: float = 2.0) -> bool:
+    """predicate() が True になるまで（最大 timeout 秒）待つ。別スレッドの処理を待つテストで使う。"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return predicate()
+
+
+@pytest.fixture
+def speed_mode(monkeypatch):
+    """zap_mode を speed にする（予測発火はオフ）。"""
+    monkeypatch.setattr(s_mod.settings.device, "zap_mode", "speed")
+    monkeypatch.setattr(s_mod.settings.speed_mode, "predictive_fire", False)
+
+
+class ZapRecorder:
+    """device_worker の代わり：送信せずに (時刻, 強度) を記録する。"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.zaps: list[tuple[float, int]] = []
+
+    @property
+    def intensities(self) -> list[int]:
+        return [intensity for _, intensity in self.zaps]
+
+    def submit(self, fn, intensity, cfg) -> bool:
+        self.zaps.append((self.clock.now(), intensity))
+        return True
+
+
+def replay_grab(machine, clock, samples, release_at: float) -> None:
+    """1 回の Grab を仮想時刻で流す。samples の時刻と release_at は Grab 開始（今の clock.now()）からの秒数。"""
+    start = clock.now()
+    machine.on_grabbed_change(True, start)
+    for t, value in samples:
+        clock.advance_to(start + t)
+        machine.on_stretch_change(value, start + t)
+    clock.advance_to(start + release_at)
+    machine.on_grabbed_change(False, start + release_at)
@@ -0,0 +1,93 @@
+"""
+avatar_profiles.py のテスト
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+
+import settings as s_mod
+from avatar_profiles import DEFAULT_PROFILE, AvatarSwitcher, compile_profiles, physbone_union
+from handlers import SpeedModeHandler, StimulusHandler
+from state_machine import GrabStateMachine
+
+AVATAR = "avtr_collar"
+
+
+@pytest.fixture
+def profiles(monkeypatch):
+    monkeypatch.setattr(s_mod.settings, "physbones", {"Leash": {}})
+    monkeypatch.setattr(s_mod.settings, "avatars", {
+        AVATAR: {
+            "stretch_param": "/avatar/parameters/Collar_Stretch",
+            "max_stimulus_value": 40,
+            "physbones": {"Tail": {"max_stretch_for_calc": 0.5}},
+            "speed_mode": {"speed_zap_threshold": 3.0, "no_such_key": 1},
+        },
+        "avtr_plain": {},
+    })
+    return compile_profiles()
+
+
+def test_default_profile_is_osc_and_physbones(profiles):
+    default = profiles[DEFAULT_PROFILE]
+    assert [pb.name for pb in default.physbones] == ["ShockPB", "Leash"]
+    assert default.speed_mode is None
+    assert [pb.name for pb in profiles["avtr_plain"].physbones] == ["ShockPB", "Leash"]
+
+
+def test_avatar_profile_overrides_params_curve_and_speed_mode(profiles):
+    profile = profiles[AVATAR]
+    collar, tail = profile.physbones
+    assert collar.name == "Collar"
+    assert collar.is_grabbed_param == "/avatar/parameters/Collar_IsGrabbed"  # 残りは [osc] のまま
+    assert tail.stretch_param == "/avatar/parameters/Tail_Stretch"
+    assert collar.intensity_overrides == {"max_stimulus_value": 40}
+    assert tail.intensity_overrides == {"max_stimulus_value": 40, "max_stretch_for_calc": 0.5}
+    assert profile.speed_mode.speed_zap_threshold == 3.0
+    assert profile.speed_mode.speed_onset_ticks == s_mod.settings.speed_mode.speed_onset_ticks
+
+
+def test_union_is_unique_by_name_default_first(profiles):
+    assert [pb.name for pb in physbone_union(profiles)] == ["ShockPB", "Leash", "Collar", "Tail"]
+
+
+def test_avatars_table_is_read_from_toml():
+    s = s_mod.Settings()
+    s_mod._apply_toml(s, {"avatars": {AVATAR: {"max_stimulus_value": 40}}})
+    assert s.avatars == {AVATAR: {"max_stimulus_value": 40}}
+
+
+class TestAvatarSwitcher:
+
+    @pytest.fixture
+    def machines(self, profiles):
+        return {pb.name: GrabStateMachine(pb.name) for pb in physbone_union(profiles)}
+
+    def test_switch_swaps_curve_and_speed_mode(self, profiles, machines):
+        switcher = AvatarSwitcher(profiles, machines)
+        switcher.apply(AVATAR)
+        assert machines["Tail"].intensity_config().max_stretch_for_calc == 0.5
+        assert machines["Tail"].speed_mode.speed_zap_threshold == 3.0
+        assert machines["ShockPB"].intensity_overrides == {}
+        switcher.apply("avtr_unknown")  # 一致しなければ既定のプロファイル
+        assert switcher.profile == DEFAULT_PROFILE
+        assert machines["Tail"].intensity_overrides == {}
+        assert machines["Tail"].speed_mode is None
+        assert switcher.switches == 2
+
+    def test_switch_resets_grab_without_stimulus(self, profiles, machines):
+        m = machines["ShockPB"]
+        StimulusHandler(m)
+        SpeedModeHandler(m)
+        ended = []
+        m.subscribe_grab_end(lambda *a: ended.append(a))
+        m.on_grabbed_change(True, 0.0)
+        m.on_stretch_change(0.5, 1.0)
+        AvatarSwitcher(profiles, machines).apply(AVATAR)
+        assert not m.is_grabbed
+        assert m.current_stretch == 0.0
+        m.on_grabbed_change(False, 2.0)
+        assert ended == []
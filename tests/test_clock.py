@@ -0,0 +1,126 @@
+"""
+clock.py の単体テストと、VirtualClock で速度モードを実時間なしに動かすテスト
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from clock import SystemClock, TimerScheduler, VirtualClock
+from grab_traces import profile_samples
+from handlers.speed_mode import SpeedModeHandler
+from state_machine import GrabStateMachine
+from tests.conftest import ZapRecorder, replay_grab, wait_until
+
+
+class TestVirtualClock:
+
+    def test_timers_fire_in_order_at_their_deadline(self):
+        clock = VirtualClock(start=10.0)
+        fired = []
+        clock.call_later(0.2, lambda: fired.append(("b", clock.now())))
+        clock.call_later(0.1, lambda: fired.append(("a", clock.now())))
+        clock.call_later(0.2, lambda: fired.append(("c", clock.now())))
+        assert clock.advance(0.15) == 1
+        assert fired == [("a", 10.1)]
+        assert clock.now() == 10.15
+        clock.advance_to(11.0)
+        assert fired == [("a", 10.1), ("b", 10.2), ("c", 10.2)]
+        assert clock.now() == 11.0
+
+    def test_cancel_and_rescheduling_from_callback(self):
+        clock = VirtualClock()
+        fired = []
+        handle = clock.call_later(0.1, fired.append, "cancelled")
+        clock.cancel(handle)
+        clock.call_later(0.1, lambda: clock.call_later(0.1, fired.append, "chained"))
+        assert clock.pending() == 1
+        clock.advance(0.25)
+        assert fired == ["chained"]
+        assert clock.pending() == 0
+
+    def test_time_never_goes_backwards(self):
+        clock = VirtualClock(start=5.0)
+        clock.advance_to(1.0)
+        assert clock.now() == 5.0
+
+
+class TestTimerScheduler:
+
+    def test_many_timers_share_one_thread(self):
+        scheduler = TimerScheduler()
+        clock = SystemClock(scheduler)
+        threads_before = threading.active_count()
+        fired = []
+        done = threading.Event()
+        for i in range(50):
+            handle = clock.call_later(0.01, fired.append, i)
+            if i < 49:
+                clock.cancel(handle)  # 張り直し：最後の 1 個だけ残る
+        clock.call_later(0.02, done.set)
+        assert done.wait(1.0)
+        assert fired == [49]
+        assert threading.active_count() == threads_before + 1
+        stats = scheduler.stats()
+        assert (stats["scheduled"], stats["fired"], stats["cancelled"]) == (51, 2, 49)
+        assert 0.0 <= stats["late_max"] < 0.5
+        scheduler.stop()
+
+    def test_timers_fire_in_deadline_order(self):
+        scheduler = TimerScheduler()
+        fired = []
+        done = threading.Event()
+        now = time.perf_counter()
+        scheduler.call_at(now + 0.03, fired.append, "c")
+        scheduler.call_at(now + 0.01, fired.append, "a")
+        scheduler.call_at(now + 0.02, fired.append, "b")
+        scheduler.call_at(now + 0.04, done.set)
+        assert done.wait(1.0)
+        assert fired == ["a", "b", "c"]
+        scheduler.stop()
+
+    def test_executor_runs_callbacks_and_rechecks_cancellation(self):
+        """executor に渡した後で取り消された処理は実行しない"""
+        handed: list = []
+        scheduler = TimerScheduler(executor=lambda fn, *args: handed.append((fn, args)))
+        fired = []
+        h1 = scheduler.call_at(time.perf_counter(), fired.append, 1)
+        scheduler.call_at(time.perf_counter(), fired.append, 2)
+        assert wait_until(lambda: len(handed) == 2)
+        assert fired == []  # スケジューラのスレッドでは実行しない
+        scheduler.cancel(h1)
+        for fn, args in handed:
+            fn(*args)
+        assert fired == [2]
+        scheduler.stop()
+
+
+def _simulate(grabs: int) -> tuple[list[int], float]:
+    """yank を grabs 回、仮想時刻で流す。(Zap 強度の列, 終了時の仮想時刻) を返す。"""
+    clock = VirtualClock()
+    machine = GrabStateMachine("ShockPB", clock=clock)
+    zaps = ZapRecorder(clock)
+    SpeedModeHandler(machine, device_worker=zaps)
+    samples, release_at = profile_samples("yank", rate=60.0, peak=0.6)
+    for _ in range(grabs):
+        replay_grab(machine, clock, samples, release_at)
+        clock.advance(1.0)
+    return zaps.intensities, clock.now()
+
+
+def test_virtual_clock_runs_speed_mode_without_threads(speed_mode):
+    threads_before = threading.active_count()
+    wall = time.perf_counter()
+    intensities, virtual_end = _simulate(1000)
+    wall = time.perf_counter() - wall
+
+    # 停止タイマーは仮想時刻で発火し、Grab ごとに Zap が 1 回出る
+    assert len(intensities) == 1000
+    assert all(i > 0 for i in intensities)
+    assert virtual_end > 1000
+    assert wall < virtual_end / 10
+    assert threading.active_count() == threads_before
+    # 同じ入力なら同じ結果（決定的）
+    assert _simulate(1000) == (intensities, virtual_end)
@@ -0,0 +1,165 @@
+"""
+event_worker.py と、ワーカーに積んだ購読者のテスト
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+
+import settings as s_mod
+from event_worker import EventWorker
+from handlers import RecorderHandler, StimulusHandler
+from state_machine import GrabStateMachine
+from tests.conftest import wait_until
+
+
+@pytest.fixture
+def gate():
+    """最初の処理でブロックさせ、set() まで後続をキューに溜めさせる。"""
+    entered, release = threading.Event(), threading.Event()
+
+    def block():
+        entered.set()
+        release.wait(2.0)
+    yield entered, release, block
+    release.set()
+
+
+@pytest.fixture
+def worker_factory():
+    workers = []
+
+    def _make(*args, **kwargs):
+        workers.append(EventWorker(*args, **kwargs))
+        return workers[-1]
+    yield _make
+    for w in workers:
+        w.stop()
+
+
+@pytest.mark.parametrize("overflow, expected", [("drop_oldest", [3, 4]), ("drop_newest", [1, 2])])
+def test_overflow_policy(worker_factory, gate, overflow, expected):
+    entered, release, block = gate
+    w = worker_factory("test", maxsize=2, overflow=overflow)
+    done = []
+    w.submit(block)
+    assert entered.wait(1.0)
+    for i in (1, 2, 3, 4):
+        w.submit(done.append, i)
+    release.set()
+    assert wait_until(lambda: w.executed == 3)
+    assert done == expected
+    assert w.stats()["dropped"] == 2
+
+
+def test_stale_events_expire(worker_factory, gate):
+    entered, release, block = gate
+    w = worker_factory("test", max_delay=0.05)
+    done = []
+    w.submit(block)
+    assert entered.wait(1.0)
+    w.submit(done.append, "stale")
+    time.sleep(0.1)
+    release.set()
+    assert wait_until(lambda: w.expired == 1)
+    w.submit(done.append, "fresh")
+    assert wait_until(lambda: done == ["fresh"])
+
+
+def test_errors_do_not_stop_the_worker(worker_factory):
+    w = worker_factory("test")
+    done = []
+    w.submit(lambda: 1 / 0)
+    w.submit(done.append, 1)
+    assert wait_until(lambda: done == [1])
+    assert w.errors == 1
+
+
+def test_subscriber_on_worker_is_called_in_order(worker_factory):
+    w = worker_factory("test")
+    m = GrabStateMachine()
+    seen = []
+    m.subscribe_grab_end(lambda e: seen.append((threading.current_thread().name, round(e.duration, 1))), worker=w)
+    for t in range(3):
+        m.on_grabbed_change(True, t * 10.0)
+        m.on_grabbed_change(False, t * 10.0 + t + 1)
+    assert wait_until(lambda: len(seen) == 3)
+    assert seen == [("EventWorker-test", 1.0), ("EventWorker-test", 2.0), ("EventWorker-test", 3.0)]
+
+
+def test_stalled_device_does_not_block_state_tracking(worker_factory, gate, monkeypatch):
+    """send_zap がブロックしていても、状態機械は次の Grab を処理し続ける"""
+    import pavlok_controller as ctrl
+    entered, release, block = gate
+    sent = []
+
+    def send_zap(intensity):
+        block()
+        sent.append(intensity)
+        return True
+    monkeypatch.setattr(ctrl, "send_zap", send_zap)
+    monkeypatch.setattr(ctrl, "send_vibration", lambda *a: True)
+    monkeypatch.setattr(s_mod.settings.device, "zap_mode", "stretch")
+    # config.py は BLE の MAC アドレスがないと読み込めない
+    monkeypatch.setattr(s_mod.settings.ble, "device_mac", "00:00:00:00:00:00")
+
+    w = worker_factory("device")
+    m = GrabStateMachine()
+    StimulusHandler(m, device_worker=w)
+    m.on_grabbed_change(True, 0.0)
+    m.on_stretch_change(0.5, 0.5)
+    m.on_grabbed_change(False, 2.0)
+    assert entered.wait(1.0)
+
+    started = time.perf_counter()
+    m.on_grabbed_change(True, 3.0)
+    m.on_stretch_change(0.6, 3.5)
+    assert m.is_grabbed and m.current_stretch == 0.6
+    assert time.perf_counter() - started < 0.1
+    assert sent == []
+    release.set()
+    assert wait_until(lambda: len(sent) == 1)
+    assert m.last_zap_actual_intensity == sent[0]
+
+
+class _Recorder:
+    def __init__(self):
+        self.zaps = []
+
+    def record_zap(self, **kwargs) -> dict:
+        self.zaps.append(kwargs)
+        return kwargs
+
+
+def test_recorder_decides_before_test_mode_is_reset(worker_factory, gate, monkeypatch):
+    """GUI のテスト Grab（is_test_mode → 掴む → 離す → is_test_mode を戻す）はワーカーが遅れても記録しない"""
+    import config
+    monkeypatch.setattr(s_mod.settings.ble, "device_mac", "00:00:00:00:00:00")
+    monkeypatch.setattr(config, "USE_VIBRATION", False)
+    entered, release, block = gate
+    w = worker_factory("recorder")
+    recorder = _Recorder()
+    m = GrabStateMachine()
+    RecorderHandler(m, recorder, worker=w)
+    w.submit(block)
+    assert entered.wait(1.0)
+
+    # tab_test の test_grab_start / test_grab_end と同じ順
+    m.is_test_mode = True
+    m.on_grabbed_change(True, 0.0)
+    m.on_stretch_change(0.5, 0.5)
+    m.on_grabbed_change(False, 2.0)
+    m.is_test_mode = False
+    # 本番の Grab は記録する
+    m.on_grabbed_change(True, 3.0)
+    m.on_stretch_change(0.5, 3.5)
+    m.on_grabbed_change(False, 5.0)
+
+    release.set()
+    assert wait_until(lambda: w.executed == 2)
+    assert len(recorder.zaps) == 1
+    assert recorder.zaps[0]["actual_intensity"] > 0
@@ -0,0 +1,66 @@
+"""
+events.py と、GrabStateMachine が購読者に渡すイベントのテスト
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+
+import settings as s_mod
+from events import GrabStart, StretchUpdate, GrabEnd
+from intensity import IntensityConfig, calculate_intensity, normalize_for_display
+from state_machine import GrabStateMachine
+
+
+@pytest.fixture
+def machine():
+    m = GrabStateMachine()
+    m.events = []
+    m.subscribe_grab_start(m.events.append)
+    m.subscribe_stretch_update(m.events.append)
+    m.subscribe_grab_end(m.events.append)
+    return m
+
+
+def test_events_carry_precomputed_intensity(machine):
+    cfg = IntensityConfig.from_settings()
+    machine.on_grabbed_change(True, 1.0)
+    machine.on_stretch_change(0.6, 1.1)
+    machine.on_grabbed_change(False, 1.5)
+
+    start, update, end = machine.events
+    assert isinstance(start, GrabStart) and start.event_time == 1.0
+    assert isinstance(update, StretchUpdate)
+    assert update.intensity == calculate_intensity(0.6, cfg)
+    assert update.intensity_display == normalize_for_display(update.intensity, cfg)
+    assert isinstance(end, GrabEnd)
+    assert (end.stretch, end.intensity, end.intensity_display) == (0.6, update.intensity, update.intensity_display)
+    assert end.duration == pytest.approx(0.5)
+    assert end.config == cfg
+    assert [e.seq for e in machine.events] == [1, 2, 3]
+    # Grab 終了後は状態機械の強度を 0 に戻す（GUI が読む）
+    assert (machine.intensity, machine.intensity_display) == (0, 0)
+
+
+def test_events_are_immutable(machine):
+    machine.on_grabbed_change(True, 1.0)
+    event = machine.events[0]
+    with pytest.raises(AttributeError):
+        event.stretch = 1.0
+    assert not hasattr(event, "__dict__")
+
+
+def test_intensity_config_follows_reload_and_overrides(machine, monkeypatch):
+    cfg = machine.intensity_config()
+    assert machine.intensity_config() is cfg
+
+    # settings.reload() は settings オブジェクトを差し替える
+    replaced = s_mod.Settings()
+    replaced.device.max_stimulus_value = cfg.max_stimulus_value - 10
+    monkeypatch.setattr(s_mod, "settings", replaced)
+    assert machine.intensity_config().max_stimulus_value == cfg.max_stimulus_value - 10
+
+    machine.intensity_overrides = {"max_stimulus_value": 42}
+    assert machine.intensity_config().max_stimulus_value == 42
@@ -0,0 +1,146 @@
+"""
+journal.py（イベントジャーナル）と JournalHandler のテスト
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+
+from clock import VirtualClock
+from handlers.journal import JournalHandler
+from intensity import calculate_intensity
+from journal import EventJournal, JournalReader, replay, summarize
+from state_machine import GrabStateMachine
+
+
+@pytest.fixture
+def journal(tmp_path):
+    j = EventJournal(tmp_path / "events.pvjrnl", start_time=0.0, flush_interval=0.01)
+    yield j
+    j.close()
+
+
+def _grab(machine, t0: float, values: list[float], zap: int = 0) -> None:
+    machine.on_grabbed_change(True, t0)
+    for i, v in enumerate(values):
+        machine.on_stretch_change(v, t0 + 0.1 * (i + 1))
+    if zap:
+        machine.notify_zap(zap, 50, True)
+    machine.on_grabbed_change(False, t0 + 0.1 * (len(values) + 1))
+
+
+def test_records_round_trip(journal):
+    clock = VirtualClock(start=2.0)
+    machine = GrabStateMachine("ShockPB", clock=clock)
+    JournalHandler(machine, journal)
+    _grab(machine, 1.0, [0.2, 0.4], zap=30)
+    machine.reset()
+    journal.close()
+
+    with JournalReader(journal.path) as reader:
+        records = list(reader)
+    assert [r.kind for r in records] == ["channel", "grab_start", "sample", "sample", "zap", "grab_end", "reset"]
+    assert {r.physbone for r in records} == {"ShockPB"}
+    start, end, zap = records[1], records[5], records[4]
+    assert (start.seq, start.t) == (1, pytest.approx(1.0))
+    assert records[3].stretch == pytest.approx(0.4)
+    assert (zap.t, zap.intensity, zap.intensity_display, zap.sent) == (pytest.approx(2.0), 30, 50, True)
+    assert end.duration == pytest.approx(0.3)
+    assert end.stretch == pytest.approx(0.4)
+    assert end.intensity == calculate_intensity(0.4, machine.intensity_config())
+    assert journal.stats()["records"] == 7
+
+
+def test_summarize_per_physbone(journal):
+    machines = [GrabStateMachine(name) for name in ("ShockPB", "Leash")]
+    for m in machines:
+        JournalHandler(m, journal)
+    _grab(machines[0], 0.0, [0.3, 0.7], zap=40)
+    _grab(machines[1], 1.0, [0.5])
+    _grab(machines[0], 2.0, [0.1])
+    journal.close()
+
+    with JournalReader(journal.path) as reader:
+        stats = summarize(reader)
+    assert stats["ShockPB"]["grabs"] == 2
+    assert stats["ShockPB"]["zaps"] == 1
+    assert stats["ShockPB"]["max_stretch"] == pytest.approx(0.7)
+    assert stats["Leash"]["grabs"] == 1 and stats["Leash"]["zaps"] == 0
+    assert stats["Leash"]["grab_time"] == pytest.approx(0.2)
+
+
+def test_replay_rebuilds_the_session(journal):
+    machine = GrabStateMachine("ShockPB")
+    JournalHandler(machine, journal)
+    for i in range(3):
+        _grab(machine, i * 2.0, [0.2, 0.6, 0.4])
+    journal.close()
+
+    clock = VirtualClock()
+    replayed = GrabStateMachine("ShockPB", clock=clock)
+    ends = []
+    replayed.subscribe_grab_end(ends.append)
+    with JournalReader(journal.path) as reader:
+        replay(reader, {"ShockPB": replayed}, clock)
+    assert [(e.stretch, round(e.duration, 6)) for e in ends] == [(pytest.approx(0.4), 0.4)] * 3
+    assert clock.now() == pytest.approx(4.4)
+
+
+def test_rotation_keeps_size_bounded(tmp_path):
+    path = tmp_path / "events.pvjrnl"
+    journal = EventJournal(path, start_time=0.0, max_bytes=2000, backups=2, flush_interval=60, max_batch=100)
+    channel = journal.channel("ShockPB")
+    for i in range(2000):
+        journal.sample(channel, 0.5, i * 0.01)
+    journal.close()
+
+    files = sorted(p.name for p in tmp_path.iterdir())
+    assert files == ["events.pvjrnl", "events.pvjrnl.1", "events.pvjrnl.2"]
+    assert journal.stats()["rotations"] > 2
+    for p in tmp_path.iterdir():
+        assert p.stat().st_size < 2000 + 100 * 14 + 100
+        with JournalReader(p) as reader:
+            records = list(reader)
+        # 回した後のファイルも PhysBone 名から読める
+        assert records[0].kind == "channel"
+        assert {r.physbone for r in records} == {"ShockPB"}
+
+
+def test_failed_rotation_keeps_the_journal(tmp_path, monkeypatch):
+    def replace(self, target):
+        raise PermissionError("locked")
+
+    monkeypatch.setattr(Path, "replace", replace)
+    path = tmp_path / "events.pvjrnl"
+    journal = EventJournal(path, start_time=0.0, max_bytes=500, backups=2, flush_interval=60, max_batch=10)
+    channel = journal.channel("ShockPB")
+    for i in range(100):
+        journal.sample(channel, 0.5, i * 0.01)
+    journal.close()
+
+    assert [p.name for p in tmp_path.iterdir()] == ["events.pvjrnl"]
+    stats = journal.stats()
+    assert stats["rotations"] == 0 and stats["errors"] > 0
+    with JournalReader(path) as reader:
+        records = list(reader)
+    # 回せなくても先頭から全部残っている
+    assert [r.kind for r in records] == ["channel"] + ["sample"] * 100
+    assert records[1].t == pytest.approx(0.0)
+
+
+def test_drops_when_writer_is_behind(tmp_path):
+    journal = EventJournal(tmp_path / "events.pvjrnl", flush_interval=60, max_batch=1000, max_pending=10)
+    for i in range(20):
+        journal.sample(0, 0.1, float(i))
+    assert journal.stats()["dropped"] == 10
+    journal.close()
+    assert journal.stats()["records"] == 10
+
+
+def test_rejects_foreign_files(tmp_path):
+    p = tmp_path / "x.pvjrnl"
+    p.write_bytes(b"NOTAJRNL" + bytes(8))
+    with pytest.raises(ValueError):
+        JournalReader(p)
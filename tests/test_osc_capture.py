@@ -0,0 +1,110 @@
+"""
+osc/capture.py のテスト
+
+キャプチャの書き込み・読み出しの往復と、OSCReceiver で記録したものを
+別の OSCReceiver へ再生して同じ値が届くことを確認する。
+"""
+
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+from pythonosc.udp_client import SimpleUDPClient
+
+import settings as s_mod
+from osc.capture import CaptureReader, CaptureWriter, replay
+from osc.receiver import OSCReceiver
+from tests.conftest import wait_until
+
+STRETCH = s_mod.settings.osc.stretch_param
+IS_GRABBED = s_mod.settings.osc.is_grabbed_param
+
+
+class TestCaptureFile:
+
+    def test_round_trip(self, tmp_path):
+        path = tmp_path / "a.pvcap"
+        w = CaptureWriter(path, start_time=100.0)
+        w.write(100.0, b"one")
+        w.write(100.25, b"two!")
+        w.write(101.5, b"")
+        w.close()
+        with CaptureReader(path) as r:
+            records = list(r)
+        assert [d for _, d in records] == [b"one", b"two!", b""]
+        assert [t for t, _ in records] == pytest.approx([0.0, 0.25, 1.5])
+
+    def test_truncated_tail_is_ignored(self, tmp_path):
+        path = tmp_path / "a.pvcap"
+        w = CaptureWriter(path, start_time=0.0)
+        w.write(0.1, b"complete")
+        w.write(0.2, b"partial-record")
+        w.close()
+        path.write_bytes(path.read_bytes()[:-4])
+        with CaptureReader(path) as r:
+            assert [d for _, d in r] == [b"complete"]
+
+    def test_rejects_other_files(self, tmp_path):
+        path = tmp_path / "x.bin"
+        path.write_bytes(b"0123456789abcdef")
+        with pytest.raises(ValueError):
+            CaptureReader(path)
+
+
+@pytest.fixture
+def captured(tmp_path, monkeypatch):
+    """OSCReceiver で Stretch 3 個（50ms 間隔）と IsGrabbed を記録したファイル。"""
+    path = tmp_path / "session.pvcap"
+    monkeypatch.setattr(s_mod.settings.osc, "capture", True)
+    monkeypatch.setattr(s_mod.settings.osc, "capture_path", str(path))
+    r = OSCReceiver(port=0, backend="selector")
+    r.start()
+    try:
+        client = SimpleUDPClient("127.0.0.1", r.address[1])
+        client.send_message("/avatar/parameters/Other", 1.0)   # 未知アドレスは記録しない
+        client.send_message(IS_GRABBED, True)
+        for v in (0.1, 0.2, 0.3):
+            time.sleep(0.05)
+            client.send_message(STRETCH, v)
+        assert wait_until(lambda: r.metrics.datagrams == 5)
+    finally:
+        r.stop()
+    monkeypatch.setattr(s_mod.settings.osc, "capture", False)
+    return path
+
+
+def _replay_into_receiver(path, speed):
+    events = []
+    r = OSCReceiver(port=0, backend="selector")
+    r.on_stretch_change = lambda v, t, seq: events.append(("S", round(v, 3), t))
+    r.on_grabbed_change = lambda v, t, seq: events.append(("G", v, t))
+    r.start()
+    try:
+        assert replay(path, r.address, speed=speed) == 4
+        assert wait_until(lambda: len(events) == 4)
+    finally:
+        r.stop()
+    return events
+
+
+def test_capture_records_accepted_datagrams(captured):
+    with CaptureReader(captured) as r:
+        info = r.summary()
+    assert info["records"] == 4
+    assert info["duration"] >= 0.15
+
+
+def test_replay_at_1x_keeps_timing(captured):
+    events = _replay_into_receiver(captured, speed=1.0)
+    assert [(k, v) for k, v, _ in events] == [("G", True), ("S", 0.1), ("S", 0.2), ("S", 0.3)]
+    span = events[-1][2] - events[0][2]
+    assert 0.13 <= span < 0.4
+
+
+def test_replay_accelerated_and_max_speed(captured):
+    fast = _replay_into_receiver(captured, speed=10.0)
+    assert fast[-1][2] - fast[0][2] < 0.1
+    flat_out = _replay_into_receiver(captured, speed=0)
+    assert [(k, v) for k, v, _ in flat_out] == [(k, v) for k, v, _ in fast]
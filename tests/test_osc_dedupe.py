@@ -0,0 +1,125 @@
+"""
+osc/dedupe.py の単体テスト
+
+本物の GrabStateMachine に記録用の購読者をつなぎ、重複入力で
+どのイベントが発火する／しないかを確認する。
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+
+import settings as s_mod
+from osc.dedupe import OSCDedupe
+from state_machine import GrabStateMachine
+
+
+class _Recorder:
+    def __init__(self, machine: GrabStateMachine):
+        self.state_changes = 0
+        self.updates: list[float] = []
+        self.samples: list[tuple[float, float]] = []
+        self.edges: list[str] = []
+        machine.subscribe_state_change(self._state_change)
+        machine.subscribe_stretch_update(lambda e: self.updates.append(e.stretch))
+        machine.subscribe_stretch_sample(lambda s, t: self.samples.append((t, s)))
+        machine.subscribe_grab_start(lambda e: self.edges.append("start"))
+        machine.subscribe_grab_end(lambda e: self.edges.append("end"))
+
+    def _state_change(self):
+        self.state_changes += 1
+
+
+@pytest.fixture
+def machine():
+    return GrabStateMachine()
+
+
+@pytest.fixture
+def rec(machine):
+    return _Recorder(machine)
+
+
+class TestStretch:
+
+    def test_repeats_outside_grab_are_dropped(self, machine, rec):
+        d = OSCDedupe(machine)
+        for t in range(5):
+            d.on_stretch_change(0.3, float(t))
+        assert rec.state_changes == 1
+        assert machine.current_stretch == 0.3
+        assert d.stats()["stretch_suppressed"] == 4
+
+    def test_epsilon(self, machine, rec):
+        d = OSCDedupe(machine, epsilon=0.01)
+        d.on_stretch_change(0.300, 0.0)
+        d.on_stretch_change(0.305, 1.0)   # 差 0.005 → 重複
+        d.on_stretch_change(0.309, 2.0)   # 前回渡した 0.300 との差 0.009 → 重複
+        d.on_stretch_change(0.312, 3.0)   # 差 0.012 → 渡す（少しずつのずれも溜まれば届く）
+        assert rec.state_changes == 2
+        assert machine.current_stretch == pytest.approx(0.312)
+
+    def test_repeats_during_grab_reach_timeline_only(self, machine, rec):
+        """Grab 中の重複は stretch_update を発火しないが、stretch_sample と履歴には残る"""
+        d = OSCDedupe(machine)
+        d.on_grabbed_change(True, 0.0)
+        d.on_stretch_change(0.5, 0.1)
+        d.on_stretch_change(0.5, 0.2)
+        d.on_stretch_change(0.5, 0.3)
+        d.on_stretch_change(0.6, 0.4)
+        assert rec.updates == [0.5, 0.6]
+        assert rec.samples == [(0.1, 0.5), (0.2, 0.5), (0.3, 0.5), (0.4, 0.6)]
+        assert list(machine._stretch_history) == rec.samples
+        assert d.stats()["stretch_suppressed_grabbed"] == 2
+
+    def test_first_stretch_after_edge_is_forwarded(self, machine, rec):
+        d = OSCDedupe(machine)
+        d.on_stretch_change(0.5, 0.0)
+        d.on_grabbed_change(True, 0.1)
+        d.on_stretch_change(0.5, 0.2)
+        assert rec.updates == [0.5]
+
+
+class TestGrabbed:
+
+    def test_edges_are_never_suppressed(self, machine, rec):
+        d = OSCDedupe(machine)
+        for t, v in enumerate([True, True, False, False, True, False]):
+            d.on_grabbed_change(v, float(t))
+        assert rec.edges == ["start", "end", "start", "end"]
+        assert d.stats()["grabbed_suppressed"] == 2
+
+    def test_follows_direct_machine_changes(self, machine, rec):
+        """状態機械が直接操作されても（tab_test.py）、実際の状態と比べてエッジを通す"""
+        d = OSCDedupe(machine)
+        d.on_grabbed_change(True, 0.0)
+        machine.on_grabbed_change(False, 1.0)
+        d.on_grabbed_change(True, 2.0)
+        assert rec.edges == ["start", "end", "start"]
+
+
+def test_stats_estimate_saved_callbacks(machine, rec):
+    d = OSCDedupe(machine)
+    d.on_stretch_change(0.2, 0.0)
+    d.on_stretch_change(0.2, 0.1)          # state_change 1 個分
+    d.on_grabbed_change(False, 0.2)        # state_change 1 個分
+    d.on_grabbed_change(True, 0.3)
+    d.on_stretch_change(0.4, 0.4)
+    d.on_stretch_change(0.4, 0.5)          # state_change + stretch_update 1 個ずつ
+    assert d.stats()["callbacks_saved"] == 4
+
+
+def test_speed_mode_records_repeats(machine, monkeypatch):
+    """速度モードの履歴には値の変わらないサンプルも時刻付きで入る"""
+    from handlers.speed_mode import SpeedModeHandler
+    monkeypatch.setattr(s_mod.settings.device, "zap_mode", "speed")
+    handler = SpeedModeHandler(machine)
+    d = OSCDedupe(machine)
+    settle = s_mod.settings.speed_mode.grab_settle_time
+    d.on_grabbed_change(True, 0.0)
+    for i in range(4):
+        d.on_stretch_change(0.1, settle + 0.1 * (i + 1))
+    assert [s for _, s in handler._kernel.history] == [0.1] * 4
+    assert machine.speed_mode_state["history_len"] == 4
@@ -0,0 +1,280 @@
+"""
+osc/event_queue.py の単体テスト
+
+配送先を記録用のリストにして、コンフレーションの規則
+（Stretch は最新値にまとめる / IsGrabbed は絶対にまとめない・順序を変えない）を確認する。
+"""
+
+import itertools
+import sys
+import threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+from osc.event_queue import OSCEventQueue
+from tests.conftest import wait_until
+
+# 受信順の通し番号（テスト間で単調増加していればよい）
+_SEQ = itertools.count(1)
+
+
+class _BlockingSink:
+    """最初の配送でブロックし、release() まで後続を溜めさせる配送先。"""
+
+    def __init__(self):
+        self.events: list[tuple[str, object]] = []
+        self.entered = threading.Event()
+        self._gate = threading.Event()
+
+    def stretch(self, value, event_time):
+        self.events.append(("S", value))
+        if not self.entered.is_set():
+            self.entered.set()
+            self._gate.wait(timeout=2.0)
+
+    def grabbed(self, value, event_time):
+        self.events.append(("G", value))
+
+    def release(self):
+        self._gate.set()
+
+
+@pytest.fixture
+def sink():
+    return _BlockingSink()
+
+
+class TestConflation:
+
+    def test_stretch_runs_are_conflated_between_ticks(self, sink):
+        """処理中に溜まった Stretch は最新値 1 個になり、IsGrabbed の前後関係は保たれる"""
+        q = OSCEventQueue(sink.stretch, sink.grabbed, conflate=True)
+        q.start()
+        try:
+            q.push_stretch(0.0, 0.0, next(_SEQ))
+            assert sink.entered.wait(1.0)
+            # コンシューマがブロックしている間に積む
+            for v in (0.1, 0.2):
+                q.push_stretch(v, 0.0, next(_SEQ))
+            q.push_grabbed(True, 0.0, next(_SEQ))
+            for v in (0.3, 0.4, 0.5):
+                q.push_stretch(v, 0.0, next(_SEQ))
+            q.push_grabbed(False, 0.0, next(_SEQ))
+            q.push_stretch(0.6, 0.0, next(_SEQ))
+            sink.release()
+
+            assert wait_until(lambda: len(sink.events) == 6)
+            assert sink.events == [
+                ("S", 0.0), ("S", 0.2), ("G", True), ("S", 0.5), ("G", False), ("S", 0.6),
+            ]
+            stats = q.stats()
+            assert stats["stretch_received"] == 7
+            assert stats["stretch_conflated"] == 3
+            assert stats["stretch_delivered"] == 4
+            assert stats["grabbed_delivered"] == 2
+        finally:
+            q.stop()
+
+    def test_conflated_stretch_keeps_newest_event_time(self):
+        """まとめた Stretch は最新サンプルの時刻を持つ"""
+        got = []
+        gate = threading.Event()
+
+        def stretch(value, event_time):
+            got.append((value, event_time))
+            if len(got) == 1:
+                gate.wait(timeout=2.0)
+
+        q = OSCEventQueue(stretch, lambda v, t: None, conflate=True)
+        q.start()
+        try:
+            q.push_stretch(0.0, 1.0, next(_SEQ))
+            assert wait_until(lambda: len(got) == 1)
+            q.push_stretch(0.1, 2.0, next(_SEQ))
+            q.push_stretch(0.2, 3.0, next(_SEQ))
+            gate.set()
+            assert wait_until(lambda: len(got) == 2)
+            assert got[1] == (0.2, 3.0)
+        finally:
+            q.stop()
+
+    def test_grabbed_edges_are_never_conflated(self, sink):
+        """連続する IsGrabbed はすべて届く"""
+        q = OSCEventQueue(sink.stretch, sink.grabbed, conflate=True)
+        q.start()
+        try:
+            q.push_stretch(0.0, 0.0, next(_SEQ))
+            assert sink.entered.wait(1.0)
+            for v in (True, False, True, False):
+                q.push_grabbed(v, 0.0, next(_SEQ))
+            sink.release()
+            assert wait_until(lambda: len(sink.events) == 5)
+            assert [v for k, v in sink.events if k == "G"] == [True, False, True, False]
+        finally:
+            q.stop()
+
+    def test_conflate_disabled_delivers_everything(self, sink):
+        """conflate=False なら全サンプルが順番通りに届く"""
+        q = OSCEventQueue(sink.stretch, sink.grabbed, conflate=False)
+        q.start()
+        try:
+            q.push_stretch(0.0, 0.0, next(_SEQ))
+            assert sink.entered.wait(1.0)
+            for i in range(1, 50):
+                q.push_stretch(i / 100, 0.0, next(_SEQ))
+            sink.release()
+            assert wait_until(lambda: len(sink.events) == 50)
+            assert [v for _, v in sink.events] == [i / 100 for i in range(50)]
+            assert q.stats()["stretch_conflated"] == 0
+        finally:
+            q.stop()
+
+    def test_delivery_error_does_not_stop_consumer(self):
+        """配送先の例外でコンシューマが止まらない"""
+        received = []
+
+        def bad_stretch(value, event_time):
+            if value < 0:
+                raise ValueError("boom")
+            received.append(value)
+
+        q = OSCEventQueue(bad_stretch, lambda v, t: None, conflate=False)
+        q.start()
+        try:
+            q.push_stretch(-1.0, 0.0, next(_SEQ))
+            q.push_stretch(0.5, 0.0, next(_SEQ))
+            assert wait_until(lambda: received == [0.5])
+        finally:
+            q.stop()
+
+
+class TestSequencing:
+
+    def test_out_of_order_pushes_are_reordered(self, sink):
+        """追い越して push されたイベントは seq 順に並べ直して届く"""
+        q = OSCEventQueue(sink.stretch, sink.grabbed, conflate=False)
+        q.start()
+        try:
+            q.push_stretch(0.0, 0.0, 1)
+            assert sink.entered.wait(1.0)
+            q.push_stretch(0.3, 0.0, 4)
+            q.push_stretch(0.2, 0.0, 3)
+            q.push_grabbed(False, 0.0, 2)
+            sink.release()
+            assert wait_until(lambda: len(sink.events) == 4)
+            assert sink.events == [("S", 0.0), ("G", False), ("S", 0.2), ("S", 0.3)]
+            assert q.stats()["reordered"] == 2
+        finally:
+            q.stop()
+
+    def test_late_stretch_is_dropped_as_stale(self):
+        """新しい seq を渡した後に届いた Stretch は捨てて数える"""
+        got = []
+        q = OSCEventQueue(lambda v, t: got.append(v), lambda v, t: None, conflate=False)
+        q.start()
+        try:
+            q.push_stretch(0.5, 0.0, 10)
+            assert wait_until(lambda: got == [0.5])
+            q.push_stretch(0.4, 0.0, 9)
+            q.push_stretch(0.6, 0.0, 11)
+            assert wait_until(lambda: got == [0.5, 0.6])
+            stats = q.stats()
+            assert stats["stretch_stale"] == 1
+            assert stats["stretch_delivered"] == 2
+        finally:
+            q.stop()
+
+    def test_late_grabbed_is_applied_and_counted(self):
+        """追い越された IsGrabbed も状態遷移なので適用し、grabbed_stale に数える"""
+        grabs = []
+        q = OSCEventQueue(lambda v, t: None, lambda v, t: grabs.append(v), conflate=False)
+        q.start()
+        try:
+            q.push_stretch(0.5, 0.0, 10)
+            assert wait_until(lambda: q.stats()["stretch_delivered"] == 1)
+            q.push_grabbed(False, 0.0, 9)
+            assert wait_until(lambda: grabs == [False])
+            assert q.stats()["grabbed_stale"] == 1
+        finally:
+            q.stop()
+
+    def test_late_stretch_before_newer_stretch_is_conflated(self, sink):
+        """コンフレーション時、直後に新しい Stretch が待っている若い Stretch はまとめて捨てる"""
+        q = OSCEventQueue(sink.stretch, sink.grabbed, conflate=True)
+        q.start()
+        try:
+            q.push_stretch(0.0, 0.0, 1)
+            assert sink.entered.wait(1.0)
+            q.push_stretch(0.3, 0.0, 3)
+            q.push_stretch(0.2, 0.0, 2)
+            sink.release()
+            assert wait_until(lambda: len(sink.events) == 2)
+            assert sink.events == [("S", 0.0), ("S", 0.3)]
+            stats = q.stats()
+            assert stats["stretch_conflated"] == 1
+            assert stats["reordered"] == 0
+        finally:
+            q.stop()
+
+
+class TestChannels:
+
+    def test_channels_are_delivered_to_their_own_sinks_in_seq_order(self, sink):
+        """PhysBone ごとのチャネルは別の配送先に届き、受信順はチャネルをまたいで保たれる"""
+        order = []
+        q = OSCEventQueue(sink.stretch, sink.grabbed, conflate=True)
+        ch = q.add_channel(lambda v, t: order.append(("S2", v)), lambda v, t: order.append(("G2", v)))
+        q.start()
+        try:
+            q.push_stretch(0.0, 0.0, 1)
+            assert sink.entered.wait(1.0)
+            q.push_stretch(0.1, 0.0, 2)
+            q.push_stretch(0.7, 0.0, 3, channel=ch)
+            q.push_stretch(0.2, 0.0, 4)              # 末尾は別チャネルの Stretch なのでまとめない
+            q.push_stretch(0.8, 0.0, 5, channel=ch)
+            q.push_stretch(0.9, 0.0, 6, channel=ch)  # 同じチャネルの Stretch はまとめる
+            q.push_grabbed(True, 0.0, 7, channel=ch)
+            sink.release()
+            assert wait_until(lambda: len(order) == 3 and len(sink.events) == 3)
+            assert sink.events == [("S", 0.0), ("S", 0.1), ("S", 0.2)]
+            assert order == [("S2", 0.7), ("S2", 0.9), ("G2", True)]
+            assert q.stats()["stretch_conflated"] == 1
+        finally:
+            q.stop()
+
+    def test_calls_run_in_seq_order_and_split_conflation(self, sink):
+        """push_call は前後のイベントと受信順で実行され、その前後の Stretch はまとめない"""
+        q = OSCEventQueue(sink.stretch, sink.grabbed, conflate=True)
+        q.start()
+        try:
+            q.push_stretch(0.0, 0.0, 1)
+            assert sink.entered.wait(1.0)
+            q.push_stretch(0.1, 0.0, 2)
+            q.push_call(lambda: sink.events.append(("C", None)), 0.0, 4)
+            q.push_stretch(0.2, 0.0, 3)              # 追い越された Stretch も呼び出しの前に入る
+            q.push_stretch(0.3, 0.0, 5)
+            sink.release()
+            assert wait_until(lambda: len(sink.events) == 5)
+            assert sink.events == [("S", 0.0), ("S", 0.1), ("S", 0.2), ("C", None), ("S", 0.3)]
+            assert q.stats()["calls"] == 1
+        finally:
+            q.stop()
+
+    def test_post_runs_after_queued_events_on_the_consumer(self, sink):
+        """post はその時点の末尾に積まれ、コンシューマスレッドで実行される"""
+        q = OSCEventQueue(sink.stretch, sink.grabbed, conflate=True)
+        q.start()
+        threads = []
+        try:
+            q.push_stretch(0.0, 0.0, 1)
+            assert sink.entered.wait(1.0)
+            q.push_stretch(0.1, 0.0, 2)
+            q.post(lambda tag: (sink.events.append(("P", tag)), threads.append(threading.current_thread())), "t")
+            q.push_stretch(0.2, 0.0, 3)
+            sink.release()
+            assert wait_until(lambda: len(sink.events) == 4)
+            assert sink.events == [("S", 0.0), ("S", 0.1), ("P", "t"), ("S", 0.2)]
+            assert threads == [q._thread]
+        finally:
+            q.stop()
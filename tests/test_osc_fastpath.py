@@ -0,0 +1,111 @@
+"""
+osc/fastpath.py の単体テスト
+
+pythonosc の OscMessageBuilder で組み立てた本物のデータグラムを
+AddressTable.decode に通して、通常デコードと同じ値が得られることを確認する。
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+from pythonosc.osc_bundle_builder import OscBundleBuilder, IMMEDIATELY
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+from osc.fastpath import AddressTable, FALLBACK, INVALID, pad_address
+
+STRETCH = "/avatar/parameters/ShockPB_Stretch"
+IS_GRABBED = "/avatar/parameters/ShockPB_IsGrabbed"
+
+
+def _dgram(address: str, *args) -> bytes:
+    builder = OscMessageBuilder(address=address)
+    for arg in args:
+        builder.add_arg(arg)
+    return builder.build().dgram
+
+
+@pytest.fixture
+def table():
+    return AddressTable({STRETCH: "stretch", IS_GRABBED: "grabbed"})
+
+
+class TestPadAddress:
+
+    def test_padded_to_multiple_of_four(self):
+        """ヌル終端込みで 4 バイト境界に揃う"""
+        for addr in ["/a", "/ab", "/abc", "/abcd", STRETCH]:
+            padded = pad_address(addr)
+            assert len(padded) % 4 == 0
+            assert padded.startswith(addr.encode() + b"\x00")
+
+    def test_matches_builder_layout(self):
+        """OscMessageBuilder が作るアドレス部と一致する"""
+        dgram = _dgram(STRETCH, 0.5)
+        assert dgram.startswith(pad_address(STRETCH) + b",f")
+
+
+class TestAddressTableDecode:
+
+    def test_float(self, table):
+        route, value = table.decode(_dgram(STRETCH, 0.75))
+        assert route == "stretch"
+        assert value == pytest.approx(0.75)
+
+    def test_bool(self, table):
+        assert table.decode(_dgram(IS_GRABBED, True)) == ("grabbed", True)
+        assert table.decode(_dgram(IS_GRABBED, False)) == ("grabbed", False)
+
+    def test_int(self, table):
+        assert table.decode(_dgram(STRETCH, 3)) == ("stretch", 3)
+
+    def test_unknown_address_is_dropped(self, table):
+        """未知のアドレスは None（破棄）"""
+        assert table.decode(_dgram("/avatar/parameters/Other", 1.0)) is None
+        assert table.decode(_dgram("/avatar/parameters/ShockPB_Stretc", 1.0)) is None
+
+    def test_prefix_of_known_address_is_dropped(self, table):
+        """既知アドレスを前方一致で含むだけのアドレスは一致しない"""
+        assert table.decode(_dgram(STRETCH + "X", 1.0)) is None
+
+    def test_multiple_args_fall_back(self, table):
+        assert table.decode(_dgram(STRETCH, 0.1, 0.2)) is FALLBACK
+
+    def test_string_arg(self, table):
+        """文字列引数（/avatar/change のアバター ID など）は str で返す"""
+        avatar_id = "avtr_0123abcd-4567-89ef-0123-456789abcdef"
+        assert table.decode(_dgram(STRETCH, avatar_id)) == ("stretch", avatar_id)
+        assert table.decode(_dgram(STRETCH, "")) == ("stretch", "")
+
+    def test_unterminated_string_is_invalid(self, table):
+        dgram = _dgram(STRETCH, "abc")
+        assert table.decode(dgram[:-1]) is INVALID
+
+    def test_bundle_falls_back(self, table):
+        bundle = OscBundleBuilder(IMMEDIATELY)
+        bundle.add_content(OscMessageBuilder(address=STRETCH).build())
+        assert table.decode(bundle.build().dgram) is FALLBACK
+
+    def test_truncated_packets(self, table):
+        """途中で切れたパケットで例外を出さない"""
+        dgram = _dgram(STRETCH, 0.5)
+        for cut in range(len(dgram)):
+            result = table.decode(dgram[:cut])
+            assert result is None or result is FALLBACK or result is INVALID
+
+    def test_truncated_argument_is_invalid(self, table):
+        """既知アドレスで引数が途切れているものは INVALID"""
+        dgram = _dgram(STRETCH, 0.5)
+        assert table.decode(dgram[:-2]) is INVALID
+
+    def test_missing_terminator_is_invalid(self, table):
+        assert table.decode(b"/avatar/parameters/ShockPB") is INVALID
+
+    def test_empty(self, table):
+        assert table.decode(b"") is INVALID
+
+    def test_contains_and_len(self, table):
+        assert STRETCH in table
+        assert "/avatar/parameters/Other" not in table
+        assert len(table) == 2
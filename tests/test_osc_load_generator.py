@@ -0,0 +1,101 @@
+"""
+tools/osc_load_generator.py のテスト
+
+引っ張り方ごとのサンプル形状と、生成したパケットが OSCReceiver で
+設定どおりのアドレス・値として受信されることを確認する。
+"""
+
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "tools"))
+
+import pytest
+
+import settings as s_mod
+from grab_traces import PROFILES, profile_samples
+from osc.fastpath import AddressTable
+from osc.receiver import OSCReceiver
+from osc_load_generator import build_schedule, prefix_addresses, send
+
+STRETCH = s_mod.settings.osc.stretch_param
+IS_GRABBED = s_mod.settings.osc.is_grabbed_param
+
+
+class TestProfiles:
+
+    @pytest.mark.parametrize("profile", PROFILES)
+    def test_samples_are_ordered_and_in_range(self, profile):
+        samples, release_at = profile_samples(profile, rate=100.0)
+        times = [t for t, _ in samples]
+        assert times == sorted(times)
+        assert times[-1] < release_at
+        assert all(0.0 <= v <= 1.0 for _, v in samples)
+
+    def test_rate_sets_sample_count(self):
+        slow, _ = profile_samples("hold", rate=10.0, duration=1.0)
+        fast, _ = profile_samples("hold", rate=2000.0, duration=1.0)
+        assert len(slow) == 10
+        assert len(fast) == 2000
+
+    def test_yank_settles_before_pulling(self):
+        samples, _ = profile_samples("yank", rate=1000.0, peak=0.8, settle=0.15)
+        first_move = next(t for t, v in samples if v > 0)
+        assert first_move >= 0.15
+        assert max(v for _, v in samples) == pytest.approx(0.8)
+
+    def test_tugs_return_between_pulls(self):
+        samples, _ = profile_samples("tugs", rate=200.0, peak=0.6, tugs=3)
+        peaks = sum(1 for (_, a), (_, b), (_, c) in zip(samples, samples[1:], samples[2:]) if a < b > c)
+        assert peaks == 3
+
+
+def test_prefix_addresses_follow_settings():
+    pairs = prefix_addresses(STRETCH, IS_GRABBED, 3)
+    assert pairs[0] == (STRETCH, IS_GRABBED)
+    head, _, name = STRETCH.rpartition("/")
+    base = name.rpartition("_")[0]
+    assert pairs[2][0] == f"{head}/{base}3_Stretch"
+    assert len({a for pair in pairs for a in pair}) == 6
+
+
+def test_schedule_is_time_ordered_and_decodable():
+    schedule, total = build_schedule(
+        "tugs", 500.0, prefixes=4, repeat=2, gap=0.1,
+        stretch_param=STRETCH, is_grabbed_param=IS_GRABBED, noise_rate=1000.0, noise_params=10,
+    )
+    events = list(schedule)
+    assert [t for t, _ in events] == sorted(t for t, _ in events)
+    assert events[-1][0] <= total
+
+    table = AddressTable()
+    for stretch, grabbed in prefix_addresses(STRETCH, IS_GRABBED, 4):
+        table.add(stretch, stretch)
+        table.add(grabbed, grabbed)
+    known = [table.decode(d) for _, d in events]
+    assert all(r is None or isinstance(r, tuple) for r in known)
+    assert sum(1 for r in known if r is None) == int(total * 1000.0)   # ノイズは未知アドレス
+
+
+def test_sends_to_receiver():
+    events = []
+    r = OSCReceiver(port=0, backend="selector")
+    r.on_stretch_change = lambda v, t, seq: events.append(("S", v))
+    r.on_grabbed_change = lambda v, t, seq: events.append(("G", v))
+    r.start()
+    try:
+        schedule, _ = build_schedule(
+            "yank", 200.0, prefixes=1, repeat=1, gap=0.0,
+            stretch_param=STRETCH, is_grabbed_param=IS_GRABBED, peak=0.5,
+        )
+        result = send(schedule, r.address)
+        deadline = time.monotonic() + 2.0
+        while len(events) < result["sent"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        r.stop()
+    assert len(events) == result["sent"]
+    assert events[0] == ("G", True)
+    assert ("G", False) in events
+    assert max(v for k, v in events if k == "S") == pytest.approx(0.5)
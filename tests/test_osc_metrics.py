@@ -0,0 +1,144 @@
+"""
+osc/metrics.py のテスト
+
+カウンタ単体の計算と、OSCReceiver に実際のパケットを送ったときの集計を確認する。
+"""
+
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+from pythonosc.osc_message_builder import OscMessageBuilder
+from pythonosc.udp_client import SimpleUDPClient
+
+import settings as s_mod
+from osc.metrics import AddressCounter, ReceiverMetrics, StretchCounter
+from osc.receiver import OSCReceiver
+from tests.conftest import wait_until
+
+STRETCH = s_mod.settings.osc.stretch_param
+IS_GRABBED = s_mod.settings.osc.is_grabbed_param
+
+
+class TestAddressCounter:
+
+    def test_pps_is_previous_full_second(self):
+        c = AddressCounter("/a")
+        for i in range(30):
+            c.hit(100.0 + i / 30)       # 100 秒台に 30 個
+        c.hit(101.2)
+        assert c.count == 31
+        assert c.pps(101.5) == 30       # 直前の 1 秒（100 秒台）
+        assert c.pps(102.1) == 1        # 101 秒台に 1 個
+
+    def test_pps_is_zero_after_silence(self):
+        c = AddressCounter("/a")
+        c.hit(10.0)
+        assert c.pps(15.0) == 0
+
+    def test_gap_resets_pps(self):
+        c = AddressCounter("/a")
+        for _ in range(5):
+            c.hit(10.5)
+        c.hit(20.0)                     # 間が空いたので直前の 1 秒は 0 個
+        assert c.pps(20.5) == 0
+
+
+class TestStretchHistogram:
+
+    def test_buckets(self):
+        c = StretchCounter(STRETCH)
+        t = 0.0
+        for dt in (0.0005, 0.011, 0.011, 0.09, 5.0):
+            c.hit(t)
+            t += dt
+        c.hit(t)
+        h = c.histogram_snapshot()
+        assert h["<=1ms"] == 1
+        assert h["<=20ms"] == 2
+        assert h["<=100ms"] == 1
+        assert h[">1000ms"] == 1
+        assert sum(h.values()) == 5
+
+
+def test_snapshot_includes_sources():
+    m = ReceiverMetrics([STRETCH], STRETCH)
+    m.add_source("queue", lambda: {"stretch_conflated": 3})
+    snap = m.snapshot()
+    assert snap["queue"] == {"stretch_conflated": 3}
+    assert snap["addresses"][STRETCH]["count"] == 0
+
+
+@pytest.mark.parametrize("backend", ["selector", "threading"])
+def test_receiver_counts_addresses_and_unknown(backend):
+    r = OSCReceiver(port=0, backend=backend)
+    r.start()
+    try:
+        client = SimpleUDPClient("127.0.0.1", r.address[1])
+        for i in range(10):
+            client.send_message(STRETCH, i / 10)
+        client.send_message(IS_GRABBED, True)
+        client.send_message("/avatar/parameters/Other", 1.0)
+        client.send_message("/avatar/parameters/Other", 2.0)
+        assert wait_until(lambda: r.metrics.datagrams == 13)
+        snap = r.metrics.snapshot()
+        assert snap["addresses"][STRETCH]["count"] == 10
+        assert snap["addresses"][IS_GRABBED]["count"] == 1
+        assert snap["unknown"] == 2
+        assert snap["endpoints"]["local"]["count"] == 13
+        assert sum(snap["stretch_interarrival"].values()) == 9
+    finally:
+        r.stop()
+
+
+def test_receiver_counts_decode_failures():
+    r = OSCReceiver(port=0, backend="selector")
+    r.start()
+    try:
+        builder = OscMessageBuilder(address=STRETCH)
+        builder.add_arg(0.5)
+        truncated = builder.build().dgram[:-2]
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.sendto(truncated, r.address)
+        sock.sendto(b"garbage-without-terminator", r.address)
+        sock.close()
+        assert wait_until(lambda: r.metrics.decode_failures == 2)
+        assert r.metrics.counter(STRETCH).count == 0
+    finally:
+        r.stop()
+
+
+def test_snapshot_is_readable_while_receiving():
+    """受信中に別スレッドからロックなしで読んでも例外にならない"""
+    r = OSCReceiver(port=0, backend="selector")
+    r.start()
+    errors = []
+    done = threading.Event()
+
+    def reader():
+        while not done.is_set():
+            try:
+                r.metrics.snapshot()
+            except Exception as e:
+                errors.append(e)
+            time.sleep(0)
+
+    t = threading.Thread(target=reader)
+    t.start()
+    try:
+        client = SimpleUDPClient("127.0.0.1", r.address[1])
+        for i in range(500):
+            client.send_message(STRETCH, i / 500)
+            if i % 50 == 49:
+                time.sleep(0.005)
+        assert wait_until(lambda: r.metrics.datagrams > 0)
+        time.sleep(0.1)
+    finally:
+        done.set()
+        t.join()
+        r.stop()
+    assert errors == []
@@ -0,0 +1,122 @@
+"""
+osc/oscquery.py のテスト
+
+VRChat の代わりにローカルの簡易クライアントで HTTP エンドポイントを問い合わせ、
+広告されるツリーに ShockPB パラメータだけが含まれることを確認する。
+"""
+
+import json
+import sys
+import urllib.error
+import urllib.request
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+
+import settings as s_mod
+from osc.oscquery import OSCQueryService, build_tree, find_node
+from osc.receiver import AVATAR_CHANGE, OSCReceiver
+
+STRETCH = "/avatar/parameters/ShockPB_Stretch"
+IS_GRABBED = "/avatar/parameters/ShockPB_IsGrabbed"
+
+
+class _StandInClient:
+    """VRChat の代わりに OSCQuery サービスを問い合わせる簡易クライアント。"""
+
+    def __init__(self, http_address: tuple[str, int]):
+        self._base = f"http://{http_address[0]}:{http_address[1]}"
+
+    def get(self, path: str):
+        with urllib.request.urlopen(self._base + path, timeout=2.0) as res:
+            body = res.read()
+            return res.status, json.loads(body) if body else None
+
+    def host_info(self) -> dict:
+        return self.get("/?HOST_INFO")[1]
+
+    def leaves(self) -> dict[str, str]:
+        """ルートからツリーをたどり、末端パラメータの FULL_PATH → TYPE を返す。"""
+        found = {}
+
+        def walk(node):
+            if "CONTENTS" in node:
+                for child in node["CONTENTS"].values():
+                    walk(child)
+            else:
+                found[node["FULL_PATH"]] = node["TYPE"]
+        walk(self.get("/")[1])
+        return found
+
+
+@pytest.fixture
+def service():
+    svc = OSCQueryService("TestService", 9001, {STRETCH: "f", IS_GRABBED: "T"}, mdns=False)
+    svc.start()
+    yield svc
+    svc.stop()
+
+
+class TestBuildTree:
+
+    def test_nested_containers(self):
+        tree = build_tree({STRETCH: "f", IS_GRABBED: "T"})
+        params = find_node(tree, "/avatar/parameters")
+        assert params["FULL_PATH"] == "/avatar/parameters"
+        assert params["ACCESS"] == 0
+        assert set(params["CONTENTS"]) == {"ShockPB_Stretch", "ShockPB_IsGrabbed"}
+
+    def test_leaf_is_write_only(self):
+        leaf = find_node(build_tree({STRETCH: "f"}), STRETCH)
+        assert leaf == {"FULL_PATH": STRETCH, "ACCESS": 2, "TYPE": "f"}
+
+    def test_find_missing(self):
+        assert find_node(build_tree({STRETCH: "f"}), "/avatar/parameters/Other") is None
+
+
+class TestHTTPEndpoint:
+
+    def test_host_info(self, service):
+        info = _StandInClient(service.http_address).host_info()
+        assert info["NAME"] == "TestService"
+        assert info["OSC_PORT"] == 9001
+        assert info["OSC_TRANSPORT"] == "UDP"
+
+    def test_tree_has_only_advertised_parameters(self, service):
+        client = _StandInClient(service.http_address)
+        assert client.leaves() == {STRETCH: "f", IS_GRABBED: "T"}
+
+    def test_node_and_attribute_queries(self, service):
+        client = _StandInClient(service.http_address)
+        assert client.get(STRETCH)[1]["TYPE"] == "f"
+        assert client.get(STRETCH + "?TYPE") == (200, {"TYPE": "f"})
+        assert client.get(STRETCH + "?VALUE") == (204, None)
+
+    def test_unknown_path_is_404(self, service):
+        client = _StandInClient(service.http_address)
+        with pytest.raises(urllib.error.HTTPError) as e:
+            client.get("/avatar/parameters/Other")
+        assert e.value.code == 404
+
+
+def test_receiver_advertises_shockpb_parameters(monkeypatch):
+    """[osc] oscquery を有効にすると、受信ポートと ShockPB の 4 パラメータ（と /avatar/change）が広告される"""
+    osc = s_mod.settings.osc
+    monkeypatch.setattr(osc, "oscquery", True)
+    r = OSCReceiver(port=0)
+    r.start()
+    try:
+        assert r.oscquery is not None
+        client = _StandInClient(r.oscquery.http_address)
+        assert client.host_info()["OSC_PORT"] == r.address[1]
+        assert client.leaves() == {
+            osc.stretch_param: "f",
+            osc.is_grabbed_param: "T",
+            osc.angle_param: "f",
+            osc.is_posed_param: "T",
+            AVATAR_CHANGE: "s",
+        }
+    finally:
+        r.stop()
+    assert r.oscquery is None
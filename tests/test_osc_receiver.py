@@ -0,0 +1,390 @@
+"""
+osc/receiver.py の結合テスト
+
+ループバックの空きポートで OSCReceiver を起動し、
+実際の UDP パケットを送ってコールバックまで届くことを確認する。
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+from pythonosc.udp_client import SimpleUDPClient
+
+import settings as s_mod
+from osc.receiver import OSCReceiver
+from tests.conftest import wait_until
+
+STRETCH = s_mod.settings.osc.stretch_param
+IS_GRABBED = s_mod.settings.osc.is_grabbed_param
+
+
+@pytest.fixture(params=["selector", "threading"])
+def receiver(request):
+    r = OSCReceiver(port=0, backend=request.param)
+    yield r
+    r.stop()
+
+
+def _client(receiver: OSCReceiver) -> SimpleUDPClient:
+    return SimpleUDPClient("127.0.0.1", receiver.address[1])
+
+
+# =========================================================
+# 基本動作
+# =========================================================
+
+class TestOSCReceiver:
+
+    def test_stretch_and_grabbed_are_delivered(self, receiver):
+        """Stretch / IsGrabbed がそれぞれのコールバックに届く"""
+        stretches, grabs = [], []
+        receiver.on_stretch_change = lambda v, t, seq: stretches.append(v)
+        receiver.on_grabbed_change = lambda v, t, seq: grabs.append(v)
+        receiver.start()
+
+        client = _client(receiver)
+        client.send_message(IS_GRABBED, True)
+        assert wait_until(lambda: grabs == [True])
+        client.send_message(STRETCH, 0.5)
+        assert wait_until(lambda: len(stretches) == 1)
+        assert stretches[0] == pytest.approx(0.5)
+
+    def test_unknown_address_is_ignored(self, receiver):
+        """購読していないアドレスはコールバックを呼ばない"""
+        stretches = []
+        receiver.on_stretch_change = lambda v, t, seq: stretches.append(v)
+        receiver.start()
+
+        client = _client(receiver)
+        client.send_message("/avatar/parameters/Other", 1.0)
+        client.send_message(STRETCH, 0.25)
+        assert wait_until(lambda: len(stretches) == 1)
+        assert stretches[0] == pytest.approx(0.25)
+
+    def test_event_time_is_receive_time(self, receiver):
+        """コールバックには perf_counter 基準の受信時刻が渡り、ハンドラの遅延を含まない"""
+        times = []
+
+        def slow(value, event_time, seq):
+            times.append(event_time)
+            time.sleep(0.05)
+
+        receiver.on_stretch_change = slow
+        receiver.start()
+        client = _client(receiver)
+        sent_at = time.perf_counter()
+        for i in range(3):
+            client.send_message(STRETCH, i / 10)
+        assert wait_until(lambda: len(times) == 3)
+        assert times == sorted(times)
+        assert times[0] >= sent_at - 0.01
+        if receiver.batch_stats.batches:
+            # selector: 3 個とも 1 回目の sleep 中に届いているので時刻の差は小さい
+            assert times[-1] - times[0] < 0.04
+
+    def test_stop_releases_port(self, receiver):
+        """stop() 後は同じポートで再度 bind できる"""
+        receiver.start()
+        port = receiver.address[1]
+        receiver.stop()
+
+        again = OSCReceiver(port=port, backend="selector")
+        again.start()
+        try:
+            assert again.address[1] == port
+        finally:
+            again.stop()
+
+    def test_debug_log_flags_are_read_at_start(self, receiver, monkeypatch, caplog):
+        """[debug] log_stretch は start() の時点の値を使い、パケットごとには読まない"""
+        monkeypatch.setattr(s_mod.settings.debug, "log_stretch", True)
+        stretches = []
+        receiver.on_stretch_change = lambda v, t, seq: stretches.append(v)
+        receiver.start()
+        monkeypatch.setattr(s_mod.settings.debug, "log_stretch", False)
+
+        with caplog.at_level("INFO", logger="osc.receiver"):
+            _client(receiver).send_message(STRETCH, 0.5)
+            assert wait_until(lambda: len(stretches) == 1)
+        assert any("[STRETCH]" in r.getMessage() for r in caplog.records)
+
+
+def test_selector_backend_uses_single_thread(monkeypatch):
+    """selector バックエンドはパケット数に関係なく受信スレッドが 1 本のまま"""
+    monkeypatch.setattr(s_mod.settings.osc, "shed_batch_size", 0)
+    received = []
+    r = OSCReceiver(port=0, backend="selector")
+    r.on_stretch_change = lambda v, t, seq: received.append(v)
+    before = threading.active_count()
+    r.start()
+    try:
+        client = _client(r)
+        for i in range(200):
+            client.send_message(STRETCH, i / 200)
+        assert wait_until(lambda: len(received) == 200)
+        assert threading.active_count() == before + 1
+    finally:
+        r.stop()
+
+
+# =========================================================
+# バッチ読み切り・過負荷時の間引き
+# =========================================================
+
+def _route(addr: str, sheddable: bool):
+    return (addr, None, sheddable)
+
+
+class TestShedStale:
+
+    S = _route("stretch", True)
+    A = _route("angle", True)
+    G = _route("grabbed", False)
+
+    def test_keeps_latest_stretch_per_segment(self):
+        """IsGrabbed の間にある Stretch は最新の 1 個だけ残り、順序は変わらない"""
+        batch = [(self.S, 0.1), (self.S, 0.2), (self.G, True),
+                 (self.S, 0.3), (self.S, 0.4), (self.S, 0.5), (self.G, False), (self.S, 0.6)]
+        kept, shed = OSCReceiver._shed_stale(batch)
+        assert kept == [(self.S, 0.2), (self.G, True), (self.S, 0.5), (self.G, False), (self.S, 0.6)]
+        assert shed == 3
+
+    def test_never_sheds_grabbed(self):
+        batch = [(self.G, True), (self.G, False), (self.G, True)]
+        kept, shed = OSCReceiver._shed_stale(batch)
+        assert kept == batch
+        assert shed == 0
+
+    def test_addresses_are_independent(self):
+        """アドレスごとに最新値が残る"""
+        batch = [(self.S, 0.1), (self.A, 10.0), (self.S, 0.2), (self.A, 20.0)]
+        kept, shed = OSCReceiver._shed_stale(batch)
+        assert kept == [(self.S, 0.2), (self.A, 20.0)]
+        assert shed == 2
+
+    def test_fallback_items_act_as_boundaries(self):
+        """高速パス外のパケット（route=None）は捨てず、区切りとして扱う"""
+        batch = [(self.S, 0.1), (None, b"raw"), (self.S, 0.2)]
+        kept, shed = OSCReceiver._shed_stale(batch)
+        assert kept == batch
+        assert shed == 0
+
+
+def test_burst_is_drained_in_one_batch_and_shed(monkeypatch):
+    """ハンドラが詰まっている間に溜まったバーストは 1 回でまとめて読まれ、古い Stretch が間引かれる"""
+    monkeypatch.setattr(s_mod.settings.osc, "shed_batch_size", 8)
+    gate = threading.Event()
+    events = []
+
+    def on_stretch(value, event_time, seq):
+        events.append(("S", round(value, 3)))
+        if len(events) == 1:
+            gate.wait(timeout=2.0)
+
+    r = OSCReceiver(port=0, backend="selector")
+    r.on_stretch_change = on_stretch
+    r.on_grabbed_change = lambda v, t, seq: events.append(("G", v))
+    r.start()
+    try:
+        client = _client(r)
+        client.send_message(STRETCH, 0.0)
+        assert wait_until(lambda: len(events) == 1)
+        # 受信スレッドが止まっている間にバーストを送る
+        for i in range(1, 11):
+            client.send_message(STRETCH, i / 100)
+        client.send_message(IS_GRABBED, False)
+        client.send_message(STRETCH, 0.5)
+        time.sleep(0.1)
+        gate.set()
+
+        assert wait_until(lambda: events[-1] == ("S", 0.5))
+        assert events == [("S", 0.0), ("S", 0.1), ("G", False), ("S", 0.5)]
+        stats = r.batch_stats.snapshot()
+        assert stats["max_batch"] == 12
+        assert stats["shed"] == 9
+    finally:
+        r.stop()
+
+
+# =========================================================
+# 受信順の通し番号と単一コンシューマ
+# =========================================================
+
+def test_seq_follows_arrival_order(receiver):
+    """コールバックに渡る seq は受信順に 1 から振られる"""
+    seqs = []
+    receiver.on_stretch_change = lambda v, t, seq: seqs.append(seq)
+    receiver.on_grabbed_change = lambda v, t, seq: seqs.append(seq)
+    receiver.start()
+    client = _client(receiver)
+    for i in range(5):
+        client.send_message(STRETCH, i / 10)
+        time.sleep(0.005)
+    client.send_message(IS_GRABBED, True)
+    assert wait_until(lambda: len(seqs) == 6)
+    assert sorted(seqs) == [1, 2, 3, 4, 5, 6]
+
+
+def test_concurrent_senders_are_applied_in_arrival_order(receiver, monkeypatch):
+    """複数の送信元から同時に送っても、状態機械へは受信順に 1 本のスレッドで適用される"""
+    from osc.event_queue import OSCEventQueue
+
+    monkeypatch.setattr(s_mod.settings.osc, "kernel_timestamps", False)
+    monkeypatch.setattr(s_mod.settings.osc, "shed_batch_size", 0)
+    applied = []
+    consumer_threads = set()
+
+    def on_stretch(value, event_time):
+        consumer_threads.add(threading.get_ident())
+        applied.append((event_time, round(value)))
+
+    q = OSCEventQueue(on_stretch, lambda v, t: None, conflate=False)
+    q.start()
+    receiver.on_stretch_change = q.push_stretch
+    receiver.on_grabbed_change = q.push_grabbed
+    receiver.start()
+
+    senders, per_sender = 4, 150
+
+    def send(sender_id: int):
+        client = _client(receiver)
+        for i in range(per_sender):
+            client.send_message(STRETCH, float(sender_id * 1000 + i))
+            if i % 10 == 9:
+                time.sleep(0.001)
+
+    threads = [threading.Thread(target=send, args=(n,)) for n in range(senders)]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        def settled():
+            s = q.stats()
+            return s["pending"] == 0 and s["stretch_received"] == s["stretch_delivered"] + s["stretch_stale"]
+        last = -1
+        while q.stats()["stretch_received"] != last:
+            last = q.stats()["stretch_received"]
+            time.sleep(0.2)
+        assert wait_until(settled)
+
+        stats = q.stats()
+        assert stats["stretch_received"] > 0
+        assert stats["stretch_delivered"] == len(applied)
+        assert len(consumer_threads) == 1
+        # 受信時刻（受信順）で単調、かつ送信元ごとの順序も保たれている
+        times = [t for t, _ in applied]
+        assert times == sorted(times)
+        for n in range(senders):
+            values = [v for _, v in applied if v // 1000 == n]
+            assert values == sorted(values)
+            assert len(set(values)) == len(values)
+    finally:
+        q.stop()
+
+
+# =========================================================
+# 複数 PhysBone のルーティング
+# =========================================================
+
+def test_physbones_are_routed_to_their_own_callbacks(monkeypatch):
+    """[physbones] で追加した PhysBone は同じソケットで受信し、それぞれのルートに届く"""
+    from physbones import configured_physbones
+    monkeypatch.setattr(s_mod.settings, "physbones", {"Collar": {}, "Leash": {}})
+    physbones = configured_physbones()
+    r = OSCReceiver(port=0, backend="selector", physbones=physbones)
+    got = []
+    for name, route in r.routes.items():
+        route.on_stretch_change = lambda v, t, seq, name=name: got.append((name, "S", round(v, 3), seq))
+        route.on_grabbed_change = lambda v, t, seq, name=name: got.append((name, "G", v, seq))
+    r.start()
+    try:
+        client = _client(r)
+        client.send_message(physbones[1].is_grabbed_param, True)
+        client.send_message(physbones[2].stretch_param, 0.4)
+        client.send_message(STRETCH, 0.1)
+        client.send_message(physbones[1].stretch_param, 0.2)
+        assert wait_until(lambda: len(got) == 4)
+    finally:
+        r.stop()
+    assert [g[:3] for g in got] == [
+        ("Collar", "G", True), ("Leash", "S", 0.4), (physbones[0].name, "S", 0.1), ("Collar", "S", 0.2)]
+    assert [g[3] for g in got] == [1, 2, 3, 4]
+    assert r.metrics.snapshot()["addresses"][physbones[2].stretch_param]["count"] == 1
+
+
+# =========================================================
+# アバターごとのプロファイル
+# =========================================================
+
+@pytest.mark.parametrize("backend", ["selector", "threading"])
+def test_avatar_change_switches_address_table(backend):
+    """/avatar/change の直後に届いた新しいアバターの PhysBone は、同じバースト内でも新しいテーブルで受信する"""
+    from physbones import build_physbones, configured_physbones, rename_param
+    osc = s_mod.settings.osc
+    collar = rename_param(STRETCH, "Collar")
+    avatar = build_physbones(*(rename_param(p, "Collar") for p in (
+        osc.stretch_param, osc.is_grabbed_param, osc.angle_param, osc.is_posed_param)), {})
+    r = OSCReceiver(port=0, backend=backend, physbones=configured_physbones(),
+                    avatar_profiles={"avtr_collar": avatar})
+    got = []
+    for name, route in r.routes.items():
+        route.on_stretch_change = lambda v, t, seq, name=name: got.append((name, round(v, 3), seq))
+    r.on_avatar_change = lambda a, t, seq: got.append(("avatar", a, seq))
+    r.start()
+    try:
+        client = _client(r)
+        client.send_message(collar, 0.1)          # 既定のプロファイルでは受信しない
+        client.send_message("/avatar/change", "avtr_collar")
+        client.send_message(collar, 0.2)
+        client.send_message(STRETCH, 0.3)         # 切り替え後は受信しない
+        client.send_message("/avatar/change", "avtr_other")
+        client.send_message(STRETCH, 0.4)
+        assert wait_until(lambda: len(got) == 4)
+        time.sleep(0.05)
+    finally:
+        r.stop()
+    assert [g[:2] for g in got] == [
+        ("avatar", "avtr_collar"), ("Collar", 0.2), ("avatar", "avtr_other"), ("ShockPB", 0.4)]
+    assert r.avatar_id == "avtr_other"
+    assert r.metrics.snapshot()["addresses"]["/avatar/change"]["count"] == 2
+
+
+# =========================================================
+# 複数ソケットでの待ち受け
+# =========================================================
+
+def test_listen_addresses_share_one_selector_loop(monkeypatch):
+    """[osc] listen_addresses のソケット（IPv6 を含む）も同じ受信スレッドで受け、タグごとに数える"""
+    import socket
+    from osc.receiver import parse_listen_address
+    assert parse_listen_address("quest=0.0.0.0:9001") == ("quest", "0.0.0.0", 9001)
+    assert parse_listen_address("[::]:9001") == ("[::]:9001", "::", 9001)
+
+    monkeypatch.setattr(s_mod.settings.osc, "listen_addresses", ["lan=127.0.0.1:0", "v6=[::1]:0", "bad", "lan=x:1"])
+    r = OSCReceiver(port=0, backend="selector")
+    got = []
+    r.on_stretch_change = lambda v, t, seq: got.append((round(v, 3), seq))
+    r.start()
+    try:
+        assert set(r.addresses) == {"local", "lan", "v6"}
+        assert sum(1 for th in threading.enumerate() if th.name == "OSCReceiver") == 1
+        _client(r).send_message(STRETCH, 0.1)
+        assert wait_until(lambda: len(got) == 1)
+        SimpleUDPClient("127.0.0.1", r.addresses["lan"][1]).send_message(STRETCH, 0.2)
+        assert wait_until(lambda: len(got) == 2)
+        v6 = SimpleUDPClient("::1", r.addresses["v6"][1], family=socket.AF_INET6)
+        v6.send_message(STRETCH, 0.3)
+        v6.send_message(IS_GRABBED, True)
+        assert wait_until(lambda: len(got) == 3 and r.metrics.datagrams == 4)
+    finally:
+        r.stop()
+    assert got == [(0.1, 1), (0.2, 2), (0.3, 3)]
+    endpoints = r.metrics.snapshot()["endpoints"]
+    assert {tag: e["count"] for tag, e in endpoints.items()} == {"local": 1, "lan": 1, "v6": 2}
+    assert endpoints["v6"]["bytes"] > 0
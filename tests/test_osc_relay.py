@@ -0,0 +1,181 @@
+"""
+osc/relay.py のテスト
+
+ループバックの UDP ソケットを転送先にして、受信したデータグラムが
+そのままのバイト列で転送されること、送れないときも受信処理を止めないことを確認する。
+"""
+
+import socket
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+from pythonosc.osc_message_builder import OscMessageBuilder
+from pythonosc.udp_client import SimpleUDPClient
+
+import settings as s_mod
+from osc.receiver import OSCReceiver
+from osc.relay import OSCRelay, parse_target
+from tests.conftest import wait_until
+
+STRETCH = s_mod.settings.osc.stretch_param
+
+
+def _dgram(address: str, value: float) -> bytes:
+    builder = OscMessageBuilder(address=address)
+    builder.add_arg(value, OscMessageBuilder.ARG_TYPE_FLOAT)
+    return builder.build().dgram
+
+
+@pytest.fixture
+def downstream():
+    """転送先の OSC アプリの代わりに受信するソケット。"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(2.0)
+    yield sock
+    sock.close()
+
+
+def _recv_all(sock: socket.socket, count: int) -> list[bytes]:
+    return [sock.recvfrom(65535)[0] for _ in range(count)]
+
+
+class _WouldBlockSocket:
+    """送信バッファが一杯の状態を再現する送信ソケット（selector 登録用に本物の fd を持つ）。"""
+
+    def __init__(self):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def fileno(self):
+        return self._sock.fileno()
+
+    def sendto(self, data, address):
+        raise BlockingIOError
+
+    def close(self):
+        self._sock.close()
+
+
+class TestOSCRelay:
+
+    def test_parse_target(self):
+        assert parse_target("127.0.0.1:9002") == ("127.0.0.1", 9002)
+        assert parse_target("localhost:9100") == ("localhost", 9100)
+        assert parse_target("[::1]:9002") == ("::1", 9002)
+        with pytest.raises(ValueError):
+            parse_target("9002")
+
+    def test_forwards_bytes_unchanged(self, downstream):
+        relay = OSCRelay([downstream.getsockname()])
+        try:
+            dgrams = [_dgram(STRETCH, 0.5), _dgram("/avatar/parameters/Other", 1.0)]
+            assert relay.forward(dgrams)
+            assert _recv_all(downstream, 2) == dgrams
+            assert relay.stats()[f"127.0.0.1:{downstream.getsockname()[1]}"]["sent"] == 2
+        finally:
+            relay.close()
+
+    def test_forwards_to_ipv6_and_ipv4_targets(self, downstream):
+        """IPv6 の転送先（"[::1]:port"）には IPv6 のソケットで送る"""
+        v6 = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM)
+        v6.bind(("::1", 0))
+        v6.settimeout(2.0)
+        relay = OSCRelay([parse_target(f"[::1]:{v6.getsockname()[1]}"), downstream.getsockname()])
+        try:
+            dgram = _dgram(STRETCH, 0.5)
+            assert relay.forward([dgram])
+            assert _recv_all(v6, 1) == [dgram]
+            assert _recv_all(downstream, 1) == [dgram]
+            assert set(relay.sockets) == {socket.AF_INET, socket.AF_INET6}
+            stats = relay.stats()[f"[::1]:{v6.getsockname()[1]}"]
+            assert (stats["sent"], stats["errors"]) == (1, 0)
+        finally:
+            relay.close()
+            v6.close()
+
+    def test_unresolvable_target_is_dropped(self, downstream):
+        relay = OSCRelay([("no-such-host.invalid", 9002), downstream.getsockname()])
+        try:
+            assert relay.targets == [downstream.getsockname()]
+        finally:
+            relay.close()
+
+    def test_blocked_target_keeps_bounded_queue(self):
+        """送れない間は上限まで溜め、溢れた分は古いものから捨てる"""
+        relay = OSCRelay([("127.0.0.1", 9)], queue_size=4)
+        relay.sockets[socket.AF_INET].close()
+        relay.sockets[socket.AF_INET] = _WouldBlockSocket()
+        assert not relay.forward([bytes([i]) for i in range(10)])
+        stats = relay.stats()["127.0.0.1:9"]
+        assert stats["pending"] == 4
+        assert stats["dropped"] == 6
+        assert list(relay._targets[0].queue) == [bytes([i]) for i in range(6, 10)]
+
+
+@pytest.mark.parametrize("backend", ["selector", "threading"])
+def test_receiver_relays_raw_datagrams(backend, downstream, monkeypatch):
+    """受信したデータグラム（未知アドレス含む）が転送され、自分のコールバックにも届く"""
+    monkeypatch.setattr(s_mod.settings.osc, "relay_targets", [f"127.0.0.1:{downstream.getsockname()[1]}"])
+    stretches = []
+    r = OSCReceiver(port=0, backend=backend)
+    r.on_stretch_change = lambda v, t, seq: stretches.append(v)
+    r.start()
+    try:
+        client = SimpleUDPClient("127.0.0.1", r.address[1])
+        client.send_message("/avatar/parameters/Other", 1.0)
+        client.send_message(STRETCH, 0.5)
+        assert _recv_all(downstream, 2) == [_dgram("/avatar/parameters/Other", 1.0), _dgram(STRETCH, 0.5)]
+        assert wait_until(lambda: stretches == [0.5])
+    finally:
+        r.stop()
+
+
+@pytest.mark.parametrize("backend", ["selector", "threading"])
+def test_receiver_relays_to_ipv6_target(backend, monkeypatch):
+    v6 = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM)
+    v6.bind(("::1", 0))
+    v6.settimeout(2.0)
+    monkeypatch.setattr(s_mod.settings.osc, "relay_targets", [f"[::1]:{v6.getsockname()[1]}"])
+    r = OSCReceiver(port=0, backend=backend)
+    r.start()
+    try:
+        SimpleUDPClient("127.0.0.1", r.address[1]).send_message(STRETCH, 0.5)
+        assert _recv_all(v6, 1) == [_dgram(STRETCH, 0.5)]
+    finally:
+        r.stop()
+        v6.close()
+
+
+def test_blocked_relay_does_not_delay_handling(monkeypatch):
+    """転送先に送れなくても、自分の Stretch 処理は止まらない"""
+    monkeypatch.setattr(s_mod.settings.osc, "relay_targets", ["127.0.0.1:9"])
+    monkeypatch.setattr(s_mod.settings.osc, "relay_queue_size", 8)
+    monkeypatch.setattr(s_mod.settings.osc, "shed_batch_size", 0)
+    stretches = []
+    r = OSCReceiver(port=0, backend="selector")
+    r.on_stretch_change = lambda v, t, seq: stretches.append(v)
+    r.start()
+    try:
+        r.relay.sockets[socket.AF_INET].close()
+        r.relay.sockets[socket.AF_INET] = _WouldBlockSocket()
+        client = SimpleUDPClient("127.0.0.1", r.address[1])
+        for i in range(50):
+            client.send_message(STRETCH, i / 100)
+        assert wait_until(lambda: len(stretches) == 50)
+        assert r.relay.pending == 8
+        assert r._server_thread.is_alive()
+    finally:
+        r.stop()
+
+
+def test_own_port_is_not_a_relay_target(monkeypatch):
+    """自分の受信ポートへの転送（ループ）は設定されていても除外する"""
+    monkeypatch.setattr(s_mod.settings.osc, "relay_targets", ["127.0.0.1:39001"])
+    r = OSCReceiver(port=39001, backend="selector")
+    r.start()
+    try:
+        assert r.relay is None
+    finally:
+        r.stop()
@@ -0,0 +1,68 @@
+"""
+physbones.py / 強度カーブの上書きのテスト
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+
+import settings as s_mod
+from intensity import IntensityConfig, calculate_intensity
+from physbones import configured_physbones, physbone_name
+from state_machine import GrabStateMachine
+
+
+@pytest.fixture
+def extra(monkeypatch):
+    def _set(table: dict):
+        monkeypatch.setattr(s_mod.settings, "physbones", table)
+        return configured_physbones()
+    return _set
+
+
+def test_primary_comes_from_osc_params(extra):
+    osc = s_mod.settings.osc
+    primary, = extra({})
+    assert primary.name == physbone_name(osc.stretch_param)
+    assert primary.stretch_param == osc.stretch_param
+    assert primary.is_posed_param == osc.is_posed_param
+    assert primary.intensity_overrides == {}
+
+
+def test_extra_physbones_rename_the_primary_addresses(extra):
+    osc = s_mod.settings.osc
+    physbones = extra({"Collar": {}, "Tail": {"max_stimulus_value": 40}})
+    assert [pb.name for pb in physbones][1:] == ["Collar", "Tail"]
+    collar = physbones[1]
+    assert collar.stretch_param == osc.stretch_param.rsplit("/", 1)[0] + "/Collar_Stretch"
+    assert collar.is_grabbed_param.endswith("/Collar_IsGrabbed")
+    assert len({a for pb in physbones for a in pb.parameters}) == 12
+    assert physbones[2].intensity_overrides == {"max_stimulus_value": 40}
+
+
+def test_primary_name_table_overrides_primary_curve(extra):
+    primary_name = physbone_name(s_mod.settings.osc.stretch_param)
+    physbones = extra({primary_name: {"max_stretch_for_calc": 0.5}})
+    assert len(physbones) == 1
+    assert physbones[0].intensity_overrides == {"max_stretch_for_calc": 0.5}
+
+
+def test_unknown_override_keys_are_dropped(extra):
+    physbones = extra({"Collar": {"max_stimulus_value": 40, "no_such_key": 1}})
+    assert physbones[1].intensity_overrides == {"max_stimulus_value": 40}
+
+
+def test_machine_uses_its_own_curve():
+    base = GrabStateMachine("A")
+    capped = GrabStateMachine("B", {"max_stimulus_value": 30})
+    assert base.intensity_config() == IntensityConfig.from_settings()
+    assert calculate_intensity(1.0, capped.intensity_config()) == 30
+    assert calculate_intensity(1.0, base.intensity_config()) == s_mod.settings.device.max_stimulus_value
+
+
+def test_physbones_table_is_read_from_toml():
+    s = s_mod.Settings()
+    s_mod._apply_toml(s, {"physbones": {"Collar": {}, "Leash": {"max_stimulus_value": 50}}})
+    assert s.physbones == {"Collar": {}, "Leash": {"max_stimulus_value": 50}}
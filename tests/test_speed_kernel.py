@@ -0,0 +1,114 @@
+"""
+speed_kernel.py のテスト
+
+ライブのハンドラ（VirtualClock 上の SpeedModeHandler）・サンプルごとに SpeedKernel を動かした結果・
+配列でまとめて判定する run_grab() が、同じ入力で同じ判定になることを確認する。
+"""
+
+import random
+import sys
+from dataclasses import replace
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+
+import settings as s_mod
+from clock import VirtualClock
+from grab_traces import profile_samples, synthetic_grabs
+from handlers.speed_mode import SpeedModeHandler
+from speed_kernel import SpeedKernel, run_grab
+from state_machine import GrabStateMachine
+from tests.conftest import ZapRecorder, replay_grab
+from velocity import ESTIMATORS
+
+
+def _grabs():
+    grabs = []
+    for noise in (0.0, 0.003, 0.02):
+        grabs += synthetic_grabs(8, rate=60.0, noise=noise, seed=int(noise * 1000))
+    rng = random.Random(0)
+    for profile, kwargs in (("yank", {}), ("tugs", {"tugs": 4}), ("slow", {}),
+                            ("jitter", {"duration": 8.0, "jitter": 0.05})):
+        samples, release_at = profile_samples(profile, 90.0, rng=rng, **kwargs)
+        grabs.append((profile, samples, release_at))
+    return grabs
+
+
+GRABS = _grabs()
+
+
+def _handler_zaps(sm, samples, release_at) -> list[tuple[float, int]]:
+    clock = VirtualClock()
+    machine = GrabStateMachine("ShockPB", clock=clock)
+    machine.speed_mode = sm
+    zaps = ZapRecorder(clock)
+    SpeedModeHandler(machine, device_worker=zaps)
+    replay_grab(machine, clock, samples, release_at)
+    return zaps.zaps
+
+
+def _stepped(sm, samples, release_at):
+    """SpeedKernel をサンプルごとに動かす（停止タイマーは期限の時刻で、サンプルより先に実行）。"""
+    kernel = SpeedKernel(sm)
+    kernel.grab_start(0.0)
+    out = []
+    for t, value in samples:
+        while kernel.deadline is not None and kernel.deadline <= t:
+            out += kernel.expire(kernel.deadline)
+        out += kernel.sample(t, value)
+    while kernel.deadline is not None and kernel.deadline <= release_at:
+        out += kernel.expire(kernel.deadline)
+    return out
+
+
+def _settings(estimator: str, predictive: bool):
+    return replace(s_mod.settings.speed_mode, velocity_estimator=estimator, predictive_fire=predictive)
+
+
+@pytest.mark.parametrize("predictive", [False, True])
+@pytest.mark.parametrize("estimator", ESTIMATORS)
+def test_run_grab_matches_the_stepped_kernel(estimator, predictive):
+    sm = _settings(estimator, predictive)
+    kinds = set()
+    for _, samples, release_at in GRABS:
+        times = [t for t, _ in samples]
+        values = [s for _, s in samples]
+        decisions = run_grab(0.0, times, values, release_at, sm)
+        assert decisions == _stepped(sm, samples, release_at)
+        kinds.update(d.kind for d in decisions)
+    assert {"onset", "fire", "cancel"} <= kinds
+
+
+@pytest.mark.parametrize("predictive", [False, True])
+@pytest.mark.parametrize("estimator", ESTIMATORS)
+def test_run_grab_matches_the_live_handler(speed_mode, estimator, predictive):
+    sm = _settings(estimator, predictive)
+    fired = 0
+    for _, samples, release_at in GRABS:
+        decisions = run_grab(0.0, [t for t, _ in samples], [s for _, s in samples], release_at, sm)
+        expected = [(d.t, d.intensity) for d in decisions if d.kind == "fire"]
+        assert _handler_zaps(sm, samples, release_at) == expected
+        fired += len(expected)
+    assert fired > 0
+
+
+def test_reasons(speed_mode):
+    sm = _settings("two_point", False)
+
+    def kinds(profile, **kwargs):
+        samples, release_at = profile_samples(profile, 90.0, **kwargs)
+        return [(d.kind, d.reason) for d in run_grab(0.0, [t for t, _ in samples], [s for _, s in samples],
+                                                      release_at, sm)]
+
+    assert ("fire", "stop") in kinds("yank")
+    assert not [k for k in kinds("slow", duration=1.5) if k[0] == "fire"]
+    tugs = kinds("tugs", tugs=3)
+    assert tugs.count(("fire", "stop")) == 3
+    assert ("pullback", "sample") in tugs or ("pullback", "immediate") in tugs
+
+
+def test_run_grab_accepts_no_settled_samples():
+    sm = _settings("two_point", False)
+    assert run_grab(0.0, [0.01, 0.02], [0.1, 0.9], 0.05, sm) == []
+    assert run_grab(0.0, [], [], None, sm) == []
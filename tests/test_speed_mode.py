@@ -0,0 +1,144 @@
+"""
+speed_kernel.py の速度履歴（_SpeedHistory）・減速フィット（_DecelFit）・予測発火のテスト
+
+履歴は全部なめる素直な計算と、リングバッファ・立ち上がり索引の結果を比べる。
+"""
+
+import random
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+
+import settings as s_mod
+from clock import VirtualClock
+from handlers.speed_mode import SpeedModeHandler
+from speed_kernel import _DecelFit, _SpeedHistory
+from state_machine import GrabStateMachine
+from tests.conftest import ZapRecorder, replay_grab
+
+
+def _avg(entries):
+    if len(entries) < 2:
+        return 0.0
+    ds = entries[-1][1] - entries[0][1]
+    dt = entries[-1][0] - entries[0][0]
+    return ds / dt if ds > 0 and dt > 0 else 0.0
+
+
+def _fill(history, entries):
+    for t, s in entries:
+        history.append(t, s)
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 7, 50, 300, 1000])
+def test_tail_queries_match_full_scan(n):
+    rng = random.Random(n)
+    entries = [(i / 60 + rng.uniform(0, 0.002), rng.random()) for i in range(n)]
+    history = _SpeedHistory(300)
+    _fill(history, entries)
+    kept = entries[-300:]
+    assert list(history) == kept
+    assert len(history) == len(kept)
+    for ticks in (1, 5, 299, 1000):
+        expected = _avg(kept[-min(ticks + 1, len(kept)):])
+        assert history.avg_speed_recent(ticks) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("n", [3, 120, 300, 900])
+def test_range_queries_on_a_rising_pull_match_full_scan(n):
+    """立ち上がり（単調増加）区間では、範囲内のエントリを全部なめた結果と一致する。"""
+    rng = random.Random(n)
+    entries, s = [], 0.1
+    for i in range(n):
+        s += rng.uniform(0.0, 0.003)
+        entries.append((i / 120, s))
+    history = _SpeedHistory(300)
+    _fill(history, entries)
+    kept = entries[-300:]
+    lo, hi = kept[0][1], kept[-1][1]
+    for frac in (0.1, 0.5, 0.9, 1.0):
+        to = lo + (hi - lo) * frac
+        for limit in (None, kept[len(kept) // 2][0]):
+            expected = _avg([(t, v) for t, v in kept if lo <= v <= to and (limit is None or t <= limit)])
+            assert history.avg_speed_in_range(lo, to, limit) == pytest.approx(expected)
+
+
+def test_range_query_ignores_dips_below_the_running_max():
+    history = _SpeedHistory(300)
+    _fill(history, [(0.0, 0.1), (0.1, 0.3), (0.2, 0.2), (0.3, 0.5), (0.4, 0.25)])
+    # 立ち上がり索引は 0.1 → 0.3 → 0.5。0.2 / 0.25 への戻りは区間平均に入らない
+    assert history.avg_speed_in_range(0.1, 0.35, None) == pytest.approx(0.2 / 0.1)
+    assert history.avg_speed_in_range(0.1, 0.6, 0.3) == pytest.approx(0.4 / 0.3)
+
+
+def test_rise_index_stays_bounded_while_creeping():
+    history = _SpeedHistory(10)
+    for i in range(10000):
+        history.append(i * 0.01, i * 1e-4)
+    assert len(history._rise_t) <= 20
+    assert history.avg_speed_in_range(0.0, 1.0, None) == pytest.approx(0.01)
+
+
+def test_clear_resets_everything():
+    history = _SpeedHistory(4)
+    _fill(history, [(0.0, 0.1), (0.1, 0.5), (0.2, 0.9)])
+    history.clear()
+    assert len(history) == 0 and list(history) == []
+    assert history.avg_speed_in_range(0.0, 1.0, None) == 0.0
+    history.append(1.0, 0.2)
+    assert history.avg_speed_recent(5) == 0.0
+
+
+def test_rise_start_finds_first_entry_at_or_above():
+    history = _SpeedHistory(300)
+    _fill(history, [(0.0, 0.1), (0.1, 0.3), (0.2, 0.2), (0.3, 0.5)])
+    assert history.rise_start(0.2) == (0.1, 0.3)
+    assert history.rise_start(0.6) is None
+    history.clear()
+    assert history.rise_start(0.0) is None
+
+
+def test_decel_fit_restarts_at_each_new_velocity_peak():
+    fit = _DecelFit()
+    for i, v in enumerate([1.0, 2.0, 3.0]):
+        fit.add(i * 0.01, v)
+    assert fit.fit(2) is None  # まだ加速中（ピーク以降は 1 サンプル）
+    for i in range(1, 5):
+        fit.add(0.02 + i * 0.01, 3.0 - 5.0 * i * 0.01)
+    velocity, accel = fit.fit(3)
+    assert accel == pytest.approx(-5.0)
+    assert velocity == pytest.approx(3.0 - 5.0 * 0.04)
+
+
+def _pull(peak: float, pull: float, predictive: bool) -> list[tuple[float, int]]:
+    """0.15 秒静止 → pull 秒で peak まで等減速で伸ばす → 0.6 秒保持、を 60Hz で流す。"""
+    s_mod.settings.speed_mode.predictive_fire = predictive
+    clock = VirtualClock()
+    machine = GrabStateMachine("ShockPB", clock=clock)
+    zaps = ZapRecorder(clock)
+    SpeedModeHandler(machine, device_worker=zaps)
+    samples = []
+    t = 0.0
+    while t < 0.15 + pull + 0.6:
+        t += 1 / 60
+        x = min(1.0, max(0.0, (t - 0.15) / pull))
+        samples.append((t, peak * (1.0 - (1.0 - x) ** 2)))
+    replay_grab(machine, clock, samples, t)
+    return zaps.zaps
+
+
+def test_predictive_fire_skips_the_hold_time(speed_mode):
+    held = _pull(0.6, 0.2, predictive=False)
+    predicted = _pull(0.6, 0.2, predictive=True)
+    assert len(held) == len(predicted) == 1
+    stop = 0.15 + 0.2
+    assert held[0][0] >= stop + s_mod.settings.speed_mode.speed_zap_hold_time - 0.02
+    assert predicted[0][0] < stop + 0.05
+    # 外挿したピークで強度を決めるので、止まるまで待った場合とほぼ同じ
+    assert abs(predicted[0][1] - held[0][1]) <= 3
+
+
+def test_predictive_fire_does_not_fire_on_a_slow_pull(speed_mode):
+    assert _pull(0.4, 1.5, predictive=True) == []
@@ -0,0 +1,73 @@
+"""
+tools/speed_mode_sweep.py のテスト
+
+探索範囲の組み立て、パレート前線、プロセスプールとこのプロセスでの評価結果の一致を確認する。
+"""
+
+import json
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "tools"))
+
+import pytest
+
+import settings as s_mod
+from speed_mode_sweep import combinations, load_traces, pareto_front, parse_space, run, synthetic_traces
+
+
+def test_grid_is_the_product_of_each_axis():
+    space = parse_space(["speed_zap_threshold=1:2:3", "speed_onset_ticks=2:6:3", "speed_zap_hold_time=0.1,0.3"])
+    combos = combinations(space)
+    assert len(combos) == 3 * 3 * 2
+    assert sorted({c["speed_zap_threshold"] for c in combos}) == [1.0, 1.5, 2.0]
+    assert sorted({c["speed_onset_ticks"] for c in combos}) == [2, 4, 6]
+
+
+def test_random_search_stays_in_range_and_keeps_int_fields():
+    space = parse_space(["speed_zap_threshold=1:2", "speed_onset_ticks=2:6", "speed_zap_hold_time=0.1,0.3"])
+    combos = combinations(space, random_count=200, seed=1)
+    assert len(combos) == 200
+    assert all(1.0 <= c["speed_zap_threshold"] <= 2.0 for c in combos)
+    assert all(isinstance(c["speed_onset_ticks"], int) and 2 <= c["speed_onset_ticks"] <= 6 for c in combos)
+    assert {c["speed_zap_hold_time"] for c in combos} == {0.1, 0.3}
+    assert combinations(space, random_count=200, seed=1) == combos
+
+
+def test_unknown_key_is_rejected():
+    with pytest.raises(SystemExit):
+        parse_space(["no_such_key=1"])
+
+
+def test_pareto_front_drops_dominated_results():
+    def r(p, rec, p50):
+        return {"precision": p, "recall": rec, "f1": 2 * p * rec / (p + rec), "p50_ms": p50}
+    results = [r(1.0, 0.5, 300), r(0.9, 0.9, 300), r(0.9, 0.8, 300), r(0.9, 0.9, 200), r(1.0, 0.5, 300)]
+    front = pareto_front(results)
+    assert [(x["precision"], x["recall"], x["p50_ms"]) for x in front] == [(0.9, 0.9, 200), (1.0, 0.5, 300)]
+
+
+def _comparable(results):
+    """NaN（Zap がなく遅れが出ない）は等号で比べられないので除く"""
+    return [{k: v for k, v in r.items() if v == v} for r in results]
+
+
+def test_pool_and_inline_evaluation_agree(monkeypatch, tmp_path):
+    monkeypatch.setattr(s_mod.settings.device, "zap_mode", "speed")
+    traces = synthetic_traces(16, rate=60.0, noise=0.0, seed=0)
+    combos = combinations(parse_space(["speed_zap_threshold=0.5,1.5,10", "speed_zap_hold_time=0.1,0.3"]))
+    base = s_mod.settings.speed_mode
+    inline = run(combos, traces, base, jobs=1)
+    pooled = run(combos, traces, base, jobs=2)
+    assert _comparable(inline) == _comparable(pooled)
+
+    by_threshold = {(r["speed_zap_threshold"], r["speed_zap_hold_time"]): r for r in inline}
+    assert by_threshold[(1.5, 0.3)]["tp"] > 0
+    assert by_threshold[(10.0, 0.3)]["tp"] == by_threshold[(10.0, 0.3)]["fp"] == 0
+    for r in inline:
+        assert r["tp"] + r["fp"] + r["fn"] + r["tn"] == len(traces)
+
+    # JSON Lines に書き出したトレースを読み直しても同じ結果
+    path = tmp_path / "traces.jsonl"
+    path.write_text("".join(json.dumps({**t, "samples": [list(p) for p in t["samples"]]}) + "\n" for t in traces))
+    assert _comparable(run(combos, load_traces(str(path)), base, jobs=1)) == _comparable(inline)
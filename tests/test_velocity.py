@@ -0,0 +1,99 @@
+"""
+velocity.py の速度推定器のテスト
+
+オンライン（サンプルごと）の推定と estimate_offline()（numpy でまとめて計算）の一致、
+直線の傾きへの収束、ジッタのある入力での停止しきい値の跨ぎ回数、速度モードでの使用を確かめる。
+"""
+
+import random
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+
+import settings as s_mod
+from clock import VirtualClock
+from grab_traces import profile_samples
+from handlers.speed_mode import SpeedModeHandler
+from state_machine import GrabStateMachine
+from tests.conftest import ZapRecorder, replay_grab
+from velocity import ESTIMATORS, SavitzkyGolayEstimator, create_estimator, estimate_offline
+
+
+def _jittery_trace(n: int, slope: float, noise: float, seed: int = 0) -> tuple[list[float], list[float]]:
+    """約 60Hz・送信間隔が揺れ、ときどき 2 パケットが詰まって届く、傾き slope の直線 + ノイズ。"""
+    rng = random.Random(seed)
+    times, values = [], []
+    t = 100.0
+    for _ in range(n):
+        t += 0.0005 if rng.random() < 0.1 else rng.uniform(0.010, 0.024)
+        times.append(t)
+        values.append(0.1 + slope * (t - 100.0) + rng.uniform(-noise, noise))
+    return times, values
+
+
+def _online(name: str, times, values) -> list[float]:
+    est = create_estimator(name)
+    return [est.update(t, s) for t, s in zip(times, values)]
+
+
+def _crossings(velocities, threshold: float) -> int:
+    above = [v > threshold for v in velocities]
+    return sum(1 for a, b in zip(above, above[1:]) if a != b)
+
+
+@pytest.mark.parametrize("name", ESTIMATORS)
+def test_online_matches_offline(name):
+    times, values = _jittery_trace(2000, slope=0.4, noise=0.01)
+    online = _online(name, times, values)
+    offline = estimate_offline(times, values, name)
+    assert max(abs(a - b) for a, b in zip(online, offline)) < 1e-6
+
+
+@pytest.mark.parametrize("name", ["alpha_beta", "savgol"])
+def test_filtered_estimators_converge_to_slope(name):
+    times, values = _jittery_trace(300, slope=0.5, noise=0.0)
+    est = create_estimator(name)
+    for t, s in zip(times, values):
+        est.update(t, s)
+    assert est.velocity == pytest.approx(0.5, rel=1e-3)
+    assert est.position == pytest.approx(values[-1], abs=1e-4)
+
+
+def test_filtered_estimators_cross_stop_threshold_less_often():
+    """ゆっくり引き続けている（0.5/秒）ノイズ入りの入力で、停止しきい値 0.1 を跨ぐ回数"""
+    times, values = _jittery_trace(600, slope=0.5, noise=0.004)
+    raw = _crossings(_online("two_point", times, values), 0.1)
+    for name in ("alpha_beta", "savgol"):
+        assert _crossings(_online(name, times, values)[10:], 0.1) * 10 < raw
+
+
+def test_savgol_rebase_keeps_result():
+    times, values = _jittery_trace(3000, slope=0.3, noise=0.01, seed=3)
+    rebased = SavitzkyGolayEstimator(window=7, rebase_after=0.5)
+    plain = SavitzkyGolayEstimator(window=7, rebase_after=1e9)
+    for t, s in zip(times, values):
+        assert rebased.update(t, s) == pytest.approx(plain.update(t, s), abs=1e-6)
+    assert rebased._ref > times[0]
+
+
+def test_unknown_name_falls_back_to_two_point():
+    assert not create_estimator("nope").filtered
+    with pytest.raises(ValueError):
+        estimate_offline([0.0, 1.0], [0.0, 1.0], "nope")
+
+
+@pytest.mark.parametrize("name", ESTIMATORS)
+def test_speed_mode_fires_on_yank_with_each_estimator(speed_mode, monkeypatch, name):
+    monkeypatch.setattr(s_mod.settings.speed_mode, "velocity_estimator", name)
+    clock = VirtualClock()
+    machine = GrabStateMachine("ShockPB", clock=clock)
+    zaps = ZapRecorder(clock)
+    SpeedModeHandler(machine, device_worker=zaps)
+    samples, release_at = profile_samples("yank", rate=60.0, peak=0.6)
+    for _ in range(5):
+        replay_grab(machine, clock, samples, release_at)
+        clock.advance(1.0)
+    assert len(zaps.intensities) == 5
+    assert all(i > 0 for i in zaps.intensities)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+状態機械 + ハンドラチェーンのイベントあたりのコストを測るベンチマーク
+
+GrabStateMachine に main.py と同じハンドラ（Stimulus / SpeedMode / Chatbox / Recorder / GUIUpdater）を
+つなぎ、デバイス・Chatbox 送信・Zap 記録は何もしないスタブに差し替えて、
+Grab 開始 → Stretch 更新 N 回 → Grab 終了 を繰り返す。
+
+  - us/event   : イベント 1 個（on_stretch_change / on_grabbed_change 1 回）あたりの CPU 時間
+  - B/event    : イベント 1 個の処理中に一時的に確保したメモリ（tracemalloc のピーク − 処理前）の平均
+                 （GUI キューに積んだ dict も含む。キューは毎回空にする）
+
+--journal を付けると JournalHandler（一時ファイルへのイベントジャーナル）もつなぐ。
+
+使い方:
+    python tools/bench_handler_chain.py [--grabs 200] [--updates 100] [--mode stretch|speed] [--journal]
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from queue import Queue
+
+import settings as s_mod
+
+
+class _NullDevice:
+    is_connected = True
+
+    def send_zap(self, intensity: int) -> bool:
+        return True
+
+    def send_vibration(self, intensity: int, count: int = 1, ton: int = 10, toff: int = 10) -> bool:
+        return True
+
+
+class _NullSender:
+    def send_chatbox_message(self, message: str, send_immediately: bool = False) -> None:
+        pass
+
+
+class _NullRecorder:
+    def record_zap(self, **kwargs) -> None:
+        pass
+
+
+def _build(mode: str, journal=None):
+    # config.py は BLE の MAC アドレスがないと読み込めないのでダミーを入れる
+    s_mod.settings.ble.device_mac = s_mod.settings.ble.device_mac or "00:00:00:00:00:00"
+    s_mod.settings.device.zap_mode = mode
+    import pavlok_controller as ctrl
+    from state_machine import GrabStateMachine
+    from handlers import StimulusHandler, ChatboxHandler, RecorderHandler, GUIUpdater, SpeedModeHandler, JournalHandler
+    ctrl.initialize_device(_NullDevice())
+    machine = GrabStateMachine("ShockPB")
+    status_queue: Queue = Queue()
+    SpeedModeHandler(machine)
+    StimulusHandler(machine)
+    ChatboxHandler(machine, _NullSender(), device=_NullDevice())
+    RecorderHandler(machine, _NullRecorder())
+    GUIUpdater(machine, status_queue)
+    if journal:
+        JournalHandler(machine, journal)
+    return machine, status_queue
+
+
+def _events(grabs: int, updates: int) -> list[tuple[str, float, float]]:
+    """(種別, 値, イベント時刻) のリスト。Stretch は 60Hz で 0→0.9 を往復する。"""
+    events = []
+    t = 0.0
+    for _ in range(grabs):
+        events.append(("G", True, t))
+        for i in range(updates):
+            t += 1 / 60
+            phase = i / max(1, updates - 1)
+            events.append(("S", 0.9 * (1 - abs(1 - 2 * phase)), t))
+        t += 1.0
+        events.append(("G", False, t))
+        t += 0.5
+    return events
+
+
+def _run(machine, status_queue, events, trace: bool) -> dict:
+    on_s, on_g = machine.on_stretch_change, machine.on_grabbed_change
+    drain = status_queue.queue.clear
+    if trace:
+        transient = 0
+        for kind, value, t in events:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            (on_s if kind == "S" else on_g)(value, t)
+            transient += tracemalloc.get_traced_memory()[1] - before
+            drain()
+        return {"bytes": transient / len(events)}
+    start = time.process_time()
+    for kind, value, t in events:
+        (on_s if kind == "S" else on_g)(value, t)
+        drain()
+    return {"cpu": time.process_time() - start}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grabs", type=int, default=200)
+    parser.add_argument("--updates", type=int, default=100, help="Grab 1 回あたりの Stretch 更新数")
+    parser.add_argument("--mode", choices=("stretch", "speed"), default="stretch", help="zap_mode")
+    parser.add_argument("--journal", action="store_true", help="イベントジャーナルもつなぐ")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.CRITICAL)  # ログ出力のコストは測らない
+
+    events = _events(args.grabs, args.updates)
+    journal = None
+    if args.journal:
+        from journal import EventJournal
+        journal = EventJournal(os.path.join(tempfile.mkdtemp(), "bench.pvjrnl"), start_time=0.0)
+    machine, status_queue = _build(args.mode, journal)
+    _run(machine, status_queue, events[: len(events) // 10], trace=False)  # ウォームアップ
+    cpu = min(_run(machine, status_queue, events, trace=False)["cpu"] for _ in range(3))
+    tracemalloc.start()
+    mem = _run(machine, status_queue, events, trace=True)
+    tracemalloc.stop()
+    if journal:
+        journal.close()
+
+    print(f"{'mode':<8} {'events':>8} {'us/event':>9} {'B/event':>9}")
+    print("-" * 37)
+    label = args.mode + ("+j" if journal else "")
+    print(f"{label:<8} {len(events):>8} {cpu / len(events) * 1e6:>9.2f} {mem['bytes']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
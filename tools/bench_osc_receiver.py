@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+OSCReceiver のバックエンド別ベンチマーク
+
+ローカルの別プロセスから Stretch パケットを送り続け、
+受信側の処理レート（packets/s）と CPU 使用時間を比較する。
+--noise を指定すると、Stretch 1 個につき無関係なアバターパラメータを N 個混ぜて送る。
+
+使い方:
+    python tools/bench_osc_receiver.py [--packets 50000] [--rate 0] [--noise 0]
+      --rate 0 は送信レート無制限（全力送信）
+    python tools/bench_osc_receiver.py --decode
+      ソケットを使わず、デコード処理だけを Dispatcher と高速パスで比較する
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
+
+import argparse
+import multiprocessing
+import socket
+import threading
+import time
+
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+
+def _build(address: str, value: float) -> bytes:
+    builder = OscMessageBuilder(address=address)
+    builder.add_arg(value, OscMessageBuilder.ARG_TYPE_FLOAT)
+    return builder.build().dgram
+
+
+def _noise_dgrams(noise: int) -> list[bytes]:
+    """VRChat が同じポートに送ってくる無関係なアバターパラメータの例。"""
+    return [_build(f"/avatar/parameters/Other_{i:02d}", 0.5) for i in range(noise)]
+
+
+def _sender(port: int, address: str, packets: int, rate: float, noise: int) -> None:
+    """別プロセスで Stretch パケット（と無関係なパラメータ）を送信する。"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    interval = 1.0 / rate if rate > 0 else 0.0
+    next_time = time.perf_counter()
+    others = _noise_dgrams(noise)
+    for i in range(packets):
+        for dgram in others:
+            sock.sendto(dgram, ("127.0.0.1", port))
+        sock.sendto(_build(address, (i % 1000) / 1000.0), ("127.0.0.1", port))
+        if interval:
+            next_time += interval
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    sock.close()
+
+
+def run(backend: str, packets: int, rate: float, noise: int = 0) -> dict:
+    import settings as s_mod
+    from osc.receiver import OSCReceiver
+
+    # ログ出力はベンチ対象外
+    s_mod.settings.debug.log_stretch = False
+    s_mod.settings.debug.log_all_osc = False
+
+    received = 0
+    lock = threading.Lock()
+    last_time = 0.0
+
+    def on_stretch(value: float, event_time: float, seq: int) -> None:
+        nonlocal received, last_time
+        with lock:
+            received += 1
+            last_time = time.perf_counter()
+
+    receiver = OSCReceiver(port=0, backend=backend)
+    receiver.on_stretch_change = on_stretch
+    receiver.start()
+    port = receiver.address[1]
+
+    threads_before = threading.active_count()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+
+    proc = multiprocessing.Process(
+        target=_sender, args=(port, s_mod.settings.osc.stretch_param, packets, rate, noise))
+    proc.start()
+    peak_threads = threads_before
+    while proc.is_alive():
+        peak_threads = max(peak_threads, threading.active_count())
+        time.sleep(0.01)
+    proc.join()
+
+    # 取りこぼし分を待つ（最後の受信から 0.3 秒静かになるまで）
+    while time.perf_counter() - max(last_time, wall_start) < 0.3:
+        peak_threads = max(peak_threads, threading.active_count())
+        time.sleep(0.05)
+
+    cpu = time.process_time() - cpu_start
+    wall = (last_time or time.perf_counter()) - wall_start
+    batch = receiver.batch_stats.snapshot()
+    receiver.stop()
+
+    return {
+        "backend": backend,
+        "sent": packets,
+        "received": received,
+        "pps": received / wall if wall > 0 else 0.0,
+        "cpu_sec": cpu,
+        "cpu_us_per_packet": cpu / received * 1e6 if received else 0.0,
+        "peak_threads": peak_threads,
+        "max_batch": batch["max_batch"],
+        "shed": batch["shed"],
+    }
+
+
+def run_decode(iterations: int, noise: int) -> None:
+    """Dispatcher 経由と高速パスのデコードコストを比較する（ソケットなし）。"""
+    from pythonosc import dispatcher
+    from osc.fastpath import AddressTable
+
+    address = "/avatar/parameters/ShockPB_Stretch"
+    packets = _noise_dgrams(noise) + [_build(address, 0.5)]
+    sink = []
+
+    disp = dispatcher.Dispatcher()
+    disp.map(address, lambda addr, value: sink.append(value))
+    table = AddressTable({address: sink.append})
+
+    def via_dispatcher():
+        for dgram in packets:
+            disp.call_handlers_for_packet(dgram, ("127.0.0.1", 0))
+
+    def via_fastpath():
+        for dgram in packets:
+            result = table.decode(dgram)
+            if result is not None:
+                handler, value = result
+                handler(value)
+
+    print(f"{'decoder':<12} {'packets':>10} {'us/pkt':>8}")
+    print("-" * 32)
+    for name, fn in (("dispatcher", via_dispatcher), ("fastpath", via_fastpath)):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - start
+        total = iterations * len(packets)
+        print(f"{name:<12} {total:>10} {elapsed / total * 1e6:>8.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packets", type=int, default=50000)
+    parser.add_argument("--rate", type=float, default=0.0, help="送信レート（packets/s、0=無制限）")
+    parser.add_argument("--backend", choices=["selector", "threading", "all"], default="all")
+    parser.add_argument("--noise", type=int, default=0, help="Stretch 1 個あたりの無関係なパラメータ数")
+    parser.add_argument("--decode", action="store_true", help="デコード処理だけを比較する")
+    args = parser.parse_args()
+
+    if args.decode:
+        run_decode(max(1, args.packets // (args.noise + 1)), args.noise)
+        return
+
+    backends = ["threading", "selector"] if args.backend == "all" else [args.backend]
+
+    print(f"{'backend':<10} {'sent':>8} {'recv':>8} {'pps':>10} {'cpu(s)':>8} {'us/pkt':>8} "
+          f"{'threads':>8} {'maxbatch':>9} {'shed':>8}")
+    print("-" * 84)
+    for backend in backends:
+        r = run(backend, args.packets, args.rate, args.noise)
+        print(f"{r['backend']:<10} {r['sent']:>8} {r['received']:>8} {r['pps']:>10.0f} "
+              f"{r['cpu_sec']:>8.2f} {r['cpu_us_per_packet']:>8.1f} {r['peak_threads']:>8} "
+              f"{r['max_batch']:>9} {r['shed']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+速度モードの予測発火（[speed_mode] predictive_fire）と停止タイマー待ち（従来）を同じ入力で比べるベンチマーク
+
+Grab ごとに速度モードの判定カーネル（speed_kernel.run_grab。ライブの SpeedModeHandler と同じ判定）を動かし、
+両方のモードで Zap の有無・時刻・強度を取る。遅れは「Stretch がその Grab の最大値の 99% に最初に届いた時刻」から
+Zap までで、ヒストグラム（ミリ秒）と中央値・90 パーセンタイルを出す。
+
+  fires   : Zap した Grab の数
+  false   : 予測発火だけが Zap した Grab（従来なら発火しない引っ張りで撃った）
+  missed  : 従来だけが Zap した Grab
+  |Δint|  : 両方が Zap した Grab での強度の差の平均（予測は外挿したピークで強度を決める）
+
+合成トレースは Grab ごとにピーク・引く時間・形をばらつかせる（送信間隔の揺れ・ノイズ入り）：
+
+  decel    : 等減速で止まる（速度が直線的に 0 へ）
+  smooth   : 加速して減速（smoothstep）
+  hesitate : 途中で 0.1 秒止まってから続きを引く
+  slow     : 合格ラインに届かないゆっくりした引っ張り（どちらも撃たないのが正しい）
+
+--journal を付けると、記録したジャーナルの Grab（grab_start〜grab_end のサンプル）で比べる。
+
+使い方:
+    python tools/bench_predictive_fire.py [--grabs 400] [--rate 60] [--noise 0.003] [--estimator alpha_beta]
+    python tools/bench_predictive_fire.py --journal journals/events_2025-01-01_12-00-00.pvjrnl
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
+
+import argparse
+import math
+import statistics
+
+import settings as s_mod
+from grab_traces import journal_grabs, peak_time, synthetic_grabs
+
+_BUCKETS = (0, 50, 100, 150, 200, 300, 400)
+
+
+def _run(samples: list[tuple[float, float]], release_at: float, predictive: bool) -> tuple[float, int] | None:
+    """1 回の Grab を判定し（speed_kernel.run_grab）、最初の Zap の (経過秒, 強度) を返す（撃たなければ None）。"""
+    from dataclasses import replace
+    from speed_kernel import run_grab
+
+    sm = replace(s_mod.settings.speed_mode, predictive_fire=predictive)
+    decisions = run_grab(0.0, [t for t, _ in samples], [s for _, s in samples], release_at, sm)
+    return next(((d.t, d.intensity) for d in decisions if d.kind == "fire"), None)
+
+
+def _histogram(latencies_ms: list[float]) -> str:
+    edges = list(_BUCKETS) + [math.inf]
+    counts = [sum(1 for x in latencies_ms if x < edges[0])]
+    counts += [sum(1 for x in latencies_ms if lo <= x < hi) for lo, hi in zip(edges, edges[1:])]
+    labels = [f"<{edges[0]}"] + [f"{lo}-{hi}" if hi != math.inf else f"{lo}+" for lo, hi in zip(edges, edges[1:])]
+    return "  ".join(f"{label}:{c}" for label, c in zip(labels, counts))
+
+
+def _report(grabs) -> None:
+    groups: dict[str, dict] = {}
+    for key, samples, release_at in grabs:
+        peak_t = peak_time(samples)
+        hold = _run(samples, release_at, predictive=False)
+        pred = _run(samples, release_at, predictive=True)
+        g = groups.setdefault(key, {"grabs": 0, "hold": [], "pred": [], "false": 0, "missed": 0, "dint": []})
+        g["grabs"] += 1
+        if hold:
+            g["hold"].append((hold[0] - peak_t) * 1e3)
+        if pred:
+            g["pred"].append((pred[0] - peak_t) * 1e3)
+        if pred and not hold:
+            g["false"] += 1
+        if hold and not pred:
+            g["missed"] += 1
+        if hold and pred:
+            g["dint"].append(abs(pred[1] - hold[1]))
+
+    print(f"{'grabs':<10} {'n':>5} {'mode':<5} {'fires':>6} {'false':>6} {'missed':>7} {'|Δint|':>7} "
+          f"{'p50 ms':>7} {'p90 ms':>7}")
+    print("-" * 68)
+    for key, g in groups.items():
+        for mode in ("hold", "pred"):
+            lat = sorted(g[mode])
+            p50 = statistics.median(lat) if lat else float("nan")
+            p90 = lat[min(len(lat) - 1, int(len(lat) * 0.9))] if lat else float("nan")
+            extra = (f"{g['false']:>6} {g['missed']:>7} {statistics.fmean(g['dint']) if g['dint'] else 0.0:>7.1f}"
+                     if mode == "pred" else f"{'':>6} {'':>7} {'':>7}")
+            print(f"{key:<10} {g['grabs']:>5} {mode:<5} {len(lat):>6} {extra} {p50:>7.0f} {p90:>7.0f}")
+    print("\nlatency histogram (ms from reaching the peak to the zap)")
+    for mode in ("hold", "pred"):
+        lat = [x for g in groups.values() for x in g[mode]]
+        print(f"  {mode:<5} {_histogram(lat)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grabs", type=int, default=400)
+    parser.add_argument("--rate", type=float, default=60.0, help="Stretch の送信レート（Hz）")
+    parser.add_argument("--noise", type=float, default=0.003, help="Stretch に乗せるノイズの振れ幅")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--estimator", help="[speed_mode] velocity_estimator を上書き")
+    parser.add_argument("--journal", help="合成トレースの代わりに使うジャーナル（.pvjrnl）")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.CRITICAL)
+    s_mod.settings.device.zap_mode = "speed"
+    if args.estimator:
+        s_mod.settings.speed_mode.velocity_estimator = args.estimator
+    sm = s_mod.settings.speed_mode
+    print(f"estimator={sm.velocity_estimator} hold={sm.speed_zap_hold_time}s margin={sm.predictive_margin} "
+          f"min_samples={sm.predictive_min_samples} max_remaining={sm.predictive_max_remaining}")
+    if args.journal:
+        grabs = journal_grabs(args.journal)
+    else:
+        grabs = synthetic_grabs(args.grabs, args.rate, args.noise, args.seed)
+    _report(grabs)
+
+
+if __name__ == "__main__":
+    main()
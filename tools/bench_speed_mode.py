@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+速度モード（SpeedModeHandler）の Stretch 更新 1 回あたりのコストを送信レートごとに測るベンチマーク
+
+GrabStateMachine に SpeedModeHandler だけをつなぎ、仮想時刻（clock.VirtualClock）で
+Grab → 引っ張り → 離す を繰り返す。レートが上がると Grab 1 回あたりの履歴が長くなるので、
+履歴の長さに比例する処理があれば us/update がレートとともに増える。
+
+同じサンプルを speed_kernel.run_grab()（記録した Grab を配列でまとめて判定する。スイープ・ベンチマーク用）にも
+通し、1 サンプルあたりのコスト（run_grab us）と handler に対する倍率を並べる。
+
+  - slow   : 0.6 秒かけて peak まで伸ばす（onset を超える速さで計測中の時間が長く、履歴が上限まで溜まる）
+  - yank   : settle 後に素早く引いて保持（停止タイマーで Zap が出る）
+  - jitter : 中央付近で小さく揺れるだけ（onset 待ちのまま。run_grab は numpy で読み飛ばす）
+
+使い方:
+    python tools/bench_speed_mode.py [--rates 60,120,240,480,960] [--grabs 20]
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
+
+import argparse
+import time
+
+import settings as s_mod
+from grab_traces import profile_samples
+
+
+class _NullWorker:
+    @staticmethod
+    def submit(fn, *args) -> bool:
+        return True
+
+
+def _run(profile: str, rate: float, grabs: int) -> tuple[float, int]:
+    """(CPU 秒, Stretch 更新数) を返す。"""
+    from clock import VirtualClock
+    from handlers import SpeedModeHandler
+    from state_machine import GrabStateMachine
+
+    clock = VirtualClock()
+    machine = GrabStateMachine("ShockPB", clock=clock)
+    SpeedModeHandler(machine, _NullWorker())
+    samples, release_at = profile_samples(profile, rate=rate, peak=0.8, duration=0.6)
+    on_s, on_g, advance_to = machine.on_stretch_change, machine.on_grabbed_change, clock.advance_to
+    cpu = 0.0
+    updates = 0
+    for _ in range(grabs):
+        t0 = clock.now()
+        on_g(True, t0)
+        start = time.process_time()
+        for t, value in samples:
+            advance_to(t0 + t)
+            on_s(value, t0 + t)
+        cpu += time.process_time() - start
+        updates += len(samples)
+        advance_to(t0 + release_at)
+        on_g(False, t0 + release_at)
+        clock.advance(1.0)
+    return cpu, updates
+
+
+def _run_kernel(profile: str, rate: float, grabs: int) -> float:
+    """run_grab() で grabs 回判定した CPU 秒を返す。"""
+    import numpy as np
+    from speed_kernel import run_grab
+
+    samples, release_at = profile_samples(profile, rate=rate, peak=0.8, duration=0.6)
+    times = np.array([t for t, _ in samples])
+    values = np.array([s for _, s in samples])
+    sm = s_mod.settings.speed_mode
+    intensity = lambda delta: 1
+    start = time.process_time()
+    for _ in range(grabs):
+        run_grab(0.0, times, values, release_at, sm, intensity)
+    return time.process_time() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rates", default="60,120,240,480,960", help="Stretch の送信レート（Hz、カンマ区切り）")
+    parser.add_argument("--grabs", type=int, default=20)
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.CRITICAL)  # ログ出力のコストは測らない
+    s_mod.settings.device.zap_mode = "speed"
+
+    print(f"{'profile':<8} {'rate':>6} {'updates':>8} {'us/update':>10} {'run_grab us':>12} {'speedup':>8}")
+    print("-" * 57)
+    for profile in ("slow", "yank", "jitter"):
+        for rate in (float(r) for r in args.rates.split(",")):
+            _run(profile, rate, 1)  # ウォームアップ
+            _run_kernel(profile, rate, 1)
+            cpu, updates = min(_run(profile, rate, args.grabs) for _ in range(5))
+            kernel = min(_run_kernel(profile, rate, args.grabs) for _ in range(5))
+            print(f"{profile:<8} {rate:>6.0f} {updates:>8} {cpu / updates * 1e6:>10.2f} "
+                  f"{kernel / updates * 1e6:>12.2f} {cpu / kernel:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+停止タイマーの張り直し負荷での、スレッド数とタイマーの精度を測るベンチマーク
+
+ジッタのある速い引っ張りのように、保持タイマー（--hold 秒）を --interval 秒ごとに取り消して張り直し、
+--burst 回ごとに hold より長く止まって 1 回発火させる、を --duration 秒続ける。
+
+  - timer     : 旧実装（張り直すたびに threading.Timer = OS スレッドを 1 本作る）
+  - scheduler : clock.TimerScheduler（スレッド 1 本、main.py と同じくイベントキューのコンシューマで実行）
+
+  spawned : 計測中に作られたスレッド数（threading.Thread.start() の呼び出し回数）
+  threads : 計測中に見えた最大スレッド数（メインスレッドを含む）
+  late    : 期限から実行開始までの遅れ（中央値 / 99 パーセンタイル / 最大、ミリ秒）
+
+使い方:
+    python tools/bench_timers.py [--duration 3] [--interval 0.004] [--hold 0.05] [--burst 20]
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
+
+import argparse
+import statistics
+import threading
+import time
+
+from clock import SystemClock, TimerScheduler
+from osc.event_queue import OSCEventQueue
+
+
+class _ThreadingTimerClock:
+    """旧実装（threading.Timer）と同じ張り方をする時計。"""
+
+    @staticmethod
+    def call_later(delay, fn, *args):
+        timer = threading.Timer(delay, fn, args)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    @staticmethod
+    def cancel(handle):
+        handle.cancel()
+
+
+def _count_thread_starts() -> list[int]:
+    """threading.Thread.start() を数えるようにし、カウンタ（1 要素のリスト）を返す。"""
+    counter = [0]
+    start = threading.Thread.start
+
+    def counted(self):
+        counter[0] += 1
+        start(self)
+    counted.__wrapped__ = start
+    threading.Thread.start = counted
+    return counter
+
+
+def _run(clock, duration: float, interval: float, hold: float, burst: int) -> dict:
+    spawned = _count_thread_starts()
+    late: list[float] = []
+    max_threads = threading.active_count()
+    handle = None
+
+    def fired(deadline: float) -> None:
+        late.append(time.perf_counter() - deadline)
+
+    end = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < end:
+        if handle is not None:
+            clock.cancel(handle)
+        handle = clock.call_later(hold, fired, time.perf_counter() + hold)
+        max_threads = max(max_threads, threading.active_count())
+        i += 1
+        time.sleep(hold * 1.5 if i % burst == 0 else interval)
+    time.sleep(hold * 2)
+    threading.Thread.start = threading.Thread.start.__wrapped__
+    return {"restarts": i, "fired": len(late), "spawned": spawned[0], "threads": max_threads, "late": late}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--interval", type=float, default=0.004, help="張り直しの間隔（秒）")
+    parser.add_argument("--hold", type=float, default=0.05, help="保持タイマーの長さ（秒）")
+    parser.add_argument("--burst", type=int, default=20, help="この回数ごとに 1 回発火させる")
+    args = parser.parse_args()
+
+    # スケジューラは main.py と同じくイベントキューのコンシューマで実行する
+    queue = OSCEventQueue(lambda v, t: None, lambda v, t: None)
+    queue.start()
+    scheduler = TimerScheduler(executor=queue.post)
+    clocks = {"timer": _ThreadingTimerClock(), "scheduler": SystemClock(scheduler)}
+
+    print(f"{'clock':<10} {'restarts':>9} {'fired':>6} {'spawned':>8} {'threads':>8} "
+          f"{'late p50':>9} {'p99':>7} {'max':>7}")
+    print("-" * 71)
+    for name, clock in clocks.items():
+        r = _run(clock, args.duration, args.interval, args.hold, args.burst)
+        late = sorted(r["late"]) or [0.0]
+        p99 = late[min(len(late) - 1, int(len(late) * 0.99))]
+        print(f"{name:<10} {r['restarts']:>9} {r['fired']:>6} {r['spawned']:>8} {r['threads']:>8} "
+              f"{statistics.median(late) * 1e3:>9.2f} {p99 * 1e3:>7.2f} {late[-1] * 1e3:>7.2f}")
+    scheduler.stop()
+    queue.stop()
+
+
+if __name__ == "__main__":
+    main()
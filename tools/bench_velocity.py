@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+速度モードの速度推定器（src/velocity.py）を比べるベンチマーク
+
+ジッタのある合成トレース（送信間隔が揺れ、ときどき 2 パケットが詰まって届き、値にノイズが乗る）で、
+推定器ごとに次を出す：
+
+  us/sample : update() 1 回のコスト（マイクロ秒）
+  max err   : オンライン推定と estimate_offline()（numpy でまとめて計算）の差の最大値
+  false on  : 静止（rest）で onset しきい値を上向きに跨いだ回数（誤った計測開始）
+  stop flk  : ゆっくり引き続けている（pull）間に停止しきい値を下から上へ跨ぎ直した回数（停止タイマーの張り直し）
+  onset / stop : yank の引き始めから onset まで・引き終わりから停止とみなすまでの遅れ（ミリ秒）
+
+しきい値は [speed_mode] の speed_onset_threshold / speed_stop_threshold / speed_onset_ticks、推定器のパラメータは
+velocity_alpha / velocity_beta / velocity_window を使う。two_point の onset は速度モードと同じく直近 ticks 個の平均速度。
+
+--journal を付けると、記録したジャーナルの Stretch サンプル（PhysBone ごと）でオンライン・オフラインの一致と
+しきい値の跨ぎ回数を数える（実際の入力での比較。rest / pull / yank の区別はしない）。
+
+使い方:
+    python tools/bench_velocity.py [--rate 60] [--seconds 30] [--noise 0.004]
+    python tools/bench_velocity.py --journal journals/events_2025-01-01_12-00-00.pvjrnl
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
+
+import argparse
+import random
+import time
+
+import settings as s_mod
+from velocity import ESTIMATORS, create_estimator, estimate_offline
+
+
+def _trace(kind: str, seconds: float, rate: float, noise: float, seed: int) -> tuple[list[float], list[float]]:
+    """rest: 0.3 で静止 / pull: 0.3 stretch/秒で引き続ける / yank: 0.5 秒静止 → 0.08 秒で 0.6 まで → 保持"""
+    rng = random.Random(seed)
+    times, values = [], []
+    t = 0.0
+    while t < seconds:
+        t += 0.0005 if rng.random() < 0.1 else rng.uniform(0.6, 1.4) / rate
+        if kind == "rest":
+            base = 0.3
+        elif kind == "pull":
+            base = 0.1 + 0.3 * t
+        else:
+            base = min(0.6, max(0.0, (t - 0.5) / 0.08 * 0.6))
+        times.append(t)
+        values.append(base + rng.uniform(-noise, noise))
+    return times, values
+
+
+def _online(name: str, sm, times, values) -> list[tuple[float, float]]:
+    """[(速度, onset 判定に使う速度), ...]"""
+    est = create_estimator(name, sm.velocity_alpha, sm.velocity_beta, sm.velocity_window)
+    ticks = sm.speed_onset_ticks
+    out = []
+    for i, (t, s) in enumerate(zip(times, values)):
+        v = est.update(t, s)
+        if est.filtered:
+            onset = max(0.0, v)
+        else:
+            j = max(0, i - ticks)
+            dt, ds = t - times[j], s - values[j]
+            onset = ds / dt if dt > 0 and ds > 0 else 0.0
+        out.append((v, onset))
+    return out
+
+
+def _upward(series, threshold: float) -> int:
+    return sum(1 for a, b in zip(series, series[1:]) if a <= threshold < b)
+
+
+def _cost(name: str, sm, times, values, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        est = create_estimator(name, sm.velocity_alpha, sm.velocity_beta, sm.velocity_window)
+        update = est.update
+        start = time.perf_counter()
+        for t, s in zip(times, values):
+            update(t, s)
+        best = min(best, time.perf_counter() - start)
+    return best / len(times) * 1e6
+
+
+def _max_err(name: str, sm, times, values) -> float:
+    online = [v for v, _ in _online(name, sm, times, values)]
+    offline = estimate_offline(times, values, name, sm.velocity_alpha, sm.velocity_beta, sm.velocity_window)
+    return max((abs(a - b) for a, b in zip(online, offline)), default=0.0)
+
+
+def _latency(name: str, sm, times, values) -> tuple[float, float]:
+    """yank の (onset までの遅れ, 停止とみなすまでの遅れ)。検出できなければ nan"""
+    onset = stop = float("nan")
+    for t, (v, on) in zip(times, _online(name, sm, times, values)):
+        if onset != onset and t >= 0.5 and on > sm.speed_onset_threshold:
+            onset = t - 0.5
+        if stop != stop and t >= 0.58 and max(0.0, v) <= sm.speed_stop_threshold:
+            stop = t - 0.58
+    return onset, stop
+
+
+def _synthetic(args, sm) -> None:
+    rest = _trace("rest", args.seconds, args.rate, args.noise, args.seed)
+    pull = _trace("pull", args.seconds, args.rate, args.noise, args.seed + 1)
+    yank = _trace("yank", 1.2, args.rate, args.noise, args.seed + 2)
+    print(f"rate {args.rate:g} Hz, noise ±{args.noise:g}, {len(pull[0])} samples/trace")
+    print(f"{'estimator':<11} {'us/sample':>9} {'max err':>9} {'false on':>8} {'stop flk':>8} {'onset':>7} {'stop':>7}")
+    print("-" * 65)
+    for name in ESTIMATORS:
+        false_on = _upward([on for _, on in _online(name, sm, *rest)], sm.speed_onset_threshold)
+        flicker = _upward([v for v, _ in _online(name, sm, *pull)], sm.speed_stop_threshold)
+        onset, stop = _latency(name, sm, *yank)
+        print(f"{name:<11} {_cost(name, sm, *pull):>9.2f} {_max_err(name, sm, *pull):>9.1e} {false_on:>8} "
+              f"{flicker:>8} {onset * 1e3:>7.0f} {stop * 1e3:>7.0f}")
+
+
+def _from_journal(args, sm) -> None:
+    from journal import JournalReader
+
+    traces: dict[str, tuple[list[float], list[float]]] = {}
+    with JournalReader(args.journal) as reader:
+        for rec in reader:
+            if rec.kind == "sample":
+                times, values = traces.setdefault(rec.physbone, ([], []))
+                times.append(rec.t)
+                values.append(rec.stretch)
+    if not traces:
+        print("no samples")
+        return
+    print(f"{'physbone':<16} {'estimator':<11} {'samples':>8} {'max err':>9} {'onsets':>7} {'stop flk':>8}")
+    print("-" * 64)
+    for physbone, (times, values) in traces.items():
+        for name in ESTIMATORS:
+            online = _online(name, sm, times, values)
+            onsets = _upward([on for _, on in online], sm.speed_onset_threshold)
+            flicker = _upward([v for v, _ in online], sm.speed_stop_threshold)
+            print(f"{physbone:<16} {name:<11} {len(times):>8} {_max_err(name, sm, times, values):>9.1e} "
+                  f"{onsets:>7} {flicker:>8}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=60.0, help="Stretch の送信レート（Hz）")
+    parser.add_argument("--seconds", type=float, default=30.0, help="rest / pull トレースの長さ（秒）")
+    parser.add_argument("--noise", type=float, default=0.004, help="Stretch に乗せるノイズの振れ幅")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--journal", help="合成トレースの代わりに使うジャーナル（.pvjrnl）")
+    args = parser.parse_args()
+
+    sm = s_mod.settings.speed_mode
+    if args.journal:
+        _from_journal(args, sm)
+    else:
+        _synthetic(args, sm)
+
+
+if __name__ == "__main__":
+    main()
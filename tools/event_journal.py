@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+イベントジャーナルの集計・再生ツール
+
+[journal] enabled = true で記録したジャーナル（.pvjrnl）から、PhysBone ごとの統計を作り直す。
+--replay を付けると、記録した入力（Grab 開始・Stretch サンプル・Grab 終了）を今の設定の
+状態機械と Zap ハンドラに仮想時刻（clock.VirtualClock）で流し直し、記録時の Zap と比べる。
+デバイスには送らない。
+
+使い方:
+    python tools/event_journal.py journals/events_2025-01-01_12-00-00.pvjrnl
+    python tools/event_journal.py events.pvjrnl --replay
+    python tools/event_journal.py events.pvjrnl --replay --mode speed
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
+
+import argparse
+import time
+
+import settings as s_mod
+from journal import JournalReader, replay, summarize
+
+
+class _ZapLog:
+    """device_worker の代わり：送信せずに Zap の強度だけ PhysBone ごとに数える。"""
+
+    def __init__(self):
+        self.zaps: dict[str, list[int]] = {}
+
+    def for_machine(self, name: str):
+        zaps = self.zaps.setdefault(name, [])
+
+        class _Worker:
+            @staticmethod
+            def submit(fn, *args) -> bool:
+                if getattr(fn, "__name__", "") == "_send_zap":
+                    zaps.append(args[0])
+                return True
+        return _Worker()
+
+
+def _replay(path: str, mode: str | None) -> dict[str, list[int]]:
+    # config.py は BLE の MAC アドレスがないと読み込めないのでダミーを入れる
+    s_mod.settings.ble.device_mac = s_mod.settings.ble.device_mac or "00:00:00:00:00:00"
+    if mode:
+        s_mod.settings.device.zap_mode = mode
+    from clock import VirtualClock
+    from handlers import SpeedModeHandler, StimulusHandler
+    from physbones import configured_physbones
+    from state_machine import GrabStateMachine
+
+    overrides = {pb.name: pb.intensity_overrides for pb in configured_physbones()}
+    clock = VirtualClock()
+    log = _ZapLog()
+    machines = {}
+    with JournalReader(path) as reader:
+        for r in reader:
+            if r.kind == "channel" and r.physbone not in machines:
+                m = GrabStateMachine(r.physbone, overrides.get(r.physbone), clock=clock)
+                worker = log.for_machine(r.physbone)
+                SpeedModeHandler(m, worker)
+                StimulusHandler(m, worker)
+                machines[r.physbone] = m
+        replay(reader, machines, clock)
+    return log.zaps
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="ジャーナルファイル（.pvjrnl）")
+    parser.add_argument("--replay", action="store_true", help="今の設定で流し直して Zap を比べる")
+    parser.add_argument("--mode", choices=("stretch", "speed"), help="再生時の zap_mode（既定は設定のまま）")
+    args = parser.parse_args()
+
+    with JournalReader(args.path) as reader:
+        stats = summarize(reader)
+        duration = max((r.t for r in reader if r.kind != "channel"), default=0.0)
+    print(f"{args.path}: {duration:.1f}s")
+    print(f"{'physbone':<16} {'grabs':>6} {'grab s':>8} {'samples':>8} {'max str':>8} {'zaps':>5} {'sent':>5} "
+          f"{'max int':>8} {'avg %':>6}")
+    for name, s in stats.items():
+        print(f"{name:<16} {s['grabs']:>6} {s['grab_time']:>8.1f} {s['samples']:>8} {s['max_stretch']:>8.3f} "
+              f"{s['zaps']:>5} {s['zaps_sent']:>5} {s['max_intensity']:>8} {s['avg_display']:>6.1f}")
+    if not args.replay:
+        return
+
+    import logging
+    logging.disable(logging.INFO)
+    start = time.perf_counter()
+    replayed = _replay(args.path, args.mode)
+    print(f"\nReplayed in {time.perf_counter() - start:.2f}s (zap_mode={s_mod.settings.device.zap_mode})")
+    print(f"{'physbone':<16} {'recorded':>9} {'replayed':>9} {'max int':>8}")
+    for name, zaps in replayed.items():
+        recorded = stats.get(name, {}).get("zaps", 0)
+        print(f"{name:<16} {recorded:>9} {len(zaps):>9} {max(zaps, default=0):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+VRChat OSC の疑似負荷ジェネレータ
+
+設定の stretch_param / is_grabbed_param 宛てに、実際の OSC UDP パケットで
+Grab → 引っ張り → 離す、を送る。受信処理の負荷試験や、速度モードの挙動確認に使う。
+
+引っ張り方（--profile）:
+    slow    ゆっくり peak まで伸ばして少し保持
+    yank    settle 後に素早く peak まで引いて保持（速度モードの Zap が出る形）
+    jitter  peak/2 を中心に細かく揺らす
+    hold    peak で止めたまま（同じ値を送り続ける）
+    tugs    素早く引いて戻す、を --tugs 回繰り返す
+
+--prefixes N で PhysBone を N 個（ShockPB, ShockPB2, ...）並行に動かし、
+--noise-rate で無関係なアバターパラメータを混ぜて送る（VRChat の実際の送信に近い混在）。
+
+使い方:
+    python tools/osc_load_generator.py --profile yank
+    python tools/osc_load_generator.py --profile jitter --rate 2000 --duration 5
+    python tools/osc_load_generator.py --profile tugs --prefixes 12 --noise-rate 5000 --repeat 3
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
+
+import argparse
+import heapq
+import random
+import socket
+import struct
+import time
+from typing import Iterator
+
+from grab_traces import PROFILES, profile_samples
+from osc.fastpath import pad_address
+
+_FLOAT_TAG = b",f\x00\x00"
+_TRUE_TAG = b",T\x00\x00"
+_FALSE_TAG = b",F\x00\x00"
+_FLOAT = struct.Struct(">f")
+
+
+# ---------------------------------------------------------------------- #
+# パケット列の組み立て                                                     #
+# ---------------------------------------------------------------------- #
+
+def prefix_addresses(stretch_param: str, is_grabbed_param: str, count: int) -> list[tuple[str, str]]:
+    """設定のアドレスから PhysBone を count 個分（ShockPB, ShockPB2, ...）の (stretch, is_grabbed) を作る。"""
+    def split(param: str) -> tuple[str, str, str]:
+        head, _, name = param.rpartition("/")
+        base, sep, suffix = name.rpartition("_")
+        return head, base, sep + suffix
+
+    s_head, base, s_suffix = split(stretch_param)
+    g_head, _, g_suffix = split(is_grabbed_param)
+    names = [base] + [f"{base}{i}" for i in range(2, count + 1)]
+    return [(f"{s_head}/{n}{s_suffix}", f"{g_head}/{n}{g_suffix}") for n in names]
+
+
+def _float_dgram(address: bytes, value: float) -> bytes:
+    return address + _FLOAT_TAG + _FLOAT.pack(value)
+
+
+def grab_events(
+    stretch_addr: str,
+    grabbed_addr: str,
+    samples: list[tuple[float, float]],
+    release_at: float,
+    offset: float,
+) -> Iterator[tuple[float, bytes]]:
+    """1 回の Grab を (送信時刻, データグラム) の列にする。"""
+    s_addr = pad_address(stretch_addr)
+    g_addr = pad_address(grabbed_addr)
+    yield offset, g_addr + _TRUE_TAG
+    for t, value in samples:
+        yield offset + t, _float_dgram(s_addr, value)
+    yield offset + release_at, g_addr + _FALSE_TAG
+    yield offset + release_at + 0.01, _float_dgram(s_addr, 0.0)
+
+
+def noise_events(rate: float, params: int, until: float, rng: random.Random) -> Iterator[tuple[float, bytes]]:
+    """無関係なアバターパラメータを rate Hz で until 秒まで流す。"""
+    if rate <= 0 or params <= 0:
+        return
+    addresses = [pad_address(f"/avatar/parameters/Noise_{i:03d}") for i in range(params)]
+    interval = 1.0 / rate
+    n = int(until * rate)
+    for i in range(n):
+        yield i * interval, _float_dgram(addresses[rng.randrange(params)], rng.random())
+
+
+def build_schedule(
+    profile: str,
+    rate: float,
+    prefixes: int,
+    repeat: int,
+    gap: float,
+    stretch_param: str,
+    is_grabbed_param: str,
+    noise_rate: float = 0.0,
+    noise_params: int = 50,
+    seed: int = 0,
+    **profile_args,
+) -> tuple[Iterator[tuple[float, bytes]], float]:
+    """全 PhysBone・全繰り返し・ノイズを時刻順にマージした送信予定を返す。
+
+    Returns:
+        (時刻順の (送信時刻, データグラム) イテレータ, 全体の長さ（秒）)
+    """
+    rng = random.Random(seed)
+    streams = []
+    total = 0.0
+    for stretch_addr, grabbed_addr in prefix_addresses(stretch_param, is_grabbed_param, prefixes):
+        # PhysBone ごとに開始をずらして、全部が同じ瞬間に送られないようにする
+        offset = rng.uniform(0.0, gap) if prefixes > 1 else 0.0
+        for _ in range(repeat):
+            samples, release_at = profile_samples(profile, rate, rng=rng, **profile_args)
+            streams.append(grab_events(stretch_addr, grabbed_addr, samples, release_at, offset))
+            offset += release_at + gap
+        total = max(total, offset)
+    streams.append(noise_events(noise_rate, noise_params, total, rng))
+    return heapq.merge(*streams, key=lambda e: e[0]), total
+
+
+# ---------------------------------------------------------------------- #
+# 送信                                                                     #
+# ---------------------------------------------------------------------- #
+
+def send(schedule: Iterator[tuple[float, bytes]], address: tuple[str, int]) -> dict:
+    """予定時刻どおりに送る。kHz 級では sleep の粒度より細かいので、遅れた分はまとめて送る。"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sendto = sock.sendto
+    sent = 0
+    max_late = 0.0
+    start = time.perf_counter()
+    try:
+        for t, dgram in schedule:
+            delay = start + t - time.perf_counter()
+            if delay > 0.001:
+                time.sleep(delay - 0.0005)
+            while start + t > time.perf_counter():
+                pass
+            late = time.perf_counter() - (start + t)
+            if late > max_late:
+                max_late = late
+            sendto(dgram, address)
+            sent += 1
+    finally:
+        sock.close()
+    elapsed = time.perf_counter() - start
+    return {"sent": sent, "elapsed": elapsed, "pps": sent / elapsed if elapsed > 0 else 0.0, "max_late": max_late}
+
+
+def main() -> None:
+    import settings as s_mod
+    osc = s_mod.settings.osc
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=PROFILES, default="yank")
+    parser.add_argument("--rate", type=float, default=60.0, help="PhysBone 1 個あたりの Stretch 送信レート（Hz）")
+    parser.add_argument("--peak", type=float, default=0.6)
+    parser.add_argument("--duration", type=float, default=1.0, help="slow / jitter / hold の長さ（秒）")
+    parser.add_argument("--tugs", type=int, default=3)
+    parser.add_argument("--jitter", type=float, default=0.05, help="jitter の振れ幅")
+    parser.add_argument("--repeat", type=int, default=1, help="Grab の繰り返し回数")
+    parser.add_argument("--gap", type=float, default=0.5, help="Grab の間隔（秒）")
+    parser.add_argument("--prefixes", type=int, default=1, help="並行して動かす PhysBone の数")
+    parser.add_argument("--noise-rate", type=float, default=0.0, help="無関係なパラメータの送信レート（Hz）")
+    parser.add_argument("--noise-params", type=int, default=50, help="無関係なパラメータの種類数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=osc.listen_port)
+    args = parser.parse_args()
+
+    schedule, total = build_schedule(
+        args.profile, args.rate, args.prefixes, args.repeat, args.gap,
+        osc.stretch_param, osc.is_grabbed_param,
+        noise_rate=args.noise_rate, noise_params=args.noise_params, seed=args.seed,
+        peak=args.peak, duration=args.duration, tugs=args.tugs, jitter=args.jitter,
+    )
+    print(f"Sending '{args.profile}' x{args.repeat} to {args.host}:{args.port} "
+          f"({args.prefixes} PhysBone(s), {args.rate:g} Hz, noise {args.noise_rate:g} Hz, ~{total:.1f}s)")
+    result = send(schedule, (args.host, args.port))
+    print(f"Sent {result['sent']} packets in {result['elapsed']:.2f}s "
+          f"({result['pps']:.0f} pps, max late {result['max_late'] * 1000:.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
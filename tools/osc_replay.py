@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+OSC キャプチャの再生ツール
+
+[osc] capture = true で記録したキャプチャファイル（.pvcap）を、受信ポートへ送り直す。
+本体を起動した状態で実行すれば、VRChat で同じ操作をせずに Zap の挙動を再現できる。
+
+使い方:
+    python tools/osc_replay.py captures/osc_2025-01-01_12-00-00.pvcap
+    python tools/osc_replay.py capture.pvcap --speed 4      # 4 倍速
+    python tools/osc_replay.py capture.pvcap --speed 0      # 待たずに全速
+    python tools/osc_replay.py capture.pvcap --info         # 送信せずに内容だけ表示
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
+
+import argparse
+import time
+
+from osc.capture import CaptureReader, replay
+
+
+def main() -> None:
+    import settings as s_mod
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="キャプチャファイル（.pvcap）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=s_mod.settings.osc.listen_port,
+                        help="送信先ポート（既定は [osc] listen_port）")
+    parser.add_argument("--speed", type=float, default=1.0, help="再生速度の倍率（0 以下で全速）")
+    parser.add_argument("--info", action="store_true", help="送信せずにレコード数と収録時間を表示する")
+    args = parser.parse_args()
+
+    with CaptureReader(args.path) as reader:
+        info = reader.summary()
+    print(f"{args.path}: {info['records']} records, {info['duration']:.1f}s")
+    if args.info:
+        return
+
+    mode = "max speed" if args.speed <= 0 else f"{args.speed:g}x"
+    print(f"Replaying to {args.host}:{args.port} ({mode})...")
+    start = time.perf_counter()
+    sent = replay(args.path, (args.host, args.port), args.speed)
+    print(f"Sent {sent} datagrams in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
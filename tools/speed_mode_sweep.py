@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+速度モード設定（[speed_mode]）の探索ツール
+
+「Zap すべき / すべきでない」のラベル付きトレースに対して、設定の組み合わせ（グリッドまたはランダム）ごとに
+速度モードの判定（speed_kernel.run_grab。ライブの SpeedModeHandler と同じ判定カーネルを配列でまとめて動かす）を行い、
+適合率・再現率・F1 と発火の遅れを出す。
+組み合わせはプロセスプールで全コアに分ける（トレースはワーカーの起動時に 1 回だけ渡す）。
+
+  precision : Zap した Grab のうち、Zap すべきだった割合
+  recall    : Zap すべき Grab のうち、Zap した割合
+  p50 / p90 : 正しく Zap した Grab での遅れ（Stretch が最大値の 99% に届いてから、ミリ秒）
+
+トレース:
+  --traces FILE      : JSON Lines。1 行 1 Grab で {"zap": true, "samples": [[経過秒, Stretch], ...], "release_at": 秒}
+  --journal PATH=zap : ジャーナルの全 Grab に zap / nozap のラベルを付けて使う（複数指定可）
+  どちらもなければ合成トレース（src/grab_traces.py の synthetic_grabs() の decel / smooth / hesitate を zap、
+  slow と profile_samples() の jitter を nozap）。--export FILE で使ったトレースを JSON Lines に書き出す。
+
+探索範囲は --param 名前=値 を繰り返す（名前は [speed_mode] のキー）：
+  名前=1.0,1.5,2.0  : 値の列
+  名前=0.5:2.0:4    : 0.5〜2.0 を 4 点（グリッド）。--random のときは範囲として一様に引く
+--random N を付けると、直積の代わりに N 個をランダムに引く。指定しないキーは [speed_mode] の値のまま。
+
+使い方:
+    python tools/speed_mode_sweep.py                                  # 既定の範囲でグリッド
+    python tools/speed_mode_sweep.py --random 20000 --jobs 8
+    python tools/speed_mode_sweep.py --param speed_zap_threshold=1:3:9 --param speed_zap_hold_time=0.1,0.2,0.3
+    python tools/speed_mode_sweep.py --journal good.pvjrnl=zap --journal idle.pvjrnl=nozap --csv sweep.csv
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
+
+import argparse
+import csv
+import itertools
+import json
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields, replace
+
+import settings as s_mod
+
+# --param を指定しないときの探索範囲（4·4·4·3·3·3 = 1728 通り）
+DEFAULT_SPACE = (
+    "speed_onset_threshold=0.5:2.0:4",
+    "speed_zap_threshold=0.75:3.0:4",
+    "min_speed_threshold=0.25:1.0:4",
+    "speed_stop_threshold=0.05:0.2:3",
+    "speed_zap_hold_time=0.15:0.45:3",
+    "initial_speed_stretch_window=30,50,70",
+)
+
+
+# ---------------------------------------------------------------------- #
+# トレース                                                                 #
+# ---------------------------------------------------------------------- #
+
+def synthetic_traces(count: int, rate: float, noise: float, seed: int) -> list[dict]:
+    from grab_traces import profile_samples, synthetic_grabs
+
+    traces = [{"name": kind, "zap": kind != "slow", "samples": samples, "release_at": release_at}
+              for kind, samples, release_at in synthetic_grabs(count, rate, noise, seed)]
+    rng = random.Random(seed + 1)
+    for _ in range(count // 4):
+        samples, release_at = profile_samples("jitter", rate, peak=rng.uniform(0.2, 0.8), jitter=0.05, rng=rng)
+        traces.append({"name": "jitter", "zap": False, "samples": samples, "release_at": release_at})
+    return traces
+
+
+def load_traces(path: str) -> list[dict]:
+    traces = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                d = json.loads(line)
+                traces.append({"name": d.get("name", "trace"), "zap": bool(d["zap"]),
+                               "samples": [tuple(p) for p in d["samples"]], "release_at": float(d["release_at"])})
+    return traces
+
+
+def journal_traces(spec: str) -> list[dict]:
+    """"path=zap" / "path=nozap" の全 Grab をトレースにする。"""
+    from grab_traces import journal_grabs
+
+    path, _, label = spec.rpartition("=")
+    if label not in ("zap", "nozap") or not path:
+        raise SystemExit(f"--journal expects PATH=zap or PATH=nozap: {spec!r}")
+    return [{"name": name, "zap": label == "zap", "samples": samples, "release_at": release_at}
+            for name, samples, release_at in journal_grabs(path)]
+
+
+# ---------------------------------------------------------------------- #
+# 探索範囲                                                                 #
+# ---------------------------------------------------------------------- #
+
+def parse_space(specs) -> dict[str, tuple]:
+    """名前 → ("values", [値, ...]) または ("range", lo, hi, n)"""
+    types = {f.name: f.type for f in fields(s_mod.settings.speed_mode)}
+    space = {}
+    for spec in specs:
+        name, _, value = spec.partition("=")
+        name = name.strip()
+        if name not in types:
+            raise SystemExit(f"unknown [speed_mode] key: {name!r}")
+        cast = int if types[name] in (int, "int") else float
+        if ":" in value:
+            lo, hi, *n = value.split(":")
+            space[name] = ("range", cast(lo), cast(hi), int(n[0]) if n else 5)
+        else:
+            space[name] = ("values", [cast(v) for v in value.split(",")])
+    return space
+
+
+def _grid_values(entry: tuple) -> list:
+    if entry[0] == "values":
+        return entry[1]
+    _, lo, hi, n = entry
+    if n <= 1:
+        return [lo]
+    values = [lo + (hi - lo) * i / (n - 1) for i in range(n)]
+    return sorted({round(v) for v in values}) if isinstance(lo, int) else [round(v, 6) for v in values]
+
+
+def combinations(space: dict[str, tuple], random_count: int = 0, seed: int = 0) -> list[dict]:
+    names = list(space)
+    if not random_count:
+        return [dict(zip(names, values)) for values in itertools.product(*(_grid_values(space[n]) for n in names))]
+    rng = random.Random(seed)
+    combos = []
+    for _ in range(random_count):
+        combo = {}
+        for name in names:
+            entry = space[name]
+            if entry[0] == "values":
+                combo[name] = rng.choice(entry[1])
+            elif isinstance(entry[1], int):
+                combo[name] = rng.randint(entry[1], entry[2])
+            else:
+                combo[name] = round(rng.uniform(entry[1], entry[2]), 6)
+        combos.append(combo)
+    return combos
+
+
+# ---------------------------------------------------------------------- #
+# 評価（ワーカープロセス）                                                 #
+# ---------------------------------------------------------------------- #
+
+_TRACES: list[tuple[bool, object, object, float, float]] = []
+_BASE = None
+_INTENSITY = None
+
+
+def _load(traces, base) -> None:
+    """トレースを配列（時刻, Stretch）にしておき、基準の設定と強度カーブを覚える。"""
+    import numpy as np
+    from intensity import IntensityConfig, calculate_intensity
+
+    global _TRACES, _BASE, _INTENSITY
+    _TRACES = [(label, np.array([t for t, _ in samples], dtype=float), np.array([s for _, s in samples], dtype=float),
+                release_at, peak_at)
+               for label, samples, release_at, peak_at in traces]
+    _BASE = base
+    cfg = IntensityConfig.from_settings()
+    _INTENSITY = lambda delta: calculate_intensity(delta, cfg)
+
+
+def _init_worker(traces, base) -> None:
+    """ワーカープロセスの起動時に 1 回だけ呼ばれる：トレースと基準の設定を受け取る。"""
+    import logging
+    logging.disable(logging.CRITICAL)
+    s_mod.settings.device.zap_mode = "speed"
+    _load(traces, base)
+
+
+def evaluate(params: dict) -> dict:
+    """1 つの組み合わせで全トレースを判定し（speed_kernel.run_grab）、混同行列と遅れを返す。"""
+    from speed_kernel import run_grab
+
+    sm = replace(_BASE, **params)
+    tp = fp = fn = tn = 0
+    latencies = []
+    for label, times, values, release_at, peak_at in _TRACES:
+        zap_at = next((d.t for d in run_grab(0.0, times, values, release_at, sm, _INTENSITY) if d.kind == "fire"),
+                      None)
+        if zap_at is None:
+            fn += label
+            tn += not label
+        elif label:
+            tp += 1
+            latencies.append((zap_at - peak_at) * 1e3)
+        else:
+            fp += 1
+    return _metrics(params, tp, fp, fn, tn, latencies)
+
+
+def _metrics(params: dict, tp: int, fp: int, fn: int, tn: int, latencies: list[float]) -> dict:
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    latencies.sort()
+    return {
+        **params,
+        "tp": tp, "fp": fp, "fn": fn, "tn": tn,
+        "precision": precision, "recall": recall, "f1": f1,
+        "p50_ms": statistics.median(latencies) if latencies else float("nan"),
+        "p90_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.9))] if latencies else float("nan"),
+    }
+
+
+def run(combos: list[dict], traces: list[dict], base, jobs: int, progress=None) -> list[dict]:
+    """組み合わせを jobs プロセスで評価する（jobs=1 ならこのプロセスで順に。zap_mode は呼び出し側で "speed" にしておく）。"""
+    from grab_traces import peak_time
+
+    packed = [(tr["zap"], tr["samples"], tr["release_at"], peak_time(tr["samples"])) for tr in traces]
+    if jobs <= 1:
+        _load(packed, base)
+        results = []
+        for i, combo in enumerate(combos, 1):
+            results.append(evaluate(combo))
+            if progress:
+                progress(i)
+        return results
+    chunksize = max(1, min(64, len(combos) // (jobs * 16)))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(packed, base)) as pool:
+        results = []
+        for i, r in enumerate(pool.map(evaluate, combos, chunksize=chunksize), 1):
+            results.append(r)
+            if progress:
+                progress(i)
+        return results
+
+
+def pareto_front(results: list[dict]) -> list[dict]:
+    """precision・recall が高く p50 が小さい方向で、他のどれにも劣らない組み合わせ（同じ成績は 1 つだけ）を F1 順に返す。"""
+    def key(r):
+        p50 = r["p50_ms"]
+        return r["precision"], r["recall"], -(p50 if p50 == p50 else float("inf"))
+
+    front: dict[tuple, dict] = {}
+    for k, r in sorted(((key(r), r) for r in results), key=lambda kr: kr[0], reverse=True):
+        if k not in front and not any(all(a >= b for a, b in zip(fk, k)) for fk in front):
+            front[k] = r
+    return sorted(front.values(), key=lambda r: -r["f1"])
+
+
+# ---------------------------------------------------------------------- #
+# 表示                                                                     #
+# ---------------------------------------------------------------------- #
+
+def _print_rows(title: str, rows: list[dict], names: list[str]) -> None:
+    print(f"\n{title}")
+    header = "  ".join(f"{n[:22]:>22}" for n in names)
+    print(f"{'prec':>6} {'recall':>6} {'f1':>6} {'p50':>6} {'p90':>6}  {header}")
+    for r in rows:
+        values = "  ".join(f"{r[n]:>22g}" for n in names)
+        print(f"{r['precision']:>6.3f} {r['recall']:>6.3f} {r['f1']:>6.3f} {r['p50_ms']:>6.0f} {r['p90_ms']:>6.0f}  {values}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--traces", help="ラベル付きトレース（JSON Lines）")
+    parser.add_argument("--journal", action="append", default=[], help="PATH=zap / PATH=nozap（複数指定可）")
+    parser.add_argument("--synthetic", type=int, default=200, help="合成トレースの Grab 数")
+    parser.add_argument("--rate", type=float, default=60.0, help="合成トレースの送信レート（Hz）")
+    parser.add_argument("--noise", type=float, default=0.002, help="合成トレースのノイズの振れ幅")
+    parser.add_argument("--export", help="使ったトレースを JSON Lines に書き出す")
+    parser.add_argument("--param", action="append", default=[], help="探索範囲 名前=値,値 / 名前=lo:hi[:n]")
+    parser.add_argument("--random", type=int, default=0, help="直積の代わりにランダムに引く組み合わせ数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="ワーカープロセス数")
+    parser.add_argument("--top", type=int, default=10, help="F1 の上位を何件出すか")
+    parser.add_argument("--csv", help="全結果を CSV に書き出す")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.CRITICAL)
+    s_mod.settings.device.zap_mode = "speed"
+    traces = load_traces(args.traces) if args.traces else []
+    for spec in args.journal:
+        traces += journal_traces(spec)
+    if not traces:
+        traces = synthetic_traces(args.synthetic, args.rate, args.noise, args.seed)
+    if args.export:
+        with open(args.export, "w", encoding="utf-8") as f:
+            for tr in traces:
+                f.write(json.dumps({**tr, "samples": [list(p) for p in tr["samples"]]}) + "\n")
+
+    space = parse_space(args.param or DEFAULT_SPACE)
+    combos = combinations(space, args.random, args.seed)
+    names = list(space)
+    base = s_mod.settings.speed_mode
+    positives = sum(tr["zap"] for tr in traces)
+    samples = sum(len(tr["samples"]) for tr in traces)
+    print(f"{len(traces)} traces ({positives} zap / {len(traces) - positives} nozap, {samples} samples), "
+          f"{len(combos)} combinations, {args.jobs} jobs")
+
+    start = time.perf_counter()
+    step = max(1, len(combos) // 20)
+
+    def progress(done: int) -> None:
+        if done % step == 0 or done == len(combos):
+            elapsed = time.perf_counter() - start
+            print(f"\r  {done}/{len(combos)}  {elapsed:.1f}s  ({done / elapsed:.0f} combos/s)", end="", flush=True)
+
+    results = run(combos, traces, base, args.jobs, progress)
+    elapsed = time.perf_counter() - start
+    print(f"\n{len(combos) * samples / elapsed / 1e6:.2f}M samples/s")
+
+    current = run([{}], traces, base, 1)[0]
+    _print_rows("current [speed_mode]", [{**current, **{n: getattr(base, n) for n in names}}], names)
+    ranked = sorted(results, key=lambda r: (-r["f1"], r["p50_ms"] if r["p50_ms"] == r["p50_ms"] else float("inf")))
+    _print_rows(f"top {args.top} by F1", ranked[:args.top], names)
+    front = pareto_front(results)
+    _print_rows(f"pareto front (precision / recall / p50), {len(front)} combinations", front[:args.top], names)
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+
+if __name__ == "__main__":
+    main()